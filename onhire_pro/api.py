@@ -4,6 +4,10 @@ import json
 from frappe.utils import get_datetime, cint, flt, now
 from frappe.utils.data import validate_json_string
 from onhire_pro.utils.error_handler import handle_api_exception, log_error
+from onhire_pro.utils.availability import (
+    check_availability, get_default_warehouse, get_free_windows, parse_availability_lines
+)
+from onhire_pro.utils.capacity_cache import get_item_capacity
 
 def validate_input(data):
     """Validate input data with improved error handling"""
@@ -151,13 +155,57 @@ def add_to_cart(**kwargs):
 
 def check_stock_availability(item_code, qty):
     """Check if sufficient stock is available"""
-    actual_qty = frappe.db.get_value("Bin", 
-        {"item_code": item_code, "warehouse": get_default_warehouse()},
-        "actual_qty") or 0
-    return actual_qty >= qty
+    return get_item_capacity(item_code, get_default_warehouse()) >= flt(qty)
 
-def get_default_warehouse():
-    """Get default warehouse from settings"""
-    return frappe.db.get_single_value("Stock Settings", "default_warehouse")
+@frappe.whitelist(allow_guest=True)
+def check_item_availability(item_code, start_date, end_date, qty=1):
+    """Check if a rental item is available for the given period"""
+    try:
+        lines = parse_availability_lines([{"item_code": item_code, "qty": qty}], start_date, end_date)
+        result = check_availability(lines)[0]
+        result.success = True
+        return result
+    except Exception as e:
+        return handle_api_exception(e)
+
+@frappe.whitelist(allow_guest=True)
+def check_items_availability(items, start_date=None, end_date=None):
+    """
+    Check availability for a whole catalog page or cart in one call.
+
+    `items` is a JSON list of item codes (checked for start_date/end_date) or of
+    cart lines with their own item_code, qty, start_date and end_date.
+    """
+    try:
+        lines = parse_availability_lines(items, start_date, end_date)
+        results = check_availability(lines)
+
+        availability_map = {}
+        for result in results:
+            # An item is available only if every line for it is
+            if result.item_code not in availability_map or not result.available:
+                availability_map[result.item_code] = result
+
+        return {
+            "success": True,
+            "lines": results,
+            "availability_map": availability_map
+        }
+    except Exception as e:
+        return handle_api_exception(e)
+
+@frappe.whitelist(allow_guest=True)
+def get_next_free_windows(item_code, qty=1, min_days=1, from_date=None, horizon_days=90, limit=3):
+    """Find when a rental item is next free for `qty` units and at least `min_days` days"""
+    try:
+        return {
+            "success": True,
+            "windows": get_free_windows(
+                item_code, qty=qty, min_days=min_days, from_date=from_date,
+                horizon_days=horizon_days, limit=min(cint(limit) or 3, 20)
+            )
+        }
+    except Exception as e:
+        return handle_api_exception(e)
 
 # Add the rest of the improved API functions...
@@ -0,0 +1,66 @@
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("rebuild-rental-occupancy")
+@click.option("--from-date", help="First day to rebuild (default: one year ago)")
+@click.option("--to-date", help="Last day to rebuild (default: one year ahead)")
+@click.option("--item", "items", multiple=True, help="Item Code to rebuild; repeat for several (default: all)")
+@pass_context
+def rebuild_rental_occupancy(context, from_date=None, to_date=None, items=None):
+    """Rebuild the Rental Item Daily Occupancy table from Rental Jobs, Stock Reservations and Maintenance Tasks"""
+    from onhire_pro.utils.daily_occupancy import rebuild_daily_occupancy
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        rows = rebuild_daily_occupancy(from_date, to_date, item_codes=list(items) or None)
+        click.echo(f"Wrote {rows} occupancy rows")
+    finally:
+        frappe.destroy()
+
+
+@click.command("rebuild-rental-revenue")
+@click.option("--from-date", help="First posting date to rebuild (default: three years ago)")
+@click.option("--to-date", help="Last posting date to rebuild (default: today)")
+@click.option("--company", help="Company to rebuild (default: all)")
+@pass_context
+def rebuild_rental_revenue(context, from_date=None, to_date=None, company=None):
+    """Rebuild the Rental Revenue Daily table from submitted Sales Invoices"""
+    from onhire_pro.utils.revenue_rollup import rebuild_revenue_rollup
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        rows = rebuild_revenue_rollup(from_date, to_date, company=company)
+        click.echo(f"Rental revenue rollup holds {rows} rows for the period")
+    finally:
+        frappe.destroy()
+
+
+@click.command("rebuild-rental-leaderboards")
+@click.option("--from-date", help="First day to rebuild (default: three years ago)")
+@click.option("--to-date", help="Last day to rebuild (default: today)")
+@pass_context
+def rebuild_rental_leaderboards(context, from_date=None, to_date=None):
+    """Rebuild the Rental Leaderboard Entry table from Rental Jobs and Sales Invoices"""
+    from onhire_pro.utils.leaderboards import rebuild_leaderboards
+
+    site = get_site(context)
+    frappe.init(site=site)
+    frappe.connect()
+    try:
+        rows = rebuild_leaderboards(from_date, to_date)
+        click.echo(f"Rental leaderboards hold {rows} entries for the period")
+    finally:
+        frappe.destroy()
+
+
+commands = [
+    rebuild_rental_occupancy,
+    rebuild_rental_revenue,
+    rebuild_rental_leaderboards
+]
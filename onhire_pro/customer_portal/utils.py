@@ -2,6 +2,7 @@ import frappe
 import json
 from frappe.utils import getdate, date_diff, flt, today, add_days, get_first_day, get_last_day, now_datetime
 from frappe.utils.csvutils import build_csv_response
+from onhire_pro.utils.availability import check_availability, get_availability_map
 
 
 def create_portal_user_for_contact(contact_docname):
@@ -173,17 +174,12 @@ def check_multiple_item_availability(item_codes, start_date, end_date):
         return {"error": "Start date and end date are required for availability check."}
 
     availability_map = {}
-    for item_code in item_codes_list:
+    for item_code, result in get_availability_map(item_codes_list, start_date, end_date).items():
         availability_map[item_code] = {
-            "available": True, 
-            "reason": "Availability check placeholder - marked as available."
+            "available": result.available,
+            "available_qty": result.available_qty,
+            "reason": result.reason
         }
-    
-    if len(item_codes_list) > 1:
-        if item_codes_list[0] in availability_map: 
-            availability_map[item_codes_list[0]] = {"available": False, "reason": "Booked (Demo)"}
-        if item_codes_list[1] in availability_map:
-             availability_map[item_codes_list[1]] = {"available": True, "reason": ""}
     return {"availability_map": availability_map}
 
 @frappe.whitelist()
@@ -218,10 +214,16 @@ def get_rental_quote_estimate(items_data, start_date_str, end_date_str, customer
     total_discounts = 0.0
     line_items_breakdown = []
 
-    for item_detail in items:
+    items = [item_detail for item_detail in items if flt(item_detail.get("qty", 1)) > 0]
+    availability = check_availability([
+        {"item_code": item_detail.get("item_code"), "qty": item_detail.get("qty", 1),
+         "start_date": start_date, "end_date": end_date}
+        for item_detail in items
+    ])
+
+    for item_detail, item_availability in zip(items, availability):
         item_code = item_detail.get("item_code")
         qty = flt(item_detail.get("qty", 1))
-        if qty <= 0: continue
 
         item_price_details = frappe.db.get_value("Item Price", {
             "item_code": item_code,
@@ -236,7 +238,8 @@ def get_rental_quote_estimate(items_data, start_date_str, end_date_str, customer
             if not daily_rate:
                  line_items_breakdown.append({
                     "item_code": item_code, "qty": qty, "rate": 0, "days": rental_days,
-                    "line_total": 0, "error": "Rate not found"
+                    "line_total": 0, "error": "Rate not found",
+                    "available": item_availability.available
                 })
                  continue
 
@@ -259,7 +262,10 @@ def get_rental_quote_estimate(items_data, start_date_str, end_date_str, customer
             "base_amount": line_total_before_modifiers,
             "surcharge": item_surcharge,
             "discount": item_discount,
-            "line_total": line_total_after_modifiers
+            "line_total": line_total_after_modifiers,
+            "available": item_availability.available,
+            "available_qty": item_availability.available_qty,
+            "availability_reason": item_availability.reason
         })
 
     tax_amount = 0
@@ -394,7 +400,7 @@ def export_customer_rental_history():
     
     output = ""
     for row_idx, row_val in enumerate(csv_data):
-        output += ",".join([f'"{str(x).replace("\"", "\"\"")}"' for x in row_val]) + ("\n" if row_idx < len(csv_data) -1 else "")
+        output += ",".join(['"' + str(x).replace('"', '""') + '"' for x in row_val]) + ("\n" if row_idx < len(csv_data) -1 else "")
     return {"csv_data": output}
 
 @frappe.whitelist()
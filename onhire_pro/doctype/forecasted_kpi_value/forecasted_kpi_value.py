@@ -1,24 +1,41 @@
 # Project/onhire_pro/onhire_pro/doctype/forecasted_kpi_value/forecasted_kpi_value.py
+import hashlib
 import frappe
 from frappe.model.document import Document
+from frappe.utils import getdate
+
+# A forecast value is unique per KPI, target date, company and forecast date
+UNIQUE_KEY = ("kpi_name", "target_date", "company", "forecast_date")
+
+
+def forecasted_kpi_value_name(kpi_name, target_date, company, forecast_date):
+    """Name of the forecast value of a unique key, shared by the ORM and bulk upserts."""
+    key = "|".join([kpi_name, str(getdate(target_date)), company or "", str(getdate(forecast_date))])
+    return f"FKV-{hashlib.md5(key.encode()).hexdigest()}"
+
 
 class ForecastedKPIValue(Document):
     def autoname(self):
-        # Naming: FKV-KPI Name-Forecast Date
-        self.name = f"FKV-{self.kpi_name}-{self.forecast_date}"
+        # Naming: FKV-hash of the unique key
+        self.name = forecasted_kpi_value_name(self.kpi_name, self.target_date, self.company, self.forecast_date)
 
     def validate(self):
         if not self.kpi_name or not self.forecast_date:
             frappe.throw("KPI Name and Forecast Date are mandatory.")
-        
-        # Ensure unique combination of kpi_name, forecast_date, periodicity, and company
+
+        # Ensure unique combination of kpi_name, target_date, company and forecast_date
         # to avoid duplicate forecast entries for the same point.
         existing = frappe.db.exists("Forecasted KPI Value", {
             "kpi_name": self.kpi_name,
-            "forecast_date": self.forecast_date,
-            "periodicity": self.periodicity,
+            "target_date": self.target_date,
             "company": self.company,
+            "forecast_date": self.forecast_date,
             "name": ["!=", self.name] # Exclude current doc if updating
         })
         if existing:
-            frappe.throw(f"A forecast for KPI '{self.kpi_name}' on date '{self.forecast_date}' with periodicity '{self.periodicity}' for company '{self.company}' already exists: {existing}")
+            frappe.throw(f"A forecast for KPI '{self.kpi_name}' on date '{self.target_date}' made on '{self.forecast_date}' for company '{self.company}' already exists: {existing}")
+
+
+def on_doctype_update():
+    """Forecasts are upserted on their unique key"""
+    frappe.db.add_unique("Forecasted KPI Value", list(UNIQUE_KEY), constraint_name="unique_forecast")
@@ -0,0 +1,16 @@
+# Copyright (c) 2025, OnHire Pro and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class RentalBookingConflict(Document):
+    """
+    One over-capacity period of an item in a warehouse. Rows are replaced in bulk
+    by onhire_pro.utils.conflict_detector and never edited by hand.
+    """
+    pass
+
+def on_doctype_update():
+    """The KPI and the conflict report read the table by date range"""
+    frappe.db.add_index("Rental Booking Conflict", ["from_date", "to_date"])
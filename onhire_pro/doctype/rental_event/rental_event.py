@@ -3,7 +3,11 @@
 
 import frappe
 from frappe.model.document import Document
-from frappe.utils import get_datetime, add_to_date, cint, getdate, now_datetime, get_link_to_form
+from frappe.utils import get_datetime, add_to_date, cint, getdate, get_link_to_form
+from onhire_pro.utils.availability_index import get_peak_booked_qty, get_serial_conflict
+from onhire_pro.utils.reservations import create_bulk_reservations, format_conflicts
+from onhire_pro.utils.capacity_cache import get_item_capacity, prefetch_item_capacities
+from onhire_pro.utils.serial_allocator import allocate_serials
 
 class RentalEvent(Document):
     def validate(self):
@@ -43,70 +47,44 @@ class RentalEvent(Document):
         """Detect scheduling conflicts for serialized and non-serialized items"""
         if not self.items or len(self.items) == 0:
             return
+        
+        # Load the stock of every bulk item in one go
+        prefetch_item_capacities(item.item_code for item in self.items if not item.serial_no)
             
         for item in self.items:
             if item.serial_no:
                 # Check for serialized item conflicts
                 self.detect_serialized_item_conflict(item)
+            elif frappe.get_cached_value("Item", item.item_code, "has_serial_no"):
+                # Serials are assigned on submit; check that enough of them are free
+                self.detect_serial_pool_conflict(item)
             else:
                 # Check for non-serialized item conflicts
                 self.detect_non_serialized_item_conflict(item)
     
     def detect_serialized_item_conflict(self, item):
         """Check if a serialized item is already booked during the requested period"""
-        conflicts = frappe.db.sql("""
-            SELECT re.name, rei.serial_no, re.title, re.start_date, re.end_date
-            FROM `tabRental Event Item` rei
-            JOIN `tabRental Event` re ON rei.parent = re.name
-            WHERE 
-                rei.serial_no = %s
-                AND re.name != %s
-                AND re.docstatus = 1
-                AND re.status IN ('Scheduled', 'Confirmed', 'In Progress')
-                AND (
-                    (rei.start_date <= %s AND rei.end_date >= %s)
-                    OR (rei.start_date <= %s AND rei.end_date >= %s)
-                    OR (rei.start_date >= %s AND rei.end_date <= %s)
-                )
-        """, (
-            item.serial_no, 
-            self.name or "New Rental Event",
-            item.end_date, item.start_date,
-            item.start_date, item.start_date,
-            item.start_date, item.end_date
-        ), as_dict=1)
+        conflict = get_serial_conflict(
+            item.item_code,
+            item.serial_no,
+            item.start_date,
+            item.end_date,
+            exclude=self.name
+        )
         
-        if conflicts:
-            conflict = conflicts[0]
-            frappe.throw(f"Serial No {item.serial_no} is already booked in Rental Event {conflict.name} ({conflict.title}) from {conflict.start_date} to {conflict.end_date}")
+        if conflict:
+            frappe.throw(f"Serial No {item.serial_no} is already booked in {conflict.reference_doctype} {conflict.reference_name} from {conflict.from_date} to {conflict.to_date}")
+    
+    def detect_serial_pool_conflict(self, item):
+        """Check if enough serials of a serialized item are free during the requested period"""
+        if not allocate_serials(item.item_code, cint(item.qty), item.start_date, item.end_date, exclude=self.name):
+            frappe.throw(f"Not enough serial numbers of {item.item_code} are free for the requested period. Requested: {cint(item.qty)}")
     
     def detect_non_serialized_item_conflict(self, item):
         """Check if enough quantity of a non-serialized item is available during the requested period"""
-        # Get total quantity of this item booked during the period
-        booked_qty = frappe.db.sql("""
-            SELECT SUM(rei.qty) as total_qty
-            FROM `tabRental Event Item` rei
-            JOIN `tabRental Event` re ON rei.parent = re.name
-            WHERE 
-                rei.item_code = %s
-                AND rei.serial_no IS NULL
-                AND re.name != %s
-                AND re.docstatus = 1
-                AND re.status IN ('Scheduled', 'Confirmed', 'In Progress')
-                AND (
-                    (rei.start_date <= %s AND rei.end_date >= %s)
-                    OR (rei.start_date <= %s AND rei.end_date >= %s)
-                    OR (rei.start_date >= %s AND rei.end_date <= %s)
-                )
-        """, (
-            item.item_code, 
-            self.name or "New Rental Event",
-            item.end_date, item.start_date,
-            item.start_date, item.start_date,
-            item.start_date, item.end_date
-        ), as_dict=1)
-        
-        booked_qty = booked_qty[0].total_qty or 0
+        # Get the peak quantity of this item booked at any one time during the period,
+        # ignoring this event's own reservations
+        booked_qty = get_peak_booked_qty(item.item_code, item.start_date, item.end_date, exclude=self.name)
         
         # Get available quantity from stock
         available_qty = self.get_available_qty(item.item_code)
@@ -116,15 +94,7 @@ class RentalEvent(Document):
     
     def get_available_qty(self, item_code):
         """Get available quantity of an item from stock"""
-        # This is a simplified version - in a real implementation, 
-        # you would query the actual stock ledger or bin
-        available_qty = frappe.db.sql("""
-            SELECT SUM(actual_qty) as qty
-            FROM `tabBin`
-            WHERE item_code = %s
-        """, (item_code), as_dict=1)
-        
-        return available_qty[0].qty or 0
+        return get_item_capacity(item_code)
     
     def on_submit(self):
         """Actions to take when event is submitted"""
@@ -137,41 +107,36 @@ class RentalEvent(Document):
             self.schedule_reminders()
     
     def create_stock_reservations(self):
-        """Create stock reservations for items in the event"""
+        """
+        Reserve all items in the event together; nothing is reserved if any line conflicts.
+        Serialized lines without a serial get free serials assigned in the same batch.
+        """
+        report = create_bulk_reservations(
+            [
+                {
+                    "idx": item.idx,
+                    "item_code": item.item_code,
+                    "serial_no": item.serial_no,
+                    "qty": 1 if item.serial_no else item.qty,
+                    "from_date": item.start_date,
+                    "to_date": item.end_date
+                }
+                for item in self.items
+            ],
+            "Rental Event",
+            self.name
+        )
+        
+        if not report["success"]:
+            frappe.throw(f"Could not reserve the event items:<br>{format_conflicts(report['conflicts'])}")
+        
+        # Record the assigned serial on single-unit lines that did not name one
+        assigned = {}
+        for line in report["lines"]:
+            assigned.setdefault(line.idx, []).append(line.serial_no)
         for item in self.items:
-            if item.serial_no:
-                # Create serialized item reservation
-                self.create_serialized_reservation(item)
-            else:
-                # Create non-serialized item reservation
-                self.create_non_serialized_reservation(item)
-    
-    def create_serialized_reservation(self, item):
-        """Create a reservation for a serialized item"""
-        reservation = frappe.new_doc("Stock Reservation")
-        reservation.item_code = item.item_code
-        reservation.serial_no = item.serial_no
-        reservation.qty = 1
-        reservation.reservation_date = now_datetime()
-        reservation.from_date = item.start_date
-        reservation.to_date = item.end_date
-        reservation.reference_doctype = "Rental Event"
-        reservation.reference_name = self.name
-        reservation.status = "Reserved"
-        reservation.insert()
-    
-    def create_non_serialized_reservation(self, item):
-        """Create a reservation for a non-serialized item"""
-        reservation = frappe.new_doc("Stock Reservation")
-        reservation.item_code = item.item_code
-        reservation.qty = item.qty
-        reservation.reservation_date = now_datetime()
-        reservation.from_date = item.start_date
-        reservation.to_date = item.end_date
-        reservation.reference_doctype = "Rental Event"
-        reservation.reference_name = self.name
-        reservation.status = "Reserved"
-        reservation.insert()
+            if not item.serial_no and len(assigned.get(item.idx, [])) == 1 and assigned[item.idx][0]:
+                item.db_set("serial_no", assigned[item.idx][0], update_modified=False)
     
     def schedule_reminders(self):
         """Schedule reminders for the event"""
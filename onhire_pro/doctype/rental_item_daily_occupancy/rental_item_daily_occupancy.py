@@ -0,0 +1,17 @@
+# Copyright (c) 2025, OnHire Pro and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class RentalItemDailyOccupancy(Document):
+    """
+    One row per item, warehouse, company and day. Rows are written in bulk by
+    onhire_pro.utils.daily_occupancy and never edited by hand.
+    """
+    pass
+
+def on_doctype_update():
+    """Reports read the table by item and date range"""
+    frappe.db.add_index("Rental Item Daily Occupancy", ["item_code", "date"])
+    frappe.db.add_index("Rental Item Daily Occupancy", ["date", "company"])
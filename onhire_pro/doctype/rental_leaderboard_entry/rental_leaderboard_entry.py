@@ -0,0 +1,16 @@
+# Copyright (c) 2025, OnHire Pro and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class RentalLeaderboardEntry(Document):
+    """
+    Score of one member of a leaderboard for a company and a day or month. Rows
+    are written by onhire_pro.utils.leaderboards and never edited by hand.
+    """
+    pass
+
+def on_doctype_update():
+    """Leaderboards are read by board, period and company"""
+    frappe.db.add_index("Rental Leaderboard Entry", ["board", "period_type", "period_start", "company"])
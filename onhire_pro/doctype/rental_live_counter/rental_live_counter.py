@@ -0,0 +1,16 @@
+# Copyright (c) 2025, OnHire Pro and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class RentalLiveCounter(Document):
+    """
+    Number of open documents of one doctype, company, status and dates. Rows are
+    written by onhire_pro.utils.live_counters and never edited by hand.
+    """
+    pass
+
+def on_doctype_update():
+    """Number cards read the counters of a doctype and company"""
+    frappe.db.add_index("Rental Live Counter", ["source_doctype", "company", "status"])
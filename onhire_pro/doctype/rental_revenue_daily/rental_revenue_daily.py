@@ -0,0 +1,18 @@
+# Copyright (c) 2025, OnHire Pro and contributors
+# For license information, please see license.txt
+
+import frappe
+from frappe.model.document import Document
+
+class RentalRevenueDaily(Document):
+    """
+    One row per company, day, item group, item, customer, rental job and sales
+    person. Rows are written by onhire_pro.utils.revenue_rollup and never edited
+    by hand.
+    """
+    pass
+
+def on_doctype_update():
+    """KPIs and reports read the table by company and date range"""
+    frappe.db.add_index("Rental Revenue Daily", ["company", "date"])
+    frappe.db.add_index("Rental Revenue Daily", ["company", "item_group", "date"])
@@ -4,7 +4,13 @@
 import frappe
 from frappe.model.document import Document
 import json
-from frappe.utils import now_datetime, get_datetime, add_to_date
+import math
+from frappe.utils import now_datetime, get_datetime, add_to_date, formatdate
+from onhire_pro.utils.availability_index import update_reservation_index, find_free_windows
+from onhire_pro.utils.reservations import get_locked_item_index
+from onhire_pro.utils.capacity_cache import get_item_capacity
+
+ALTERNATIVE_DATES_HORIZON_DAYS = 90
 
 class StockReservation(Document):
     def validate(self):
@@ -22,90 +28,87 @@ class StockReservation(Document):
     
     def validate_item_availability(self):
         """Check if the item is available for reservation during the specified period"""
+        # Skip validation if this is an update of an existing reservation
+        if not self.is_new():
+            return
+        
+        self.check_item_availability()
+    
+    def before_submit(self):
+        # Only submitted reservations hold stock, so the check that counts is the one at submit
+        self.check_item_availability()
+    
+    def check_item_availability(self):
+        """Check availability while holding the item lock, so concurrent bookings are checked one at a time"""
+        index = get_locked_item_index(self.item_code)
+        
         if self.serial_no:
-            self.validate_serialized_item()
+            self.validate_serialized_item(index)
         else:
-            self.validate_non_serialized_item()
+            self.validate_non_serialized_item(index)
     
-    def validate_serialized_item(self):
+    def validate_serialized_item(self, index):
         """Check if a serialized item is already reserved during the requested period"""
-        # Skip validation if this is an update of an existing reservation
-        if not self.is_new():
-            return
-            
-        conflicts = frappe.db.sql("""
-            SELECT sr.name, sr.reference_doctype, sr.reference_name, sr.from_date, sr.to_date
-            FROM `tabStock Reservation` sr
-            WHERE 
-                sr.serial_no = %s
-                AND sr.name != %s
-                AND sr.docstatus = 1
-                AND sr.status IN ('Reserved', 'In Use')
-                AND (
-                    (sr.from_date <= %s AND sr.to_date >= %s)
-                    OR (sr.from_date <= %s AND sr.to_date >= %s)
-                    OR (sr.from_date >= %s AND sr.to_date <= %s)
-                )
-        """, (
-            self.serial_no, 
-            self.name or "New Stock Reservation",
-            self.to_date, self.from_date,
-            self.from_date, self.from_date,
-            self.from_date, self.to_date
-        ), as_dict=1)
+        conflict = index.serial_conflict(
+            self.serial_no,
+            self.from_date,
+            self.to_date,
+            exclude=self.name
+        )
         
-        if conflicts:
-            conflict = conflicts[0]
-            frappe.throw(f"Serial No {self.serial_no} is already reserved in {conflict.reference_doctype} {conflict.reference_name} from {conflict.from_date} to {conflict.to_date}")
+        if conflict:
+            frappe.throw(f"Serial No {self.serial_no} is already reserved in {conflict.reference_doctype} {conflict.reference_name} from {conflict.from_date} to {conflict.to_date}"
+                         + self.get_alternative_dates_message(serial_nos=[self.serial_no]))
     
-    def validate_non_serialized_item(self):
+    def validate_non_serialized_item(self, index):
         """Check if enough quantity of a non-serialized item is available during the requested period"""
-        # Skip validation if this is an update of an existing reservation
-        if not self.is_new():
-            return
-            
-        # Get total quantity of this item reserved during the period
-        reserved_qty = frappe.db.sql("""
-            SELECT SUM(sr.qty) as total_qty
-            FROM `tabStock Reservation` sr
-            WHERE 
-                sr.item_code = %s
-                AND sr.serial_no IS NULL
-                AND sr.name != %s
-                AND sr.docstatus = 1
-                AND sr.status IN ('Reserved', 'In Use')
-                AND (
-                    (sr.from_date <= %s AND sr.to_date >= %s)
-                    OR (sr.from_date <= %s AND sr.to_date >= %s)
-                    OR (sr.from_date >= %s AND sr.to_date <= %s)
-                )
-        """, (
-            self.item_code, 
-            self.name or "New Stock Reservation",
-            self.to_date, self.from_date,
-            self.from_date, self.from_date,
-            self.from_date, self.to_date
-        ), as_dict=1)
-        
-        reserved_qty = reserved_qty[0].total_qty or 0
+        # Get the peak quantity of this item reserved at any one time during the period
+        reserved_qty = index.peak_booked_qty(self.from_date, self.to_date, exclude=self.name)
         
         # Get available quantity from stock
         available_qty = self.get_available_qty()
         
         if (reserved_qty + self.qty) > available_qty:
-            frappe.throw(f"Not enough quantity available for {self.item_code}. Requested: {self.qty}, Available: {available_qty - reserved_qty}")
+            frappe.throw(f"Not enough quantity available for {self.item_code}. Requested: {self.qty}, Available: {available_qty - reserved_qty}"
+                         + self.get_alternative_dates_message(capacity=available_qty))
+    
+    def get_alternative_dates(self, capacity=0, serial_nos=None, limit=3):
+        """Find the next periods, from the requested start day, long enough for this reservation"""
+        duration = get_datetime(self.to_date) - get_datetime(self.from_date)
+        min_days = max(math.ceil(duration.total_seconds() / 86400), 1)
+        
+        return find_free_windows(
+            self.item_code,
+            self.from_date,
+            ALTERNATIVE_DATES_HORIZON_DAYS,
+            min_days,
+            qty=1 if serial_nos else self.qty,
+            capacity=capacity,
+            serial_nos=serial_nos,
+            exclude=self.name,
+            limit=limit
+        )
+    
+    def get_alternative_dates_message(self, capacity=0, serial_nos=None):
+        """Suggest alternative dates to append to an availability error"""
+        try:
+            windows = self.get_alternative_dates(capacity=capacity, serial_nos=serial_nos)
+        except Exception:
+            frappe.log_error(f"Failed to find alternative dates for {self.item_code}: {frappe.get_traceback()}", "Stock Reservation Error")
+            return ""
+        
+        if not windows:
+            return f"<br>No alternative dates found in the next {ALTERNATIVE_DATES_HORIZON_DAYS} days."
+        
+        suggestions = ", ".join(
+            f"{formatdate(window.start_date)} to {formatdate(window.end_date)}" + (" or later" if window.open_ended else "")
+            for window in windows
+        )
+        return f"<br>Available periods: {suggestions}"
     
     def get_available_qty(self):
         """Get available quantity of an item from stock"""
-        # This is a simplified version - in a real implementation, 
-        # you would query the actual stock ledger or bin
-        available_qty = frappe.db.sql("""
-            SELECT SUM(actual_qty) as qty
-            FROM `tabBin`
-            WHERE item_code = %s
-        """, (self.item_code), as_dict=1)
-        
-        return available_qty[0].qty or 0
+        return get_item_capacity(self.item_code)
     
     def on_submit(self):
         """Update item status when reservation is submitted"""
@@ -113,6 +116,8 @@ class StockReservation(Document):
             # Update Serial No status
             frappe.db.set_value("Serial No", self.serial_no, "reservation_status", "Reserved")
             frappe.db.set_value("Serial No", self.serial_no, "reserved_for", f"{self.reference_doctype}: {self.reference_name}")
+        
+        update_reservation_index(self)
     
     def on_cancel(self):
         """Update item status when reservation is cancelled"""
@@ -120,6 +125,12 @@ class StockReservation(Document):
             # Update Serial No status
             frappe.db.set_value("Serial No", self.serial_no, "reservation_status", "Available")
             frappe.db.set_value("Serial No", self.serial_no, "reserved_for", None)
+        
+        update_reservation_index(self)
+    
+    def on_update_after_submit(self):
+        """Status changes (In Use, Completed) alter what the availability index holds"""
+        update_reservation_index(self)
     
     def mark_as_in_use(self):
         """Mark the reservation as in use when the item is dispatched"""
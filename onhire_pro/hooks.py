@@ -8,6 +8,88 @@ app_include_js = [
 
 doc_events = {
     "Sales Invoice": {
+        "on_submit": [
+            "onhire_pro.utils.revenue_rollup.update_revenue_rollup",
+            "onhire_pro.utils.leaderboards.update_leaderboards"
+        ],
+        "on_cancel": [
+            "onhire_pro.utils.revenue_rollup.update_revenue_rollup",
+            "onhire_pro.utils.leaderboards.update_leaderboards"
+        ],
+        "on_change": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache",
+        "on_trash": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+    },
+    "Rental Job": {
+        "on_submit": [
+            "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+            "onhire_pro.utils.leaderboards.update_leaderboards"
+        ],
+        "on_cancel": [
+            "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+            "onhire_pro.utils.leaderboards.update_leaderboards"
+        ],
+        "on_update_after_submit": "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+        "on_change": [
+            "onhire_pro.utils.kpi_cache.invalidate_kpi_cache",
+            "onhire_pro.utils.live_counters.update_live_counters"
+        ],
+        "on_trash": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+    },
+    "Stock Reservation": {
+        "on_submit": "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+        "on_cancel": "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+        "on_update_after_submit": "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+        "on_change": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+    },
+    "Stock Ledger Entry": {
+        "on_submit": [
+            "onhire_pro.utils.capacity_cache.invalidate_stock_ledger_entry",
+            "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+        ],
+        "on_cancel": [
+            "onhire_pro.utils.capacity_cache.invalidate_stock_ledger_entry",
+            "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+        ]
+    },
+    "Maintenance Task": {
+        "on_submit": "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+        "on_cancel": "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+        "on_update_after_submit": "onhire_pro.utils.daily_occupancy.update_daily_occupancy",
+        "on_change": [
+            "onhire_pro.utils.kpi_cache.invalidate_kpi_cache",
+            "onhire_pro.utils.live_counters.update_live_counters"
+        ],
+        "on_trash": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+    },
+    "Condition Assessment": {
+        "on_change": [
+            "onhire_pro.utils.kpi_cache.invalidate_kpi_cache",
+            "onhire_pro.utils.live_counters.update_live_counters"
+        ],
+        "on_trash": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+    },
+    "Quotation": {
+        "on_change": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache",
+        "on_trash": "onhire_pro.utils.kpi_cache.invalidate_kpi_cache"
+    },
+    "Custom Field": {
+        "on_update": "onhire_pro.utils.schema_capabilities.invalidate_schema_capabilities",
+        "on_trash": "onhire_pro.utils.schema_capabilities.invalidate_schema_capabilities"
     }
 }
 
+after_migrate = [
+    "onhire_pro.utils.schema_capabilities.refresh_schema_capabilities"
+]
+
+scheduler_events = {
+    "hourly": [
+        "onhire_pro.utils.live_counters.reconcile_live_counters"
+    ],
+    "daily": [
+        "onhire_pro.utils.daily_occupancy.refresh_recent_occupancy",
+        "onhire_pro.utils.conflict_detector.refresh_booking_conflicts",
+        "onhire_pro.utils.leaderboards.refresh_recent_leaderboards",
+        "onhire_pro.utils.revenue_rollup.refresh_recent_revenue"
+    ]
+}
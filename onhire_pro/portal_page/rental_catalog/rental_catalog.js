@@ -187,20 +187,15 @@ class RentalCatalog {
     }
 
     check_availability_and_render() {
-        // CP_RENTAL.4.2: Implement Dynamic Availability Filtering
-        // This requires a backend method to check availability for multiple items.
-        // For now, this is a placeholder. The actual check would involve:
-        // 1. Collecting all item_codes from this.items
-        // 2. Calling a whitelisted backend method: e.g., get_items_availability(item_codes, start_date, end_date)
-        // 3. Backend method checks stock ledger or Rental Event conflicts for each item.
-        // 4. Backend returns a map: { item_code: { available: true/false, reason: "..." } }
-        // 5. Client-side then filters or annotates items before rendering.
+        // CP_RENTAL.4.2: Dynamic Availability Filtering
+        // All items on the page are checked in one batch call, which returns a map:
+        // { item_code: { available: true/false, available_qty: n, reason: "..." } }
 
         frappe.show_progress(__("Checking Availability..."), true, false);
         const item_codes = this.items.map(item => item.item_code);
 
         frappe.call({
-            method: "onhire_pro.onhire_pro.customer_portal.utils.check_multiple_item_availability", // Assuming this method exists
+            method: "onhire_pro.onhire_pro.customer_portal.utils.check_multiple_item_availability",
             args: {
                 item_codes: JSON.stringify(item_codes),
                 start_date: this.filters.start_date,
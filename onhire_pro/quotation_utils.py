@@ -1,12 +1,21 @@
 import frappe
 from frappe.utils import flt, get_datetime
 from frappe import _
+from onhire_pro.utils.availability_index import get_peak_booked_qty, get_serial_conflict
+from onhire_pro.utils.reservations import create_bulk_reservations, format_conflicts
+from onhire_pro.utils.capacity_cache import get_item_capacity, prefetch_item_capacities
 
 def validate_item_availability_for_quotation(quotation_doc):
     """Validate item availability for all items in a quotation."""
     if not quotation_doc.get("is_rental_quotation") or not quotation_doc.items:
         return
 
+    # Load the stock of every rental item in one go
+    prefetch_item_capacities(
+        [item.item_code for item in quotation_doc.items if item.item_type == "Rental" and not item.serial_no],
+        quotation_doc.get("set_warehouse")
+    )
+
     for item in quotation_doc.items:
         if item.item_type == "Rental":
             if not item.rental_item_start_date or not item.rental_item_end_date:
@@ -18,36 +27,25 @@ def validate_item_availability_for_quotation(quotation_doc):
                 item.rental_item_start_date,
                 item.rental_item_end_date,
                 item.serial_no,
-                quotation_doc.name
+                quotation_doc.name,
+                quotation_doc.get("set_warehouse")
             )
 
-def check_single_item_availability(item_code, qty, start_date, end_date, serial_no=None, exclude_docname=None):
+def check_single_item_availability(item_code, qty, start_date, end_date, serial_no=None, exclude_docname=None, warehouse=None):
     """Check availability for a single item for a given period."""
     start_datetime = get_datetime(start_date)
     end_datetime = get_datetime(end_date)
 
     if serial_no:
         # Check for serialized item conflicts
-        conflicts = frappe.db.sql("""
-            SELECT sr.name, sr.reference_doctype, sr.reference_name
-            FROM `tabStock Reservation` sr
-            WHERE sr.serial_no = %(serial_no)s
-                AND sr.docstatus = 1
-                AND sr.status IN (
-                    'Reserved', 'In Use'
-                )
-                AND sr.name != %(exclude_docname)s
-                AND (
-                    (sr.from_date < %(end_date)s AND sr.to_date > %(start_date)s)
-                )
-        """, {
-            "serial_no": serial_no,
-            "start_date": start_datetime,
-            "end_date": end_datetime,
-            "exclude_docname": exclude_docname or ""
-        }, as_dict=1)
-        if conflicts:
-            conflict = conflicts[0]
+        conflict = get_serial_conflict(
+            item_code,
+            serial_no,
+            start_datetime,
+            end_datetime,
+            exclude=exclude_docname
+        )
+        if conflict:
             frappe.throw(
                 _("Serial No {0} for item {1} is already reserved or in use in {2} {3} during the selected period.").format(
                     serial_no, item_code, conflict.reference_doctype, conflict.reference_name
@@ -55,36 +53,16 @@ def check_single_item_availability(item_code, qty, start_date, end_date, serial_
             )
     else:
         # Check for non-serialized item conflicts
-        # Get total quantity of this item reserved during the period
-        overlapping_reservations = frappe.db.sql("""
-            SELECT SUM(sr.qty) as reserved_qty
-            FROM `tabStock Reservation` sr
-            WHERE sr.item_code = %(item_code)s
-                AND sr.serial_no IS NULL
-                AND sr.docstatus = 1
-                AND sr.status IN (
-                    'Reserved', 'In Use'
-                )
-                AND sr.name != %(exclude_docname)s
-                AND (
-                    (sr.from_date < %(end_date)s AND sr.to_date > %(start_date)s)
-                )
-        """, {
-            "item_code": item_code,
-            "start_date": start_datetime,
-            "end_date": end_datetime,
-            "exclude_docname": exclude_docname or ""
-        }, as_dict=1)
-        
-        reserved_qty = overlapping_reservations[0].reserved_qty if overlapping_reservations and overlapping_reservations[0].reserved_qty else 0
+        # Get the peak quantity of this item reserved at any one time during the period
+        reserved_qty = get_peak_booked_qty(
+            item_code,
+            start_datetime,
+            end_datetime,
+            exclude=exclude_docname
+        )
         
         # Get available quantity from stock (simplified, assumes a default warehouse or uses ERPNext's logic)
-        # In a real scenario, warehouse would be a parameter
-        actual_qty_at_warehouse = frappe.db.get_value(
-            "Bin",
-            {"item_code": item_code, "warehouse": quotation_doc.set_warehouse}, # Assuming set_warehouse is on Quotation
-            "actual_qty"
-        ) or 0
+        actual_qty_at_warehouse = get_item_capacity(item_code, warehouse)
         
         projected_qty = actual_qty_at_warehouse - reserved_qty
 
@@ -103,25 +81,32 @@ def create_reservations_for_quotation(quotation_doc):
     if quotation_doc.workflow_state != "Approved": # Or your specific approved state
         return
 
-    for item in quotation_doc.items:
-        if item.item_type == "Rental":
-            try:
-                reservation = frappe.new_doc("Stock Reservation")
-                reservation.item_code = item.item_code
-                reservation.qty = item.qty
-                reservation.serial_no = item.serial_no
-                reservation.from_date = item.rental_item_start_date
-                reservation.to_date = item.rental_item_end_date
-                reservation.reference_doctype = "Quotation"
-                reservation.reference_name = quotation_doc.name
-                reservation.status = "Reserved"
-                # Add warehouse if applicable, e.g., from quotation_doc.set_warehouse
-                # reservation.warehouse = quotation_doc.set_warehouse 
-                reservation.insert(ignore_permissions=True) # Use with caution
-                frappe.msgprint(_("Reservation created for item {0}").format(item.item_code))
-            except Exception as e:
-                frappe.log_error(frappe.get_traceback(), _("Error creating reservation for item {0} in Quotation {1}").format(item.item_code, quotation_doc.name))
-                frappe.throw(_("Could not create reservation for item {0}: {1}").format(item.item_code, str(e)))
+    lines = [
+        {
+            "idx": item.idx,
+            "item_code": item.item_code,
+            "serial_no": item.serial_no,
+            "qty": item.qty,
+            "from_date": item.rental_item_start_date,
+            "to_date": item.rental_item_end_date
+        }
+        for item in quotation_doc.items
+        if item.item_type == "Rental"
+    ]
+
+    try:
+        report = create_bulk_reservations(
+            lines, "Quotation", quotation_doc.name, warehouse=quotation_doc.get("set_warehouse")
+        )
+    except Exception as e:
+        frappe.log_error(frappe.get_traceback(), _("Error creating reservations for Quotation {0}").format(quotation_doc.name))
+        frappe.throw(_("Could not create reservations: {0}").format(str(e)))
+
+    if not report["success"]:
+        frappe.throw(_("Could not create reservations:<br>{0}").format(format_conflicts(report["conflicts"])))
+
+    if report["reservations"]:
+        frappe.msgprint(_("{0} reservations created").format(len(report["reservations"])))
 
 # Hooks for Quotation DocType
 
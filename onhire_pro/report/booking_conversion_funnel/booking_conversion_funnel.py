@@ -2,6 +2,7 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, flt, add_days
+from onhire_pro.utils.schema_capabilities import has_column
 
 def execute(filters=None):
     columns = get_columns(filters)
@@ -82,7 +83,7 @@ def get_data(filters):
     # This requires a link from Rental Job back to Quotation.
     # Assuming Rental Job has a field 'quotation' (or 'prevdoc_docname' if made via Sales Order from Quotation)
     rental_jobs_created_count = 0
-    if frappe.db.has_column("Rental Job", "quotation"): # Check if direct link exists
+    if has_column("Rental Job", "quotation"): # Check if direct link exists
         rj_q_filters = {
             "rj.docstatus": 1, "rj.company": company,
             "q.name": ["in", [d.name for d in frappe.get_all("Quotation", filters=quotation_filters, fields=["name"])]]
@@ -104,7 +105,7 @@ def get_data(filters):
 
     # Stage 5: Rental Jobs Completed (from the created Rental Jobs)
     rental_jobs_completed_count = 0
-    if rental_jobs_created_count > 0 and frappe.db.has_column("Rental Job", "quotation"): # Only if jobs were found and link exists
+    if rental_jobs_created_count > 0 and has_column("Rental Job", "quotation"): # Only if jobs were found and link exists
         # This counts jobs linked to the initial set of quotations that are now 'Completed'.
         if relevant_quotation_names: # from previous stage
             rental_jobs_completed_count = frappe.db.count("Rental Job", {
@@ -114,7 +115,7 @@ def get_data(filters):
                 "company": company
             })
     else:
-         if not frappe.db.has_column("Rental Job", "quotation"):
+         if not has_column("Rental Job", "quotation"):
             frappe.log_info("Rental Job to Quotation link ('quotation' field) not found for accurate funnel Stage 5.", "BookingConversionFunnel")
 
 
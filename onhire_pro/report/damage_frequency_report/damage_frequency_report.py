@@ -2,6 +2,7 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, flt, cint
+from onhire_pro.utils.schema_capabilities import has_column
 
 def execute(filters=None):
     columns = get_columns(filters)
@@ -44,7 +45,7 @@ def get_data(filters):
         sql_params["serial_no"] = filters.get("serial_no")
 
     # Check if custom_item_damaged field exists for fallback
-    has_custom_item_damaged_field = frappe.db.has_column("Rental Job Item", "custom_item_damaged")
+    has_custom_item_damaged_field = has_column("Rental Job Item", "custom_item_damaged")
     damage_case_expression = "CASE WHEN ca.overall_condition_rating IN ('Damaged', 'Needs Repair') THEN 1 "
     if has_custom_item_damaged_field:
         damage_case_expression += "WHEN rji.custom_item_damaged = 1 THEN 1 ELSE 0 END"
@@ -6,6 +6,8 @@ from frappe.utils import getdate, nowdate, add_days, date_diff, flt, add_months,
 # For direct relative import if in same app: from ..kpi_utils import calculate_item_utilization_rate
 # If kpi_utils is in onhire_pro.onhire_pro.reports then:
 from onhire_pro.onhire_pro.reports.kpi_utils import calculate_item_utilization_rate 
+from onhire_pro.onhire_pro.utils.daily_occupancy import get_daily_occupancy
+from onhire_pro.onhire_pro.utils.schema_capabilities import has_column
 
 def execute(filters=None):
     columns = get_columns(filters)
@@ -40,7 +42,7 @@ def get_data(filters):
     item_q_filters = {"is_rental_item": 1, "disabled": 0}
     # Company filter for items might not be standard, depends on Item master setup
     # If items are not company-specific, this filter might be removed or adapted
-    if company and frappe.db.has_column("Item", "company"):
+    if company and has_column("Item", "company"):
          item_q_filters["company"] = company
 
     if item_code_filter:
@@ -49,12 +51,26 @@ def get_data(filters):
         item_q_filters["item_group"] = item_group_filter
     
     items_to_report = frappe.get_all("Item", filters=item_q_filters, fields=["name", "item_name", "item_group"])
+    if not items_to_report:
+        return data
+
+    # Rented qty per item and day, read once for the whole range from the daily occupancy table
+    rented_by_item = {}
+    for row in get_daily_occupancy(from_date_main, to_date_main, company=company,
+                                   item_codes=[item.name for item in items_to_report]):
+        rented_by_item.setdefault(row.item_code, []).append(
+            (getdate(row.date), flt(row.reserved_qty) + flt(row.dispatched_qty))
+        )
+
+    def rented_qty_days_between(item_code, period_start, period_end):
+        return sum(qty for day, qty in rented_by_item.get(item_code, []) if period_start <= day <= period_end)
 
     if summarize_by == "Overall" or not summarize_by:
         for item in items_to_report:
             period_days = date_diff(to_date_main, from_date_main) + 1
             rented_qty_days, available_qty_days, util_rate = get_utilization_components(
-                item.name, from_date_main, to_date_main, company, period_days
+                item.name, from_date_main, to_date_main, company, period_days,
+                rented_qty_days_between(item.name, from_date_main, to_date_main)
             )
             data.append({
                 "item_code": item.name, "item_name": item.item_name, "item_group": item.item_group,
@@ -68,7 +84,8 @@ def get_data(filters):
             for period_start, period_end, period_label in periods:
                 sub_period_days = date_diff(period_end, period_start) + 1
                 rented_qty_days, available_qty_days, util_rate = get_utilization_components(
-                    item.name, period_start, period_end, company, sub_period_days
+                    item.name, period_start, period_end, company, sub_period_days,
+                    rented_qty_days_between(item.name, getdate(period_start), getdate(period_end))
                 )
                 data.append({
                     "item_code": item.name, "item_name": item.item_name, "item_group": item.item_group,
@@ -79,19 +96,7 @@ def get_data(filters):
                 })
     return data
 
-def get_utilization_components(item_code, from_date, to_date, company, period_days):
-    sql_params_item = {
-        "from_date": from_date, "to_date": to_date, 
-        "company": company, "item_code": item_code
-    }
-    rented_sum_q = """SELECT SUM((DATEDIFF(LEAST(rj.scheduled_return_date, %(to_date)s), GREATEST(rj.scheduled_dispatch_date, %(from_date)s)) + 1) * rji.qty) 
-                      FROM `tabRental Job Item` rji JOIN `tabRental Job` rj ON rji.parent = rj.name
-                      WHERE rj.docstatus = 1 AND rj.status NOT IN ('Cancelled', 'Draft') AND rj.company = %(company)s
-                        AND rj.scheduled_dispatch_date <= %(to_date)s AND rj.scheduled_return_date >= %(from_date)s
-                        AND rji.item_code = %(item_code)s"""
-    total_rented_qty_days_res = frappe.db.sql(rented_sum_q, sql_params_item)
-    total_rented_qty_days = total_rented_qty_days_res[0][0] or 0 if total_rented_qty_days_res and total_rented_qty_days_res[0] else 0
-    
+def get_utilization_components(item_code, from_date, to_date, company, period_days, total_rented_qty_days):
     item_doc = frappe.get_doc("Item", item_code)
     total_available_qty_days = 0
     if item_doc.has_serial_no:
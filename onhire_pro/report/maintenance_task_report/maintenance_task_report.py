@@ -2,10 +2,11 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, date_diff, flt, cint, get_datetime, nowdate
+from onhire_pro.utils.schema_capabilities import doctype_exists, has_column, sql_fragment
 
 def execute(filters=None):
     # Check if Maintenance Task DocType exists
-    if not frappe.db.exists("DocType", "Maintenance Task"):
+    if not doctype_exists("Maintenance Task"):
         frappe.msgprint(_("DocType 'Maintenance Task' not found. Please ensure it is installed/created for this report."), indicator="orange", alert=True)
         return [], [], None, None, None
 
@@ -44,10 +45,10 @@ def get_data(filters, report_summary_columns):
     sql_filters = {"docstatus": 1} # Submitted tasks
     # sql_params = {} # Not needed for frappe.get_all with dict filters
 
-    if filters.get("company") and frappe.db.has_column("Maintenance Task", "company"):
+    if filters.get("company") and has_column("Maintenance Task", "company"):
         sql_filters["company"] = filters.get("company")
     
-    date_field_to_filter = "start_date" if frappe.db.has_column("Maintenance Task", "start_date") else "creation"
+    date_field_to_filter = sql_fragment("maintenance_task_date")
 
     # Date filtering logic
     from_date_filter = filters.get("from_date")
@@ -63,19 +64,19 @@ def get_data(filters, report_summary_columns):
 
     if filters.get("status"):
         sql_filters["status"] = filters.get("status")
-    if filters.get("item_code") and frappe.db.has_column("Maintenance Task", "item_code"):
+    if filters.get("item_code") and has_column("Maintenance Task", "item_code"):
         sql_filters["item_code"] = filters.get("item_code")
-    if filters.get("serial_no") and frappe.db.has_column("Maintenance Task", "serial_no"):
+    if filters.get("serial_no") and has_column("Maintenance Task", "serial_no"):
         sql_filters["serial_no"] = filters.get("serial_no")
-    if filters.get("assigned_to") and frappe.db.has_column("Maintenance Task", "assigned_to"):
+    if filters.get("assigned_to") and has_column("Maintenance Task", "assigned_to"):
         sql_filters["assigned_to"] = filters.get("assigned_to")
-    if filters.get("maintenance_type") and frappe.db.has_column("Maintenance Task", "maintenance_type"):
+    if filters.get("maintenance_type") and has_column("Maintenance Task", "maintenance_type"):
         sql_filters["maintenance_type"] = filters.get("maintenance_type")
 
     fields_to_fetch = ["name", "status", "creation"]
     # Conditionally add fields if they exist in the DocType schema
     for field in ["item_code", "serial_no", "maintenance_type", "assigned_to", "start_date", "due_date", "completion_date"]:
-        if frappe.db.has_column("Maintenance Task", field):
+        if has_column("Maintenance Task", field):
             fields_to_fetch.append(field)
 
 
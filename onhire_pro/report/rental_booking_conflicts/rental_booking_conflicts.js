@@ -0,0 +1,42 @@
+// Project/onhire_pro/onhire_pro/report/rental_booking_conflicts/rental_booking_conflicts.js
+frappe.query_reports["Rental Booking Conflicts"] = {
+    "filters": [
+        {
+            "fieldname": "company",
+            "label": __("Company"),
+            "fieldtype": "Link",
+            "options": "Company",
+            "default": frappe.defaults.get_user_default("Company")
+        },
+        {
+            "fieldname": "from_date",
+            "label": __("From Date"),
+            "fieldtype": "Date",
+            "default": frappe.datetime.now_date(),
+            "reqd": 1
+        },
+        {
+            "fieldname": "to_date",
+            "label": __("To Date"),
+            "fieldtype": "Date",
+            "default": frappe.datetime.add_days(frappe.datetime.now_date(), 30),
+            "reqd": 1
+        },
+        {
+            "fieldname": "item_code",
+            "label": __("Item Code"),
+            "fieldtype": "Link",
+            "options": "Item",
+            "get_query": function() {
+                return { filters: { "is_rental_item": 1 } }
+            }
+        }
+    ],
+    "formatter": function(value, row, column, data, default_formatter) {
+        value = default_formatter(value, row, column, data);
+        if (column.fieldname === "shortfall_qty" && data && data.shortfall_qty > 0) {
+            value = `<span class="text-danger">${value}</span>`;
+        }
+        return value;
+    }
+};
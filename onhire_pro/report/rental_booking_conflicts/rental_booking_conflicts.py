@@ -0,0 +1,83 @@
+# Project/onhire_pro/onhire_pro/report/rental_booking_conflicts/rental_booking_conflicts.py
+from frappe import _
+from frappe.utils import getdate, nowdate, add_days
+from onhire_pro.utils.conflict_detector import get_booking_conflicts
+
+def execute(filters=None):
+    filters = filters or {}
+    columns = get_columns(filters)
+    data = get_data(filters)
+    return columns, data
+
+def get_columns(filters):
+    return [
+        {
+            "label": _("Item Code"),
+            "fieldname": "item_code",
+            "fieldtype": "Link",
+            "options": "Item",
+            "width": 150
+        },
+        {
+            "label": _("Warehouse"),
+            "fieldname": "warehouse",
+            "fieldtype": "Link",
+            "options": "Warehouse",
+            "width": 150
+        },
+        {
+            "label": _("From Date"),
+            "fieldname": "from_date",
+            "fieldtype": "Date",
+            "width": 100
+        },
+        {
+            "label": _("To Date"),
+            "fieldname": "to_date",
+            "fieldtype": "Date",
+            "width": 100
+        },
+        {
+            "label": _("Booked Qty"),
+            "fieldname": "booked_qty",
+            "fieldtype": "Float",
+            "width": 100,
+            "description": _("Highest quantity booked at the same time during the conflict")
+        },
+        {
+            "label": _("Available Qty"),
+            "fieldname": "available_qty",
+            "fieldtype": "Float",
+            "width": 100
+        },
+        {
+            "label": _("Shortfall Qty"),
+            "fieldname": "shortfall_qty",
+            "fieldtype": "Float",
+            "width": 100
+        },
+        {
+            "label": _("Rental Jobs"),
+            "fieldname": "rental_jobs",
+            "fieldtype": "Small Text",
+            "width": 250
+        },
+        {
+            "label": _("Detected On"),
+            "fieldname": "detected_on",
+            "fieldtype": "Datetime",
+            "width": 150
+        }
+    ]
+
+def get_data(filters):
+    # Conflicts are found by the daily conflict detection; this report only reads them
+    from_date = getdate(filters.get("from_date") or nowdate())
+    to_date = getdate(filters.get("to_date") or add_days(nowdate(), 30))
+
+    return get_booking_conflicts(
+        from_date,
+        to_date,
+        company=filters.get("company"),
+        item_code=filters.get("item_code")
+    )
@@ -42,17 +42,13 @@ frappe.query_reports["Rental Item Availability Calendar"] = {
             "fieldname": "status",
             "label": __("Event Type"),
             "fieldtype": "Select",
-            "options": "\nRental Job\nMaintenance Task", // Add more if needed
-            "default": "Rental Job"
+            "options": "\nReserved\nDispatched\nIn Maintenance"
         }
     ],
     "formatter": function(value, row, column, data, Rreport) {
         if (column.id === "item_code" && value) {
             return `<a href="/app/item/${value}">${value}</a>`;
         }
-        if (column.id === "reference_name" && data.reference_doctype) {
-             return `<a href="/app/${data.reference_doctype.toLowerCase().replace(/ /g,'-')}/${value}">${value}</a>`;
-        }
         return value;
     },
     "initial_depth": 1, // For tree view if using resources
@@ -96,16 +92,13 @@ frappe.query_reports["Rental Item Availability Calendar"] = {
                 editable: false,
                 eventLimit: true, // allow "more" link when too many events
                 events: data.map(function(item) {
-                    let title = item.item_code || 'Event';
-                    if(item.serial_no) title += ` (${item.serial_no})`;
-                    if(item.reference_name) title += ` - ${item.reference_name}`;
-                    title += ` (${item.status || item.event_type})`;
-                    
-                    let color = '#3a87ad'; // Default
-                    if(item.event_type === 'Rental Job') {
-                        color = item.status === 'Completed' ? '#d3d3d3' : (item.status === 'Cancelled' ? '#f64c72' : '#28a745');
-                    } else if (item.event_type === 'Maintenance Task') {
-                        color = item.status === 'Completed' ? '#6c757d' : '#ffc107'; // Yellow for maintenance
+                    let title = `${item.item_code} x ${item.qty} (${__(item.event_type)})`;
+
+                    let color = '#3a87ad'; // Reserved
+                    if (item.event_type === 'Dispatched') {
+                        color = '#28a745';
+                    } else if (item.event_type === 'In Maintenance') {
+                        color = '#ffc107'; // Yellow for maintenance
                     }
 
                     return {
@@ -113,8 +106,7 @@ frappe.query_reports["Rental Item Availability Calendar"] = {
                         start: item.start_date, 
                         end: frappe.datetime.add_days(item.end_date, 1), 
                         allDay: true, 
-                        color: color,
-                        url: item.reference_doctype && item.reference_name ? frappe.utils.get_form_link(item.reference_doctype, item.reference_name) : null
+                        color: color
                     };
                 }),
                 eventDidMount: function(info) {
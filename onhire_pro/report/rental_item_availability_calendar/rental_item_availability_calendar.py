@@ -1,7 +1,15 @@
 # Project/onhire_pro/onhire_pro/report/rental_item_availability_calendar/rental_item_availability_calendar.py
 import frappe
 from frappe import _
-from frappe.utils import getdate, nowdate, add_days, get_datetime_str
+from frappe.utils import getdate, add_days, flt
+from onhire_pro.utils.daily_occupancy import get_daily_occupancy
+
+# Event Type filter value -> occupancy bucket
+EVENT_TYPES = {
+    "Reserved": "reserved_qty",
+    "Dispatched": "dispatched_qty",
+    "In Maintenance": "maintenance_qty"
+}
 
 def execute(filters=None):
     columns = get_columns(filters)
@@ -21,167 +29,73 @@ def get_columns(filters):
             "width": 120
         },
         {
-            "label": _("Serial No"),
-            "fieldname": "serial_no",
-            "fieldtype": "Link",
-            "options": "Serial No",
-            "width": 120
-        },
-        {
-            "label": _("Event Type"), # 'Rental Job' or 'Maintenance Task'
+            "label": _("Event Type"), # 'Reserved', 'Dispatched' or 'In Maintenance'
             "fieldname": "event_type",
             "fieldtype": "Data",
             "width": 120
         },
         {
-            "label": _("Reference Doctype"),
-            "fieldname": "reference_doctype",
-            "fieldtype": "Data",
-            "hidden": 1
-        },
-        {
-            "label": _("Reference Name"),
-            "fieldname": "reference_name",
-            "fieldtype": "Dynamic Link",
-            "options": "reference_doctype",
-            "width": 150
-        },
-        {
-            "label": _("Status"),
-            "fieldname": "status",
-            "fieldtype": "Data",
-            "width": 100
+            "label": _("Qty"),
+            "fieldname": "qty",
+            "fieldtype": "Float",
+            "width": 80
         },
         {
             "label": _("Start Date"),
             "fieldname": "start_date",
-            "fieldtype": "Datetime",
-            "width": 150
+            "fieldtype": "Date",
+            "width": 120
         },
         {
             "label": _("End Date"),
             "fieldname": "end_date",
-            "fieldtype": "Datetime",
-            "width": 150
-        },
-        {
-            "label": _("Customer"),
-            "fieldname": "customer",
-            "fieldtype": "Link",
-            "options": "Customer",
-            "width": 150
+            "fieldtype": "Date",
+            "width": 120
         }
     ]
 
 def get_data(filters):
-    data = []
+    """
+    Occupancy runs per item from the daily occupancy table.
+
+    Consecutive days on which an item has the same quantity in a bucket are
+    collapsed into one event, so a week-long hire shows as a single bar.
+    """
     company = filters.get("company")
-    from_date = filters.get("from_date")
-    to_date = filters.get("to_date")
-    item_code_filter = filters.get("item_code")
-    item_group_filter = filters.get("item_group")
+    from_date = getdate(filters.get("from_date"))
+    to_date = getdate(filters.get("to_date"))
     event_type_filter = filters.get("status") # Filter name is 'status' in JS, maps to event_type
 
-    sql_params = {
-        "company": company,
-        "from_date": from_date,
-        "to_date": to_date
-    }
-
-    # Fetch Rental Jobs
-    if not event_type_filter or event_type_filter == "Rental Job":
-        rj_conditions = ""
-        current_sql_params_rj = sql_params.copy()
-        if item_code_filter:
-            rj_conditions += " AND rji.item_code = %(item_code)s"
-            current_sql_params_rj["item_code"] = item_code_filter
-        if item_group_filter:
-            rj_conditions += " AND item.item_group = %(item_group)s"
-            current_sql_params_rj["item_group"] = item_group_filter
-        
-        rental_jobs_query = f"""
-            SELECT 
-                rji.item_code, 
-                rji.serial_no,
-                'Rental Job' as event_type,
-                rj.name as reference_name,
-                'Rental Job' as reference_doctype,
-                rj.status,
-                rj.scheduled_dispatch_date as start_date,
-                rj.scheduled_return_date as end_date,
-                rj.customer
-            FROM `tabRental Job Item` rji
-            JOIN `tabRental Job` rj ON rji.parent = rj.name
-            {'JOIN `tabItem` item ON rji.item_code = item.name' if item_group_filter else ''}
-            WHERE rj.docstatus = 1
-              AND rj.company = %(company)s
-              AND rj.status NOT IN ('Cancelled', 'Draft')
-              AND rj.scheduled_dispatch_date <= %(to_date)s
-              AND rj.scheduled_return_date >= %(from_date)s
-              {rj_conditions}
-        """
-        rental_job_data = frappe.db.sql(rental_jobs_query, current_sql_params_rj, as_dict=True)
-        data.extend(rental_job_data)
-
-    # Fetch Maintenance Tasks
-    if (not event_type_filter or event_type_filter == "Maintenance Task") and frappe.db.exists("DocType", "Maintenance Task"):
-        mt_conditions = ""
-        current_sql_params_mt = sql_params.copy()
+    item_codes = None
+    if filters.get("item_code"):
+        item_codes = [filters.get("item_code")]
+    elif filters.get("item_group"):
+        item_codes = frappe.get_all("Item", filters={"item_group": filters.get("item_group")}, pluck="name")
+        if not item_codes:
+            return []
 
-        # Check for company field in Maintenance Task
-        mt_company_filter = ""
-        if frappe.db.has_column("Maintenance Task", "company"):
-            mt_company_filter = "AND mt.company = %(company)s"
-        else:
-            if "company" in current_sql_params_mt: # remove if not applicable
-                 del current_sql_params_mt["company"]
+    event_types = {event_type_filter: EVENT_TYPES[event_type_filter]} if event_type_filter in EVENT_TYPES else EVENT_TYPES
 
+    data = []
+    open_runs = {}
+    for row in get_daily_occupancy(from_date, to_date, company=company, item_codes=item_codes):
+        day = getdate(row.date)
+        for event_type, bucket in event_types.items():
+            qty = flt(row[bucket])
+            key = (row.item_code, event_type)
+            run = open_runs.get(key)
 
-        if item_code_filter and frappe.db.has_column("Maintenance Task", "item_code"):
-            mt_conditions += " AND mt.item_code = %(item_code)s"
-            current_sql_params_mt["item_code"] = item_code_filter
-        
-        item_join_mt = ""
-        if item_group_filter and frappe.db.has_column("Maintenance Task", "item_code"):
-            item_join_mt = " JOIN `tabItem` item ON mt.item_code = item.name "
-            mt_conditions += " AND item.item_group = %(item_group)s"
-            current_sql_params_mt["item_group"] = item_group_filter
-
-        # Determine date fields for Maintenance Task
-        start_date_field_mt = "mt.start_date" if frappe.db.has_column("Maintenance Task", "start_date") else "mt.creation"
-        end_date_field_mt = "mt.completion_date"
-        if not frappe.db.has_column("Maintenance Task", "completion_date") and frappe.db.has_column("Maintenance Task", "expected_completion_date"):
-            end_date_field_mt = "mt.expected_completion_date"
-        elif not frappe.db.has_column("Maintenance Task", "completion_date"):
-             # If neither completion_date nor expected_completion_date exists, this query part might fail or return nulls for end_date
-             # For simplicity, we'll proceed assuming one of them exists, or the query will just not find matches for date range on end_date
-             # A robust solution would handle this by perhaps not filtering on end_date if the field is missing.
-             pass
+            if run and run.qty == qty and add_days(run.end_date, 1) == day:
+                run.end_date = day
+                continue
 
+            if qty > 0:
+                run = frappe._dict(item_code=row.item_code, event_type=event_type, qty=qty,
+                                   start_date=day, end_date=day)
+                open_runs[key] = run
+                data.append(run)
+            else:
+                open_runs.pop(key, None)
 
-        maintenance_tasks_query = f"""
-            SELECT 
-                mt.item_code, 
-                mt.serial_no,
-                'Maintenance Task' as event_type,
-                mt.name as reference_name,
-                'Maintenance Task' as reference_doctype,
-                mt.status,
-                {start_date_field_mt} as start_date,
-                {end_date_field_mt} as end_date, 
-                NULL as customer
-            FROM `tabMaintenance Task` mt
-            {item_join_mt}
-            WHERE mt.docstatus = 1
-              {mt_company_filter}
-              AND mt.status NOT IN ('Cancelled', 'Completed') 
-              AND {start_date_field_mt} <= %(to_date)s
-              AND {end_date_field_mt} >= %(from_date)s
-              {mt_conditions}
-        """
-        if frappe.db.has_column("Maintenance Task", "start_date") and \
-           (frappe.db.has_column("Maintenance Task", "completion_date") or frappe.db.has_column("Maintenance Task", "expected_completion_date")):
-            maintenance_data = frappe.db.sql(maintenance_tasks_query, current_sql_params_mt, as_dict=True)
-            data.extend(maintenance_data)
-            
+    data.sort(key=lambda run: (run.item_code, run.start_date, run.event_type))
     return data
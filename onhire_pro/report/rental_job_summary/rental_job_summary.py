@@ -2,6 +2,7 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, flt, cstr
+from onhire_pro.utils.schema_capabilities import has_column
 
 def execute(filters=None):
     columns = get_columns(filters)
@@ -63,7 +64,7 @@ def get_data(filters):
     if filters.get("status"):
         sql_filters["status"] = filters.get("status")
     if filters.get("sales_person"):
-        if frappe.db.has_column("Rental Job", "sales_person"):
+        if has_column("Rental Job", "sales_person"):
              sql_filters["sales_person"] = filters.get("sales_person")
         # else:
             # frappe.msgprint(_("Filtering by Sales Person is not fully supported if 'sales_person' field is not on Rental Job."), indicator="orange")
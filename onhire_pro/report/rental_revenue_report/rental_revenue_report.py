@@ -2,7 +2,17 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, flt, add_days, add_months, get_first_day, get_last_day, nowdate
+from bisect import bisect_right
 from collections import defaultdict
+from onhire_pro.utils.revenue_rollup import get_revenue
+
+# Report "Group By" -> Rental Revenue Daily field
+GROUP_BY_FIELDS = {
+    "Item Group": "item_group",
+    "Customer": "customer",
+    "Sales Person": "sales_person",
+    "Item Code": "item_code"
+}
 
 def execute(filters=None):
     columns, chart_data_config = get_columns(filters) # chart_data_config for dynamic chart labels
@@ -77,78 +87,55 @@ def get_data(filters, columns, chart_data_config):
     group_by_field_filter = filters.get("group_by") # Renamed to avoid conflict with variable
 
     periods = get_report_periods(from_date_main, to_date_main, periodicity)
+    if not periods:
+        return []
     
     report_data = []
 
-    for p_start, p_end, p_label in periods:
-        sql_params = {
-            "company": company,
-            "from_date": p_start,
-            "to_date": p_end
-        }
-        
-        conditions = ["si.docstatus = 1", "si.company = %(company)s", "sii.docstatus = 1"] 
-        conditions.append("si.posting_date BETWEEN %(from_date)s AND %(to_date)s")
-        conditions.append("(si.custom_linked_rental_job IS NOT NULL OR item.is_rental_item = 1)")
-
-
-        if filters.get("customer"):
-            conditions.append("si.customer = %(customer)s")
-            sql_params["customer"] = filters.get("customer")
-        if filters.get("item_code"):
-            conditions.append("sii.item_code = %(item_code)s")
-            sql_params["item_code"] = filters.get("item_code")
-        if filters.get("item_group") and group_by_field_filter != "Item Group": 
-            conditions.append("item.item_group = %(item_group_filter)s") 
-            sql_params["item_group_filter"] = filters.get("item_group")
-        if filters.get("sales_person"):
-            sp_field_on_si = "sales_person" if frappe.db.has_column("Sales Invoice", "sales_person") else "owner"
-            conditions.append(f"si.{sp_field_on_si} = %(sales_person)s")
-            sql_params["sales_person"] = filters.get("sales_person")
-
-
-        select_fields = "SUM(sii.base_net_amount) as revenue"
-        group_by_sql_parts = []
-        
-        # Determine the field to group by for SQL
-        sql_group_by_field_name_for_select = None
-        if group_by_field_filter == "Item Group":
-            select_fields += ", item.item_group as group_by_field"
-            group_by_sql_parts.append("item.item_group")
-        elif group_by_field_filter == "Customer":
-            select_fields += ", si.customer as group_by_field"
-            group_by_sql_parts.append("si.customer")
-        elif group_by_field_filter == "Sales Person":
-            sp_field = "si.sales_person" if frappe.db.has_column("Sales Invoice", "sales_person") else "si.owner"
-            select_fields += f", {sp_field} as group_by_field"
-            group_by_sql_parts.append(sp_field)
-        elif group_by_field_filter == "Item Code":
-            select_fields += ", sii.item_code as group_by_field, item.item_name as item_name_for_report"
-            group_by_sql_parts.extend(["sii.item_code", "item.item_name"])
-
-        group_by_sql = ""
-        if group_by_sql_parts:
-            group_by_sql = f"GROUP BY {', '.join(group_by_sql_parts)}"
-
-
-        query = f"""
-            SELECT {select_fields}
-            FROM `tabSales Invoice Item` sii
-            JOIN `tabSales Invoice` si ON sii.parent = si.name
-            JOIN `tabItem` item ON sii.item_code = item.name 
-            WHERE {" AND ".join(conditions)}
-            {group_by_sql}
-            ORDER BY revenue DESC
-        """
-        
-        period_results = frappe.db.sql(query, sql_params, as_dict=True)
-
-        for row in period_results:
-            entry = {"period": p_label, "revenue": flt(row.get("revenue"))} # Use .get for safety
-            if group_by_field_filter and "group_by_field" in row:
-                entry["group_by_field"] = row.group_by_field
-                if group_by_field_filter == "Item Code" and "item_name_for_report" in row:
-                    entry["item_name"] = row.item_name_for_report
+    revenue_filters = {
+        "customer": filters.get("customer"),
+        "item_code": filters.get("item_code"),
+        "sales_person": filters.get("sales_person")
+    }
+    if group_by_field_filter != "Item Group":
+        revenue_filters["item_group"] = filters.get("item_group")
+
+    # One query over the rollup for all periods; days are summed into periods below
+    group_field = GROUP_BY_FIELDS.get(group_by_field_filter)
+    revenue_rows = get_revenue(
+        company, periods[0][0], periods[-1][1],
+        group_by=["date"] + ([group_field] if group_field else []),
+        measure="net_amount",
+        filters=revenue_filters
+    )
+
+    period_starts = [getdate(p_start) for p_start, p_end, p_label in periods]
+    period_totals = defaultdict(lambda: defaultdict(float)) # period index -> group value -> revenue
+    for row in revenue_rows:
+        day = getdate(row.date)
+        index = bisect_right(period_starts, day) - 1
+        # Weekly periods may overlap, so a day counts for every period containing it
+        while index >= 0 and period_starts[index] <= day:
+            if day <= getdate(periods[index][1]):
+                period_totals[index][row.get(group_field) if group_field else None] += row.revenue
+            index -= 1
+
+    item_names = {}
+    if group_by_field_filter == "Item Code" and revenue_rows:
+        item_names = dict(frappe.get_all(
+            "Item", filters={"name": ["in", list({row.item_code for row in revenue_rows})]},
+            fields=["name", "item_name"], as_list=True
+        ))
+
+    for index, (p_start, p_end, p_label) in enumerate(periods):
+        if not group_field:
+            report_data.append({"period": p_label, "revenue": flt(period_totals[index].get(None))})
+            continue
+
+        for group_value, revenue in sorted(period_totals[index].items(), key=lambda total: total[1], reverse=True):
+            entry = {"period": p_label, "revenue": flt(revenue), "group_by_field": group_value}
+            if group_by_field_filter == "Item Code":
+                entry["item_name"] = item_names.get(group_value)
             report_data.append(entry)
             
     # If not grouping by any field, and periodicity is not 'Overall', aggregate revenue per period
@@ -2,6 +2,8 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, flt, nowdate
+from onhire_pro.utils.daily_occupancy import get_peak_occupancy
+from onhire_pro.utils.capacity_cache import get_item_capacities, get_default_warehouse
 
 def execute(filters=None):
     columns = get_columns(filters)
@@ -41,7 +43,7 @@ def get_columns(filters):
             "fieldname": "reserved_qty_rental_jobs",
             "fieldtype": "Float",
             "width": 180,
-            "description": _("Quantity reserved for active/confirmed Rental Jobs overlapping the 'To Date'")
+            "description": _("Highest daily reserved + dispatched quantity between 'From Date' and 'To Date'")
         },
         # Add other reservation sources if applicable (e.g., Sales Orders)
         # {
@@ -95,49 +97,30 @@ def get_data(filters):
           {item_conditions}
     """
     rental_items = frappe.db.sql(items_query, sql_params, as_dict=True)
+    if not rental_items:
+        return data
+
+    warehouse_filter_value = filters.get("warehouse")
+
+    # Reserved qty for all items at once from the daily occupancy table
+    peak_occupancy = get_peak_occupancy(
+        from_date, to_date, company=company, warehouse=warehouse_filter_value,
+        item_codes=[item.item_code for item in rental_items]
+    )
+
+    actual_qtys = get_item_capacities([item.item_code for item in rental_items], warehouse_filter_value)
 
     for item in rental_items:
-        actual_qty_filters = {"item_code": item.item_code}
-        warehouse_filter_value = filters.get("warehouse")
-        if warehouse_filter_value:
-            actual_qty_filters["warehouse"] = warehouse_filter_value
-        
-        actual_qty = frappe.db.get_value("Bin", actual_qty_filters, "sum(actual_qty)") or 0
-        
-        # Reserved Qty from Rental Jobs
-        reserved_sql_params = {
-            "item_code": item.item_code,
-            "company": company,
-            "to_date": to_date,
-            "from_date": from_date # from_date is important to consider jobs starting in future but reserving now
-        }
-        warehouse_job_filter_sql = ""
-        if warehouse_filter_value:
-            # This assumes Rental Job has a 'set_warehouse' field. Adjust if different.
-            warehouse_job_filter_sql = " AND rj.set_warehouse = %(warehouse)s"
-            reserved_sql_params["warehouse"] = warehouse_filter_value
+        actual_qty = actual_qtys.get(item.item_code, 0)
 
-        reserved_qty_rental_jobs_result = frappe.db.sql(f"""
-            SELECT SUM(rji.qty) 
-            FROM `tabRental Job Item` rji
-            JOIN `tabRental Job` rj ON rji.parent = rj.name
-            WHERE rji.item_code = %(item_code)s
-              AND rj.docstatus = 1
-              AND rj.status IN ('Order Confirmed', 'Ready for Dispatch', 'Dispatched', 'In Use')
-              AND rj.company = %(company)s
-              AND rj.scheduled_dispatch_date <= %(to_date)s 
-              AND rj.scheduled_return_date >= %(from_date)s 
-              {warehouse_job_filter_sql}
-        """, reserved_sql_params)
-        
-        reserved_qty_rj = flt(reserved_qty_rental_jobs_result[0][0] if reserved_qty_rental_jobs_result and reserved_qty_rental_jobs_result[0] else 0)
+        reserved_qty_rj = flt(peak_occupancy[item.item_code].booked_qty) if item.item_code in peak_occupancy else 0
 
         available_qty = actual_qty - reserved_qty_rj
 
         projected_qty_erpnext = 0
         try:
             from erpnext.stock.utils import get_projected_qty as get_erpnext_projected_qty
-            warehouse_for_proj = warehouse_filter_value or frappe.db.get_single_value("Stock Settings", "default_warehouse")
+            warehouse_for_proj = warehouse_filter_value or get_default_warehouse()
             if warehouse_for_proj:
                 projected_qty_erpnext = get_erpnext_projected_qty(item.item_code, warehouse_for_proj, to_date) # Use to_date for projection
         except ImportError:
@@ -0,0 +1,183 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module computes customer churn, retention and reactivation from cohorts.
+
+One grouped query loads the days on which each customer booked a submitted
+Rental Job (`load_customer_activity`); each customer's first and last rental,
+their cohort (month of first rental) and their activity in any period are
+derived from those rows with NumPy, so any number of periods or a whole
+retention matrix costs that single query.
+
+A customer is active on a day if they booked a Rental Job in the CHURN_WINDOW_DAYS
+up to and including that day. For a period:
+
+- customers_at_start: active on the day before the period
+- churned_customers: active at the start but no longer active at its end
+- retained_customers: active at the start and still active at its end
+- new_customers: first rental in the period
+- reactivated_customers: rented in the period after having lapsed before it
+"""
+
+import frappe
+import numpy as np
+from datetime import date
+from frappe.utils import getdate
+from typing import Dict, List, Optional, Any
+from onhire_pro.utils.daily_occupancy import column_if_exists
+from onhire_pro.utils.schema_capabilities import doctype_exists
+
+CHURN_WINDOW_DAYS = 90
+RETENTION_MONTHS = 12
+
+
+def load_customer_activity(company: Optional[str] = None, to_date=None) -> Dict[str, Any]:
+    """
+    Days on which each customer booked a submitted Rental Job, up to `to_date`.
+
+    Returns:
+        dict: customers (names), customer (index into customers per row) and
+            day (datetime64[D] per row), sorted by customer and day
+    """
+    activity = frappe._dict(customers=[], customer=np.zeros(0, dtype=np.int64),
+                            day=np.zeros(0, dtype="datetime64[D]"))
+    if not doctype_exists("Rental Job"):
+        return activity
+
+    company_field = column_if_exists("Rental Job", "company", "rj.company")
+    rows = frappe.db.sql(f"""
+        SELECT rj.customer, DATE(rj.creation) AS day
+        FROM `tabRental Job` rj
+        WHERE rj.docstatus = 1
+            AND IFNULL(rj.customer, '') != ''
+            AND (%(company)s IS NULL OR IFNULL({company_field}, '') IN (%(company)s, ''))
+            AND (%(to_date)s IS NULL OR DATE(rj.creation) <= %(to_date)s)
+        GROUP BY rj.customer, DATE(rj.creation)
+        ORDER BY rj.customer, day
+    """, {"company": company or None, "to_date": getdate(to_date) if to_date else None})
+
+    if not rows:
+        return activity
+
+    customers, index = np.unique([customer for customer, day in rows], return_inverse=True)
+    activity.customers = customers.tolist()
+    activity.customer = index.astype(np.int64)
+    activity.day = np.array([getdate(day) for customer, day in rows], dtype="datetime64[D]")
+    return activity
+
+
+def first_and_last_rentals(activity: Dict[str, Any]) -> tuple:
+    """Each customer's first and last rental day, indexed like activity.customers."""
+    count = len(activity.customers)
+    days = activity.day.astype(np.int64)
+    first = np.full(count, np.iinfo(np.int64).max)
+    last = np.full(count, np.iinfo(np.int64).min)
+    np.minimum.at(first, activity.customer, days)
+    np.maximum.at(last, activity.customer, days)
+    return first.astype("datetime64[D]"), last.astype("datetime64[D]")
+
+
+def _rented_between(activity: Dict[str, Any], start: date, end: date) -> np.ndarray:
+    """Per customer, whether they booked a Rental Job from `start` to `end` inclusive."""
+    rows = (activity.day >= np.datetime64(start, "D")) & (activity.day <= np.datetime64(end, "D"))
+    return np.bincount(activity.customer[rows], minlength=len(activity.customers)) > 0
+
+
+def _rate(part: int, whole: int) -> float:
+    return part / whole * 100 if whole else 0
+
+
+def customer_cohort_metrics(activity: Dict[str, Any], periods: List[Dict[str, Any]],
+                            window_days: int = CHURN_WINDOW_DAYS) -> List[Dict[str, Any]]:
+    """
+    Churn, retention and reactivation for each period (with start_date and end_date).
+
+    Example:
+        >>> customer_cohort_metrics(activity, [frappe._dict(start_date=date(2025, 3, 1), end_date=date(2025, 3, 31))])
+        [{"customers_at_start": 40, "churned_customers": 6, "churn_rate": 15.0, "retention_rate": 85.0, ...}]
+    """
+    first = first_and_last_rentals(activity)[0]
+    results = []
+
+    for period in periods:
+        start, end = getdate(period.get("start_date")), getdate(period.get("end_date"))
+        day_before = np.datetime64(start, "D") - 1
+
+        at_start = _rented_between(activity, (day_before - (window_days - 1)).item(), day_before.item())
+        at_end = _rented_between(activity, (np.datetime64(end, "D") - (window_days - 1)).item(), end)
+        in_period = _rented_between(activity, start, end)
+        started_before = first < np.datetime64(start, "D")
+
+        customers_at_start = int(at_start.sum())
+        churned = int((at_start & ~at_end).sum())
+        lapsed = started_before & ~at_start
+        reactivated = int((lapsed & in_period).sum())
+
+        results.append(frappe._dict(
+            start_date=start,
+            end_date=end,
+            customers_at_start=customers_at_start,
+            churned_customers=churned,
+            retained_customers=customers_at_start - churned,
+            new_customers=int((in_period & ~started_before).sum()),
+            reactivated_customers=reactivated,
+            active_customers=int(at_end.sum()),
+            churn_rate=_rate(churned, customers_at_start),
+            retention_rate=_rate(customers_at_start - churned, customers_at_start),
+            reactivation_rate=_rate(reactivated, int(lapsed.sum()))
+        ))
+
+    return results
+
+
+def retention_curves(activity: Dict[str, Any], from_date, to_date,
+                     months: int = RETENTION_MONTHS) -> Dict[str, Any]:
+    """
+    Monthly retention of the customers who first rented from `from_date` to `to_date`.
+
+    Cohorts are the months of first rental; the curve of a cohort holds, for
+    0..`months` months after it, the percentage of its customers who booked a
+    Rental Job in that month, up to the last month observed.
+
+    Returns:
+        dict: {"cohorts": [label], "sizes": [customers], "curves": [[percentage]]}
+    """
+    from_month = np.datetime64(getdate(from_date), "M").astype(np.int64)
+    to_month = np.datetime64(getdate(to_date), "M").astype(np.int64)
+    curves = frappe._dict(cohorts=[], sizes=[], curves=[])
+    if not len(activity.customers) or to_month < from_month:
+        return curves
+
+    month = activity.day.astype("datetime64[M]").astype(np.int64)
+    first_month = np.full(len(activity.customers), np.iinfo(np.int64).max)
+    np.minimum.at(first_month, activity.customer, month)
+
+    cohort = first_month[activity.customer]
+    offset = month - cohort
+    rows = (cohort >= from_month) & (cohort <= to_month) & (offset <= months)
+
+    # Each customer counts once per month, however many jobs they booked in it
+    pairs = np.unique(activity.customer[rows] * (months + 1) + offset[rows])
+    pair_cohort = first_month[pairs // (months + 1)] - from_month
+    active = np.zeros((to_month - from_month + 1, months + 1), dtype=np.int64)
+    np.add.at(active, (pair_cohort, pairs % (months + 1)), 1)
+
+    for index, size in enumerate(active[:, 0]):
+        if not size:
+            continue
+        observed = min(months, to_month - from_month - index)
+        cohort_month = (from_month + index).astype("datetime64[M]").item()
+        curves.cohorts.append(cohort_month.strftime("%b %Y"))
+        curves.sizes.append(int(size))
+        curves.curves.append([float(value) for value in active[index, :observed + 1] / size * 100])
+
+    return curves
+
+
+def get_customer_cohort_metrics(company: Optional[str], periods: List[Dict[str, Any]],
+                                window_days: int = CHURN_WINDOW_DAYS) -> List[Dict[str, Any]]:
+    """`customer_cohort_metrics` for a company, loading its activity once."""
+    if not periods:
+        return []
+    to_date = max(getdate(period.get("end_date")) for period in periods)
+    return customer_cohort_metrics(load_customer_activity(company, to_date), periods, window_days)
@@ -4,7 +4,7 @@ import numpy as np
 import json
 import os
 from datetime import datetime, timedelta
-from frappe.utils import nowdate, add_days, getdate, add_months, get_datetime
+from frappe.utils import nowdate, add_days, getdate, add_months, get_datetime, now_datetime
 from onhire_pro.reports.kpi_utils import (
     calculate_item_utilization_rate,
     calculate_average_rental_duration,
@@ -18,6 +18,20 @@ from onhire_pro.reports.kpi_utils import (
     get_active_rental_jobs_count,
     get_total_rental_revenue
 )
+from onhire_pro.reports.kpi_batch import evaluate_kpi_batch, BATCH_KPIS
+from onhire_pro.utils.schema_capabilities import doctype_exists
+
+# KPIs suitable for forecasting as identified in requirements
+FORECASTABLE_KPIS = [
+    "item_utilization_rate",
+    "total_rental_revenue",
+    "booking_conversion_rate",
+    "average_rental_duration",
+    "maintenance_turnaround_time"
+]
+
+# Historical KPI Values per bulk INSERT statement
+HISTORICAL_ROWS_PER_INSERT = 1000
 
 class KPIDataCollector:
     """
@@ -52,13 +66,7 @@ class KPIDataCollector:
         }
         
         # KPIs suitable for forecasting as identified in requirements
-        self.forecastable_kpis = [
-            "item_utilization_rate",
-            "total_rental_revenue",
-            "booking_conversion_rate",
-            "average_rental_duration",
-            "maintenance_turnaround_time"
-        ]
+        self.forecastable_kpis = list(FORECASTABLE_KPIS)
     
     def collect_kpi_data_for_date(self, kpi_name, date, filters=None):
         """
@@ -72,6 +80,26 @@ class KPIDataCollector:
         Returns:
             float: The KPI value for the specified date
         """
+        value = self._calculate_kpi_value(kpi_name, date, filters)
+        
+        # Store the collected data
+        if value is not None:
+            self._store_historical_kpi_value(kpi_name, date, value, filters)
+        
+        return value
+    
+    def _calculate_kpi_value(self, kpi_name, date, filters=None):
+        """
+        Calculate a KPI for a single date with its `kpi_utils` function.
+        
+        Args:
+            kpi_name (str): Name of the KPI to calculate
+            date (str): Date to calculate the KPI for (YYYY-MM-DD format)
+            filters (dict, optional): Additional filters to apply to the KPI calculation
+            
+        Returns:
+            float: The KPI value, or None if it could not be calculated
+        """
         if kpi_name not in self.kpi_functions:
             frappe.log_error(
                 f"Unknown KPI: {kpi_name}",
@@ -79,14 +107,8 @@ class KPIDataCollector:
             )
             return None
         
-        # Prepare filters
-        if not filters:
-            filters = {}
-        
         # Add company and date filters
-        filters["company"] = self.company
-        filters["from_date"] = date
-        filters["to_date"] = date
+        filters = dict(filters or {}, company=self.company, from_date=date, to_date=date)
         
         try:
             # Call the appropriate KPI function
@@ -94,18 +116,13 @@ class KPIDataCollector:
             
             # Extract the value from the result
             if isinstance(result, dict) and "value" in result:
-                value = result["value"]
-            else:
-                frappe.log_error(
-                    f"Unexpected result format for KPI {kpi_name}: {result}",
-                    "KPI Data Collection Error"
-                )
-                return None
+                return result["value"]
             
-            # Store the collected data
-            self._store_historical_kpi_value(kpi_name, date, value, filters)
-            
-            return value
+            frappe.log_error(
+                f"Unexpected result format for KPI {kpi_name}: {result}",
+                "KPI Data Collection Error"
+            )
+            return None
         except Exception as e:
             frappe.log_error(
                 f"Error collecting data for KPI {kpi_name} on {date}: {str(e)}\n{frappe.get_traceback()}",
@@ -113,6 +130,25 @@ class KPIDataCollector:
             )
             return None
     
+    def calculate_kpi_series(self, kpi_name, dates, filters=None):
+        """
+        Calculate a KPI for each of a list of dates.
+        
+        KPIs in BATCH_KPIS are calculated for all dates with one set of grouped
+        queries; other KPIs call their `kpi_utils` function once per date.
+        
+        Args:
+            kpi_name (str): Name of the KPI to calculate
+            dates (list): Dates to calculate the KPI for
+            filters (dict, optional): Additional filters to apply to the KPI calculation
+            
+        Returns:
+            list: One value per date, None where the KPI could not be calculated
+        """
+        if kpi_name in BATCH_KPIS and not filters:
+            return evaluate_kpi_batch(kpi_name, [(self.company, date, date) for date in dates])
+        return [self._calculate_kpi_value(kpi_name, date, filters) for date in dates]
+    
     def collect_kpi_data_for_period(self, kpi_name, start_date, end_date, filters=None):
         """
         Collect KPI data for a period of time.
@@ -136,11 +172,11 @@ class KPIDataCollector:
             dates.append(current_date.strftime("%Y-%m-%d"))
             current_date = add_days(current_date, 1)
         
-        # Collect data for each date
-        values = []
-        for date in dates:
-            value = self.collect_kpi_data_for_date(kpi_name, date, filters)
-            values.append(value)
+        # Calculate the whole series, then store it with one bulk upsert
+        values = self.calculate_kpi_series(kpi_name, dates, filters)
+        store_historical_kpi_values(
+            kpi_name, [(self.company, date, value) for date, value in zip(dates, values)], filters
+        )
         
         # Create a DataFrame
         df = pd.DataFrame({
@@ -183,40 +219,9 @@ class KPIDataCollector:
         Returns:
             str: Name of the created/updated document
         """
-        try:
-            # Check if a record already exists for this KPI, date, and company
-            existing = frappe.db.exists(
-                "Historical KPI Value",
-                {
-                    "kpi_name": kpi_name,
-                    "date": date,
-                    "company": self.company
-                }
-            )
-            
-            if existing:
-                # Update existing record
-                doc = frappe.get_doc("Historical KPI Value", existing)
-                doc.actual_value = value
-                doc.filters_json = json.dumps(filters)
-                doc.save()
-                return doc.name
-            else:
-                # Create new record
-                doc = frappe.new_doc("Historical KPI Value")
-                doc.kpi_name = kpi_name
-                doc.date = date
-                doc.actual_value = value
-                doc.company = self.company
-                doc.filters_json = json.dumps(filters)
-                doc.insert()
-                return doc.name
-        except Exception as e:
-            frappe.log_error(
-                f"Error storing historical KPI value for {kpi_name} on {date}: {str(e)}\n{frappe.get_traceback()}",
-                "KPI Data Storage Error"
-            )
-            return None
+        if store_historical_kpi_values(kpi_name, [(self.company, date, value)], filters):
+            return historical_kpi_value_name(kpi_name, date, self.company)
+        return None
     
     def get_historical_kpi_data(self, kpi_name, start_date, end_date):
         """
@@ -329,32 +334,188 @@ class KPIDataCollector:
         Returns:
             int: Number of data points backfilled
         """
-        # Get existing data
-        existing_df = self.get_historical_kpi_data(kpi_name, start_date, end_date)
+        return backfill_kpi_series(kpi_name, [self.company], start_date, end_date, filters)
+
+
+def historical_kpi_value_name(kpi_name, date, company):
+    """Name of the Historical KPI Value of a KPI, date and company (the DocType's autoname format)."""
+    return f"HKV-{kpi_name}-{getdate(date).strftime('%Y-%m-%d')}-{company}"
+
+
+def store_historical_kpi_values(kpi_name, rows, filters=None):
+    """
+    Insert or update historical values of a KPI with bulk INSERT ... ON DUPLICATE KEY UPDATE.
+    
+    Rows are named like the DocType's autoname, so a value already stored for a
+    date and company is overwritten instead of duplicated.
+    
+    Args:
+        kpi_name (str): Name of the KPI
+        rows (list): (company, date, value) tuples; rows without a value are skipped
+        filters (dict, optional): Additional filters the values were calculated with
+        
+    Returns:
+        int: Number of values stored
+    """
+    now = now_datetime()
+    user = frappe.session.user
+    records = []
+    for company, date, value in rows:
+        if value is None:
+            continue
+        date = getdate(date).strftime("%Y-%m-%d")
+        records.append((
+            historical_kpi_value_name(kpi_name, date, company), user, now, now, user,
+            kpi_name, date, company, float(value),
+            json.dumps(dict(filters or {}, company=company, from_date=date, to_date=date))
+        ))
+    
+    try:
+        for start in range(0, len(records), HISTORICAL_ROWS_PER_INSERT):
+            chunk = records[start:start + HISTORICAL_ROWS_PER_INSERT]
+            placeholders = ", ".join(["(%s, %s, %s, %s, %s, 0, %s, %s, %s, %s, %s)"] * len(chunk))
+            frappe.db.sql(f"""
+                INSERT INTO `tabHistorical KPI Value`
+                    (name, owner, creation, modified, modified_by, docstatus,
+                     kpi_name, date, company, actual_value, filters_json)
+                VALUES {placeholders}
+                ON DUPLICATE KEY UPDATE
+                    actual_value = VALUES(actual_value),
+                    filters_json = VALUES(filters_json),
+                    modified = VALUES(modified),
+                    modified_by = VALUES(modified_by)
+            """, tuple(field for record in chunk for field in record))
+        return len(records)
+    except Exception as e:
+        frappe.log_error(
+            f"Error storing historical KPI values for {kpi_name}: {str(e)}\n{frappe.get_traceback()}",
+            "KPI Data Storage Error"
+        )
+        return 0
+
+
+def find_missing_kpi_days(kpi_name, companies, start_date, end_date):
+    """
+    Find the days of a period without a historical value of a KPI, with one query.
+    
+    Args:
+        kpi_name (str): Name of the KPI
+        companies (list): Companies to check
+        start_date (str): Start date of the period (YYYY-MM-DD format)
+        end_date (str): End date of the period (YYYY-MM-DD format)
         
-        # Create a set of existing dates
-        existing_dates = set(existing_df["date"].dt.strftime("%Y-%m-%d"))
+    Returns:
+        list: (company, date) tuples of the missing values, by company and date
+    """
+    companies = list(companies)
+    start_date, end_date = getdate(start_date), getdate(end_date)
+    days = (end_date - start_date).days + 1
+    if days <= 0 or not companies:
+        return []
+    
+    existing = frappe.db.sql("""
+        SELECT company, date
+        FROM `tabHistorical KPI Value`
+        WHERE kpi_name = %(kpi_name)s
+            AND company IN %(companies)s
+            AND date BETWEEN %(start_date)s AND %(end_date)s
+    """, {"kpi_name": kpi_name, "companies": tuple(companies), "start_date": start_date, "end_date": end_date})
+    
+    # Mark the stored days in a companies x days grid and return the rest
+    company_index = {company: index for index, company in enumerate(companies)}
+    stored = np.zeros((len(companies), days), dtype=bool)
+    for company, date in existing:
+        stored[company_index[company], (getdate(date) - start_date).days] = True
+    
+    company_indexes, offsets = np.nonzero(~stored)
+    return [
+        (companies[index], start_date + timedelta(days=int(offset)))
+        for index, offset in zip(company_indexes, offsets)
+    ]
+
+
+def backfill_kpi_series(kpi_name, companies, start_date, end_date, filters=None):
+    """
+    Backfill the missing historical values of a KPI for several companies.
+    
+    The missing days of all companies are found with one query, calculated as one
+    series (one set of grouped queries for KPIs in BATCH_KPIS) and stored with
+    bulk upserts, instead of calculating and saving each day on its own.
+    
+    Args:
+        kpi_name (str): Name of the KPI to backfill data for
+        companies (list): Companies to backfill data for
+        start_date (str): Start date of the period (YYYY-MM-DD format)
+        end_date (str): End date of the period (YYYY-MM-DD format)
+        filters (dict, optional): Additional filters to apply to the KPI calculation
         
-        # Create a list of all dates in the range
-        start_date = getdate(start_date)
-        end_date = getdate(end_date)
-        all_dates = []
-        current_date = start_date
-        while current_date <= end_date:
-            all_dates.append(current_date.strftime("%Y-%m-%d"))
-            current_date = add_days(current_date, 1)
+    Returns:
+        int: Number of data points backfilled
+    """
+    missing = find_missing_kpi_days(kpi_name, companies, start_date, end_date)
+    if not missing:
+        return 0
+    
+    if kpi_name in BATCH_KPIS and not filters:
+        values = evaluate_kpi_batch(kpi_name, [(company, date, date) for company, date in missing])
+    else:
+        collectors = {company: KPIDataCollector(company) for company in companies}
+        values = [collectors[company]._calculate_kpi_value(kpi_name, date, filters) for company, date in missing]
+    
+    return store_historical_kpi_values(
+        kpi_name, [(company, date, value) for (company, date), value in zip(missing, values)], filters
+    )
+
+
+def get_historical_kpi_data_batch(kpi_names, companies, start_date, end_date):
+    """
+    Retrieve historical KPI data of several KPIs and companies with one query.
+    
+    Args:
+        kpi_names (list): Names of the KPIs to retrieve data for
+        companies (list): Companies to retrieve data for
+        start_date (str): Start date of the period (YYYY-MM-DD format)
+        end_date (str): End date of the period (YYYY-MM-DD format)
         
-        # Find missing dates
-        missing_dates = [date for date in all_dates if date not in existing_dates]
+    Returns:
+        dict: DataFrames with dates and KPI values, keyed by (company, kpi_name);
+              every combination is present, empty if it has no data
+    """
+    history = {
+        (company, kpi_name): pd.DataFrame(columns=["date", "value"])
+        for company in companies for kpi_name in kpi_names
+    }
+    if not history:
+        return history
+    
+    try:
+        data = frappe.db.get_all(
+            "Historical KPI Value",
+            filters={
+                "kpi_name": ["in", list(kpi_names)],
+                "company": ["in", list(companies)],
+                "date": ["between", [start_date, end_date]]
+            },
+            fields=["company", "kpi_name", "date", "actual_value"],
+            order_by="company, kpi_name, date"
+        )
         
-        # Collect data for missing dates
-        count = 0
-        for date in missing_dates:
-            value = self.collect_kpi_data_for_date(kpi_name, date, filters)
-            if value is not None:
-                count += 1
+        if data:
+            df = pd.DataFrame(data)
+            df["date"] = pd.to_datetime(df["date"])
+            for (company, kpi_name), group in df.groupby(["company", "kpi_name"]):
+                history[(company, kpi_name)] = pd.DataFrame({
+                    "date": group["date"].values,
+                    "value": group["actual_value"].values
+                })
         
-        return count
+        return history
+    except Exception as e:
+        frappe.log_error(
+            f"Error retrieving historical KPI data: {str(e)}\n{frappe.get_traceback()}",
+            "KPI Data Retrieval Error"
+        )
+        return history
 
 
 def create_historical_kpi_value_doctype():
@@ -369,7 +530,7 @@ def create_historical_kpi_value_doctype():
     """
     try:
         # Check if DocType already exists
-        if frappe.db.exists("DocType", "Historical KPI Value"):
+        if doctype_exists("Historical KPI Value"):
             return True
         
         # Create new DocType
@@ -497,37 +658,23 @@ def collect_daily_kpi_data():
         
         # Current date
         today = nowdate()
+        company_names = [company_doc.name for company_doc in companies]
+        failed_companies = set()
         
-        # Process each company
-        for company_doc in companies:
-            company = company_doc.name
-            try:
-                # Create data collector for this company
-                collector = KPIDataCollector(company)
-                
-                # Collect data for each forecastable KPI
-                for kpi_name in collector.forecastable_kpis:
-                    results["total_kpis"] += 1
-                    try:
-                        value = collector.collect_kpi_data_for_date(kpi_name, today)
-                        if value is not None:
-                            results["successful_kpis"] += 1
-                        else:
-                            results["failed_kpis"] += 1
-                    except Exception as e:
-                        results["failed_kpis"] += 1
-                        frappe.log_error(
-                            f"Error collecting data for KPI {kpi_name} in company {company}: {str(e)}\n{frappe.get_traceback()}",
-                            "Daily KPI Data Collection Error"
-                        )
-                
-                results["successful_companies"] += 1
-            except Exception as e:
-                results["failed_companies"] += 1
-                frappe.log_error(
-                    f"Error processing company {company} for daily KPI data collection: {str(e)}\n{frappe.get_traceback()}",
-                    "Daily KPI Data Collection Error"
-                )
+        # Evaluate each forecastable KPI for all companies at once
+        for kpi_name in FORECASTABLE_KPIS:
+            values = evaluate_kpi_batch(kpi_name, [(company, today, today) for company in company_names])
+            
+            rows = [(company, today, value) for company, value in zip(company_names, values)]
+            stored = store_historical_kpi_values(kpi_name, rows)
+            
+            results["total_kpis"] += len(rows)
+            results["successful_kpis"] += stored
+            results["failed_kpis"] += len(rows) - stored
+            failed_companies.update(company for company, date, value in rows if value is None or not stored)
+        
+        results["failed_companies"] = len(failed_companies)
+        results["successful_companies"] = len(company_names) - len(failed_companies)
         
         # Log summary
         frappe.log_error(
@@ -582,41 +729,27 @@ def backfill_historical_kpi_data(days=90):
         end_date = add_days(nowdate(), -1)  # Yesterday
         start_date = add_days(end_date, -days)  # X days before yesterday
         
-        # Process each company
-        for company_doc in companies:
-            company = company_doc.name
+        company_names = [company_doc.name for company_doc in companies]
+        failed_companies = set()
+        
+        # Backfill each forecastable KPI for all companies at once
+        for kpi_name in FORECASTABLE_KPIS:
+            results["total_kpis"] += len(company_names)
+            results["total_datapoints"] += len(company_names) * (days + 1)  # Include both start and end dates
             try:
-                # Create data collector for this company
-                collector = KPIDataCollector(company)
-                
-                # Backfill data for each forecastable KPI
-                for kpi_name in collector.forecastable_kpis:
-                    results["total_kpis"] += 1
-                    try:
-                        # Calculate total datapoints for this KPI
-                        total_days = days + 1  # Include both start and end dates
-                        results["total_datapoints"] += total_days
-                        
-                        # Backfill missing data
-                        backfilled = collector.backfill_missing_data(kpi_name, start_date, end_date)
-                        results["backfilled_datapoints"] += backfilled
-                        
-                        results["successful_kpis"] += 1
-                    except Exception as e:
-                        results["failed_kpis"] += 1
-                        frappe.log_error(
-                            f"Error backfilling data for KPI {kpi_name} in company {company}: {str(e)}\n{frappe.get_traceback()}",
-                            "Historical KPI Data Backfill Error"
-                        )
-                
-                results["successful_companies"] += 1
+                results["backfilled_datapoints"] += backfill_kpi_series(kpi_name, company_names, start_date, end_date)
+                results["successful_kpis"] += len(company_names)
             except Exception as e:
-                results["failed_companies"] += 1
+                results["failed_kpis"] += len(company_names)
+                failed_companies.update(company_names)
                 frappe.log_error(
-                    f"Error processing company {company} for historical KPI data backfill: {str(e)}\n{frappe.get_traceback()}",
+                    f"Error backfilling data for KPI {kpi_name}: {str(e)}\n{frappe.get_traceback()}",
                     "Historical KPI Data Backfill Error"
                 )
         
+        results["failed_companies"] = len(failed_companies)
+        results["successful_companies"] = len(company_names) - len(failed_companies)
+        
         # Log summary
         frappe.log_error(
             f"Historical KPI data backfill completed: {json.dumps(results, indent=2)}",
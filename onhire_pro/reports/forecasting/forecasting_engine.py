@@ -2,15 +2,158 @@ import frappe
 import pandas as pd
 import numpy as np
 import json
+import math
+import multiprocessing
 import os
+import signal
+import time
+import traceback
 import matplotlib.pyplot as plt
 from datetime import datetime, timedelta
 from prophet import Prophet
 from prophet.diagnostics import cross_validation, performance_metrics
 from prophet.plot import plot_cross_validation_metric
 from sklearn.metrics import mean_absolute_error, mean_squared_error
-from frappe.utils import nowdate, add_days, getdate, add_months, get_datetime
-from onhire_pro.reports.forecasting.data_collector import KPIDataCollector
+from frappe.utils import nowdate, add_days, getdate, add_months, get_datetime, now_datetime, cint
+from onhire_pro.doctype.forecasted_kpi_value.forecasted_kpi_value import forecasted_kpi_value_name
+from onhire_pro.reports.forecasting.data_collector import KPIDataCollector, FORECASTABLE_KPIS, get_historical_kpi_data_batch
+from onhire_pro.reports.forecasting.model_registry import (
+    ModelRegistry, DEFAULT_MODEL_STORE_MB, data_fingerprint, warm_start_params
+)
+from onhire_pro.utils.schema_capabilities import doctype_exists
+
+# Forecasted KPI Values per bulk INSERT statement
+FORECAST_ROWS_PER_INSERT = 1000
+
+# Seconds one (company, KPI) forecast may run in a worker, unless set in Rental Settings
+DEFAULT_FORECAST_TASK_TIMEOUT = 1800
+
+# Seconds the parent waits beyond the task timeouts before it stops the pool
+FORECAST_POOL_GRACE_SECONDS = 60
+
+
+def prepare_data_for_prophet(df):
+    """Rename a (date, value) DataFrame to Prophet's (ds, y) and drop missing values."""
+    return df.rename(columns={"date": "ds", "value": "y"}).dropna()
+
+
+def cross_validate_horizons(model, periods, parallel=None):
+    """
+    Cross-validate a trained Prophet model once for several horizons; raises on failure.
+    
+    The cross-validation runs to the longest horizon and each shorter horizon is
+    evaluated on the predictions at most that many days after their cutoff.
+    
+    Args:
+        model (prophet.Prophet): Trained Prophet model
+        periods (list): Horizons in days
+        parallel (str, optional): How Prophet runs the folds: None, "threads" or "processes"
+        
+    Returns:
+        dict: Evaluation metrics per horizon, None for a horizon without predictions
+    """
+    cv_results = cross_validation(
+        model,
+        initial='90 days',
+        period='30 days',
+        horizon=f'{max(periods)} days',
+        parallel=parallel
+    )
+    days_ahead = cv_results['ds'] - cv_results['cutoff']
+    
+    evaluations = {}
+    for period in periods:
+        horizon_results = cv_results[days_ahead <= pd.Timedelta(days=period)]
+        if horizon_results.empty:
+            evaluations[period] = None
+            continue
+        
+        metrics = performance_metrics(horizon_results)
+        evaluations[period] = {
+            "mape": metrics['mape'].mean(),
+            "rmse": metrics['rmse'].mean(),
+            "cv_results": horizon_results,
+            "metrics": metrics
+        }
+    return evaluations
+
+
+def cross_validate_model(model, periods, parallel=None):
+    """Cross-validate a trained Prophet model for a horizon of `periods` days; raises on failure."""
+    return cross_validate_horizons(model, [periods], parallel)[periods]
+
+
+def fit_or_reuse_model(prophet_df, params, fingerprint, previous=None, errors=None):
+    """
+    Fit a Prophet model, reusing or warm-starting from a previously fitted one.
+    
+    Args:
+        prophet_df (pandas.DataFrame): Training data with 'ds' and 'y' columns
+        params (dict): Parameters for the Prophet model
+        fingerprint (str): `data_fingerprint` of the training data and parameters
+        previous (dict, optional): Entry of the previous model from the `ModelRegistry`
+        errors (list, optional): Receives the error of a failed warm start
+        
+    Returns:
+        tuple: (model, reused) - the previous model itself if it was fitted on the
+               same data, otherwise a new fit, started from the previous model's
+               parameters if it had the same Prophet parameters
+    """
+    if previous and previous["fingerprint"] == fingerprint:
+        return previous["model"], True
+    
+    if previous and previous["params"] == (params or {}):
+        try:
+            model = Prophet(**params) if params else Prophet()
+            return model.fit(prophet_df, init=warm_start_params(previous["model"])), False
+        except Exception:
+            # Fall back to a cold start
+            if errors is not None:
+                errors.append(f"Error warm-starting forecast model: {traceback.format_exc()}")
+    
+    model = Prophet(**params) if params else Prophet()
+    return model.fit(prophet_df), False
+
+
+def slice_forecast(forecast, model, periods):
+    """The part of a longer forecast up to `periods` days after the model's history."""
+    return forecast[forecast['ds'] <= model.history['ds'].max() + pd.Timedelta(days=periods)]
+
+
+def plot_forecast_to_file(forecast, df, file_path):
+    """Plot the history and a forecast with its uncertainty interval to `file_path`; raises on failure."""
+    # Create figure
+    fig = plt.figure(figsize=(12, 6))
+    
+    # Plot forecast
+    ax = fig.add_subplot(111)
+    
+    # Plot historical data
+    prophet_df = prepare_data_for_prophet(df)
+    ax.scatter(prophet_df['ds'], prophet_df['y'], color='black', label='Historical')
+    
+    # Plot forecast
+    ax.plot(forecast['ds'], forecast['yhat'], color='blue', label='Forecast')
+    
+    # Plot uncertainty intervals
+    ax.fill_between(
+        forecast['ds'],
+        forecast['yhat_lower'],
+        forecast['yhat_upper'],
+        color='blue',
+        alpha=0.2,
+        label='Uncertainty'
+    )
+    
+    # Add labels and title
+    ax.set_xlabel('Date')
+    ax.set_ylabel('Value')
+    ax.set_title('Forecast with Prophet')
+    ax.legend()
+    
+    # Save figure
+    plt.savefig(file_path)
+    plt.close(fig)
 
 class ForecastingEngine:
     """
@@ -96,7 +239,7 @@ class ForecastingEngine:
         """
         try:
             # Check if DocType already exists
-            if frappe.db.exists("DocType", "Forecasted KPI Value"):
+            if doctype_exists("Forecasted KPI Value"):
                 return True
             
             # Create new DocType
@@ -226,6 +369,11 @@ class ForecastingEngine:
                 ON `tabForecasted KPI Value` (company)
             """)
             
+            frappe.db.sql("""
+                CREATE UNIQUE INDEX IF NOT EXISTS unique_forecast
+                ON `tabForecasted KPI Value` (kpi_name, target_date, company, forecast_date)
+            """)
+            
             return True
         except Exception as e:
             frappe.log_error(
@@ -245,12 +393,7 @@ class ForecastingEngine:
             pandas.DataFrame: DataFrame formatted for Prophet
         """
         # Prophet requires columns named 'ds' and 'y'
-        prophet_df = df.rename(columns={"date": "ds", "value": "y"})
-        
-        # Handle missing values
-        prophet_df = prophet_df.dropna()
-        
-        return prophet_df
+        return prepare_data_for_prophet(df)
     
     def train_prophet_model(self, df, params=None):
         """
@@ -264,7 +407,7 @@ class ForecastingEngine:
             prophet.Prophet: Trained Prophet model
         """
         # Prepare data
-        prophet_df = self.prepare_data_for_prophet(df)
+        prophet_df = prepare_data_for_prophet(df)
         
         if prophet_df.empty:
             frappe.log_error(
@@ -331,32 +474,7 @@ class ForecastingEngine:
             return None
         
         try:
-            # Prepare data
-            prophet_df = self.prepare_data_for_prophet(df)
-            
-            # Perform cross-validation
-            cv_results = cross_validation(
-                model,
-                initial='90 days',
-                period='30 days',
-                horizon=f'{periods} days'
-            )
-            
-            # Calculate performance metrics
-            metrics = performance_metrics(cv_results)
-            
-            # Calculate MAPE
-            mape = metrics['mape'].mean()
-            
-            # Calculate RMSE
-            rmse = metrics['rmse'].mean()
-            
-            return {
-                "mape": mape,
-                "rmse": rmse,
-                "cv_results": cv_results,
-                "metrics": metrics
-            }
+            return cross_validate_model(model, periods)
         except Exception as e:
             frappe.log_error(
                 f"Error evaluating model: {str(e)}\n{frappe.get_traceback()}",
@@ -381,39 +499,7 @@ class ForecastingEngine:
             return False
         
         try:
-            # Create figure
-            fig = plt.figure(figsize=(12, 6))
-            
-            # Plot forecast
-            ax = fig.add_subplot(111)
-            
-            # Plot historical data
-            prophet_df = self.prepare_data_for_prophet(df)
-            ax.scatter(prophet_df['ds'], prophet_df['y'], color='black', label='Historical')
-            
-            # Plot forecast
-            ax.plot(forecast['ds'], forecast['yhat'], color='blue', label='Forecast')
-            
-            # Plot uncertainty intervals
-            ax.fill_between(
-                forecast['ds'],
-                forecast['yhat_lower'],
-                forecast['yhat_upper'],
-                color='blue',
-                alpha=0.2,
-                label='Uncertainty'
-            )
-            
-            # Add labels and title
-            ax.set_xlabel('Date')
-            ax.set_ylabel('Value')
-            ax.set_title('Forecast with Prophet')
-            ax.legend()
-            
-            # Save figure
-            plt.savefig(file_path)
-            plt.close(fig)
-            
+            plot_forecast_to_file(forecast, df, file_path)
             return True
         except Exception as e:
             frappe.log_error(
@@ -422,10 +508,15 @@ class ForecastingEngine:
             )
             return False
     
-    def store_forecast(self, kpi_name, forecast, forecast_date=None, algorithm="Prophet", accuracy=None, historical_data_points=None):
+    def store_forecast(self, kpi_name, forecast, forecast_date=None, algorithm="Prophet", accuracy=None,
+                       historical_data_points=None, retire_superseded=False):
         """
         Store forecasted values in the database.
         
+        The rows are built from the forecast's columns and written with multi-row
+        INSERT ... ON DUPLICATE KEY UPDATE on the unique key (kpi_name, target_date,
+        company, forecast_date), so storing a forecast again updates its values.
+        
         Args:
             kpi_name (str): Name of the KPI
             forecast (pandas.DataFrame): DataFrame with forecasted values
@@ -433,6 +524,8 @@ class ForecastingEngine:
             algorithm (str, optional): Algorithm used for forecasting
             accuracy (float, optional): Forecast accuracy (MAPE)
             historical_data_points (int, optional): Number of historical data points used
+            retire_superseded (bool, optional): Delete the values of earlier forecasts
+                                                for the target dates this one covers
             
         Returns:
             int: Number of forecasted values stored
@@ -444,164 +537,255 @@ class ForecastingEngine:
         self.create_forecasted_kpi_value_doctype()
         
         # Set default forecast date to today
-        if forecast_date is None:
-            forecast_date = nowdate()
+        forecast_date = getdate(forecast_date or nowdate()).strftime("%Y-%m-%d")
         
         # Extract future dates (after forecast_date)
         future_forecast = forecast[forecast['ds'] > pd.to_datetime(forecast_date)]
+        if future_forecast.empty:
+            return 0
         
-        count = 0
-        for _, row in future_forecast.iterrows():
-            try:
-                # Check if a record already exists for this KPI, target date, and company
-                target_date = row['ds'].strftime("%Y-%m-%d")
-                existing = frappe.db.exists(
-                    "Forecasted KPI Value",
-                    {
-                        "kpi_name": kpi_name,
-                        "target_date": target_date,
-                        "company": self.company,
-                        "forecast_date": forecast_date
-                    }
-                )
-                
-                if existing:
-                    # Update existing record
-                    doc = frappe.get_doc("Forecasted KPI Value", existing)
-                    doc.forecasted_value = row['yhat']
-                    doc.lower_bound = row['yhat_lower']
-                    doc.upper_bound = row['yhat_upper']
-                    doc.algorithm = algorithm
-                    if accuracy is not None:
-                        doc.accuracy = accuracy
-                    if historical_data_points is not None:
-                        doc.historical_data_points = historical_data_points
-                    doc.save()
-                else:
-                    # Create new record
-                    doc = frappe.new_doc("Forecasted KPI Value")
-                    doc.kpi_name = kpi_name
-                    doc.forecast_date = forecast_date
-                    doc.target_date = target_date
-                    doc.forecasted_value = row['yhat']
-                    doc.lower_bound = row['yhat_lower']
-                    doc.upper_bound = row['yhat_upper']
-                    doc.algorithm = algorithm
-                    doc.company = self.company
-                    if accuracy is not None:
-                        doc.accuracy = accuracy
-                    if historical_data_points is not None:
-                        doc.historical_data_points = historical_data_points
-                    doc.insert()
-                
-                count += 1
-            except Exception as e:
-                frappe.log_error(
-                    f"Error storing forecast for KPI {kpi_name} on {target_date}: {str(e)}\n{frappe.get_traceback()}",
-                    "Forecast Storage Error"
-                )
+        target_dates = future_forecast['ds'].dt.strftime("%Y-%m-%d").tolist()
+        now = now_datetime()
+        user = frappe.session.user
+        records = [
+            (forecasted_kpi_value_name(kpi_name, target_date, self.company, forecast_date), user, now, now, user,
+             kpi_name, forecast_date, target_date, value, lower_bound, upper_bound,
+             algorithm, accuracy, historical_data_points, self.company)
+            for target_date, value, lower_bound, upper_bound in zip(
+                target_dates,
+                future_forecast['yhat'].astype(float).tolist(),
+                future_forecast['yhat_lower'].astype(float).tolist(),
+                future_forecast['yhat_upper'].astype(float).tolist()
+            )
+        ]
+        
+        try:
+            for start in range(0, len(records), FORECAST_ROWS_PER_INSERT):
+                chunk = records[start:start + FORECAST_ROWS_PER_INSERT]
+                placeholders = ", ".join(["(%s, %s, %s, %s, %s, 0, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"] * len(chunk))
+                frappe.db.sql(f"""
+                    INSERT INTO `tabForecasted KPI Value`
+                        (name, owner, creation, modified, modified_by, docstatus,
+                         kpi_name, forecast_date, target_date, forecasted_value, lower_bound, upper_bound,
+                         algorithm, accuracy, historical_data_points, company)
+                    VALUES {placeholders}
+                    ON DUPLICATE KEY UPDATE
+                        forecasted_value = VALUES(forecasted_value),
+                        lower_bound = VALUES(lower_bound),
+                        upper_bound = VALUES(upper_bound),
+                        algorithm = VALUES(algorithm),
+                        accuracy = IFNULL(VALUES(accuracy), `tabForecasted KPI Value`.accuracy),
+                        historical_data_points = IFNULL(VALUES(historical_data_points),
+                                                        `tabForecasted KPI Value`.historical_data_points),
+                        modified = VALUES(modified),
+                        modified_by = VALUES(modified_by)
+                """, tuple(field for record in chunk for field in record))
+        except Exception as e:
+            frappe.log_error(
+                f"Error storing forecast for KPI {kpi_name} made on {forecast_date}: {str(e)}\n{frappe.get_traceback()}",
+                "Forecast Storage Error"
+            )
+            return 0
         
-        return count
+        if retire_superseded:
+            self.retire_superseded_forecasts(kpi_name, forecast_date)
+        
+        return len(records)
     
-    def forecast_kpi(self, kpi_name, historical_days=365, forecast_periods=None, params=None):
+    def retire_superseded_forecasts(self, kpi_name, forecast_date):
         """
-        Generate forecast for a specific KPI.
+        Delete the values of forecasts made before `forecast_date` for target dates after it.
+        
+        Values for target dates up to `forecast_date` are kept, as
+        `compare_forecast_with_actual` compares them with the actual values.
+        
+        Args:
+            kpi_name (str): Name of the KPI
+            forecast_date (str): Date of the forecast that supersedes the earlier ones
+            
+        Returns:
+            bool: True if successful, False otherwise
+        """
+        try:
+            frappe.db.sql("""
+                DELETE FROM `tabForecasted KPI Value`
+                WHERE kpi_name = %(kpi_name)s
+                    AND company = %(company)s
+                    AND forecast_date < %(forecast_date)s
+                    AND target_date > %(forecast_date)s
+            """, {"kpi_name": kpi_name, "company": self.company, "forecast_date": getdate(forecast_date)})
+            return True
+        except Exception as e:
+            frappe.log_error(
+                f"Error retiring forecasts for KPI {kpi_name} before {forecast_date}: {str(e)}\n{frappe.get_traceback()}",
+                "Forecast Storage Error"
+            )
+            return False
+    
+    def prepare_forecast_task(self, kpi_name, historical_days=365, forecast_periods=None, params=None, history=None,
+                              cv_parallel=None):
+        """
+        Load the history of a KPI and build the task `run_forecast_task` fits and predicts.
         
         Args:
             kpi_name (str): Name of the KPI to forecast
             historical_days (int, optional): Number of historical days to use
             forecast_periods (list, optional): List of periods to forecast
             params (dict, optional): Parameters for the Prophet model
+            history (pandas.DataFrame, optional): Historical data already loaded for
+                                                  the period, e.g. by a batch load
+            cv_parallel (str, optional): How to run the cross-validation folds: "threads"
+                                         or "processes" (default from Rental Settings)
             
         Returns:
-            dict: Forecasting results
+            dict: The task, or None if there is not enough historical data
         """
-        try:
-            # Set default forecast periods if not specified
-            if forecast_periods is None:
-                forecast_periods = self.default_horizons.get(kpi_name, [30])
-            
-            # Set default parameters if not specified
-            if params is None:
-                params = self.default_params.get(kpi_name, {})
-            
-            # Calculate date range for historical data
-            end_date = add_days(nowdate(), -1)  # Yesterday
-            start_date = add_days(end_date, -historical_days)  # X days before yesterday
-            
-            # Get historical data
+        # Set default forecast periods if not specified
+        if forecast_periods is None:
+            forecast_periods = self.default_horizons.get(kpi_name, [30])
+        
+        # Set default parameters if not specified
+        if params is None:
+            params = self.default_params.get(kpi_name, {})
+        
+        # Calculate date range for historical data
+        end_date = add_days(nowdate(), -1)  # Yesterday
+        start_date = add_days(end_date, -historical_days)  # X days before yesterday
+        
+        # Get historical data
+        if history is not None:
+            df = history
+        else:
             df = self.data_collector.get_historical_kpi_data(kpi_name, start_date, end_date)
+        
+        # Fill missing dates
+        df = self.data_collector.fill_missing_dates(df, start_date, end_date)
+        
+        # Check if we have enough data
+        if len(df) < 30:
+            frappe.log_error(
+                f"Insufficient historical data for KPI {kpi_name}. Need at least 30 data points, got {len(df)}.",
+                "Forecasting Error"
+            )
+            return None
+        
+        plot_dir = os.path.join(frappe.get_site_path(), "public", "files", "forecasts")
+        os.makedirs(plot_dir, exist_ok=True)
+        registry = get_model_registry()
+        
+        return {
+            "company": self.company,
+            "kpi_name": kpi_name,
+            "history": df,
+            "params": params,
+            "periods": list(forecast_periods),
+            "cv_parallel": cv_parallel or get_cv_parallel(),
+            "model_store": registry.path,
+            "model_store_bytes": registry.max_bytes,
+            "plot_files": {
+                period: os.path.join(plot_dir, f"{kpi_name}_{period}days_{nowdate()}.png")
+                for period in forecast_periods
+            }
+        }
+    
+    def store_forecast_result(self, task, result):
+        """
+        Store the forecasts `run_forecast_task` returned for a task.
+        
+        Args:
+            task (dict): Task built by `prepare_forecast_task`
+            result (dict): Result of `run_forecast_task` for the task
             
-            # Fill missing dates
-            df = self.data_collector.fill_missing_dates(df, start_date, end_date)
-            
-            # Check if we have enough data
-            if len(df) < 30:
-                frappe.log_error(
-                    f"Insufficient historical data for KPI {kpi_name}. Need at least 30 data points, got {len(df)}.",
-                    "Forecasting Error"
-                )
-                return {
+        Returns:
+            dict: Forecasting results, as returned by `forecast_kpi`
+        """
+        kpi_name = task["kpi_name"]
+        for error in result.get("errors", []):
+            frappe.log_error(error, "Forecasting Error")
+        
+        if result.get("error"):
+            frappe.log_error(
+                f"Error forecasting KPI {kpi_name} for company {self.company}: {result['error']}",
+                "Forecasting Error"
+            )
+            return {
+                "success": False,
+                "error": result.get("message") or result["error"],
+                "kpi_name": kpi_name
+            }
+        
+        # The forecasts of shorter horizons are slices of the longest one, so only
+        # the longest is stored, with its accuracy
+        forecast_periods = [period for period in task["periods"] if result["forecasts"].get(period) is not None]
+        stored = 0
+        if forecast_periods:
+            longest = max(forecast_periods)
+            evaluation = result["evaluations"].get(longest)
+            stored = self.store_forecast(
+                kpi_name,
+                result["forecasts"][longest],
+                algorithm="Prophet",
+                accuracy=evaluation["mape"] if evaluation else None,
+                historical_data_points=len(task["history"])
+            )
+        
+        results = {}
+        for period in task["periods"]:
+            forecast = result["forecasts"].get(period)
+            if forecast is None:
+                results[period] = {
                     "success": False,
-                    "error": "Insufficient historical data",
-                    "kpi_name": kpi_name
+                    "error": "Failed to generate forecast"
                 }
+                continue
             
-            # Train model
-            model = self.train_prophet_model(df, params)
+            future_rows = int((forecast['ds'] > pd.to_datetime(nowdate())).sum())
+            results[period] = {
+                "success": True,
+                "forecast": forecast,
+                "evaluation": result["evaluations"].get(period),
+                "stored_count": min(future_rows, stored),
+                "plot_file": result["plot_files"].get(period)
+            }
+        
+        return {
+            "success": True,
+            "kpi_name": kpi_name,
+            "historical_data_points": len(task["history"]),
+            "model_reused": result.get("model_reused", False),
+            "results": results
+        }
+    
+    def forecast_kpi(self, kpi_name, historical_days=365, forecast_periods=None, params=None, history=None,
+                     cv_parallel=None):
+        """
+        Generate forecast for a specific KPI.
+        
+        Args:
+            kpi_name (str): Name of the KPI to forecast
+            historical_days (int, optional): Number of historical days to use
+            forecast_periods (list, optional): List of periods to forecast
+            params (dict, optional): Parameters for the Prophet model
+            history (pandas.DataFrame, optional): Historical data already loaded for
+                                                  the period, e.g. by a batch load
+            cv_parallel (str, optional): How to run the cross-validation folds: "threads"
+                                         or "processes" (default from Rental Settings)
             
-            if model is None:
+        Returns:
+            dict: Forecasting results
+        """
+        try:
+            task = self.prepare_forecast_task(kpi_name, historical_days, forecast_periods, params, history, cv_parallel)
+            if task is None:
                 return {
                     "success": False,
-                    "error": "Failed to train model",
+                    "error": "Insufficient historical data",
                     "kpi_name": kpi_name
                 }
             
-            # Generate forecasts for each period
-            results = {}
-            for period in forecast_periods:
-                # Generate forecast
-                forecast = self.generate_forecast(model, periods=period)
-                
-                if forecast is None:
-                    results[period] = {
-                        "success": False,
-                        "error": "Failed to generate forecast"
-                    }
-                    continue
-                
-                # Evaluate model
-                evaluation = self.evaluate_model(model, df, periods=period)
-                
-                # Store forecast
-                count = self.store_forecast(
-                    kpi_name,
-                    forecast,
-                    algorithm="Prophet",
-                    accuracy=evaluation["mape"] if evaluation else None,
-                    historical_data_points=len(df)
-                )
-                
-                # Plot forecast
-                plot_dir = os.path.join(frappe.get_site_path(), "public", "files", "forecasts")
-                os.makedirs(plot_dir, exist_ok=True)
-                plot_file = os.path.join(plot_dir, f"{kpi_name}_{period}days_{nowdate()}.png")
-                plot_success = self.plot_forecast(model, forecast, df, plot_file)
-                
-                results[period] = {
-                    "success": True,
-                    "forecast": forecast,
-                    "evaluation": evaluation,
-                    "stored_count": count,
-                    "plot_file": plot_file if plot_success else None
-                }
-            
-            return {
-                "success": True,
-                "kpi_name": kpi_name,
-                "historical_data_points": len(df),
-                "results": results
-            }
+            result = self.store_forecast_result(task, run_forecast_task(task))
+            evict_stored_models()
+            return result
         except Exception as e:
             frappe.log_error(
                 f"Error forecasting KPI {kpi_name}: {str(e)}\n{frappe.get_traceback()}",
@@ -613,22 +797,25 @@ class ForecastingEngine:
                 "kpi_name": kpi_name
             }
     
-    def forecast_all_kpis(self, historical_days=365):
+    def forecast_all_kpis(self, historical_days=365, history=None, workers=None, timeout=None):
         """
         Generate forecasts for all forecastable KPIs.
         
+        The models are fitted in parallel by `run_forecast_tasks`.
+        
         Args:
             historical_days (int, optional): Number of historical days to use
+            history (dict, optional): Historical data per KPI name, already loaded
+            workers (int, optional): Worker processes (default from Rental Settings)
+            timeout (int, optional): Seconds one KPI may take (default from Rental Settings)
             
         Returns:
             dict: Forecasting results for all KPIs
         """
-        results = {}
-        
-        for kpi_name in self.data_collector.forecastable_kpis:
-            results[kpi_name] = self.forecast_kpi(kpi_name, historical_days)
-        
-        return results
+        return forecast_in_parallel(
+            [(self, kpi_name, (history or {}).get(kpi_name)) for kpi_name in self.data_collector.forecastable_kpis],
+            historical_days, workers, timeout
+        )[self.company]
     
     def get_forecasted_values(self, kpi_name, start_date=None, end_date=None, latest_forecast_only=True):
         """
@@ -720,6 +907,31 @@ class ForecastingEngine:
                 "accuracy"
             ])
     
+    def predict_with_stored_model(self, kpi_name, forecast_date, start_date, end_date):
+        """
+        Predict a period with the latest stored model trained on data before the forecast date.
+        
+        Args:
+            kpi_name (str): Name of the KPI
+            forecast_date (str): Date the forecast would have been generated
+            start_date (str): First target date
+            end_date (str): Last target date
+            
+        Returns:
+            pandas.DataFrame: Forecasted values per target date, None without a stored model
+        """
+        entry = get_model_registry().latest(self.company, kpi_name, trained_through=add_days(forecast_date, -1))
+        if not entry:
+            return None
+        
+        forecast = entry["model"].predict(pd.DataFrame({"ds": pd.date_range(start=start_date, end=end_date, freq="D")}))
+        return pd.DataFrame({
+            "target_date": forecast["ds"],
+            "forecasted_value": forecast["yhat"],
+            "lower_bound": forecast["yhat_lower"],
+            "upper_bound": forecast["yhat_upper"]
+        })
+    
     def compare_forecast_with_actual(self, kpi_name, forecast_date, start_date=None, end_date=None):
         """
         Compare forecasted values with actual values.
@@ -760,17 +972,22 @@ class ForecastingEngine:
                 order_by="target_date"
             )
             
-            if not forecast_data:
+            if forecast_data:
+                forecast_df = pd.DataFrame(forecast_data)
+                forecast_df["target_date"] = pd.to_datetime(forecast_df["target_date"])
+                forecast_source = "Stored Values"
+            else:
+                # Predict the period with the model stored for the forecast date, without refitting
+                forecast_df = self.predict_with_stored_model(kpi_name, forecast_date, start_date, end_date)
+                forecast_source = "Stored Model"
+            
+            if forecast_df is None or forecast_df.empty:
                 return {
                     "success": False,
                     "error": "No forecast data available",
                     "kpi_name": kpi_name
                 }
             
-            # Convert to DataFrame
-            forecast_df = pd.DataFrame(forecast_data)
-            forecast_df["target_date"] = pd.to_datetime(forecast_df["target_date"])
-            
             # Get actual values
             actual_df = self.data_collector.get_historical_kpi_data(kpi_name, start_date, end_date)
             
@@ -813,6 +1030,7 @@ class ForecastingEngine:
                 "success": True,
                 "kpi_name": kpi_name,
                 "forecast_date": forecast_date,
+                "forecast_source": forecast_source,
                 "comparison_period": {
                     "start_date": start_date,
                     "end_date": end_date
@@ -838,6 +1056,233 @@ class ForecastingEngine:
             }
 
 
+def get_forecasting_workers():
+    """Worker processes for parallel forecasting from Rental Settings (one per CPU core if not set)."""
+    workers = cint(frappe.db.get_single_value("Rental Settings", "forecasting_workers"))
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def get_forecast_task_timeout():
+    """Seconds one (company, KPI) forecast may run, from Rental Settings."""
+    timeout = cint(frappe.db.get_single_value("Rental Settings", "forecasting_task_timeout"))
+    return timeout if timeout > 0 else DEFAULT_FORECAST_TASK_TIMEOUT
+
+
+def get_model_registry():
+    """Store of the fitted forecast models of the site, capped at the size set in Rental Settings."""
+    store_mb = cint(frappe.db.get_single_value("Rental Settings", "forecast_model_store_mb")) or DEFAULT_MODEL_STORE_MB
+    return ModelRegistry(frappe.get_site_path("private", "files", "forecast_models"), store_mb * 1024 * 1024)
+
+
+def evict_stored_models():
+    """Evict the least recently used forecast models beyond the store's size."""
+    try:
+        get_model_registry().evict()
+    except Exception:
+        frappe.log_error(f"Error evicting forecast models: {frappe.get_traceback()}", "Forecasting Error")
+
+
+def get_cv_parallel():
+    """How to run cross-validation folds, from Rental Settings: "threads" or None."""
+    return "threads" if cint(frappe.db.get_single_value("Rental Settings", "parallel_cross_validation")) else None
+
+
+def run_forecast_task(task):
+    """
+    Fit, predict and evaluate the forecasts of one company and KPI.
+    
+    Needs no database access: the history comes with the task and the forecasts
+    go back to the caller, which stores them. It can therefore run in a worker
+    process of `run_forecast_tasks`. Errors are returned instead of logged.
+    
+    Args:
+        task (dict): Task built by `ForecastingEngine.prepare_forecast_task`
+        
+    Returns:
+        dict: {"forecasts", "evaluations", "plot_files"} per period and "errors",
+              or {"error", "message"} if no model could be trained
+    """
+    registry = ModelRegistry(task["model_store"], task["model_store_bytes"]) if task.get("model_store") else None
+    result = {"forecasts": {}, "evaluations": {}, "plot_files": {}, "errors": [], "model_reused": False}
+    periods = task["periods"]
+    
+    try:
+        prophet_df = prepare_data_for_prophet(task["history"])
+        if prophet_df.empty:
+            return {"error": "No valid data available for training Prophet model", "message": "Failed to train model"}
+        
+        # Reuse the stored model if the data is unchanged, otherwise warm-start from it
+        fingerprint = data_fingerprint(prophet_df, task["params"])
+        previous = None
+        if registry:
+            try:
+                previous = registry.latest(task["company"], task["kpi_name"])
+            except Exception:
+                result["errors"].append(f"Error loading stored forecast model: {traceback.format_exc()}")
+        model, result["model_reused"] = fit_or_reuse_model(
+            prophet_df, task["params"], fingerprint, previous, result["errors"]
+        )
+    except Exception:
+        return {"error": f"Error training Prophet model: {traceback.format_exc()}", "message": "Failed to train model"}
+    
+    # Predict once to the longest horizon; shorter horizons are slices of it
+    try:
+        full_forecast = model.predict(model.make_future_dataframe(periods=max(periods)))
+    except Exception:
+        result["forecasts"] = dict.fromkeys(periods)
+        result["errors"].append(f"Error generating forecast: {traceback.format_exc()}")
+        return result
+    
+    # Cross-validate once to the longest horizon, with metrics per horizon; a
+    # reused model keeps the metrics stored with it
+    stored_evaluations = previous["evaluations"] if result["model_reused"] else {}
+    if all(period in stored_evaluations for period in periods):
+        result["evaluations"] = {
+            period: dict(stored_evaluations[period], cv_results=None, metrics=None) for period in periods
+        }
+    else:
+        try:
+            result["evaluations"] = cross_validate_horizons(model, periods, task.get("cv_parallel"))
+        except Exception:
+            result["evaluations"] = dict.fromkeys(periods)
+            result["errors"].append(f"Error evaluating model: {traceback.format_exc()}")
+        
+        if registry:
+            try:
+                registry.save(task["company"], task["kpi_name"], model, fingerprint, task["params"],
+                              result["evaluations"])
+            except Exception:
+                result["errors"].append(f"Error storing forecast model: {traceback.format_exc()}")
+    
+    for period in periods:
+        forecast = slice_forecast(full_forecast, model, period)
+        result["forecasts"][period] = forecast
+        
+        try:
+            plot_forecast_to_file(forecast, task["history"], task["plot_files"][period])
+            result["plot_files"][period] = task["plot_files"][period]
+        except Exception:
+            result["plot_files"][period] = None
+            result["errors"].append(f"Error plotting forecast: {traceback.format_exc()}")
+    
+    return result
+
+
+class ForecastTaskTimeout(BaseException):
+    """Raised in a worker when a task runs out of time; not an Exception, so no task step swallows it."""
+
+
+def _raise_task_timeout(signum, frame):
+    raise ForecastTaskTimeout()
+
+
+def _run_forecast_task_in_worker(task, timeout):
+    """Run a task in a pool worker, interrupted by SIGALRM after `timeout` seconds."""
+    # Pool workers are daemonic and cannot start processes of their own
+    if task.get("cv_parallel") == "processes":
+        task = dict(task, cv_parallel="threads")
+    
+    signal.signal(signal.SIGALRM, _raise_task_timeout)
+    signal.alarm(timeout)
+    try:
+        return run_forecast_task(task)
+    except ForecastTaskTimeout:
+        return {"error": f"Forecast did not finish within {timeout} seconds", "message": "Timed out"}
+    finally:
+        signal.alarm(0)
+
+
+def run_forecast_tasks(tasks, workers=None, timeout=None):
+    """
+    Run forecast tasks in a pool of worker processes.
+    
+    Prophet fitting is CPU-bound, so each task runs in its own process. Workers
+    are started with "spawn" and never use the parent's database connection. A
+    worker stops a task after `timeout` seconds; as a fallback the parent stops
+    the pool once every task has had its timeout, so a hung model cannot block
+    the run.
+    
+    Args:
+        tasks (list): Tasks built by `ForecastingEngine.prepare_forecast_task`
+        workers (int, optional): Worker processes (default from Rental Settings)
+        timeout (int, optional): Seconds one task may take (default from Rental Settings)
+        
+    Returns:
+        list: One `run_forecast_task` result per task, in the order given
+    """
+    if not tasks:
+        return []
+    
+    workers = min(cint(workers) or get_forecasting_workers(), len(tasks))
+    timeout = cint(timeout) or get_forecast_task_timeout()
+    results = []
+    
+    with multiprocessing.get_context("spawn").Pool(processes=workers) as pool:
+        pending = [pool.apply_async(_run_forecast_task_in_worker, (task, timeout)) for task in tasks]
+        deadline = time.monotonic() + timeout * math.ceil(len(tasks) / workers) + FORECAST_POOL_GRACE_SECONDS
+        
+        for async_result in pending:
+            try:
+                results.append(async_result.get(timeout=max(deadline - time.monotonic(), 0)))
+            except multiprocessing.TimeoutError:
+                results.append({"error": f"Forecast did not finish within {timeout} seconds", "message": "Timed out"})
+            except Exception as e:
+                results.append({"error": f"Forecast worker failed: {str(e)}", "message": str(e)})
+    
+    return results
+
+
+def forecast_in_parallel(jobs, historical_days=365, workers=None, timeout=None):
+    """
+    Forecast KPIs of one or more companies, fitting the models in parallel.
+    
+    The history is loaded and the forecasts are stored in this process; only the
+    fitting, prediction and evaluation run in the worker processes.
+    
+    Args:
+        jobs (list): (ForecastingEngine, kpi_name, history or None) tuples
+        historical_days (int, optional): Number of historical days to use
+        workers (int, optional): Worker processes (default from Rental Settings)
+        timeout (int, optional): Seconds one KPI may take (default from Rental Settings)
+        
+    Returns:
+        dict: Forecasting results per company and KPI, as returned by `forecast_kpi`
+    """
+    results = {}
+    prepared = []
+    for engine, kpi_name, history in jobs:
+        company_results = results.setdefault(engine.company, {})
+        try:
+            task = engine.prepare_forecast_task(kpi_name, historical_days, history=history)
+        except Exception as e:
+            frappe.log_error(
+                f"Error forecasting KPI {kpi_name}: {str(e)}\n{frappe.get_traceback()}",
+                "Forecasting Error"
+            )
+            company_results[kpi_name] = {"success": False, "error": str(e), "kpi_name": kpi_name}
+            continue
+        
+        if task is None:
+            company_results[kpi_name] = {"success": False, "error": "Insufficient historical data", "kpi_name": kpi_name}
+        else:
+            company_results[kpi_name] = None  # Filled in below, keeping the KPI order
+            prepared.append((engine, task))
+    
+    task_results = run_forecast_tasks([task for engine, task in prepared], workers, timeout)
+    for (engine, task), result in zip(prepared, task_results):
+        try:
+            results[engine.company][task["kpi_name"]] = engine.store_forecast_result(task, result)
+        except Exception as e:
+            frappe.log_error(
+                f"Error storing forecast of KPI {task['kpi_name']}: {str(e)}\n{frappe.get_traceback()}",
+                "Forecasting Error"
+            )
+            results[engine.company][task["kpi_name"]] = {"success": False, "error": str(e), "kpi_name": task["kpi_name"]}
+    
+    evict_stored_models()
+    return results
+
+
 def generate_weekly_forecasts():
     """
     Scheduled task to generate weekly forecasts for all companies.
@@ -861,31 +1306,38 @@ def generate_weekly_forecasts():
             "failed_kpis": 0
         }
         
-        # Process each company
+        # Load the history of all companies and KPIs with one query
+        historical_days = 365
+        end_date = add_days(nowdate(), -1)
+        history = get_historical_kpi_data_batch(
+            FORECASTABLE_KPIS,
+            [company_doc.name for company_doc in companies],
+            add_days(end_date, -historical_days),
+            end_date
+        )
+        
+        # Fit the models of all companies and KPIs in one process pool
+        jobs = []
         for company_doc in companies:
-            company = company_doc.name
-            try:
-                # Create forecasting engine for this company
-                engine = ForecastingEngine(company)
-                
-                # Forecast all KPIs
-                kpi_results = engine.forecast_all_kpis()
-                
-                # Count successes and failures
-                for kpi_name, result in kpi_results.items():
-                    results["total_kpis"] += 1
-                    if result["success"]:
-                        results["successful_kpis"] += 1
-                    else:
-                        results["failed_kpis"] += 1
-                
+            engine = ForecastingEngine(company_doc.name)
+            jobs += [(engine, kpi_name, history[(company_doc.name, kpi_name)]) for kpi_name in FORECASTABLE_KPIS]
+        
+        company_results = forecast_in_parallel(jobs, historical_days)
+        
+        # Count successes and failures
+        for company_doc in companies:
+            kpi_results = company_results.get(company_doc.name, {})
+            for kpi_name, result in kpi_results.items():
+                results["total_kpis"] += 1
+                if result["success"]:
+                    results["successful_kpis"] += 1
+                else:
+                    results["failed_kpis"] += 1
+            
+            if kpi_results and any(result["success"] for result in kpi_results.values()):
                 results["successful_companies"] += 1
-            except Exception as e:
+            else:
                 results["failed_companies"] += 1
-                frappe.log_error(
-                    f"Error processing company {company} for weekly forecasting: {str(e)}\n{frappe.get_traceback()}",
-                    "Weekly Forecasting Error"
-                )
         
         # Log summary
         frappe.log_error(
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from prophet.serialize import model_to_json, model_from_json
+
+# Size of the model store, unless set in Rental Settings
+DEFAULT_MODEL_STORE_MB = 512
+
+
+def data_fingerprint(prophet_df, params):
+    """
+    Fingerprint of the data and parameters a Prophet model is fitted with.
+
+    Args:
+        prophet_df (pandas.DataFrame): Training data with 'ds' and 'y' columns
+        params (dict): Parameters for the Prophet model
+
+    Returns:
+        str: SHA-256 hex digest; equal fingerprints give equal fits
+    """
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(prophet_df[["ds", "y"]], index=False).values.tobytes())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def warm_start_params(model):
+    """Fitted parameters of a Prophet model, as `init` for fitting a model with the same parameters."""
+    init = {name: model.params[name][0][0] for name in ("k", "m", "sigma_obs")}
+    init.update({name: model.params[name][0] for name in ("delta", "beta")})
+    return init
+
+
+class ModelRegistry:
+    """
+    Disk store of fitted Prophet models per company and KPI.
+
+    Each model is saved as Prophet JSON with the fingerprint of its training data,
+    its parameters, the last date it was trained on and its cross-validation
+    metrics, one file per company, KPI and training date. The store is capped in
+    size; `evict` deletes the least recently used models first.
+
+    The registry only uses the filesystem, so it can be used in forecasting
+    worker processes without database access.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_MODEL_STORE_MB * 1024 * 1024):
+        """
+        Initialize the model registry.
+
+        Args:
+            path (str): Directory of the store
+            max_bytes (int, optional): Size the store is evicted down to
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+
+    def _model_dir(self, company, kpi_name):
+        key = hashlib.md5(f"{company}|{kpi_name}".encode()).hexdigest()
+        return os.path.join(self.path, key)
+
+    def _read(self, file_path):
+        try:
+            with open(file_path) as f:
+                entry = json.load(f)
+            os.utime(file_path)  # Mark as recently used
+        except (OSError, ValueError):
+            return None
+
+        entry["model"] = model_from_json(entry["model"])
+        entry["evaluations"] = {int(period): metrics for period, metrics in entry.get("evaluations", {}).items()}
+        return entry
+
+    def save(self, company, kpi_name, model, fingerprint, params, evaluations=None):
+        """
+        Save a fitted model, replacing the one trained on the same last date.
+
+        Args:
+            company (str): Company of the model
+            kpi_name (str): KPI of the model
+            model (prophet.Prophet): Fitted model
+            fingerprint (str): `data_fingerprint` of the training data
+            params (dict): Parameters the model was created with
+            evaluations (dict, optional): Cross-validation metrics per horizon
+
+        Returns:
+            str: Path of the saved model
+        """
+        trained_through = model.history["ds"].max().strftime("%Y-%m-%d")
+        model_dir = self._model_dir(company, kpi_name)
+        os.makedirs(model_dir, exist_ok=True)
+
+        entry = {
+            "company": company,
+            "kpi_name": kpi_name,
+            "trained_through": trained_through,
+            "fingerprint": fingerprint,
+            "params": params,
+            "evaluations": {
+                str(period): {"mape": float(metrics["mape"]), "rmse": float(metrics["rmse"])}
+                for period, metrics in (evaluations or {}).items() if metrics
+            },
+            "model": model_to_json(model)
+        }
+
+        # Write to a temporary file first, so readers never see a partial model
+        file_path = os.path.join(model_dir, f"{trained_through}.json")
+        temp_path = f"{file_path}.{os.getpid()}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entry, f, default=str)
+        os.replace(temp_path, file_path)
+
+        return file_path
+
+    def latest(self, company, kpi_name, trained_through=None):
+        """
+        The most recently trained model of a company and KPI.
+
+        Args:
+            company (str): Company of the model
+            kpi_name (str): KPI of the model
+            trained_through (str, optional): Only consider models trained on data up
+                                             to this date (YYYY-MM-DD format)
+
+        Returns:
+            dict: Entry with the deserialized "model", "fingerprint", "params",
+                  "trained_through" and "evaluations"; None if there is none
+        """
+        model_dir = self._model_dir(company, kpi_name)
+        try:
+            dates = sorted(
+                (file_name[:-len(".json")] for file_name in os.listdir(model_dir) if file_name.endswith(".json")),
+                reverse=True
+            )
+        except OSError:
+            return None
+
+        for date in dates:
+            if trained_through is None or date <= str(trained_through):
+                entry = self._read(os.path.join(model_dir, f"{date}.json"))
+                if entry:
+                    return entry
+        return None
+
+    def evict(self):
+        """
+        Delete the least recently used models until the store fits in max_bytes.
+
+        Returns:
+            int: Number of models deleted
+        """
+        files = []
+        for root, dirs, file_names in os.walk(self.path):
+            for file_name in file_names:
+                file_path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, file_path))
+
+        total = sum(size for mtime, size, file_path in files)
+        deleted = 0
+        for mtime, size, file_path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+                deleted += 1
+            except OSError:
+                pass
+            total -= size
+
+        return deleted
@@ -0,0 +1,244 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module evaluates KPIs for many companies and periods at once.
+
+The KPI collection and forecasting jobs need the same KPI for every company and
+day. Calling a `kpi_utils` function per company and day runs its queries
+companies x days times; `evaluate_kpi_batch` instead takes a list of
+(company, from_date, to_date) windows and runs each KPI's queries once, grouped
+by company and day over the span of all windows. Each window's value is then
+summed from the per-day rows with one cumulative sum per company
+(see `onhire_pro.utils.occupancy.window_sums`).
+
+The KPI definitions follow the matching `kpi_utils` functions; rows of doctypes
+whose company is optional count for every company, as in the KPI snapshot.
+"""
+
+import frappe
+import numpy as np
+from frappe.utils import getdate
+from typing import Dict, List, Optional, Iterable, Any, Tuple, Callable
+from onhire_pro.utils.daily_occupancy import column_if_exists, get_occupied_items_per_company_day
+from onhire_pro.utils.occupancy import window_sums
+from onhire_pro.utils.revenue_rollup import REVENUE_DOCTYPE
+from onhire_pro.utils.schema_capabilities import doctype_exists, has_column, sql_fragment
+
+Window = Tuple[str, Any, Any]
+
+
+def _normalize_windows(windows: Iterable[Window]) -> List[Window]:
+    return [(company, getdate(from_date), getdate(to_date)) for company, from_date, to_date in windows]
+
+
+def _span(windows: List[Window]) -> Dict[str, Any]:
+    """Query parameters covering every window."""
+    return {
+        "companies": tuple({company for company, from_date, to_date in windows}),
+        "from_date": min(from_date for company, from_date, to_date in windows),
+        "to_date": max(to_date for company, from_date, to_date in windows),
+    }
+
+
+def grouped_window_sums(rows: Iterable[tuple], windows: List[Window], columns: int = 1,
+                        shared: bool = False) -> np.ndarray:
+    """
+    Sum rows of (company, day, value, ...) over each window of its company.
+
+    Args:
+        rows: Grouped rows, one per company and day
+        windows: (company, from_date, to_date) windows
+        columns: Number of values per row
+        shared: Whether rows with a blank company count for every company
+
+    Returns:
+        numpy.ndarray: One row of `columns` sums per window
+    """
+    by_company: Dict[str, List[tuple]] = {}
+    for row in rows:
+        by_company.setdefault(row[0] or "", []).append(row[1:])
+
+    window_indexes: Dict[str, List[int]] = {}
+    for index, (company, from_date, to_date) in enumerate(windows):
+        window_indexes.setdefault(company, []).append(index)
+
+    sums = np.zeros((len(windows), columns))
+    for company, company_rows in by_company.items():
+        indexes = list(range(len(windows))) if shared and company == "" else window_indexes.get(company)
+        if not indexes:
+            continue
+        company_rows.sort(key=lambda row: getdate(row[0]))
+        sums[indexes] += window_sums(
+            [getdate(row[0]).toordinal() for row in company_rows],
+            [[float(value or 0) for value in row[1:]] for row in company_rows],
+            [windows[index][1].toordinal() for index in indexes],
+            [windows[index][2].toordinal() for index in indexes]
+        )
+    return sums
+
+
+def _ratios(sums: np.ndarray, scale: float = 1) -> List[float]:
+    """numerator / denominator of each window's sums, 0 without a denominator."""
+    return [float(numerator / denominator * scale) if denominator else 0.0 for numerator, denominator in sums]
+
+
+def batch_item_utilization_rate(windows: List[Window]) -> List[float]:
+    """Item-days reserved or on hire / item-days available (see `calculate_item_utilization_rate`)."""
+    span = _span(windows)
+    occupied = grouped_window_sums(
+        get_occupied_items_per_company_day(span["from_date"], span["to_date"], span["companies"]), windows
+    )[:, 0]
+
+    item_company = column_if_exists("Item", "company", "i.company")
+    items = frappe.db.sql(f"""
+        SELECT IFNULL({item_company}, '') AS company, DATE(i.creation) AS created_on
+        FROM `tabItem` i
+        WHERE i.is_rental_item = 1
+            AND IFNULL({item_company}, '') IN %(companies)s
+    """, {"companies": span["companies"] + ("",)})
+
+    created: Dict[str, List[int]] = {}
+    for company, created_on in items:
+        created.setdefault(company, []).append(getdate(created_on).toordinal())
+    no_items = np.zeros(0, dtype=np.int64)
+    created = {company: np.array(days, dtype=np.int64) for company, days in created.items()}
+
+    rates = []
+    for (company, from_date, to_date), occupied_days in zip(windows, occupied):
+        # Items without a company are available to every company
+        created_on = np.concatenate([created.get(company, no_items), created.get("", no_items)])
+        available = np.clip(to_date.toordinal() - np.maximum(from_date.toordinal(), created_on) + 1, 0, None).sum()
+        rates.append(float(occupied_days / available * 100) if available else 0.0)
+    return rates
+
+
+def batch_total_rental_revenue(windows: List[Window]) -> List[float]:
+    """Grand total of submitted Sales Invoices of a Rental Job (see `get_total_rental_revenue`)."""
+    if not doctype_exists(REVENUE_DOCTYPE):
+        return [0.0] * len(windows)
+
+    rows = frappe.db.sql(f"""
+        SELECT rev.company, rev.date, SUM(rev.grand_total)
+        FROM `tab{REVENUE_DOCTYPE}` rev
+        WHERE rev.company IN %(companies)s
+            AND rev.date BETWEEN %(from_date)s AND %(to_date)s
+            AND rev.rental_job IS NOT NULL
+        GROUP BY rev.company, rev.date
+    """, _span(windows))
+    return [float(total) for total in grouped_window_sums(rows, windows)[:, 0]]
+
+
+def batch_booking_conversion_rate(windows: List[Window]) -> List[float]:
+    """Rental Jobs from a quotation / rental quotations, in % (see `calculate_booking_conversion_rate`)."""
+    if not doctype_exists("Quotation") or not doctype_exists("Rental Job") or not has_column("Rental Job", "quotation"):
+        return [0.0] * len(windows)
+
+    span = _span(windows)
+    rental_quotation = column_if_exists("Quotation", "rental_quotation", "q.rental_quotation = 1", "1 = 1")
+    quotations = frappe.db.sql(f"""
+        SELECT q.company, q.transaction_date, COUNT(*)
+        FROM `tabQuotation` q
+        WHERE q.company IN %(companies)s
+            AND q.transaction_date BETWEEN %(from_date)s AND %(to_date)s
+            AND q.docstatus = 1
+            AND {rental_quotation}
+        GROUP BY q.company, q.transaction_date
+    """, span)
+
+    company = sql_fragment("rental_job_company")
+    jobs = frappe.db.sql(f"""
+        SELECT IFNULL({company}, '') AS company, DATE(rj.creation) AS created_on, COUNT(*)
+        FROM `tabRental Job` rj
+        WHERE IFNULL({company}, '') IN %(all_companies)s
+            AND DATE(rj.creation) BETWEEN %(from_date)s AND %(to_date)s
+            AND rj.docstatus = 1
+            AND IFNULL(rj.quotation, '') != ''
+        GROUP BY IFNULL({company}, ''), DATE(rj.creation)
+    """, dict(span, all_companies=span["companies"] + ("",)))
+
+    converted = grouped_window_sums(jobs, windows, shared=True)
+    return _ratios(np.hstack([converted, grouped_window_sums(quotations, windows)]), 100)
+
+
+def batch_average_rental_duration(windows: List[Window]) -> List[float]:
+    """Average days of completed Rental Jobs ending in the window (see `calculate_average_rental_duration`)."""
+    if not doctype_exists("Rental Job"):
+        return [0.0] * len(windows)
+
+    span = _span(windows)
+    company = sql_fragment("rental_job_company")
+    status = sql_fragment("rental_job_status")
+    start = column_if_exists("Rental Job", "start_date", "rj.start_date", "rj.scheduled_dispatch_date")
+    end = column_if_exists("Rental Job", "end_date", "rj.end_date", "rj.scheduled_return_date")
+    rows = frappe.db.sql(f"""
+        SELECT IFNULL({company}, '') AS company, DATE({end}) AS end_date,
+            SUM(DATEDIFF({end}, {start}) + 1), COUNT(*)
+        FROM `tabRental Job` rj
+        WHERE IFNULL({company}, '') IN %(all_companies)s
+            AND {status} = 'Completed'
+            AND DATE({end}) BETWEEN %(from_date)s AND %(to_date)s
+            AND rj.docstatus = 1
+        GROUP BY IFNULL({company}, ''), DATE({end})
+    """, dict(span, all_companies=span["companies"] + ("",)))
+    return _ratios(grouped_window_sums(rows, windows, columns=2, shared=True))
+
+
+def batch_maintenance_turnaround_time(windows: List[Window]) -> List[float]:
+    """Average days from creation to completion of Maintenance Tasks (see `calculate_avg_maintenance_turnaround_time`)."""
+    if not doctype_exists("Maintenance Task"):
+        return [0.0] * len(windows)
+
+    span = _span(windows)
+    company = column_if_exists("Maintenance Task", "company", "mt.company")
+    rows = frappe.db.sql(f"""
+        SELECT IFNULL({company}, '') AS company, DATE(mt.completion_date) AS completed_on,
+            SUM(DATEDIFF(mt.completion_date, mt.creation)), COUNT(*)
+        FROM `tabMaintenance Task` mt
+        WHERE IFNULL({company}, '') IN %(all_companies)s
+            AND mt.status = 'Completed'
+            AND DATE(mt.completion_date) BETWEEN %(from_date)s AND %(to_date)s
+            AND mt.docstatus = 1
+        GROUP BY IFNULL({company}, ''), DATE(mt.completion_date)
+    """, dict(span, all_companies=span["companies"] + ("",)))
+    return _ratios(grouped_window_sums(rows, windows, columns=2, shared=True))
+
+
+# KPI -> function of the windows returning one value per window
+BATCH_KPIS: Dict[str, Callable[[List[Window]], List[float]]] = {
+    "item_utilization_rate": batch_item_utilization_rate,
+    "total_rental_revenue": batch_total_rental_revenue,
+    "booking_conversion_rate": batch_booking_conversion_rate,
+    "average_rental_duration": batch_average_rental_duration,
+    "maintenance_turnaround_time": batch_maintenance_turnaround_time,
+}
+
+
+def evaluate_kpi_batch(kpi_name: str, windows: Iterable[Window]) -> List[Optional[float]]:
+    """
+    Values of a KPI for each (company, from_date, to_date) window.
+
+    Returns:
+        list: One value per window, in the order given; None for every window if
+            the KPI could not be calculated
+
+    Example:
+        >>> evaluate_kpi_batch("total_rental_revenue", [("Example Inc.", "2025-03-01", "2025-03-01"),
+        ...                                             ("Example GmbH", "2025-03-01", "2025-03-31")])
+        [1250.0, 38400.0]
+    """
+    windows = _normalize_windows(windows)
+    if not windows:
+        return []
+
+    if kpi_name not in BATCH_KPIS:
+        frappe.log_error(f"KPI {kpi_name} cannot be evaluated in batch", "KPI Calculation Error")
+        return [None] * len(windows)
+
+    try:
+        return BATCH_KPIS[kpi_name](windows)
+    except Exception as e:
+        frappe.log_error(
+            f"Error evaluating KPI {kpi_name} for {len(windows)} windows: {str(e)}\n{frappe.get_traceback()}",
+            "KPI Calculation Error"
+        )
+        return [None] * len(windows)
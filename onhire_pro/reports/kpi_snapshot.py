@@ -0,0 +1,600 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module computes the Rental Management Dashboard KPIs from one snapshot.
+
+Every Dashboard Chart Source used to run its own `kpi_utils` function, so one
+dashboard load queried `tabRental Job`, `tabSales Invoice` and friends some
+25 times with nearly the same filters. `compute_kpi_snapshot` instead loads the
+job lines, invoices, quotations, assessments, maintenance tasks, rental items and
+daily occupancy of a company once and derives every KPI from those rows in memory.
+Revenue KPIs are read from the Rental Revenue Daily rollup
+(see `onhire_pro.utils.revenue_rollup`) and the top lists from the leaderboards
+(see `onhire_pro.utils.leaderboards`), like their `kpi_utils` functions. Top lists
+are paged, so they are read outside the snapshot (see LEADERBOARD_KPIS).
+
+Snapshots are cached per company, period and as-of date for SNAPSHOT_CACHE_SECONDS,
+the shortest `cache_seconds` of the chart sources, or until a document they read
+changes (see `onhire_pro.utils.kpi_cache`); the chart sources read their slice
+with `get_snapshot_kpi`.
+
+The KPI definitions follow the matching `kpi_utils` functions. Optional schema
+fields are probed once per snapshot, and Rental Job statuses are matched in
+both the job_status and the legacy status vocabulary (see JOB_STATUS_GROUPS).
+"""
+
+import frappe
+import json
+import calendar
+from datetime import date, timedelta
+from frappe.utils import getdate, nowdate, add_days, date_diff, flt, cint, now_datetime
+from typing import Dict, List, Any
+from onhire_pro.reports.customer_cohorts import load_customer_activity, customer_cohort_metrics
+from onhire_pro.utils.capacity_cache import get_item_capacities
+from onhire_pro.utils.conflict_detector import get_booking_conflicts
+from onhire_pro.utils.daily_occupancy import column_if_exists, get_occupied_items_per_day
+from onhire_pro.utils.kpi_cache import cached_kpi
+from onhire_pro.utils.leaderboards import MOST_RENTED_ITEMS, TOP_CUSTOMERS, DEFAULT_PAGE_LENGTH, get_leaderboard
+from onhire_pro.utils.occupancy import daily_interval_weight, bucket_days, period_sums
+from onhire_pro.utils.revenue_rollup import get_revenue, get_total_revenue
+from onhire_pro.utils.schema_capabilities import doctype_exists, has_column, sql_fragment
+
+SNAPSHOT_CACHE_SECONDS = 300
+DEFAULT_PERIOD_DAYS = 30
+
+# Doctypes the snapshot reads; a change to any of them invalidates cached snapshots
+KPI_SNAPSHOT_DOCTYPES = ("Rental Job", "Sales Invoice", "Quotation", "Condition Assessment", "Maintenance Task",
+                         "Stock Reservation", "Stock Ledger Entry", "Rental Booking Conflict")
+
+PRE_DISPATCH_STATUSES = ("Confirmed", "Order Confirmed", "Pending Preparation", "Preparation in Progress",
+                         "Ready for Dispatch")
+ON_HIRE_STATUSES = ("In Progress", "Dispatched", "Partially Returned")
+ACTIVE_STATUSES = PRE_DISPATCH_STATUSES + ON_HIRE_STATUSES
+COMPLETED_STATUSES = ("Completed",)
+
+# Job Status Distribution labels -> Rental Job statuses counted under them
+JOB_STATUS_GROUPS = {
+    "Draft": ("Draft",),
+    "Confirmed": PRE_DISPATCH_STATUSES,
+    "In Progress": ON_HIRE_STATUSES,
+    "Completed": COMPLETED_STATUSES,
+    "Cancelled": ("Cancelled",),
+}
+
+# Dataset name of each chart KPI; every other KPI is a number card ({"value": ...})
+CHART_DATASETS = {
+    "revenue_per_item_category": "Revenue",
+    "rental_revenue_trend": "Revenue",
+    "job_status_distribution": "Jobs",
+    "top_5_most_rented_items": "Rental Count",
+    "top_5_customers_by_rental_value": "Rental Value",
+    "damage_rate_by_item_group": "Damage Rate (%)",
+    "item_utilization_rate_trend": "Utilization Rate (%)",
+}
+
+# Top lists read from a leaderboard (see `onhire_pro.utils.leaderboards`) instead of the snapshot,
+# as they are paged with "start" and "page_length" filters: KPI -> (board, doctype, label field)
+LEADERBOARD_KPIS = {
+    "top_5_most_rented_items": (MOST_RENTED_ITEMS, "Item", "item_name"),
+    "top_5_customers_by_rental_value": (TOP_CUSTOMERS, "Customer", "customer_name"),
+}
+
+# KPIs that depend on a "group_by" filter, and the groupings they support
+TREND_KPIS = ("rental_revenue_trend", "item_utilization_rate_trend")
+TREND_GROUPS = ("Monthly", "Weekly")
+UTILIZATION_TREND_GROUPS = ("Daily", "Weekly", "Monthly", "Quarterly")
+
+
+def empty_kpi_result(kpi: str) -> Dict[str, Any]:
+    """Safe result of a KPI, in the shape its chart expects."""
+    if kpi in CHART_DATASETS:
+        return {"labels": [], "datasets": [{"name": CHART_DATASETS[kpi], "values": []}]}
+    return {"value": 0}
+
+
+def _chart(kpi: str, labels: List[str], values: List[float]) -> Dict[str, Any]:
+    return {"labels": labels, "datasets": [{"name": CHART_DATASETS[kpi], "values": values}]}
+
+
+def _company_condition(doctype: str, alias: str) -> str:
+    """Company filter for a doctype; rows without a company count for every company."""
+    company = column_if_exists(doctype, "company", f"{alias}.company")
+    return f"IFNULL({company}, '') IN (%(company)s, '')"
+
+
+def _mysql_week(day: date) -> tuple:
+    """(year, week) as MySQL DATE_FORMAT('%Y-%u') numbers it: Monday weeks, week 1 has 4+ days."""
+    iso_year, iso_week, weekday = day.isocalendar()
+    if iso_year < day.year:
+        return day.year, 0
+    if iso_year > day.year:
+        return day.year, date(day.year, 12, 28).isocalendar()[1] + 1
+    return day.year, iso_week
+
+
+def trend_periods(from_date, to_date, group_by: str = "Monthly") -> List[Dict[str, Any]]:
+    """Days, Monday-to-Sunday weeks, calendar months or quarters covering the period, with chart labels."""
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    periods = []
+
+    if group_by == "Daily":
+        current = from_date
+        while current <= to_date:
+            periods.append(frappe._dict(start_date=current, end_date=current, label=current.strftime("%d %b %Y")))
+            current += timedelta(days=1)
+    elif group_by in ("Monthly", "Quarterly"):
+        months = 3 if group_by == "Quarterly" else 1
+        current = from_date.replace(day=1, month=(from_date.month - 1) // months * months + 1)
+        while current <= to_date:
+            last_month = current.month + months - 1
+            period_end = current.replace(month=last_month, day=calendar.monthrange(current.year, last_month)[1])
+            label = f"Q{(current.month - 1) // 3 + 1} {current.year}" if months == 3 else current.strftime("%b %Y")
+            periods.append(frappe._dict(start_date=current, end_date=period_end, label=label))
+            current = period_end + timedelta(days=1)
+    else:
+        current = from_date - timedelta(days=from_date.weekday())
+        while current <= to_date:
+            periods.append(frappe._dict(
+                start_date=current,
+                end_date=current + timedelta(days=6),
+                label=f"Week {current.isocalendar()[1]}, {current.year}"
+            ))
+            current += timedelta(days=7)
+
+    return periods
+
+
+def utilization_by_period(periods: List[Dict[str, Any]], occupied: List[tuple], item_created_on: List[Any]) -> List[float]:
+    """
+    Utilization rate of consecutive periods: occupied item-days over available
+    item-days, where an item is available from its creation date.
+
+    Args:
+        periods: Consecutive periods with start_date and end_date (see `trend_periods`)
+        occupied: (date, number of occupied items) pairs (see `get_occupied_items_per_day`)
+        item_created_on: Creation date of every rental item
+
+    Returns:
+        list: Utilization rate as a percentage per period
+    """
+    if not periods:
+        return []
+
+    first_day = periods[0].start_date.toordinal()
+    length = periods[-1].end_date.toordinal() - first_day + 1
+    offsets = [period.start_date.toordinal() - first_day for period in periods]
+
+    rented = period_sums(bucket_days(
+        [getdate(day).toordinal() for day, count in occupied], [flt(count) for day, count in occupied],
+        first_day, length
+    ), offsets)
+    available = period_sums(daily_interval_weight(
+        [getdate(created_on).toordinal() for created_on in item_created_on],
+        [first_day + length] * len(item_created_on), 1.0, first_day, length
+    ), offsets)
+
+    return [float(rented_days / available_days * 100) if available_days > 0 else 0
+            for rented_days, available_days in zip(rented, available)]
+
+
+def load_job_lines(company: str, from_date: date, to_date: date) -> List[Dict[str, Any]]:
+    """
+    Submitted Rental Job lines the KPIs can look at: jobs ending in or after the
+    period, jobs created in it and every active job. Jobs without items appear
+    once with an empty item_code.
+    """
+    if not doctype_exists("Rental Job"):
+        return []
+
+    status = sql_fragment("rental_job_status")
+    start = column_if_exists("Rental Job", "start_date", "rj.start_date", "rj.scheduled_dispatch_date")
+    end = column_if_exists("Rental Job", "end_date", "rj.end_date", "rj.scheduled_return_date")
+    line_start = column_if_exists("Rental Job Item", "rental_item_start_date",
+                                  f"COALESCE(rji.rental_item_start_date, {start})", start)
+    line_end = column_if_exists("Rental Job Item", "rental_item_end_date",
+                                f"COALESCE(rji.rental_item_end_date, {end})", end)
+    damaged = sql_fragment("job_item_damaged")
+    quotation = column_if_exists("Rental Job", "quotation", "rj.quotation")
+    warehouse = column_if_exists("Rental Job Item", "warehouse", "rji.warehouse")
+
+    return frappe.db.sql(f"""
+        SELECT rj.name AS rental_job, {status} AS status, rj.customer, DATE(rj.creation) AS created_on,
+            IFNULL({quotation}, '') AS quotation, DATE({start}) AS start_date, DATE({end}) AS end_date,
+            IF({damaged}, 1, 0) AS damaged,
+            IFNULL(rji.item_code, '') AS item_code, i.item_group, IFNULL(rji.qty, 0) AS qty,
+            IFNULL({warehouse}, '') AS warehouse,
+            DATE({line_start}) AS line_start, DATE({line_end}) AS line_end
+        FROM `tabRental Job` rj
+        LEFT JOIN `tabRental Job Item` rji ON rji.parent = rj.name
+        LEFT JOIN `tabItem` i ON i.name = rji.item_code
+        WHERE rj.docstatus = 1
+            AND {_company_condition("Rental Job", "rj")}
+            AND ({end} >= %(from_date)s
+                OR DATE(rj.creation) BETWEEN %(from_date)s AND %(to_date)s
+                OR {status} IN %(active_statuses)s)
+    """, {
+        "company": company, "from_date": from_date, "to_date": to_date, "active_statuses": ACTIVE_STATUSES
+    }, as_dict=1)
+
+
+def load_job_status_counts(company: str, as_of_date: date) -> Dict[tuple, int]:
+    """(status, docstatus) -> number of Rental Jobs created up to the as-of date."""
+    if not doctype_exists("Rental Job"):
+        return {}
+
+    status = sql_fragment("rental_job_status")
+    rows = frappe.db.sql(f"""
+        SELECT {status}, rj.docstatus, COUNT(*)
+        FROM `tabRental Job` rj
+        WHERE DATE(rj.creation) <= %(as_of_date)s
+            AND {_company_condition("Rental Job", "rj")}
+        GROUP BY {status}, rj.docstatus
+    """, {"company": company, "as_of_date": as_of_date})
+
+    return {(status, cint(docstatus)): cint(count) for status, docstatus, count in rows}
+
+
+def load_overdue_invoices(company: str, as_of_date: date) -> List[Dict[str, Any]]:
+    """Submitted rental Sales Invoices unpaid and overdue on the as-of date."""
+    if not doctype_exists("Sales Invoice") or not has_column("Sales Invoice", "rental_job"):
+        return []
+
+    return frappe.db.sql("""
+        SELECT si.name, si.outstanding_amount, si.due_date
+        FROM `tabSales Invoice` si
+        WHERE si.company = %(company)s
+            AND si.docstatus = 1
+            AND si.rental_job IS NOT NULL
+            AND si.status = 'Unpaid'
+            AND si.due_date < %(as_of_date)s
+    """, {"company": company, "as_of_date": as_of_date}, as_dict=1)
+
+
+def load_quotations(company: str, from_date: date, to_date: date, as_of_date: date) -> List[Dict[str, Any]]:
+    """Submitted rental Quotations made in the period or still open on the as-of date."""
+    if not doctype_exists("Quotation") or not has_column("Quotation", "rental_quotation"):
+        return []
+
+    return frappe.db.sql("""
+        SELECT transaction_date, status, valid_till, grand_total
+        FROM `tabQuotation`
+        WHERE company = %(company)s
+            AND docstatus = 1
+            AND rental_quotation = 1
+            AND (transaction_date BETWEEN %(from_date)s AND %(to_date)s
+                OR (status = 'Open' AND valid_till >= %(as_of_date)s))
+    """, {"company": company, "from_date": from_date, "to_date": to_date, "as_of_date": as_of_date}, as_dict=1)
+
+
+def load_pending_assessments(company: str, as_of_date: date) -> int:
+    """Number of Condition Assessments pending post-rental on the as-of date."""
+    if not doctype_exists("Condition Assessment"):
+        return 0
+
+    result = frappe.db.sql(f"""
+        SELECT COUNT(*)
+        FROM `tabCondition Assessment` ca
+        WHERE ca.docstatus = 1
+            AND ca.status = 'Pending Post-Rental'
+            AND DATE(ca.creation) <= %(as_of_date)s
+            AND {_company_condition("Condition Assessment", "ca")}
+    """, {"company": company, "as_of_date": as_of_date})
+
+    return cint(result[0][0]) if result else 0
+
+
+def load_maintenance_tasks(company: str, from_date: date, to_date: date, as_of_date: date) -> List[Dict[str, Any]]:
+    """Submitted Maintenance Tasks open on the as-of date or completed in the period."""
+    if not doctype_exists("Maintenance Task"):
+        return []
+
+    return frappe.db.sql(f"""
+        SELECT mt.status, mt.start_date, mt.completion_date, DATE(mt.creation) AS created_on
+        FROM `tabMaintenance Task` mt
+        WHERE mt.docstatus = 1
+            AND {_company_condition("Maintenance Task", "mt")}
+            AND ((mt.status != 'Completed' AND mt.start_date <= %(as_of_date)s)
+                OR (mt.status = 'Completed' AND mt.completion_date BETWEEN %(from_date)s AND %(to_date)s))
+    """, {"company": company, "from_date": from_date, "to_date": to_date, "as_of_date": as_of_date}, as_dict=1)
+
+
+def load_rental_items(company: str) -> List[Dict[str, Any]]:
+    """Rental Items with their creation date."""
+    return frappe.db.sql(f"""
+        SELECT i.name, DATE(i.creation) AS created_on
+        FROM `tabItem` i
+        WHERE i.is_rental_item = 1
+            AND {_company_condition("Item", "i")}
+    """, {"company": company}, as_dict=1)
+
+
+def compute_kpi_snapshot(company: str, from_date, to_date, as_of_date=None) -> Dict[str, Any]:
+    """
+    Compute every dashboard KPI of a company for a period in one pass.
+
+    Args:
+        company: Company to compute the KPIs for
+        from_date: Start of the period
+        to_date: End of the period; also the window of the "due for dispatch/return" cards
+        as_of_date: Date of the point-in-time cards (active jobs, overdue, ...); today if not set
+
+    Returns:
+        dict: KPI name -> result in the shape of the matching `kpi_utils` function;
+            trend KPIs hold one result per group_by ("Monthly", "Weekly"; the
+            utilization trend also "Daily" and "Quarterly")
+
+    Example:
+        >>> snapshot = compute_kpi_snapshot("Example Inc.", "2025-03-01", "2025-03-31")
+        >>> snapshot["total_rental_revenue"], snapshot["rental_revenue_trend"]["Monthly"]["labels"]
+        ({'value': 25000.0}, ['Mar 2025'])
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    as_of_date = getdate(as_of_date or nowdate())
+
+    job_lines = load_job_lines(company, from_date, to_date)
+    overdue_invoices = load_overdue_invoices(company, as_of_date)
+    quotations = load_quotations(company, from_date, to_date, as_of_date)
+    maintenance_tasks = load_maintenance_tasks(company, from_date, to_date, as_of_date)
+    items = load_rental_items(company)
+
+    snapshot: Dict[str, Any] = {"computed_on": now_datetime()}
+
+    # Jobs (one row per job) and their lines
+    jobs: Dict[str, Dict[str, Any]] = {}
+    for line in job_lines:
+        job = jobs.get(line.rental_job)
+        if not job:
+            job = jobs[line.rental_job] = frappe._dict(line, damaged=False, lines=[])
+        job.damaged = job.damaged or bool(cint(line.damaged))
+        if line.item_code:
+            job.lines.append(line)
+
+    def in_period(day) -> bool:
+        return bool(day) and from_date <= getdate(day) <= to_date
+
+    completed = [job for job in jobs.values() if job.status in COMPLETED_STATUSES and in_period(job.end_date)]
+
+    # Rental job KPIs
+    snapshot["average_rental_duration"] = {
+        "value": sum(date_diff(job.end_date, job.start_date) + 1 for job in completed) / len(completed)
+        if completed else 0
+    }
+    snapshot["damage_rate"] = {
+        "value": len([job for job in completed if job.damaged]) / len(completed) * 100 if completed else 0
+    }
+    snapshot["active_rental_jobs"] = {"value": len([
+        job for job in jobs.values()
+        if job.status in ACTIVE_STATUSES and job.start_date and job.end_date
+        and job.start_date <= as_of_date <= job.end_date
+    ])}
+    snapshot["overdue_returns"] = {"value": len([
+        job for job in jobs.values()
+        if job.status in ACTIVE_STATUSES and job.end_date and job.end_date < as_of_date
+    ])}
+    snapshot["jobs_due_for_dispatch"] = {"value": len([
+        job for job in jobs.values() if job.status in PRE_DISPATCH_STATUSES and in_period(job.start_date)
+    ])}
+    snapshot["jobs_due_for_return"] = {"value": len([
+        job for job in jobs.values() if job.status in ON_HIRE_STATUSES and in_period(job.end_date)
+    ])}
+
+    category_revenue = get_revenue(company, from_date, to_date, group_by=["item_group"], measure="net_amount")
+    snapshot["revenue_per_item_category"] = _chart(
+        "revenue_per_item_category",
+        [row.item_group for row in category_revenue],
+        [row.revenue for row in category_revenue]
+    )
+
+    group_jobs: Dict[str, set] = {}
+    group_damaged: Dict[str, set] = {}
+    for job in completed:
+        for line in job.lines:
+            group_jobs.setdefault(line.item_group, set()).add(job.rental_job)
+            if cint(line.damaged):
+                group_damaged.setdefault(line.item_group, set()).add(job.rental_job)
+    groups = sorted(group for group in group_jobs if group)
+    snapshot["damage_rate_by_item_group"] = _chart(
+        "damage_rate_by_item_group",
+        groups,
+        [len(group_damaged.get(group, ())) / len(group_jobs[group]) * 100 for group in groups]
+    )
+
+    # Reserved quantity per item and warehouse on the as-of date against stock
+    reserved: Dict[tuple, float] = {}
+    for job in jobs.values():
+        if job.status in ACTIVE_STATUSES:
+            for line in job.lines:
+                if line.line_start and line.line_end and line.line_start <= as_of_date <= line.line_end:
+                    key = (line.item_code, line.warehouse)
+                    reserved[key] = reserved.get(key, 0) + flt(line.qty)
+    at_risk = 0
+    for warehouse in {warehouse for item_code, warehouse in reserved}:
+        capacities = get_item_capacities(
+            [item_code for item_code, line_warehouse in reserved if line_warehouse == warehouse], warehouse or None
+        )
+        at_risk += len([
+            key for key, qty in reserved.items() if key[1] == warehouse and qty > capacities.get(key[0], 0.0)
+        ])
+    snapshot["at_risk_stock"] = {"value": at_risk}
+
+    status_counts = load_job_status_counts(company, as_of_date)
+    snapshot["job_status_distribution"] = _chart(
+        "job_status_distribution",
+        list(JOB_STATUS_GROUPS),
+        [
+            sum(count for (status, docstatus), count in status_counts.items()
+                if status in statuses and docstatus == (0 if label == "Draft" else 1))
+            for label, statuses in JOB_STATUS_GROUPS.items()
+        ]
+    )
+
+    # Customers active before the period who lapsed by its end
+    churn = customer_cohort_metrics(load_customer_activity(company, to_date),
+                                    [frappe._dict(start_date=from_date, end_date=to_date)])[0]
+    snapshot["customer_churn_rate"] = {"value": churn.churn_rate}
+
+    # Quotations
+    period_quotations = [quotation for quotation in quotations if in_period(quotation.transaction_date)]
+    converted = len([job for job in jobs.values() if job.quotation and in_period(job.created_on)])
+    snapshot["booking_conversion_rate"] = {
+        "value": converted / len(period_quotations) * 100 if period_quotations else 0
+    }
+    snapshot["open_rental_quotation_value"] = {"value": sum(
+        flt(quotation.grand_total) for quotation in quotations
+        if quotation.status == "Open" and quotation.valid_till and getdate(quotation.valid_till) >= as_of_date
+    )}
+
+    # Invoices; revenue from the rollup
+    total_revenue = get_total_revenue(company, from_date, to_date, filters={"rental_jobs_only": True})
+    snapshot["total_rental_revenue"] = {"value": total_revenue}
+    snapshot["average_revenue_per_rental_job"] = {"value": total_revenue / len(completed) if completed else 0}
+    snapshot["overdue_invoice_amount"] = {"value": sum(flt(invoice.outstanding_amount) for invoice in overdue_invoices)}
+
+    monthly: Dict[tuple, float] = {}
+    weekly: Dict[tuple, float] = {}
+    for row in get_revenue(company, from_date, to_date, group_by=["date"], filters={"rental_jobs_only": True}):
+        posting_date = getdate(row.date)
+        month, week = (posting_date.year, posting_date.month), _mysql_week(posting_date)
+        monthly[month] = monthly.get(month, 0) + row.revenue
+        weekly[week] = weekly.get(week, 0) + row.revenue
+    snapshot["rental_revenue_trend"] = {
+        "Monthly": _chart("rental_revenue_trend",
+                          [date(year, month, 1).strftime("%b %Y") for year, month in sorted(monthly)],
+                          [monthly[period] for period in sorted(monthly)]),
+        "Weekly": _chart("rental_revenue_trend",
+                         [f"Week {week:02d}, {year}" for year, week in sorted(weekly)],
+                         [weekly[period] for period in sorted(weekly)]),
+    }
+
+    # Assessments and maintenance
+    snapshot["items_awaiting_assessment"] = {"value": load_pending_assessments(company, as_of_date)}
+    snapshot["items_in_maintenance"] = {"value": len([
+        task for task in maintenance_tasks
+        if task.status != "Completed" and task.start_date and getdate(task.start_date) <= as_of_date
+    ])}
+    turnaround = [
+        date_diff(task.completion_date, task.created_on) for task in maintenance_tasks
+        if task.status == "Completed" and in_period(task.completion_date)
+    ]
+    snapshot["maintenance_turnaround_time"] = {"value": sum(turnaround) / len(turnaround) if turnaround else 0}
+
+    snapshot["stock_reservation_conflicts"] = {
+        "value": len(get_booking_conflicts(from_date, to_date, company=company))
+        if doctype_exists("Rental Booking Conflict") else 0
+    }
+
+    # Utilization, from the occupied items per day of the period and of every trend period
+    periods = {group_by: trend_periods(from_date, to_date, group_by) for group_by in UTILIZATION_TREND_GROUPS}
+    occupancy_from = min([from_date] + [group[0].start_date for group in periods.values() if group])
+    occupancy_to = max([to_date] + [group[-1].end_date for group in periods.values() if group])
+
+    occupied = get_occupied_items_per_day(occupancy_from, occupancy_to, company=company) if items else []
+    item_created_on = [item.created_on for item in items]
+
+    snapshot["item_utilization_rate"] = {"value": utilization_by_period(
+        [frappe._dict(start_date=from_date, end_date=to_date)], occupied, item_created_on
+    )[0]}
+    snapshot["item_utilization_rate_trend"] = {
+        group_by: _chart(
+            "item_utilization_rate_trend",
+            [period.label for period in group],
+            utilization_by_period(group, occupied, item_created_on)
+        )
+        for group_by, group in periods.items()
+    }
+
+    return snapshot
+
+
+@cached_kpi(*KPI_SNAPSHOT_DOCTYPES, ttl=SNAPSHOT_CACHE_SECONDS)
+def kpi_snapshot(filters):
+    """Snapshot for normalized filters (company, from_date, to_date, as_of_date), cached."""
+    return compute_kpi_snapshot(filters["company"], filters["from_date"], filters["to_date"], filters["as_of_date"])
+
+
+def get_kpi_snapshot(company: str, from_date, to_date, as_of_date=None) -> Dict[str, Any]:
+    """
+    KPI snapshot of a company for a period, computed at most once per
+    SNAPSHOT_CACHE_SECONDS or until one of its doctypes changes.
+    """
+    return kpi_snapshot({
+        "company": company,
+        "from_date": str(getdate(from_date)),
+        "to_date": str(getdate(to_date)),
+        "as_of_date": str(getdate(as_of_date or nowdate()))
+    })
+
+
+def parse_kpi_filters(filters=None) -> Dict[str, Any]:
+    """
+    Normalize dashboard filters: a dict or JSON string, defaulting to the user's
+    default company and the last DEFAULT_PERIOD_DAYS days.
+    """
+    if isinstance(filters, str):
+        filters = json.loads(filters or "{}")
+
+    filters = frappe._dict(filters or {})
+    filters.company = filters.company or frappe.defaults.get_user_default("company")
+    filters.to_date = filters.to_date or nowdate()
+    filters.from_date = filters.from_date or add_days(filters.to_date, -DEFAULT_PERIOD_DAYS)
+    return filters
+
+
+def get_leaderboard_kpi(kpi: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Top list of LEADERBOARD_KPIS for parsed filters, one page of its leaderboard
+    (filters "start" and "page_length", default the top DEFAULT_PAGE_LENGTH).
+    """
+    board, doctype, label_field = LEADERBOARD_KPIS[kpi]
+    entries = get_leaderboard(
+        board, filters.company, filters.from_date, filters.to_date,
+        start=cint(filters.get("start")), page_length=cint(filters.get("page_length")) or DEFAULT_PAGE_LENGTH
+    )["entries"]
+    if not entries:
+        return empty_kpi_result(kpi)
+
+    labels = dict(frappe.get_all(
+        doctype, filters={"name": ["in", [entry.member for entry in entries]]},
+        fields=["name", label_field], as_list=True
+    ))
+    return _chart(kpi, [labels.get(entry.member) or entry.member for entry in entries],
+                  [entry.score for entry in entries])
+
+
+def get_snapshot_kpi(kpi: str, filters=None) -> Dict[str, Any]:
+    """
+    Read one KPI from the cached snapshot of the filtered company and period,
+    or a top list of LEADERBOARD_KPIS from its leaderboard.
+
+    Args:
+        kpi: KPI name in the snapshot (see `compute_kpi_snapshot`) or LEADERBOARD_KPIS
+        filters (dict or str): company, from_date, to_date and optionally as_of_date,
+            group_by (for trends, see TREND_GROUPS / UTILIZATION_TREND_GROUPS) and
+            start and page_length (for top lists)
+
+    Returns:
+        dict: The KPI result, or its safe empty result on error
+    """
+    try:
+        filters = parse_kpi_filters(filters)
+        if not filters.company:
+            frappe.log_error(f"Missing required filters for {kpi} calculation: {filters}", "KPI Calculation Error")
+            return empty_kpi_result(kpi)
+
+        if kpi in LEADERBOARD_KPIS:
+            return get_leaderboard_kpi(kpi, filters)
+
+        snapshot = get_kpi_snapshot(filters.company, filters.from_date, filters.to_date, filters.get("as_of_date"))
+        result = snapshot.get(kpi)
+
+        if kpi in TREND_KPIS:
+            result = result.get(filters.get("group_by") or "Monthly") if result else None
+
+        return result if result is not None else empty_kpi_result(kpi)
+
+    except Exception as e:
+        frappe.log_error(
+            f"Error calculating {kpi} from KPI snapshot: {str(e)}\n{frappe.get_traceback()}",
+            "KPI Calculation Error"
+        )
+        return empty_kpi_result(kpi)
@@ -12,14 +12,27 @@ Each function follows a consistent pattern:
 - Returns the result in the format expected by the dashboard chart
 
 Error handling is implemented throughout to ensure robustness in production.
+
+Results are cached per filters and invalidated when a document of a doctype the
+KPI reads changes (see onhire_pro.utils.kpi_cache).
 """
 
 import frappe
 from frappe.utils import getdate, nowdate, add_days, date_diff, flt, cint
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
-import calendar
+from onhire_pro.utils.daily_occupancy import get_occupied_item_days, get_occupied_items_per_day, column_if_exists
+from onhire_pro.reports.kpi_snapshot import get_snapshot_kpi, trend_periods, utilization_by_period
+from onhire_pro.reports.customer_cohorts import (
+    get_customer_cohort_metrics, load_customer_activity, retention_curves, CHURN_WINDOW_DAYS, RETENTION_MONTHS
+)
+from onhire_pro.utils.kpi_cache import cached_kpi
+from onhire_pro.utils.leaderboards import MOST_RENTED_ITEMS, TOP_CUSTOMERS, get_leaderboard
+from onhire_pro.utils.live_counters import get_live_count, get_live_counter_kpi
+from onhire_pro.utils.revenue_rollup import REVENUE_DOCTYPE, get_total_revenue
+from onhire_pro.utils.schema_capabilities import doctype_exists, sql_fragment
 
+@cached_kpi("Rental Job", "Stock Reservation", "Maintenance Task")
 def calculate_item_utilization_rate(filters):
     """
     Calculate the utilization rate of rental items.
@@ -50,22 +63,10 @@ def calculate_item_utilization_rate(filters):
             )
             return {"value": 0}
         
-        # Get total rental days for the period
-        total_rental_days = frappe.db.sql("""
-            SELECT SUM(DATEDIFF(
-                LEAST(rji.end_date, %s),
-                GREATEST(rji.start_date, %s)
-            ) + 1) as total_days
-            FROM `tabRental Job Item` rji
-            JOIN `tabRental Job` rj ON rji.parent = rj.name
-            WHERE rj.company = %s
-            AND rji.start_date <= %s
-            AND rji.end_date >= %s
-            AND rj.docstatus = 1
-        """, (filters.get("to_date"), filters.get("from_date"), filters.get("company"), 
-              filters.get("to_date"), filters.get("from_date")))
-        
-        total_rental_days = flt(total_rental_days[0][0]) if total_rental_days and total_rental_days[0][0] else 0
+        # Get total rental days (item-days reserved or on hire) for the period from the daily occupancy table
+        total_rental_days = get_occupied_item_days(
+            filters.get("from_date"), filters.get("to_date"), company=filters.get("company")
+        )
         
         # Get all rental items
         rental_items = frappe.db.get_all(
@@ -107,6 +108,7 @@ def calculate_item_utilization_rate(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Job")
 def calculate_average_rental_duration(filters):
     """
     Calculate the average duration of rental jobs.
@@ -164,11 +166,13 @@ def calculate_average_rental_duration(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Sales Invoice")
 def get_revenue_per_item_category(filters):
     """
     Calculate the revenue distribution across different item categories.
     
-    This function returns the revenue generated by each item category during the specified period.
+    This function returns the net rental revenue invoiced for each item category during the
+    specified period, read from the Rental Revenue Daily rollup.
     The data is formatted for display in a pie or bar chart, showing the contribution of each
     category to the overall rental revenue.
     
@@ -202,18 +206,14 @@ def get_revenue_per_item_category(filters):
             return {"labels": [], "datasets": [{"name": "Revenue", "values": []}]}
         
         # Get revenue by item category
-        revenue_data = frappe.db.sql("""
-            SELECT i.item_group, SUM(rji.amount) as total_revenue
-            FROM `tabRental Job Item` rji
-            JOIN `tabRental Job` rj ON rji.parent = rj.name
-            JOIN `tabItem` i ON rji.item_code = i.name
-            WHERE rj.company = %s
-            AND rj.start_date <= %s
-            AND rj.end_date >= %s
-            AND rj.docstatus = 1
-            GROUP BY i.item_group
+        revenue_data = frappe.db.sql(f"""
+            SELECT rev.item_group, SUM(rev.net_amount) as total_revenue
+            FROM `tab{REVENUE_DOCTYPE}` rev
+            WHERE rev.company = %s
+            AND rev.date BETWEEN %s AND %s
+            GROUP BY rev.item_group
             ORDER BY total_revenue DESC
-        """, (filters.get("company"), filters.get("to_date"), filters.get("from_date")), as_dict=1)
+        """, (filters.get("company"), filters.get("from_date"), filters.get("to_date")), as_dict=1)
         
         if not revenue_data:
             return {"labels": [], "datasets": [{"name": "Revenue", "values": []}]}
@@ -239,6 +239,7 @@ def get_revenue_per_item_category(filters):
         )
         return {"labels": [], "datasets": [{"name": "Revenue", "values": []}]}
 
+@cached_kpi("Maintenance Task")
 def calculate_avg_maintenance_turnaround_time(filters):
     """
     Calculate the average turnaround time for maintenance tasks.
@@ -271,7 +272,7 @@ def calculate_avg_maintenance_turnaround_time(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Maintenance Task"):
+        if not doctype_exists("Maintenance Task"):
             frappe.log_error(
                 "Maintenance Task doctype does not exist",
                 "KPI Calculation Error"
@@ -304,6 +305,7 @@ def calculate_avg_maintenance_turnaround_time(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Quotation", "Rental Job")
 def calculate_booking_conversion_rate(filters):
     """
     Calculate the conversion rate from quotations to confirmed rental jobs.
@@ -336,7 +338,7 @@ def calculate_booking_conversion_rate(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Quotation") or not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Quotation") or not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for booking conversion rate calculation",
                 "KPI Calculation Error"
@@ -374,27 +376,33 @@ def calculate_booking_conversion_rate(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Job")
 def calculate_customer_churn_rate(filters):
     """
     Calculate the customer churn rate for rental customers.
     
-    The customer churn rate is calculated as the percentage of customers who did not
-    rent again within the specified period after their last rental. This KPI helps
-    measure customer retention and identify potential issues in customer satisfaction.
+    The customer churn rate is the percentage of customers active at the start of
+    the period (a Rental Job in the CHURN_WINDOW_DAYS before it) who are no longer
+    active at its end. This KPI helps measure customer retention and identify
+    potential issues in customer satisfaction.
     
     Args:
         filters (dict): Dictionary containing filter parameters:
             - company (str): Company name
             - from_date (str): Start date for calculation period
             - to_date (str): End date for calculation period
+            - churn_window_days (int, optional): Days without a rental after which a
+              customer counts as churned
             
     Returns:
         dict: Dictionary containing the calculated churn rate:
             - value (float): Churn rate as a percentage
+            - retention_rate (float): Percentage of customers retained
+            - reactivation_rate (float): Percentage of lapsed customers who rented again
             
     Example:
         >>> calculate_customer_churn_rate({"company": "Example Inc.", "from_date": "2023-01-01", "to_date": "2023-01-31"})
-        {'value': 15.0}
+        {'value': 15.0, 'retention_rate': 85.0, 'reactivation_rate': 4.0}
     """
     try:
         # Validate required filters
@@ -405,66 +413,82 @@ def calculate_customer_churn_rate(filters):
             )
             return {"value": 0}
         
-        # Get customers at the start of the period
-        customers_at_start = frappe.db.sql("""
-            SELECT COUNT(DISTINCT customer) as count
-            FROM `tabRental Job`
-            WHERE company = %s
-            AND creation < %s
-            AND docstatus = 1
-        """, (filters.get("company"), filters.get("from_date")))
-        
-        customers_at_start = cint(customers_at_start[0][0]) if customers_at_start and customers_at_start[0][0] else 0
-        
-        if customers_at_start == 0:
-            return {"value": 0}
-        
-        # Get customers at the end of the period
-        customers_at_end = frappe.db.sql("""
-            SELECT COUNT(DISTINCT customer) as count
-            FROM `tabRental Job`
-            WHERE company = %s
-            AND creation <= %s
-            AND docstatus = 1
-        """, (filters.get("company"), filters.get("to_date")))
+        metrics = get_customer_cohort_metrics(
+            filters.get("company"),
+            [frappe._dict(start_date=filters.get("from_date"), end_date=filters.get("to_date"))],
+            cint(filters.get("churn_window_days")) or CHURN_WINDOW_DAYS
+        )[0]
         
-        customers_at_end = cint(customers_at_end[0][0]) if customers_at_end and customers_at_end[0][0] else 0
-        
-        # Get new customers during the period
-        new_customers = frappe.db.sql("""
-            SELECT COUNT(DISTINCT customer) as count
-            FROM `tabRental Job`
-            WHERE company = %s
-            AND creation BETWEEN %s AND %s
-            AND customer NOT IN (
-                SELECT DISTINCT customer
-                FROM `tabRental Job`
-                WHERE company = %s
-                AND creation < %s
-                AND docstatus = 1
+        return {
+            "value": metrics.churn_rate,
+            "retention_rate": metrics.retention_rate,
+            "reactivation_rate": metrics.reactivation_rate
+        }
+    
+    except Exception as e:
+        frappe.log_error(
+            f"Error calculating customer churn rate: {str(e)}\n{frappe.get_traceback()}",
+            "KPI Calculation Error"
+        )
+        return {"value": 0}
+
+@cached_kpi("Rental Job")
+def get_customer_retention_curves(filters):
+    """
+    Get the monthly retention curves of the customer cohorts.
+    
+    Customers are grouped by the month of their first rental from from_date to
+    to_date; each cohort's curve shows the percentage of its customers renting
+    again 0, 1, 2, ... months later. All cohorts come from one query.
+    
+    Args:
+        filters (dict): Dictionary containing filter parameters:
+            - company (str): Company name
+            - from_date (str): First cohort month
+            - to_date (str): Last month observed
+            - months (int, optional): Months after the first rental to follow
+            
+    Returns:
+        dict: Chart data with one dataset per cohort:
+            - labels (list): Month 0, Month 1, ...
+            - datasets (list): [{"name": cohort, "values": retention percentages}]
+            
+    Example:
+        >>> get_customer_retention_curves({"company": "Example Inc.", "from_date": "2023-01-01", "to_date": "2023-03-31"})
+        {'labels': ['Month 0', 'Month 1', 'Month 2'], 'datasets': [{'name': 'Jan 2023', 'values': [100.0, 40.0, 35.0]}, ...]}
+    """
+    try:
+        if not filters.get("company") or not filters.get("from_date") or not filters.get("to_date"):
+            frappe.log_error(
+                f"Missing required filters for customer retention curves: {filters}",
+                "KPI Calculation Error"
             )
-            AND docstatus = 1
-        """, (filters.get("company"), filters.get("from_date"), filters.get("to_date"), 
-              filters.get("company"), filters.get("from_date")))
+            return {"labels": [], "datasets": []}
         
-        new_customers = cint(new_customers[0][0]) if new_customers and new_customers[0][0] else 0
-        
-        # Calculate churn rate
-        # Customers lost = (Start + New) - End
-        customers_lost = (customers_at_start + new_customers) - customers_at_end
-        
-        # Churn rate = (Customers lost / Start) * 100
-        churn_rate = (customers_lost / customers_at_start) * 100 if customers_at_start > 0 else 0
+        curves = retention_curves(
+            load_customer_activity(filters.get("company"), filters.get("to_date")),
+            filters.get("from_date"),
+            filters.get("to_date"),
+            cint(filters.get("months")) or RETENTION_MONTHS
+        )
         
-        return {"value": churn_rate}
+        months = max((len(curve) for curve in curves.curves), default=0)
+        return {
+            "labels": [f"Month {month}" for month in range(months)],
+            "datasets": [
+                {"name": f"{cohort} ({size})", "values": curve}
+                for cohort, size, curve in zip(curves.cohorts, curves.sizes, curves.curves)
+            ]
+        }
     
     except Exception as e:
         frappe.log_error(
-            f"Error calculating customer churn rate: {str(e)}\n{frappe.get_traceback()}",
+            f"Error calculating customer retention curves: {str(e)}\n{frappe.get_traceback()}",
             "KPI Calculation Error"
         )
-        return {"value": 0}
+        return {"labels": [], "datasets": []}
 
+@cached_kpi("Rental Job", "Condition Assessment")
 def calculate_damage_rate(filters):
     """
     Calculate the damage rate for rental items.
@@ -497,7 +521,7 @@ def calculate_damage_rate(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job") or not frappe.db.exists("DocType", "Condition Assessment"):
+        if not doctype_exists("Rental Job") or not doctype_exists("Condition Assessment"):
             frappe.log_error(
                 "Required doctypes do not exist for damage rate calculation",
                 "KPI Calculation Error"
@@ -536,13 +560,19 @@ def calculate_damage_rate(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Booking Conflict")
 def get_stock_reservation_conflicts(filters):
     """
     Calculate the number of stock reservation conflicts.
     
-    Stock reservation conflicts occur when the same item is reserved for multiple
-    rental jobs that overlap in time. This KPI helps identify potential overbooking
-    issues and prevent customer disappointment.
+    Stock reservation conflicts occur when the Rental Jobs booked on an item need
+    more units than are in stock at the same time. This KPI helps identify potential
+    overbooking issues and prevent customer disappointment.
+    
+    Conflicts are found by the daily fleet-wide conflict detection
+    (onhire_pro.utils.conflict_detector) and read here from the Rental Booking
+    Conflict table, counting each over-capacity period of an item that overlaps
+    the calculation period.
     
     Args:
         filters (dict): Dictionary containing filter parameters:
@@ -568,34 +598,22 @@ def get_stock_reservation_conflicts(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job") or not frappe.db.exists("DocType", "Rental Job Item"):
+        if not doctype_exists("Rental Booking Conflict"):
             frappe.log_error(
                 "Required doctypes do not exist for stock reservation conflicts calculation",
                 "KPI Calculation Error"
             )
             return {"value": 0}
         
-        # Get stock reservation conflicts
+        # Get stock reservation conflicts detected by the scheduled sweep
         conflicts = frappe.db.sql("""
-            SELECT rji1.item_code, rji1.warehouse, COUNT(*) as conflicts
-            FROM `tabRental Job Item` rji1
-            JOIN `tabRental Job` rj1 ON rji1.parent = rj1.name
-            JOIN `tabRental Job Item` rji2 ON rji1.item_code = rji2.item_code AND rji1.warehouse = rji2.warehouse
-            JOIN `tabRental Job` rj2 ON rji2.parent = rj2.name
-            WHERE rj1.company = %s
-            AND rj1.docstatus = 1
-            AND rj2.docstatus = 1
-            AND rj1.name != rj2.name
-            AND rj1.start_date <= %s
-            AND rj1.end_date >= %s
-            AND rj2.start_date <= %s
-            AND rj2.end_date >= %s
-            AND (
-                (rji1.start_date <= rji2.end_date AND rji1.end_date >= rji2.start_date)
-            )
-            GROUP BY rji1.item_code, rji1.warehouse
-        """, (filters.get("company"), filters.get("to_date"), filters.get("from_date"),
-              filters.get("to_date"), filters.get("from_date")), as_dict=1)
+            SELECT item_code, warehouse, COUNT(*) as conflicts
+            FROM `tabRental Booking Conflict`
+            WHERE IFNULL(company, '') IN (%s, '')
+            AND from_date <= %s
+            AND to_date >= %s
+            GROUP BY item_code, warehouse
+        """, (filters.get("company"), filters.get("to_date"), filters.get("from_date")), as_dict=1)
         
         # Calculate total conflicts
         total_conflicts = sum(conflict.conflicts for conflict in conflicts) if conflicts else 0
@@ -609,6 +627,7 @@ def get_stock_reservation_conflicts(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Job", ttl=300)
 def get_overdue_returns_count(filters):
     """
     Calculate the number of overdue rental returns.
@@ -640,7 +659,7 @@ def get_overdue_returns_count(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for overdue returns count calculation",
                 "KPI Calculation Error"
@@ -651,12 +670,10 @@ def get_overdue_returns_count(filters):
         as_of_date = filters.get("as_of_date") or nowdate()
         
         # Count overdue returns
-        overdue_count = frappe.db.count("Rental Job", {
-            "company": filters.get("company"),
-            "end_date": ["<", as_of_date],
-            "status": ["in", ["In Progress", "Confirmed"]],
-            "docstatus": 1
-        })
+        overdue_count = get_live_count(
+            "Rental Job", filters.get("company"), ["In Progress", "Confirmed"],
+            end_date=("<", as_of_date)
+        )
         
         return {"value": overdue_count}
     
@@ -667,6 +684,7 @@ def get_overdue_returns_count(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Job", ttl=300)
 def get_active_rental_jobs_count(filters):
     """
     Calculate the number of active rental jobs.
@@ -697,7 +715,7 @@ def get_active_rental_jobs_count(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for active rental jobs count calculation",
                 "KPI Calculation Error"
@@ -708,13 +726,10 @@ def get_active_rental_jobs_count(filters):
         as_of_date = filters.get("as_of_date") or nowdate()
         
         # Count active rental jobs
-        active_count = frappe.db.count("Rental Job", {
-            "company": filters.get("company"),
-            "start_date": ["<=", as_of_date],
-            "end_date": [">=", as_of_date],
-            "status": ["in", ["Confirmed", "In Progress"]],
-            "docstatus": 1
-        })
+        active_count = get_live_count(
+            "Rental Job", filters.get("company"), ["Confirmed", "In Progress"],
+            start_date=("<=", as_of_date), end_date=(">=", as_of_date)
+        )
         
         return {"value": active_count}
     
@@ -725,6 +740,7 @@ def get_active_rental_jobs_count(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Job", ttl=300)
 def get_jobs_due_for_dispatch_count(filters):
     """
     Calculate the number of rental jobs due for dispatch.
@@ -756,7 +772,7 @@ def get_jobs_due_for_dispatch_count(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for jobs due for dispatch count calculation",
                 "KPI Calculation Error"
@@ -768,12 +784,10 @@ def get_jobs_due_for_dispatch_count(filters):
         to_date = filters.get("to_date") or add_days(nowdate(), 7)
         
         # Count jobs due for dispatch
-        dispatch_count = frappe.db.count("Rental Job", {
-            "company": filters.get("company"),
-            "start_date": ["between", [from_date, to_date]],
-            "status": "Confirmed",
-            "docstatus": 1
-        })
+        dispatch_count = get_live_count(
+            "Rental Job", filters.get("company"), ["Confirmed"],
+            start_date=("between", [from_date, to_date])
+        )
         
         return {"value": dispatch_count}
     
@@ -784,6 +798,7 @@ def get_jobs_due_for_dispatch_count(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Job", ttl=300)
 def get_jobs_due_for_return_count(filters):
     """
     Calculate the number of rental jobs due for return.
@@ -815,7 +830,7 @@ def get_jobs_due_for_return_count(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for jobs due for return count calculation",
                 "KPI Calculation Error"
@@ -827,12 +842,10 @@ def get_jobs_due_for_return_count(filters):
         to_date = filters.get("to_date") or add_days(nowdate(), 7)
         
         # Count jobs due for return
-        return_count = frappe.db.count("Rental Job", {
-            "company": filters.get("company"),
-            "end_date": ["between", [from_date, to_date]],
-            "status": "In Progress",
-            "docstatus": 1
-        })
+        return_count = get_live_count(
+            "Rental Job", filters.get("company"), ["In Progress"],
+            end_date=("between", [from_date, to_date])
+        )
         
         return {"value": return_count}
     
@@ -843,6 +856,7 @@ def get_jobs_due_for_return_count(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Rental Job", "Stock Ledger Entry", ttl=300)
 def get_at_risk_stock_count(filters):
     """
     Calculate the number of items where reservations exceed available stock.
@@ -874,7 +888,7 @@ def get_at_risk_stock_count(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job") or not frappe.db.exists("DocType", "Bin"):
+        if not doctype_exists("Rental Job") or not doctype_exists("Bin"):
             frappe.log_error(
                 "Required doctypes do not exist for at-risk stock count calculation",
                 "KPI Calculation Error"
@@ -913,6 +927,7 @@ def get_at_risk_stock_count(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Condition Assessment", ttl=300)
 def get_items_awaiting_assessment_count(filters):
     """
     Calculate the number of items awaiting condition assessment.
@@ -944,7 +959,7 @@ def get_items_awaiting_assessment_count(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Condition Assessment"):
+        if not doctype_exists("Condition Assessment"):
             frappe.log_error(
                 "Required doctypes do not exist for items awaiting assessment count calculation",
                 "KPI Calculation Error"
@@ -955,12 +970,10 @@ def get_items_awaiting_assessment_count(filters):
         as_of_date = filters.get("as_of_date") or nowdate()
         
         # Count items awaiting assessment
-        assessment_count = frappe.db.count("Condition Assessment", {
-            "company": filters.get("company"),
-            "status": "Pending Post-Rental",
-            "creation": ["<=", as_of_date],
-            "docstatus": 1
-        })
+        assessment_count = get_live_count(
+            "Condition Assessment", filters.get("company"), ["Pending Post-Rental"],
+            start_date=("<=", as_of_date)
+        )
         
         return {"value": assessment_count}
     
@@ -971,6 +984,7 @@ def get_items_awaiting_assessment_count(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Maintenance Task", ttl=300)
 def get_items_in_maintenance_count(filters):
     """
     Calculate the number of items currently in maintenance.
@@ -1002,7 +1016,7 @@ def get_items_in_maintenance_count(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Maintenance Task"):
+        if not doctype_exists("Maintenance Task"):
             frappe.log_error(
                 "Required doctypes do not exist for items in maintenance count calculation",
                 "KPI Calculation Error"
@@ -1013,12 +1027,10 @@ def get_items_in_maintenance_count(filters):
         as_of_date = filters.get("as_of_date") or nowdate()
         
         # Count items in maintenance
-        maintenance_count = frappe.db.count("Maintenance Task", {
-            "company": filters.get("company"),
-            "status": ["!=", "Completed"],
-            "start_date": ["<=", as_of_date],
-            "docstatus": 1
-        })
+        maintenance_count = get_live_count(
+            "Maintenance Task", filters.get("company"),
+            start_date=("<=", as_of_date)
+        )
         
         return {"value": maintenance_count}
     
@@ -1029,12 +1041,14 @@ def get_items_in_maintenance_count(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Sales Invoice")
 def get_total_rental_revenue(filters):
     """
     Calculate the total rental revenue for the specified period.
     
     Total rental revenue is the sum of all invoiced amounts for rental jobs during
-    the specified period. This KPI is a key financial metric for rental operations.
+    the specified period, read from the Rental Revenue Daily rollup. This KPI is a
+    key financial metric for rental operations.
     
     Args:
         filters (dict): Dictionary containing filter parameters:
@@ -1060,7 +1074,7 @@ def get_total_rental_revenue(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Sales Invoice") or not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Sales Invoice") or not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for total rental revenue calculation",
                 "KPI Calculation Error"
@@ -1068,16 +1082,10 @@ def get_total_rental_revenue(filters):
             return {"value": 0}
         
         # Get total rental revenue
-        total_revenue = frappe.db.sql("""
-            SELECT SUM(si.grand_total) as total_revenue
-            FROM `tabSales Invoice` si
-            WHERE si.company = %s
-            AND si.posting_date BETWEEN %s AND %s
-            AND si.docstatus = 1
-            AND si.rental_job IS NOT NULL
-        """, (filters.get("company"), filters.get("from_date"), filters.get("to_date")))
-        
-        total_revenue = flt(total_revenue[0][0]) if total_revenue and total_revenue[0][0] else 0
+        total_revenue = get_total_revenue(
+            filters.get("company"), filters.get("from_date"), filters.get("to_date"),
+            filters={"rental_jobs_only": True}
+        )
         
         return {"value": total_revenue}
     
@@ -1088,6 +1096,7 @@ def get_total_rental_revenue(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Quotation")
 def get_open_rental_quotation_value(filters):
     """
     Calculate the total value of open rental quotations.
@@ -1119,7 +1128,7 @@ def get_open_rental_quotation_value(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Quotation"):
+        if not doctype_exists("Quotation"):
             frappe.log_error(
                 "Required doctypes do not exist for open rental quotation value calculation",
                 "KPI Calculation Error"
@@ -1151,6 +1160,7 @@ def get_open_rental_quotation_value(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Sales Invoice")
 def get_overdue_invoice_amount(filters):
     """
     Calculate the total amount of overdue rental invoices.
@@ -1181,7 +1191,7 @@ def get_overdue_invoice_amount(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Sales Invoice"):
+        if not doctype_exists("Sales Invoice"):
             frappe.log_error(
                 "Required doctypes do not exist for overdue invoice amount calculation",
                 "KPI Calculation Error"
@@ -1213,6 +1223,7 @@ def get_overdue_invoice_amount(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Sales Invoice", "Rental Job")
 def get_average_revenue_per_rental_job(filters):
     """
     Calculate the average revenue per rental job.
@@ -1245,7 +1256,7 @@ def get_average_revenue_per_rental_job(filters):
             return {"value": 0}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Sales Invoice") or not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Sales Invoice") or not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for average revenue per rental job calculation",
                 "KPI Calculation Error"
@@ -1253,16 +1264,10 @@ def get_average_revenue_per_rental_job(filters):
             return {"value": 0}
         
         # Get total rental revenue
-        total_revenue = frappe.db.sql("""
-            SELECT SUM(si.grand_total) as total_revenue
-            FROM `tabSales Invoice` si
-            WHERE si.company = %s
-            AND si.posting_date BETWEEN %s AND %s
-            AND si.docstatus = 1
-            AND si.rental_job IS NOT NULL
-        """, (filters.get("company"), filters.get("from_date"), filters.get("to_date")))
-        
-        total_revenue = flt(total_revenue[0][0]) if total_revenue and total_revenue[0][0] else 0
+        total_revenue = get_total_revenue(
+            filters.get("company"), filters.get("from_date"), filters.get("to_date"),
+            filters={"rental_jobs_only": True}
+        )
         
         if total_revenue == 0:
             return {"value": 0}
@@ -1290,6 +1295,7 @@ def get_average_revenue_per_rental_job(filters):
         )
         return {"value": 0}
 
+@cached_kpi("Sales Invoice")
 def get_rental_revenue_trend(filters):
     """
     Calculate the rental revenue trend over time.
@@ -1328,7 +1334,7 @@ def get_rental_revenue_trend(filters):
             return {"labels": [], "datasets": [{"name": "Revenue", "values": []}]}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Sales Invoice"):
+        if not doctype_exists("Sales Invoice"):
             frappe.log_error(
                 "Required doctypes do not exist for rental revenue trend calculation",
                 "KPI Calculation Error"
@@ -1342,19 +1348,18 @@ def get_rental_revenue_trend(filters):
         if group_by == "Monthly":
             date_format = "%Y-%m"
             label_format = "%b %Y"
-            group_by_sql = "DATE_FORMAT(posting_date, '%Y-%m')"
+            group_by_sql = "DATE_FORMAT(date, '%Y-%m')"
         else:  # Weekly
             date_format = "%Y-%u"
             label_format = "Week %u, %Y"
-            group_by_sql = "DATE_FORMAT(posting_date, '%Y-%u')"
+            group_by_sql = "DATE_FORMAT(date, '%Y-%u')"
         
         # Get revenue trend data
         revenue_data = frappe.db.sql(f"""
             SELECT {group_by_sql} as period, SUM(grand_total) as revenue
-            FROM `tabSales Invoice`
+            FROM `tab{REVENUE_DOCTYPE}`
             WHERE company = %s
-            AND posting_date BETWEEN %s AND %s
-            AND docstatus = 1
+            AND date BETWEEN %s AND %s
             AND rental_job IS NOT NULL
             GROUP BY period
             ORDER BY period
@@ -1396,6 +1401,7 @@ def get_rental_revenue_trend(filters):
         )
         return {"labels": [], "datasets": [{"name": "Revenue", "values": []}]}
 
+@cached_kpi("Rental Job", ttl=300)
 def get_job_status_distribution(filters):
     """
     Calculate the distribution of rental jobs by status.
@@ -1432,7 +1438,7 @@ def get_job_status_distribution(filters):
             return {"labels": [], "datasets": [{"name": "Jobs", "values": []}]}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job"):
+        if not doctype_exists("Rental Job"):
             frappe.log_error(
                 "Required doctypes do not exist for job status distribution calculation",
                 "KPI Calculation Error"
@@ -1475,19 +1481,22 @@ def get_job_status_distribution(filters):
         )
         return {"labels": [], "datasets": [{"name": "Jobs", "values": []}]}
 
+@cached_kpi("Rental Job")
 def get_top_5_most_rented_items(filters):
     """
     Identify the top 5 most frequently rented items.
     
     This function returns the 5 items that have been rented the most times during
-    the specified period. This KPI helps identify popular items and inform inventory
-    planning decisions.
+    the specified period, read from the Most Rented Items leaderboard. This KPI helps
+    identify popular items and inform inventory planning decisions.
     
     Args:
         filters (dict): Dictionary containing filter parameters:
             - company (str): Company name
             - from_date (str): Start date for calculation period
             - to_date (str): End date for calculation period
+            - page_length (int, optional): Number of items to return (defaults to 5)
+            - start (int, optional): Rank to start from, for paging (defaults to 0)
             
     Returns:
         dict: Dictionary containing the top 5 most rented items data:
@@ -1513,7 +1522,7 @@ def get_top_5_most_rented_items(filters):
             return {"labels": [], "datasets": [{"name": "Rental Count", "values": []}]}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job") or not frappe.db.exists("DocType", "Rental Job Item"):
+        if not doctype_exists("Rental Job") or not doctype_exists("Rental Job Item"):
             frappe.log_error(
                 "Required doctypes do not exist for top 5 most rented items calculation",
                 "KPI Calculation Error"
@@ -1521,25 +1530,21 @@ def get_top_5_most_rented_items(filters):
             return {"labels": [], "datasets": [{"name": "Rental Count", "values": []}]}
         
         # Get top 5 most rented items
-        top_items = frappe.db.sql("""
-            SELECT i.item_name, COUNT(rji.name) as rental_count
-            FROM `tabRental Job Item` rji
-            JOIN `tabRental Job` rj ON rji.parent = rj.name
-            JOIN `tabItem` i ON rji.item_code = i.name
-            WHERE rj.company = %s
-            AND rj.start_date BETWEEN %s AND %s
-            AND rj.docstatus = 1
-            GROUP BY i.item_name
-            ORDER BY rental_count DESC
-            LIMIT 5
-        """, (filters.get("company"), filters.get("from_date"), filters.get("to_date")), as_dict=1)
+        top_items = get_leaderboard(
+            MOST_RENTED_ITEMS, filters.get("company"), filters.get("from_date"), filters.get("to_date"),
+            start=filters.get("start") or 0, page_length=filters.get("page_length") or 5
+        )["entries"]
         
         if not top_items:
             return {"labels": [], "datasets": [{"name": "Rental Count", "values": []}]}
         
         # Format data for chart
-        labels = [item.item_name for item in top_items]
-        values = [item.rental_count for item in top_items]
+        item_names = dict(frappe.get_all(
+            "Item", filters={"name": ["in", [item.member for item in top_items]]},
+            fields=["name", "item_name"], as_list=True
+        ))
+        labels = [item_names.get(item.member) or item.member for item in top_items]
+        values = [cint(item.score) for item in top_items]
         
         return {
             "labels": labels,
@@ -1558,19 +1563,22 @@ def get_top_5_most_rented_items(filters):
         )
         return {"labels": [], "datasets": [{"name": "Rental Count", "values": []}]}
 
+@cached_kpi("Sales Invoice")
 def get_top_5_customers_by_rental_value(filters):
     """
     Identify the top 5 customers by rental value.
     
     This function returns the 5 customers who have generated the most rental revenue
-    during the specified period. This KPI helps identify key customers and inform
-    customer relationship management strategies.
+    during the specified period, read from the Top Customers leaderboard. This KPI
+    helps identify key customers and inform customer relationship management strategies.
     
     Args:
         filters (dict): Dictionary containing filter parameters:
             - company (str): Company name
             - from_date (str): Start date for calculation period
             - to_date (str): End date for calculation period
+            - page_length (int, optional): Number of customers to return (defaults to 5)
+            - start (int, optional): Rank to start from, for paging (defaults to 0)
             
     Returns:
         dict: Dictionary containing the top 5 customers data:
@@ -1596,7 +1604,7 @@ def get_top_5_customers_by_rental_value(filters):
             return {"labels": [], "datasets": [{"name": "Rental Value", "values": []}]}
         
         # Verify schema requirements
-        if not frappe.db.exists("DocType", "Sales Invoice") or not frappe.db.exists("DocType", "Customer"):
+        if not doctype_exists("Sales Invoice") or not doctype_exists("Customer"):
             frappe.log_error(
                 "Required doctypes do not exist for top 5 customers by rental value calculation",
                 "KPI Calculation Error"
@@ -1604,25 +1612,21 @@ def get_top_5_customers_by_rental_value(filters):
             return {"labels": [], "datasets": [{"name": "Rental Value", "values": []}]}
         
         # Get top 5 customers by rental value
-        top_customers = frappe.db.sql("""
-            SELECT c.customer_name, SUM(si.grand_total) as rental_value
-            FROM `tabSales Invoice` si
-            JOIN `tabCustomer` c ON si.customer = c.name
-            WHERE si.company = %s
-            AND si.posting_date BETWEEN %s AND %s
-            AND si.docstatus = 1
-            AND si.rental_job IS NOT NULL
-            GROUP BY c.customer_name
-            ORDER BY rental_value DESC
-            LIMIT 5
-        """, (filters.get("company"), filters.get("from_date"), filters.get("to_date")), as_dict=1)
+        top_customers = get_leaderboard(
+            TOP_CUSTOMERS, filters.get("company"), filters.get("from_date"), filters.get("to_date"),
+            start=filters.get("start") or 0, page_length=filters.get("page_length") or 5
+        )["entries"]
         
         if not top_customers:
             return {"labels": [], "datasets": [{"name": "Rental Value", "values": []}]}
         
         # Format data for chart
-        labels = [customer.customer_name for customer in top_customers]
-        values = [customer.rental_value for customer in top_customers]
+        customer_names = dict(frappe.get_all(
+            "Customer", filters={"name": ["in", [customer.member for customer in top_customers]]},
+            fields=["name", "customer_name"], as_list=True
+        ))
+        labels = [customer_names.get(customer.member) or customer.member for customer in top_customers]
+        values = [customer.score for customer in top_customers]
         
         return {
             "labels": labels,
@@ -1641,6 +1645,73 @@ def get_top_5_customers_by_rental_value(filters):
         )
         return {"labels": [], "datasets": [{"name": "Rental Value", "values": []}]}
 
+@cached_kpi("Rental Job", "Condition Assessment")
+def get_damage_counts(filters):
+    """
+    Count completed rental jobs and damaged rental jobs per item group, item and serial number.
+    
+    All levels come from one grouped query (GROUP BY ... WITH ROLLUP), so the number of
+    queries does not grow with the number of item groups, and drilling down from an item
+    group to its items and serial numbers reuses the same (cached) result. A job counts
+    as damaged for an item if the item came back damaged (on sites without per-item
+    damaged quantities: if the job has damaged items).
+    
+    Args:
+        filters (dict): Dictionary containing filter parameters:
+            - company (str): Company name
+            - from_date (str): Start date for calculation period
+            - to_date (str): End date for calculation period
+            
+    Returns:
+        dict: Dictionary containing [total, damaged] job counts:
+            - item_group (dict): item_group -> [total, damaged]
+            - item_code (dict): item_group -> {item_code -> [total, damaged]}
+            - serial_no (dict): item_code -> {serial_no -> [total, damaged]} (serialized items only)
+            
+    Example:
+        >>> get_damage_counts({"company": "Example Inc.", "from_date": "2023-01-01", "to_date": "2023-01-31"})
+        {
+            'item_group': {'Generators': [8, 1]},
+            'item_code': {'Generators': {'GEN-5KVA': [6, 1], 'GEN-10KVA': [2, 0]}},
+            'serial_no': {'GEN-5KVA': {'GEN-5KVA-001': [3, 1], 'GEN-5KVA-002': [3, 0]}}
+        }
+    """
+    status = column_if_exists("Rental Job", "job_status", "rj.job_status", "rj.status")
+    end_date = column_if_exists("Rental Job", "end_date", "rj.end_date", "rj.scheduled_return_date")
+    company = column_if_exists("Rental Job", "company", "rj.company")
+    damaged = sql_fragment("job_item_damaged")
+    
+    rows = frappe.db.sql(f"""
+        SELECT IFNULL(i.item_group, '') AS item_group, rji.item_code, IFNULL(rji.serial_no, '') AS serial_no,
+            COUNT(DISTINCT rj.name) AS total,
+            COUNT(DISTINCT CASE WHEN {damaged} THEN rj.name END) AS damaged
+        FROM `tabRental Job Item` rji
+        JOIN `tabRental Job` rj ON rji.parent = rj.name
+        JOIN `tabItem` i ON rji.item_code = i.name
+        WHERE IFNULL({company}, '') IN (%(company)s, '')
+        AND DATE({end_date}) BETWEEN %(from_date)s AND %(to_date)s
+        AND {status} = 'Completed'
+        AND rj.docstatus = 1
+        GROUP BY IFNULL(i.item_group, ''), rji.item_code, IFNULL(rji.serial_no, '') WITH ROLLUP
+    """, {
+        "company": filters.get("company"), "from_date": filters.get("from_date"), "to_date": filters.get("to_date")
+    }, as_dict=1)
+    
+    counts = {"item_group": {}, "item_code": {}, "serial_no": {}}
+    for row in rows:
+        value = [cint(row.total), cint(row.damaged)]
+        if row.item_group is None:
+            continue  # grand total
+        elif row.item_code is None:
+            counts["item_group"][row.item_group] = value
+        elif row.serial_no is None:
+            counts["item_code"].setdefault(row.item_group, {})[row.item_code] = value
+        elif row.serial_no:
+            counts["serial_no"].setdefault(row.item_code, {})[row.serial_no] = value
+    
+    return counts
+
+@cached_kpi("Rental Job", "Condition Assessment")
 def get_damage_rate_by_item_group(filters):
     """
     Calculate the damage rate for each item group.
@@ -1649,18 +1720,24 @@ def get_damage_rate_by_item_group(filters):
     group were returned with damage. This KPI helps identify item groups that may
     require more robust construction or better handling instructions.
     
+    The chart drills down from the same counts (see `get_damage_counts`): with an
+    item_group filter it shows the items of that group, with an item_code filter the
+    serial numbers of that item.
+    
     Args:
         filters (dict): Dictionary containing filter parameters:
             - company (str): Company name
             - from_date (str): Start date for calculation period
             - to_date (str): End date for calculation period
+            - item_group (str, optional): Show the items of this group
+            - item_code (str, optional): Show the serial numbers of this item
             
     Returns:
         dict: Dictionary containing the damage rate by item group data:
-            - labels (list): List of item group names
+            - labels (list): List of item group names (or item codes / serial numbers)
             - datasets (list): List containing a single dataset with:
                 - name (str): Dataset name
-                - values (list): Damage rates corresponding to each item group
+                - values (list): Damage rates as percentages
                 
     Example:
         >>> get_damage_rate_by_item_group({"company": "Example Inc.", "from_date": "2023-01-01", "to_date": "2023-01-31"})
@@ -1678,73 +1755,29 @@ def get_damage_rate_by_item_group(filters):
             )
             return {"labels": [], "datasets": [{"name": "Damage Rate (%)", "values": []}]}
         
-        # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job") or not frappe.db.exists("DocType", "Item"):
-            frappe.log_error(
-                "Required doctypes do not exist for damage rate by item group calculation",
-                "KPI Calculation Error"
-            )
-            return {"labels": [], "datasets": [{"name": "Damage Rate (%)", "values": []}]}
-        
-        # Get item groups
-        item_groups = frappe.db.sql("""
-            SELECT DISTINCT i.item_group
-            FROM `tabRental Job Item` rji
-            JOIN `tabRental Job` rj ON rji.parent = rj.name
-            JOIN `tabItem` i ON rji.item_code = i.name
-            WHERE rj.company = %s
-            AND rj.end_date BETWEEN %s AND %s
-            AND rj.status = 'Completed'
-            AND rj.docstatus = 1
-        """, (filters.get("company"), filters.get("from_date"), filters.get("to_date")), as_dict=1)
+        # Counts for every level, shared by all drill-downs of the period
+        counts = get_damage_counts({
+            "company": filters.get("company"),
+            "from_date": filters.get("from_date"),
+            "to_date": filters.get("to_date")
+        })
         
-        if not item_groups:
-            return {"labels": [], "datasets": [{"name": "Damage Rate (%)", "values": []}]}
+        if filters.get("item_code"):
+            level = counts["serial_no"].get(filters.get("item_code"), {})
+        elif filters.get("item_group"):
+            level = counts["item_code"].get(filters.get("item_group"), {})
+        else:
+            level = counts["item_group"]
         
-        # Calculate damage rate for each item group
         labels = []
         damage_rates = []
         
-        for group in item_groups:
-            # Count total rentals for this item group
-            total_rentals = frappe.db.sql("""
-                SELECT COUNT(DISTINCT rj.name) as count
-                FROM `tabRental Job Item` rji
-                JOIN `tabRental Job` rj ON rji.parent = rj.name
-                JOIN `tabItem` i ON rji.item_code = i.name
-                WHERE rj.company = %s
-                AND rj.end_date BETWEEN %s AND %s
-                AND rj.status = 'Completed'
-                AND rj.docstatus = 1
-                AND i.item_group = %s
-            """, (filters.get("company"), filters.get("from_date"), filters.get("to_date"), group.item_group))
-            
-            total_count = cint(total_rentals[0][0]) if total_rentals and total_rentals[0][0] else 0
-            
+        for label, (total_count, damaged_count) in sorted(level.items()):
             if total_count == 0:
                 continue
             
-            # Count damaged rentals for this item group
-            damaged_rentals = frappe.db.sql("""
-                SELECT COUNT(DISTINCT rj.name) as count
-                FROM `tabRental Job Item` rji
-                JOIN `tabRental Job` rj ON rji.parent = rj.name
-                JOIN `tabItem` i ON rji.item_code = i.name
-                WHERE rj.company = %s
-                AND rj.end_date BETWEEN %s AND %s
-                AND rj.status = 'Completed'
-                AND rj.docstatus = 1
-                AND rj.has_damaged_items = 1
-                AND i.item_group = %s
-            """, (filters.get("company"), filters.get("from_date"), filters.get("to_date"), group.item_group))
-            
-            damaged_count = cint(damaged_rentals[0][0]) if damaged_rentals and damaged_rentals[0][0] else 0
-            
-            # Calculate damage rate
-            damage_rate = (damaged_count / total_count) * 100
-            
-            labels.append(group.item_group)
-            damage_rates.append(damage_rate)
+            labels.append(label)
+            damage_rates.append((damaged_count / total_count) * 100)
         
         return {
             "labels": labels,
@@ -1763,20 +1796,27 @@ def get_damage_rate_by_item_group(filters):
         )
         return {"labels": [], "datasets": [{"name": "Damage Rate (%)", "values": []}]}
 
+@cached_kpi("Rental Job", "Stock Reservation", "Maintenance Task")
 def get_item_utilization_rate_trend(filters):
     """
     Calculate the item utilization rate trend over time.
     
-    Item utilization rate trend shows the monthly or weekly utilization rate for
-    rental items over the specified period. This KPI helps identify seasonal patterns
-    and optimization opportunities.
+    Item utilization rate trend shows the daily, weekly, monthly or quarterly utilization
+    rate for rental items over the specified period. This KPI helps identify seasonal
+    patterns and optimization opportunities.
+    
+    The occupied items per day and the item creation dates are fetched once for the
+    whole trend; per-period rented and available item-days are bucketed with NumPy
+    (see `onhire_pro.reports.kpi_snapshot.utilization_by_period`), so the query count
+    does not depend on the number of periods.
     
     Args:
         filters (dict): Dictionary containing filter parameters:
             - company (str): Company name
             - from_date (str): Start date for calculation period
             - to_date (str): End date for calculation period
-            - group_by (str, optional): Grouping period ('Monthly' or 'Weekly', defaults to 'Monthly')
+            - group_by (str, optional): Grouping period ('Daily', 'Weekly', 'Monthly' or 'Quarterly',
+              defaults to 'Monthly')
             
     Returns:
         dict: Dictionary containing the utilization rate trend data:
@@ -1801,77 +1841,32 @@ def get_item_utilization_rate_trend(filters):
             )
             return {"labels": [], "datasets": [{"name": "Utilization Rate (%)", "values": []}]}
         
-        # Verify schema requirements
-        if not frappe.db.exists("DocType", "Rental Job") or not frappe.db.exists("DocType", "Item"):
-            frappe.log_error(
-                "Required doctypes do not exist for item utilization rate trend calculation",
-                "KPI Calculation Error"
-            )
-            return {"labels": [], "datasets": [{"name": "Utilization Rate (%)", "values": []}]}
-        
-        # Get grouping period from filters or use default
-        group_by = filters.get("group_by") or "Monthly"
+        # Generate time periods
+        periods = trend_periods(filters.get("from_date"), filters.get("to_date"), filters.get("group_by") or "Monthly")
         
-        # Parse from_date and to_date
-        from_date = getdate(filters.get("from_date"))
-        to_date = getdate(filters.get("to_date"))
+        if not periods:
+            return {"labels": [], "datasets": [{"name": "Utilization Rate (%)", "values": []}]}
         
-        # Generate time periods
-        periods = []
-        labels = []
+        # Get all rental items
+        rental_items = frappe.db.get_all(
+            "Item",
+            filters={
+                "is_rental_item": 1,
+                "company": filters.get("company")
+            },
+            fields=["name", "creation"]
+        )
         
-        if group_by == "Monthly":
-            # Generate monthly periods
-            current_date = from_date.replace(day=1)
-            while current_date <= to_date:
-                period_end = current_date.replace(day=calendar.monthrange(current_date.year, current_date.month)[1])
-                periods.append({
-                    "start_date": current_date,
-                    "end_date": period_end,
-                    "label": current_date.strftime("%b %Y")
-                })
-                labels.append(current_date.strftime("%b %Y"))
-                
-                # Move to next month
-                if current_date.month == 12:
-                    current_date = current_date.replace(year=current_date.year + 1, month=1)
-                else:
-                    current_date = current_date.replace(month=current_date.month + 1)
-        else:  # Weekly
-            # Generate weekly periods
-            current_date = from_date
-            # Move to the beginning of the week (Monday)
-            current_date = current_date - timedelta(days=current_date.weekday())
-            
-            while current_date <= to_date:
-                period_end = current_date + timedelta(days=6)
-                week_num = current_date.isocalendar()[1]
-                periods.append({
-                    "start_date": current_date,
-                    "end_date": period_end,
-                    "label": f"Week {week_num}, {current_date.year}"
-                })
-                labels.append(f"Week {week_num}, {current_date.year}")
-                
-                # Move to next week
-                current_date = current_date + timedelta(days=7)
+        # Get the occupied items of every day of the trend in one query
+        occupied = get_occupied_items_per_day(
+            periods[0].start_date, periods[-1].end_date, company=filters.get("company")
+        ) if rental_items else []
         
         # Calculate utilization rate for each period
-        utilization_rates = []
-        
-        for period in periods:
-            period_filters = {
-                "company": filters.get("company"),
-                "from_date": period["start_date"].strftime("%Y-%m-%d"),
-                "to_date": period["end_date"].strftime("%Y-%m-%d")
-            }
-            
-            # Calculate utilization rate for this period
-            result = calculate_item_utilization_rate(period_filters)
-            utilization_rates.append(result["value"])
+        utilization_rates = utilization_by_period(periods, occupied, [getdate(item.creation) for item in rental_items])
         
         return {
-            "labels": labels,
+            "labels": [period.label for period in periods],
             "datasets": [
                 {
                     "name": "Utilization Rate (%)",
@@ -1886,3 +1881,112 @@ def get_item_utilization_rate_trend(filters):
             "KPI Calculation Error"
         )
         return {"labels": [], "datasets": [{"name": "Utilization Rate (%)", "values": []}]}
+
+
+# Dashboard Chart Sources
+#
+# The chart sources of the Rental Management Dashboard read their KPI from one
+# cached snapshot per company and period (see onhire_pro.reports.kpi_snapshot)
+# instead of running the functions above one by one. The counts of open jobs,
+# assessments and maintenance tasks are read from the live counters
+# (see onhire_pro.utils.live_counters).
+
+def calculate_active_rental_jobs(filters=None):
+    """Active Rental Jobs number card (see `get_active_rental_jobs_count`), read from the live counters."""
+    return get_live_counter_kpi("active_rental_jobs", filters)
+
+def calculate_at_risk_stock(filters=None):
+    """At-Risk Stock number card (see `get_at_risk_stock_count`), read from the KPI snapshot."""
+    return get_snapshot_kpi("at_risk_stock", filters)
+
+def calculate_average_revenue_per_job(filters=None):
+    """Average Revenue per Rental Job number card (see `get_average_revenue_per_rental_job`), read from the KPI snapshot."""
+    return get_snapshot_kpi("average_revenue_per_rental_job", filters)
+
+def calculate_booking_conversion(filters=None):
+    """Booking Conversion Rate number card (see `calculate_booking_conversion_rate`), read from the KPI snapshot."""
+    return get_snapshot_kpi("booking_conversion_rate", filters)
+
+def calculate_customer_churn_retention_rate(filters=None):
+    """Customer Churn Rate number card (see `calculate_customer_churn_rate`), read from the KPI snapshot."""
+    return get_snapshot_kpi("customer_churn_rate", filters)
+
+def calculate_damage_rate_by_group(filters=None):
+    """Damage Rate by Item Group chart (see `get_damage_rate_by_item_group`), read from the KPI snapshot."""
+    return get_snapshot_kpi("damage_rate_by_item_group", filters)
+
+def calculate_damage_rate_cost(filters=None):
+    """Damage Rate number card (see `calculate_damage_rate`), read from the KPI snapshot."""
+    return get_snapshot_kpi("damage_rate", filters)
+
+def calculate_item_utilization(filters=None):
+    """Item Utilization Rate number card (see `calculate_item_utilization_rate`), read from the KPI snapshot."""
+    return get_snapshot_kpi("item_utilization_rate", filters)
+
+def calculate_item_utilization_rate_trend(filters=None):
+    """Item Utilization Rate Trend chart (see `get_item_utilization_rate_trend`), read from the KPI snapshot."""
+    return get_snapshot_kpi("item_utilization_rate_trend", filters)
+
+def calculate_items_awaiting_assessment(filters=None):
+    """Items Awaiting Assessment number card (see `get_items_awaiting_assessment_count`), read from the live counters."""
+    return get_live_counter_kpi("items_awaiting_assessment", filters)
+
+def calculate_items_in_maintenance(filters=None):
+    """Items in Maintenance number card (see `get_items_in_maintenance_count`), read from the live counters."""
+    return get_live_counter_kpi("items_in_maintenance", filters)
+
+def calculate_job_status_distribution(filters=None):
+    """Job Status Distribution chart (see `get_job_status_distribution`), read from the KPI snapshot."""
+    return get_snapshot_kpi("job_status_distribution", filters)
+
+def calculate_jobs_due_dispatch(filters=None):
+    """Jobs Due for Dispatch number card (see `get_jobs_due_for_dispatch_count`), read from the live counters."""
+    return get_live_counter_kpi("jobs_due_for_dispatch", filters)
+
+def calculate_jobs_due_return(filters=None):
+    """Jobs Due for Return number card (see `get_jobs_due_for_return_count`), read from the live counters."""
+    return get_live_counter_kpi("jobs_due_for_return", filters)
+
+def calculate_maintenance_turnaround_time(filters=None):
+    """Maintenance Turnaround Time number card (see `calculate_avg_maintenance_turnaround_time`), read from the KPI snapshot."""
+    return get_snapshot_kpi("maintenance_turnaround_time", filters)
+
+def calculate_open_quotation_value(filters=None):
+    """Open Rental Quotation Value number card (see `get_open_rental_quotation_value`), read from the KPI snapshot."""
+    return get_snapshot_kpi("open_rental_quotation_value", filters)
+
+def calculate_overdue_invoice_amount(filters=None):
+    """Overdue Invoice Amount number card (see `get_overdue_invoice_amount`), read from the KPI snapshot."""
+    return get_snapshot_kpi("overdue_invoice_amount", filters)
+
+def calculate_overdue_returns_rate_count(filters=None):
+    """Overdue Returns number card (see `get_overdue_returns_count`), read from the live counters."""
+    return get_live_counter_kpi("overdue_returns", filters)
+
+def calculate_rental_revenue_trend(filters=None):
+    """Rental Revenue Trend chart (see `get_rental_revenue_trend`), read from the KPI snapshot."""
+    return get_snapshot_kpi("rental_revenue_trend", filters)
+
+def calculate_rental_duration(filters=None):
+    """Average Rental Duration number card (see `calculate_average_rental_duration`), read from the KPI snapshot."""
+    return get_snapshot_kpi("average_rental_duration", filters)
+
+def calculate_revenue_per_item_category(filters=None):
+    """Revenue per Item Category chart (see `get_revenue_per_item_category`), read from the KPI snapshot."""
+    return get_snapshot_kpi("revenue_per_item_category", filters)
+
+def calculate_stock_reservation_conflicts(filters=None):
+    """Stock Reservation Conflicts number card (see `get_stock_reservation_conflicts`), read from the KPI snapshot."""
+    return get_snapshot_kpi("stock_reservation_conflicts", filters)
+
+def calculate_top_customers_by_value(filters=None):
+    """Top 5 Customers by Rental Value chart (see `get_top_5_customers_by_rental_value`), read from its leaderboard."""
+    return get_snapshot_kpi("top_5_customers_by_rental_value", filters)
+
+def calculate_top_rented_items(filters=None):
+    """Top 5 Most Rented Items chart (see `get_top_5_most_rented_items`), read from its leaderboard."""
+    return get_snapshot_kpi("top_5_most_rented_items", filters)
+
+def calculate_total_rental_revenue(filters=None):
+    """Total Rental Revenue number card (see `get_total_rental_revenue`), read from the KPI snapshot."""
+    return get_snapshot_kpi("total_rental_revenue", filters)
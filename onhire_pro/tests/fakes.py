@@ -0,0 +1,45 @@
+import frappe
+
+from onhire_pro.utils.schema_capabilities import SQL_FRAGMENTS
+
+
+class FakeRedis:
+    """Just enough of frappe.cache() for the caches under test, kept in dictionaries."""
+
+    def __init__(self):
+        self.values = {}
+        self.hashes = {}
+
+    def get_value(self, key):
+        return self.values.get(key)
+
+    def set_value(self, key, value, expires_in_sec=None):
+        self.values[key] = value
+
+    def delete_value(self, key):
+        self.values.pop(key, None)
+        self.hashes.pop(key, None)
+
+    def hget(self, name, key):
+        return self.hashes.get(name, {}).get(key)
+
+    def hgetall(self, name):
+        return dict(self.hashes.get(name, {}))
+
+    def hset(self, name, key, value):
+        self.hashes.setdefault(name, {})[key] = value
+
+    def hdel(self, name, key):
+        self.hashes.get(name, {}).pop(key, None)
+
+
+def mocked_db_schema_capabilities():
+    """
+    Schema capability map tracking no doctypes, so existence and column checks ask
+    the (mocked) frappe.db; SQL fragments are compiled with frappe.db.has_column.
+    """
+    return {
+        "doctypes": {},
+        "columns": {},
+        "fragments": {name: build(frappe.db.has_column) for name, build in SQL_FRAGMENTS.items()},
+    }
@@ -0,0 +1,267 @@
+import unittest
+import frappe
+import numpy as np
+from datetime import datetime
+
+from onhire_pro.utils.occupancy import (
+    IntervalSet, day_boundaries, free_window_starts, true_runs, best_fit_order,
+    over_capacity_segments, daily_interval_weight, bucket_days, period_sums, window_sums, overlaps,
+    SECONDS_PER_DAY
+)
+from unittest.mock import patch
+from onhire_pro.utils.availability import check_availability
+from onhire_pro.utils.availability_index import ItemReservationIndex, to_timestamp, rental_period
+from onhire_pro.utils.serial_allocator import SerialPool
+
+DAY = SECONDS_PER_DAY
+
+
+class TestOccupancyEngine(unittest.TestCase):
+    """
+    Test suite for the sweep-line occupancy engine behind availability checks.
+
+    The engine is pure NumPy, so these tests run without a site.
+    """
+
+    def test_back_to_back_bookings_do_not_stack(self):
+        """Bookings that follow each other inside a window only use one unit."""
+        bookings = IntervalSet([0, DAY, 2 * DAY], [DAY, 2 * DAY, 3 * DAY], [1, 1, 1])
+
+        self.assertEqual(bookings.overlap_weight(0, 3 * DAY, inclusive=False), 3.0)
+        self.assertEqual(bookings.peak(0, 3 * DAY), 1.0)
+
+    def test_overlapping_bookings_stack(self):
+        """Overlapping bookings add up at the instant they are all out."""
+        bookings = IntervalSet([0, DAY, 1.5 * DAY], [2 * DAY, 3 * DAY, 4 * DAY], [2, 3, 1])
+
+        self.assertEqual(bookings.peak(0, 4 * DAY), 6.0)
+        self.assertEqual(bookings.peak(3 * DAY, 4 * DAY), 1.0)
+        self.assertEqual(bookings.peak(5 * DAY, 6 * DAY), 0.0)
+
+    def test_booking_spanning_window_counts(self):
+        """A booking that starts before and ends after the window is active throughout."""
+        bookings = IntervalSet([0], [10 * DAY], [4])
+        self.assertEqual(bookings.peak(3 * DAY, 4 * DAY), 4.0)
+
+    def test_daily_profile(self):
+        """The profile reports the peak within each day."""
+        bookings = IntervalSet([0, 0.5 * DAY, 2 * DAY], [DAY, 3 * DAY, 3 * DAY], [1, 2, 5])
+
+        profile = bookings.profile(day_boundaries(0, 4))
+
+        np.testing.assert_array_equal(profile, [3.0, 2.0, 7.0, 0.0])
+
+    def test_exclude_own_bookings(self):
+        """Excluded bookings are left out of both the peak and the profile."""
+        bookings = IntervalSet([0, DAY], [2 * DAY, 3 * DAY], [2, 3])
+        own = IntervalSet([DAY], [3 * DAY], [3])
+
+        self.assertEqual(bookings.peak(0, 3 * DAY, exclude=own), 2.0)
+        np.testing.assert_array_equal(bookings.profile(day_boundaries(0, 3), exclude=own), [2.0, 2.0, 0.0])
+
+    def test_peak_matches_brute_force(self):
+        """The vectorized sweep agrees with checking every event instant."""
+        rng = np.random.default_rng(7)
+        starts = rng.integers(0, 60, 300).astype(float) * DAY / 4
+        ends = starts + rng.integers(1, 40, 300) * DAY / 4
+        weights = rng.integers(1, 4, 300).astype(float)
+        bookings = IntervalSet(starts, ends, weights)
+
+        lo, hi = 5 * DAY, 12 * DAY
+        points = np.concatenate(([lo], starts[(starts > lo) & (starts < hi)]))
+        expected = max(weights[(starts <= p) & (ends > p)].sum() for p in points)
+
+        self.assertEqual(bookings.peak(lo, hi), expected)
+
+    def test_empty_set(self):
+        """An item without bookings is never occupied."""
+        bookings = IntervalSet([], [], [])
+
+        self.assertEqual(bookings.peak(0, DAY), 0.0)
+        self.assertEqual(bookings.overlap_weight(0, DAY), 0.0)
+        np.testing.assert_array_equal(bookings.profile(day_boundaries(0, 2)), [0.0, 0.0])
+
+    def test_free_window_starts(self):
+        """A day can start a window only if the following min_slots days are all free."""
+        busy = [False, False, True, False, False, False, True]
+
+        np.testing.assert_array_equal(free_window_starts(busy, 2), [True, False, False, True, True, False])
+        np.testing.assert_array_equal(free_window_starts(busy, 4), [False, False, False, False])
+        self.assertEqual(free_window_starts(busy, 8).shape, (0,))
+
+    def test_free_window_starts_per_serial(self):
+        """Serials are checked row by row, so a window is never split across two units."""
+        busy = [
+            [False, False, False, True, True],
+            [True, True, False, False, False],
+        ]
+
+        starts = free_window_starts(busy, 3)
+
+        np.testing.assert_array_equal(starts, [[True, False, False], [False, False, True]])
+        np.testing.assert_array_equal(starts.sum(axis=0) >= 1, [True, False, True])
+
+    def test_true_runs(self):
+        """Runs of free days are found in one pass."""
+        starts, lengths = true_runs([True, True, False, True, False, False, True, True, True])
+
+        np.testing.assert_array_equal(starts, [0, 3, 6])
+        np.testing.assert_array_equal(lengths, [2, 1, 3])
+
+    def test_free_days_from_profile(self):
+        """Free windows follow from the daily profile against capacity."""
+        bookings = IntervalSet([DAY, 4 * DAY], [3 * DAY, 5 * DAY], [2, 1])
+        booked = bookings.profile(day_boundaries(0, 8))
+
+        can_start = free_window_starts(3 - booked < 2, 2)
+        starts, lengths = true_runs(can_start)
+
+        np.testing.assert_array_equal(starts, [3])
+        np.testing.assert_array_equal(lengths, [4])
+
+    def test_idle_gaps(self):
+        """Idle time is measured to the nearest booking on each side of a free window."""
+        bookings = IntervalSet([0, 5 * DAY, 9 * DAY], [2 * DAY, 6 * DAY, 10 * DAY], [1, 1, 1])
+
+        self.assertEqual(bookings.idle_gaps(3 * DAY, 4 * DAY), (DAY, DAY))
+        self.assertEqual(bookings.idle_gaps(11 * DAY, 12 * DAY), (DAY, float("inf")))
+        self.assertEqual(IntervalSet([], [], []).idle_gaps(0, DAY), (float("inf"), float("inf")))
+
+    def test_best_fit_order(self):
+        """Tight gaps are filled first and idle units are kept for long bookings."""
+        inf = float("inf")
+        before = [inf, 3 * DAY, DAY, 0.0]
+        after = [inf, DAY, DAY, inf]
+
+        np.testing.assert_array_equal(best_fit_order(before, after), [2, 1, 3, 0])
+
+    def test_over_capacity_segments(self):
+        """The sweep reports each over-capacity period with every booking in it and its peak."""
+        segments = over_capacity_segments([0, 1, 2, 5], [3, 4, 3, 6], [1, 1, 1, 1], 2)
+
+        self.assertEqual(segments, [(2.0, 3.0, 3.0, [0, 1, 2])])
+        self.assertEqual(over_capacity_segments([0, 3], [3, 6], [2, 2], 2), [])
+        self.assertEqual(over_capacity_segments([], [], [], 1), [])
+
+    def test_over_capacity_matches_pairwise(self):
+        """The linear sweep finds the same over-booked days as checking every day."""
+        rng = np.random.default_rng(11)
+        starts = rng.integers(0, 100, 200)
+        ends = starts + rng.integers(1, 15, 200)
+        weights = rng.integers(1, 3, 200).astype(float)
+
+        segments = over_capacity_segments(starts, ends, weights, 8)
+
+        load = np.zeros(120)
+        for start, end, weight in zip(starts, ends, weights):
+            load[start:end] += weight
+        flagged = np.zeros(120, dtype=bool)
+        for start, end, peak, members in segments:
+            flagged[int(start):int(end)] = True
+            self.assertEqual(peak, load[int(start):int(end)].max())
+
+        np.testing.assert_array_equal(flagged, load > 8)
+
+    def test_daily_interval_weight_clips_to_range(self):
+        """Intervals are clipped to the range; open-ended ones run to its end."""
+        daily = daily_interval_weight([98, 103, 90], [102, 200, 95], [1, 2, 5], 100, 5)
+        np.testing.assert_array_equal(daily, [1, 1, 0, 2, 2])
+
+    def test_daily_interval_weight_matches_loop(self):
+        """Event accumulation gives the same per-day totals as filling every day."""
+        rng = np.random.default_rng(5)
+        starts = rng.integers(0, 400, 300)
+        ends = starts + rng.integers(1, 60, 300)
+        weights = rng.integers(1, 4, 300).astype(float)
+
+        expected = np.zeros(500)
+        for start, end, weight in zip(starts, ends, weights):
+            expected[start:end] += weight
+
+        np.testing.assert_array_equal(daily_interval_weight(starts, ends, weights, 50, 400), expected[50:450])
+
+    def test_bucket_days_and_period_sums(self):
+        """Day totals are bucketed by day and summed per consecutive period."""
+        daily = bucket_days([10, 12, 12, 30, 9], [1, 2, 3, 4, 5], 10, 10)
+        np.testing.assert_array_equal(daily, [1, 0, 5, 0, 0, 0, 0, 0, 0, 0])
+        np.testing.assert_array_equal(period_sums(np.arange(10), [0, 3, 7]), [3, 18, 24])
+        self.assertEqual(len(period_sums([], [])), 0)
+
+    def test_window_sums(self):
+        """Windows sum the rows of the days they cover, including both ends."""
+        sums = window_sums([3, 5, 5, 9], [[1, 10], [2, 20], [3, 30], [4, 40]], [0, 5, 6, 10], [5, 9, 8, 12])
+        np.testing.assert_array_equal(sums, [[6, 60], [9, 90], [0, 0], [0, 0]])
+        np.testing.assert_array_equal(window_sums([], [], [1], [2]), [[0]])
+
+
+
+class TestReservationBoundaries(unittest.TestCase):
+    """
+    Test suite for the boundary rule shared by every availability check.
+
+    Reservations are half-open [from_date, to_date): the index, the check of
+    pending bulk lines and the serial allocator all let a reservation start at
+    the instant another ends. The index is built from rows, so no site is needed.
+    """
+
+    def setUp(self):
+        self.index = ItemReservationIndex("GEN-10", [
+            {"name": "SR-0001", "serial_no": "SN-1", "qty": 1, "reference_name": "RJ-0001",
+             "from_date": "2025-03-01 10:00:00", "to_date": "2025-03-05 10:00:00"},
+            {"name": "SR-0002", "serial_no": None, "qty": 2, "reference_name": "RJ-0001",
+             "from_date": "2025-03-01 10:00:00", "to_date": "2025-03-05 10:00:00"},
+        ])
+
+    def test_overlaps(self):
+        """Intervals that only touch do not overlap."""
+        self.assertFalse(overlaps(0, DAY, DAY, 2 * DAY))
+        self.assertFalse(overlaps(DAY, 2 * DAY, 0, DAY))
+        self.assertTrue(overlaps(0, DAY + 1, DAY, 2 * DAY))
+
+    def test_index_touching_boundary(self):
+        """A booking starting when a reservation ends neither conflicts nor adds to the peak."""
+        self.assertIsNone(self.index.serial_conflict("SN-1", "2025-03-05 10:00:00", "2025-03-08 10:00:00"))
+        self.assertEqual(self.index.free_serials(["SN-1"], "2025-03-05 10:00:00", "2025-03-08 10:00:00"), ["SN-1"])
+        self.assertEqual(self.index.peak_booked_qty("2025-03-05 10:00:00", "2025-03-08 10:00:00"), 0.0)
+        self.assertEqual(self.index.booked_qty("2025-03-05 10:00:00", "2025-03-08 10:00:00"), 0.0)
+
+        self.assertIsNone(self.index.serial_conflict("SN-1", "2025-02-27 10:00:00", "2025-03-01 10:00:00"))
+        self.assertEqual(self.index.serial_conflict("SN-1", "2025-03-05 09:59:00", "2025-03-08 10:00:00").name,
+                         "SR-0001")
+        self.assertEqual(self.index.peak_booked_qty("2025-03-05 09:59:00", "2025-03-08 10:00:00"), 2.0)
+
+    def test_date_only_period_covers_end_date(self):
+        """A period given as dates includes its end date, so a booking starting that day counts."""
+        self.assertEqual(rental_period("2025-03-07", "2025-03-07"),
+                         (datetime(2025, 3, 7), datetime(2025, 3, 8)))
+        self.assertEqual(rental_period("2025-03-01", "2025-03-07 09:00:00")[1], datetime(2025, 3, 7, 9))
+
+        index = ItemReservationIndex("GEN-10", [
+            {"name": "SR-0003", "serial_no": None, "qty": 3, "reference_name": "RJ-0002",
+             "from_date": "2025-03-07 09:00:00", "to_date": "2025-03-09 09:00:00"},
+        ])
+        stock = {"GEN-10": frappe._dict(item_name="Generator", has_serial_no=0, actual_qty=5.0, serial_nos=[])}
+        with patch('onhire_pro.utils.availability.get_default_warehouse', return_value="Stores"), \
+                patch('onhire_pro.utils.availability.get_item_stock', return_value=stock), \
+                patch('onhire_pro.utils.availability.get_item_indexes', return_value={"GEN-10": index}):
+            results = check_availability([
+                {"item_code": "GEN-10", "start_date": "2025-03-01", "end_date": "2025-03-07"},
+                {"item_code": "GEN-10", "start_date": "2025-03-07", "end_date": "2025-03-07"},
+                {"item_code": "GEN-10", "start_date": "2025-03-01", "end_date": "2025-03-06"},
+                {"item_code": "GEN-10", "start_date": "2025-03-01 08:00:00", "end_date": "2025-03-07 09:00:00"},
+            ])
+
+        self.assertEqual([result.available_qty for result in results], [2.0, 2.0, 5.0, 5.0])
+
+    def test_allocator_touching_boundary(self):
+        """The allocator hands out serials whose booked or pending periods only touch the window."""
+        pending = {"SN-2": [frappe._dict(from_ts=to_timestamp("2025-03-08 10:00:00"),
+                                        to_ts=to_timestamp("2025-03-10 10:00:00"))]}
+        pool = SerialPool("GEN-10", ["SN-1", "SN-2"], self.index, pending=pending)
+
+        self.assertEqual(pool.free_serials("2025-03-05 10:00:00", "2025-03-08 10:00:00"), ["SN-1", "SN-2"])
+        self.assertEqual(pool.free_serials("2025-03-05 09:59:00", "2025-03-08 10:01:00"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
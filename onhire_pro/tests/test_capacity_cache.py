@@ -0,0 +1,89 @@
+import unittest
+import frappe
+from unittest.mock import patch, MagicMock
+
+from onhire_pro.utils.capacity_cache import (
+    get_item_capacity,
+    get_item_capacities,
+    prefetch_item_capacities,
+    invalidate_stock_ledger_entry,
+    clear_capacity_cache
+)
+from onhire_pro.tests.fakes import FakeRedis
+
+
+class TestCapacityCache(unittest.TestCase):
+    """
+    Test suite for the Bin capacity cache used by availability checks.
+
+    Validates that a warm cache answers without Bin queries, that prefetching
+    loads a batch with one query, and that Stock Ledger Entries invalidate it.
+    """
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.cache_patcher = patch('frappe.cache', return_value=self.redis)
+        self.cache_patcher.start()
+
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.mock_db.sql.return_value = [("GEN-5KVA", 5.0), ("LIGHT-TOWER", 2.0)]
+        self.mock_db.after_commit = MagicMock()
+
+        clear_capacity_cache()
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+        self.db_patcher.stop()
+        frappe.local.onhire_capacity_cache = None
+
+    def bin_queries(self):
+        return [call for call in self.mock_db.sql.call_args_list if "tabBin" in call.args[0]]
+
+    def test_prefetch_loads_batch_with_one_query(self):
+        """A whole batch of items costs one grouped Bin query."""
+        prefetch_item_capacities(["GEN-5KVA", "LIGHT-TOWER", "NO-STOCK"])
+
+        self.assertEqual(len(self.bin_queries()), 1)
+        self.assertEqual(
+            get_item_capacities(["GEN-5KVA", "LIGHT-TOWER", "NO-STOCK"]),
+            {"GEN-5KVA": 5.0, "LIGHT-TOWER": 2.0, "NO-STOCK": 0.0}
+        )
+        self.assertEqual(len(self.bin_queries()), 1)
+
+    def test_warm_cache_needs_no_bin_query(self):
+        """Another request (empty local cache) is answered from Redis."""
+        prefetch_item_capacities(["GEN-5KVA", "LIGHT-TOWER"])
+        frappe.local.onhire_capacity_cache = {}
+        self.mock_db.sql.reset_mock()
+
+        self.assertEqual(get_item_capacity("GEN-5KVA"), 5.0)
+        self.assertEqual(get_item_capacity("LIGHT-TOWER"), 2.0)
+        self.assertEqual(self.bin_queries(), [])
+
+    def test_warehouses_are_cached_separately(self):
+        """Stock in one warehouse does not answer a lookup for all warehouses."""
+        get_item_capacity("GEN-5KVA", "Stores - TC")
+        get_item_capacity("GEN-5KVA")
+
+        self.assertEqual(len(self.bin_queries()), 2)
+
+    def test_stock_ledger_entry_invalidates(self):
+        """Posting stock drops the item for its warehouse and for all warehouses."""
+        get_item_capacity("GEN-5KVA", "Stores - TC")
+        get_item_capacity("GEN-5KVA")
+        get_item_capacity("LIGHT-TOWER")
+
+        invalidate_stock_ledger_entry(frappe._dict(item_code="GEN-5KVA", warehouse="Stores - TC"))
+        self.mock_db.sql.reset_mock()
+
+        get_item_capacity("GEN-5KVA", "Stores - TC")
+        get_item_capacity("GEN-5KVA")
+        get_item_capacity("LIGHT-TOWER")
+
+        self.assertEqual(len(self.bin_queries()), 2)
+        self.mock_db.after_commit.add.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
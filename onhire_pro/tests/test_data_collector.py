@@ -0,0 +1,145 @@
+import json
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from onhire_pro.reports.forecasting.data_collector import (
+    find_missing_kpi_days,
+    backfill_kpi_series,
+    store_historical_kpi_values,
+    historical_kpi_value_name,
+    create_historical_kpi_value_doctype
+)
+
+
+class TestHistoricalKPIValues(unittest.TestCase):
+    """
+    Test suite for the historical KPI values forecasts are trained on.
+
+    Validates that missing days are found from the stored values, that backfills
+    calculate only those days and that bulk upserts are chunked and name values
+    like the DocType does.
+    """
+
+    def setUp(self):
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.log_patcher = patch('frappe.log_error')
+        self.mock_log_error = self.log_patcher.start()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.log_patcher.stop()
+
+    def _inserts(self):
+        return [call for call in self.mock_db.sql.call_args_list
+                if call[0][0].strip().startswith("INSERT INTO `tabHistorical KPI Value`")]
+
+    def test_find_missing_kpi_days(self):
+        """Days without a stored value are returned per company, in date order."""
+        self.mock_db.sql.return_value = [
+            ("Test Company", date(2025, 3, 1)), ("Test Company", date(2025, 3, 3)),
+            ("Other Company", date(2025, 3, 2)),
+        ]
+
+        missing = find_missing_kpi_days("total_rental_revenue", ["Test Company", "Other Company"],
+                                        "2025-03-01", "2025-03-03")
+
+        self.assertEqual(missing, [
+            ("Test Company", date(2025, 3, 2)),
+            ("Other Company", date(2025, 3, 1)), ("Other Company", date(2025, 3, 3)),
+        ])
+        self.assertEqual(self.mock_db.sql.call_count, 1)
+        self.assertEqual(find_missing_kpi_days("total_rental_revenue", [], "2025-03-01", "2025-03-03"), [])
+
+    @patch('onhire_pro.reports.forecasting.data_collector.HISTORICAL_ROWS_PER_INSERT', 2)
+    def test_store_in_chunks(self):
+        """Values are upserted HISTORICAL_ROWS_PER_INSERT rows at a time; rows without a value are skipped."""
+        stored = store_historical_kpi_values("total_rental_revenue", [
+            ("Test Company", "2025-03-01", 100),
+            ("Test Company", "2025-03-02", None),
+            ("Test Company", "2025-03-03", 300),
+            ("Other Company", "2025-03-01", 50.5),
+        ])
+
+        self.assertEqual(stored, 3)
+        inserts = self._inserts()
+        self.assertEqual([len(call[0][1]) for call in inserts], [20, 10])
+        self.assertIn("ON DUPLICATE KEY UPDATE", inserts[0][0][0])
+        self.assertEqual(inserts[0][0][0].count("(%s, %s, %s, %s, %s, 0, %s, %s, %s, %s, %s)"), 2)
+
+        values = inserts[1][0][1]
+        self.assertEqual(values[0], historical_kpi_value_name("total_rental_revenue", "2025-03-01", "Other Company"))
+        self.assertEqual(values[5:9], ("total_rental_revenue", "2025-03-01", "Other Company", 50.5))
+        self.assertEqual(json.loads(values[9]),
+                         {"company": "Other Company", "from_date": "2025-03-01", "to_date": "2025-03-01"})
+
+    def test_store_error_is_logged(self):
+        """A failed upsert is logged and reports nothing stored."""
+        self.mock_db.sql.side_effect = Exception("Deadlock found")
+
+        self.assertEqual(store_historical_kpi_values("total_rental_revenue", [("Test Company", "2025-03-01", 1)]), 0)
+        self.mock_log_error.assert_called_once()
+
+    @patch('onhire_pro.reports.forecasting.data_collector.evaluate_kpi_batch')
+    def test_backfill_batch_kpi(self, mock_evaluate_kpi_batch):
+        """KPIs in BATCH_KPIS are evaluated for all missing days at once and stored in one upsert."""
+        self.mock_db.sql.side_effect = lambda query, values=None, **kwargs: (
+            [("Test Company", date(2025, 3, 2))] if "SELECT company, date" in query else []
+        )
+        mock_evaluate_kpi_batch.return_value = [10.0, 30.0, 5.0, None, 7.0]
+
+        backfilled = backfill_kpi_series("total_rental_revenue", ["Test Company", "Other Company"],
+                                         "2025-03-01", "2025-03-03")
+
+        self.assertEqual(backfilled, 4)
+        mock_evaluate_kpi_batch.assert_called_once_with("total_rental_revenue", [
+            ("Test Company", date(2025, 3, 1), date(2025, 3, 1)),
+            ("Test Company", date(2025, 3, 3), date(2025, 3, 3)),
+            ("Other Company", date(2025, 3, 1), date(2025, 3, 1)),
+            ("Other Company", date(2025, 3, 2), date(2025, 3, 2)),
+            ("Other Company", date(2025, 3, 3), date(2025, 3, 3)),
+        ])
+        self.assertEqual(len(self._inserts()), 1)
+
+    @patch('onhire_pro.reports.forecasting.data_collector.evaluate_kpi_batch')
+    def test_backfill_with_filters(self, mock_evaluate_kpi_batch):
+        """Filtered KPIs are calculated day by day, and nothing is calculated when no day is missing."""
+        self.mock_db.sql.return_value = []
+        filters = {"item_group": "Generators"}
+
+        with patch('onhire_pro.reports.forecasting.data_collector.KPIDataCollector._calculate_kpi_value',
+                   return_value=42.0) as mock_calculate:
+            backfilled = backfill_kpi_series("total_rental_revenue", ["Test Company"], "2025-03-01", "2025-03-02",
+                                             filters)
+
+        self.assertEqual(backfilled, 2)
+        mock_evaluate_kpi_batch.assert_not_called()
+        self.assertEqual([call[0] for call in mock_calculate.call_args_list], [
+            ("total_rental_revenue", date(2025, 3, 1), filters),
+            ("total_rental_revenue", date(2025, 3, 2), filters),
+        ])
+        self.assertEqual(json.loads(self._inserts()[0][0][1][9])["item_group"], "Generators")
+
+        self.mock_db.sql.reset_mock()
+        self.mock_db.sql.return_value = [("Test Company", date(2025, 3, 1))]
+        self.assertEqual(backfill_kpi_series("total_rental_revenue", ["Test Company"], "2025-03-01", "2025-03-01"), 0)
+        self.assertEqual(self._inserts(), [])
+
+    @patch('onhire_pro.reports.forecasting.data_collector.doctype_exists', return_value=False)
+    def test_historical_kpi_value_name(self, mock_doctype_exists):
+        """Bulk upserts name values like the DocType's autoname format."""
+        with patch('frappe.new_doc') as mock_new_doc:
+            create_historical_kpi_value_doctype()
+        autoname = mock_new_doc.return_value.autoname
+
+        self.assertTrue(autoname.startswith("format:"))
+        self.assertEqual(
+            historical_kpi_value_name("total_rental_revenue", "2025-03-01", "Test Company"),
+            autoname[len("format:"):].format(kpi_name="total_rental_revenue", date="2025-03-01",
+                                             company="Test Company")
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+import unittest
+import pandas as pd
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+from onhire_pro.reports.forecasting.forecasting_engine import (
+    ForecastingEngine,
+    cross_validate_horizons,
+    slice_forecast
+)
+
+
+def _history(days=120, start="2025-01-01"):
+    return pd.DataFrame({"ds": pd.date_range(start, periods=days, freq="D"), "y": [float(day % 7) for day in range(days)]})
+
+
+class TestForecastHorizons(unittest.TestCase):
+    """
+    Test suite for forecasting several horizons at once.
+
+    Validates that shorter horizons are slices of the longest forecast and
+    cross-validation, and that only the longest forecast is stored.
+    """
+
+    def test_slice_forecast(self):
+        """A horizon keeps the history and the days up to `periods` after it."""
+        model = SimpleNamespace(history=_history(days=31))
+        forecast = pd.DataFrame({"ds": pd.date_range("2025-01-01", periods=31 + 90, freq="D")})
+
+        sliced = slice_forecast(forecast, model, 30)
+
+        self.assertEqual(len(sliced), 31 + 30)
+        self.assertEqual(sliced["ds"].max(), pd.Timestamp("2025-03-02"))
+
+    @patch('onhire_pro.reports.forecasting.forecasting_engine.performance_metrics')
+    @patch('onhire_pro.reports.forecasting.forecasting_engine.cross_validation')
+    def test_cross_validate_horizons(self, mock_cross_validation, mock_performance_metrics):
+        """Each horizon is evaluated on the predictions at most that many days after their cutoff."""
+        cutoff = pd.Timestamp("2025-04-01")
+        mock_cross_validation.return_value = pd.DataFrame({
+            "cutoff": [cutoff] * 90,
+            "ds": pd.date_range(cutoff + pd.Timedelta(days=1), periods=90, freq="D"),
+        })
+        mock_performance_metrics.side_effect = lambda cv: pd.DataFrame({"mape": [float(len(cv))], "rmse": [1.0]})
+
+        evaluations = cross_validate_horizons(MagicMock(), [7, 30, 90])
+
+        self.assertEqual(mock_cross_validation.call_args[1]["horizon"], "90 days")
+        self.assertEqual({period: evaluation["mape"] for period, evaluation in evaluations.items()},
+                         {7: 7.0, 30: 30.0, 90: 90.0})
+        self.assertEqual(evaluations[7]["cv_results"]["ds"].max(), cutoff + pd.Timedelta(days=7))
+
+    @patch('onhire_pro.reports.forecasting.forecasting_engine.nowdate', return_value="2025-04-30")
+    def test_store_forecast_result_stores_longest_horizon(self, mock_nowdate):
+        """Only the longest forecast is stored; shorter horizons report their part of it."""
+        engine = ForecastingEngine.__new__(ForecastingEngine)
+        engine.company = "Test Company"
+        engine.store_forecast = MagicMock(return_value=90)
+
+        forecast = pd.DataFrame({"ds": pd.date_range("2025-05-01", periods=90, freq="D"), "yhat": 1.0})
+        task = {"kpi_name": "total_rental_revenue", "periods": [30, 90], "history": _history()}
+        result = {
+            "forecasts": {30: forecast.head(30), 90: forecast},
+            "evaluations": {30: {"mape": 0.05}, 90: {"mape": 0.2}},
+            "plot_files": {30: None, 90: None},
+            "errors": [],
+        }
+
+        results = engine.store_forecast_result(task, result)
+
+        engine.store_forecast.assert_called_once()
+        args, kwargs = engine.store_forecast.call_args
+        self.assertIs(args[1], forecast)
+        self.assertEqual(kwargs["accuracy"], 0.2)
+        self.assertEqual(results["results"][30]["stored_count"], 30)
+        self.assertEqual(results["results"][90]["stored_count"], 90)
+
+
+if __name__ == '__main__':
+    unittest.main()
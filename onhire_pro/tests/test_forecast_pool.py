@@ -0,0 +1,92 @@
+import signal
+import time
+import unittest
+from unittest.mock import patch
+
+from onhire_pro.reports.forecasting import forecasting_engine
+from onhire_pro.reports.forecasting.forecasting_engine import run_forecast_tasks, _run_forecast_task_in_worker
+
+TIMED_OUT = {"error": "Forecast did not finish within 1 seconds", "message": "Timed out"}
+
+
+def _stub_forecast_task(task):
+    """Stand-in for `run_forecast_task` doing what the task says instead of fitting a model."""
+    if task.get("ignore_timeout"):
+        signal.signal(signal.SIGALRM, signal.SIG_IGN)
+    time.sleep(task.get("sleep", 0))
+    if task.get("raise"):
+        raise ValueError(task["raise"])
+    return {"kpi_name": task["kpi_name"], "cv_parallel": task.get("cv_parallel")}
+
+
+def _stub_worker(task, timeout):
+    """Pool worker running the real `_run_forecast_task_in_worker` around `_stub_forecast_task`."""
+    with patch.object(forecasting_engine, 'run_forecast_task', _stub_forecast_task):
+        return _run_forecast_task_in_worker(task, timeout)
+
+
+class TestForecastPool(unittest.TestCase):
+    """
+    Test suite for running forecast tasks in worker processes.
+
+    Validates that results come back in task order, that a task running past
+    its timeout is stopped in the worker (or by the parent if the worker does
+    not stop) and that failures are returned in the error shape.
+    """
+
+    def test_worker_timeout(self):
+        """A task is interrupted by SIGALRM after `timeout` seconds and the alarm is cleared."""
+        started = time.monotonic()
+        with patch.object(forecasting_engine, 'run_forecast_task', _stub_forecast_task):
+            result = _run_forecast_task_in_worker({"kpi_name": "total_rental_revenue", "sleep": 5}, 1)
+
+        self.assertEqual(result, TIMED_OUT)
+        self.assertLess(time.monotonic() - started, 4)
+        self.assertEqual(signal.alarm(0), 0)
+
+    def test_worker_cross_validates_in_threads(self):
+        """Pool workers cannot start processes, so process cross-validation falls back to threads."""
+        with patch.object(forecasting_engine, 'run_forecast_task', _stub_forecast_task):
+            result = _run_forecast_task_in_worker({"kpi_name": "total_rental_revenue", "cv_parallel": "processes"}, 5)
+
+        self.assertEqual(result["cv_parallel"], "threads")
+
+    @patch('onhire_pro.reports.forecasting.forecasting_engine._run_forecast_task_in_worker', _stub_worker)
+    def test_results_in_task_order(self):
+        """Results follow the tasks; a timed-out or failed task returns its error without stopping the others."""
+        results = run_forecast_tasks([
+            {"kpi_name": "total_rental_revenue", "sleep": 0.5},
+            {"kpi_name": "booking_conversion_rate", "raise": "Prophet failed"},
+            {"kpi_name": "item_utilization_rate", "sleep": 5},
+            {"kpi_name": "average_rental_duration"},
+        ], workers=2, timeout=1)
+
+        self.assertEqual(results, [
+            {"kpi_name": "total_rental_revenue", "cv_parallel": None},
+            {"error": "Forecast worker failed: Prophet failed", "message": "Prophet failed"},
+            TIMED_OUT,
+            {"kpi_name": "average_rental_duration", "cv_parallel": None},
+        ])
+
+    @patch('onhire_pro.reports.forecasting.forecasting_engine.FORECAST_POOL_GRACE_SECONDS', 5)
+    @patch('onhire_pro.reports.forecasting.forecasting_engine._run_forecast_task_in_worker', _stub_worker)
+    def test_parent_deadline(self):
+        """The parent stops waiting for a worker that does not stop itself after the timeouts and the grace."""
+        started = time.monotonic()
+        results = run_forecast_tasks([
+            {"kpi_name": "total_rental_revenue"},
+            {"kpi_name": "booking_conversion_rate", "sleep": 60, "ignore_timeout": True},
+        ], workers=2, timeout=1)
+
+        self.assertEqual(results, [{"kpi_name": "total_rental_revenue", "cv_parallel": None}, TIMED_OUT])
+        self.assertLess(time.monotonic() - started, 30)
+
+    def test_no_tasks(self):
+        """No tasks start no pool."""
+        with patch('multiprocessing.get_context') as mock_get_context:
+            self.assertEqual(run_forecast_tasks([]), [])
+        mock_get_context.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import re
+import sqlite3
+import unittest
+import pandas as pd
+from unittest.mock import patch, MagicMock
+
+from onhire_pro.doctype.forecasted_kpi_value.forecasted_kpi_value import forecasted_kpi_value_name
+from onhire_pro.reports.forecasting.forecasting_engine import ForecastingEngine
+
+
+class ForecastDatabase:
+    """In-memory stand-in for `frappe.db.sql` running the forecast DELETE on SQLite."""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute("CREATE TABLE `tabForecasted KPI Value` (kpi_name TEXT, company TEXT, "
+                          "forecast_date TEXT, target_date TEXT)")
+
+    def sql(self, query, values=None, as_dict=False):
+        query = re.sub(r"%\((\w+)\)s", r":\1", query)
+        values = {key: str(value) if hasattr(value, "isoformat") else value for key, value in (values or {}).items()}
+        return self.conn.execute(query, values).fetchall()
+
+    def rows(self):
+        return self.conn.execute("SELECT kpi_name, company, forecast_date, target_date FROM `tabForecasted KPI Value` "
+                                 "ORDER BY kpi_name, company, forecast_date, target_date").fetchall()
+
+
+class TestForecastStorage(unittest.TestCase):
+    """
+    Test suite for storing forecasted KPI values.
+
+    Validates that forecasts are upserted FORECAST_ROWS_PER_INSERT rows at a
+    time, and that a new forecast only retires the values earlier forecasts made
+    for the days after it.
+    """
+
+    def setUp(self):
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.log_patcher = patch('frappe.log_error')
+        self.mock_log_error = self.log_patcher.start()
+
+        self.engine = ForecastingEngine.__new__(ForecastingEngine)
+        self.engine.company = "Test Company"
+        self.engine.create_forecasted_kpi_value_doctype = MagicMock()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.log_patcher.stop()
+
+    def _forecast(self, start="2025-04-29", days=7):
+        values = [float(day) for day in range(days)]
+        return pd.DataFrame({
+            "ds": pd.date_range(start, periods=days, freq="D"),
+            "yhat": values,
+            "yhat_lower": [value - 1 for value in values],
+            "yhat_upper": [value + 1 for value in values],
+        })
+
+    @patch('onhire_pro.reports.forecasting.forecasting_engine.FORECAST_ROWS_PER_INSERT', 2)
+    def test_store_forecast_in_chunks(self):
+        """Days after the forecast date are upserted in multi-row statements of at most FORECAST_ROWS_PER_INSERT."""
+        stored = self.engine.store_forecast("total_rental_revenue", self._forecast(), forecast_date="2025-04-30",
+                                            accuracy=0.1, historical_data_points=120)
+
+        # 2025-04-29 and 2025-04-30 are not after the forecast date
+        self.assertEqual(stored, 5)
+        calls = self.mock_db.sql.call_args_list
+        self.assertEqual(len(calls), 3)
+
+        query, values = calls[0][0]
+        self.assertIn("INSERT INTO `tabForecasted KPI Value`", query)
+        self.assertIn("ON DUPLICATE KEY UPDATE", query)
+        self.assertEqual(query.count("(%s, %s, %s, %s, %s, 0, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)"), 2)
+        self.assertEqual([len(call[0][1]) for call in calls], [30, 30, 15])
+
+        last = calls[2][0][1]
+        self.assertEqual(last[0], forecasted_kpi_value_name("total_rental_revenue", "2025-05-05", "Test Company",
+                                                            "2025-04-30"))
+        self.assertEqual(last[5:], ("total_rental_revenue", "2025-04-30", "2025-05-05", 6.0, 5.0, 7.0,
+                                    "Prophet", 0.1, 120, "Test Company"))
+
+    def test_store_forecast_nothing_after_forecast_date(self):
+        """A forecast without days after the forecast date stores nothing."""
+        self.assertEqual(self.engine.store_forecast("total_rental_revenue", self._forecast(days=2),
+                                                    forecast_date="2025-04-30"), 0)
+        self.mock_db.sql.assert_not_called()
+
+    def test_retire_superseded_forecasts(self):
+        """Only values of earlier forecasts for target dates after the new forecast date are deleted."""
+        database = ForecastDatabase()
+        database.conn.executemany("INSERT INTO `tabForecasted KPI Value` VALUES (?, ?, ?, ?)", [
+            ("total_rental_revenue", "Test Company", "2025-04-01", "2025-04-15"),
+            ("total_rental_revenue", "Test Company", "2025-04-01", "2025-04-30"),
+            ("total_rental_revenue", "Test Company", "2025-04-01", "2025-05-01"),
+            ("total_rental_revenue", "Test Company", "2025-04-30", "2025-05-01"),
+            ("total_rental_revenue", "Other Company", "2025-04-01", "2025-05-01"),
+            ("booking_conversion_rate", "Test Company", "2025-04-01", "2025-05-01"),
+        ])
+        self.mock_db.sql.side_effect = database.sql
+
+        self.assertTrue(self.engine.retire_superseded_forecasts("total_rental_revenue", "2025-04-30"))
+        self.assertEqual(database.rows(), [
+            ("booking_conversion_rate", "Test Company", "2025-04-01", "2025-05-01"),
+            ("total_rental_revenue", "Other Company", "2025-04-01", "2025-05-01"),
+            ("total_rental_revenue", "Test Company", "2025-04-01", "2025-04-15"),
+            ("total_rental_revenue", "Test Company", "2025-04-01", "2025-04-30"),
+            ("total_rental_revenue", "Test Company", "2025-04-30", "2025-05-01"),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
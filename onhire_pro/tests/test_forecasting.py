@@ -0,0 +1,169 @@
+import os
+import shutil
+import tempfile
+import unittest
+import pandas as pd
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from onhire_pro.reports.forecasting.forecasting_engine import fit_or_reuse_model
+from onhire_pro.reports.forecasting.model_registry import ModelRegistry, data_fingerprint
+
+
+def _history(days=120, start="2025-01-01"):
+    return pd.DataFrame({"ds": pd.date_range(start, periods=days, freq="D"), "y": [float(day % 7) for day in range(days)]})
+
+
+class TestModelRegistry(unittest.TestCase):
+    """
+    Test suite for the store of fitted Prophet models.
+
+    Validates that models are found by company, KPI and training date, that
+    fingerprints only depend on the data and parameters, and that the store is
+    evicted least recently used first.
+    """
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.registry = ModelRegistry(self.path)
+
+        # Models are serialized by Prophet; a model here is its training history
+        self.json_patcher = patch('onhire_pro.reports.forecasting.model_registry.model_to_json',
+                                  side_effect=lambda model: model.history["ds"].max().strftime("%Y-%m-%d"))
+        self.json_patcher.start()
+        self.from_json_patcher = patch('onhire_pro.reports.forecasting.model_registry.model_from_json',
+                                       side_effect=lambda trained_through: trained_through)
+        self.from_json_patcher.start()
+
+    def tearDown(self):
+        self.json_patcher.stop()
+        self.from_json_patcher.stop()
+        shutil.rmtree(self.path)
+
+    def _save(self, days, company="Test Company", kpi_name="total_rental_revenue"):
+        model = SimpleNamespace(history=_history(days))
+        return self.registry.save(company, kpi_name, model, data_fingerprint(model.history, {}), {},
+                                  {30: {"mape": 0.1, "rmse": 12.0}})
+
+    def test_latest(self):
+        """The latest model is the one trained on the most recent data, up to trained_through."""
+        self._save(90)
+        self._save(120)
+        self._save(120, company="Other Company")
+
+        latest = self.registry.latest("Test Company", "total_rental_revenue")
+        self.assertEqual((latest["trained_through"], latest["model"]), ("2025-04-30", "2025-04-30"))
+        self.assertEqual(latest["evaluations"], {30: {"mape": 0.1, "rmse": 12.0}})
+
+        earlier = self.registry.latest("Test Company", "total_rental_revenue", trained_through="2025-04-15")
+        self.assertEqual(earlier["trained_through"], "2025-03-31")
+
+        self.assertIsNone(self.registry.latest("Test Company", "booking_conversion_rate"))
+
+    def test_evict_least_recently_used(self):
+        """Eviction deletes the least recently used models until the store fits."""
+        paths = [self._save(days) for days in (90, 100, 110)]
+        for age, path in zip((300, 100, 200), paths, strict=True):
+            mtime = os.path.getmtime(path) - age
+            os.utime(path, (mtime, mtime))
+        self.registry.max_bytes = os.path.getsize(paths[1]) + 1
+
+        self.assertEqual(self.registry.evict(), 2)
+        self.assertEqual([os.path.exists(path) for path in paths], [False, True, False])
+
+    def test_data_fingerprint(self):
+        """Fingerprints follow the data and parameters, not the index or parameter order."""
+        history = _history()
+        params = {"seasonality_mode": "multiplicative", "changepoint_prior_scale": 0.05}
+
+        fingerprint = data_fingerprint(history, params)
+        self.assertEqual(fingerprint, data_fingerprint(history.copy(), dict(reversed(list(params.items())))))
+        self.assertEqual(fingerprint, data_fingerprint(history.set_axis(range(1, len(history) + 1)), params))
+
+        changed = history.copy()
+        changed.loc[10, "y"] += 1
+        self.assertNotEqual(fingerprint, data_fingerprint(changed, params))
+        self.assertNotEqual(fingerprint, data_fingerprint(history, dict(params, changepoint_prior_scale=0.5)))
+
+
+class TestFitOrReuseModel(unittest.TestCase):
+    """
+    Test suite for reusing and warm-starting forecast models.
+
+    Validates that a model fitted on the same data is reused, that a model with
+    the same parameters warm-starts the new fit and that a failed warm start
+    falls back to a cold start.
+    """
+
+    def setUp(self):
+        self.params = {"seasonality_mode": "multiplicative", "changepoint_prior_scale": 0.05}
+        self.history = _history()
+        self.previous = {
+            "model": SimpleNamespace(params={"k": [[0.1]], "m": [[0.2]], "sigma_obs": [[0.3]],
+                                             "delta": [[0.01, 0.02]], "beta": [[0.5, -0.5]]}),
+            "fingerprint": data_fingerprint(self.history, self.params),
+            "params": dict(self.params),
+        }
+
+        self.prophet_patcher = patch('onhire_pro.reports.forecasting.forecasting_engine.Prophet')
+        self.mock_prophet = self.prophet_patcher.start()
+        self.model = self.mock_prophet.return_value
+        self.model.fit.return_value = self.model
+
+    def tearDown(self):
+        self.prophet_patcher.stop()
+
+    def _changed_history(self):
+        changed = self.history.copy()
+        changed.loc[10, "y"] += 1
+        return changed
+
+    def test_reuse_on_equal_fingerprint(self):
+        """The previous model is returned as is when it was fitted on the same data and parameters."""
+        model, reused = fit_or_reuse_model(self.history, self.params, data_fingerprint(self.history, self.params),
+                                           self.previous)
+
+        self.assertEqual((model, reused), (self.previous["model"], True))
+        self.mock_prophet.assert_not_called()
+
+    def test_warm_start_on_changed_data(self):
+        """New data with the same parameters is fitted from the previous model's parameters."""
+        history = self._changed_history()
+
+        model, reused = fit_or_reuse_model(history, self.params, data_fingerprint(history, self.params),
+                                           self.previous)
+
+        self.assertEqual((model, reused), (self.model, False))
+        self.mock_prophet.assert_called_once_with(**self.params)
+        self.assertEqual(self.model.fit.call_args[1]["init"], {
+            "k": 0.1, "m": 0.2, "sigma_obs": 0.3, "delta": [0.01, 0.02], "beta": [0.5, -0.5]
+        })
+
+    def test_cold_start_on_changed_parameters(self):
+        """A previous model with other parameters cannot warm-start the fit."""
+        params = dict(self.params, changepoint_prior_scale=0.5)
+
+        fit_or_reuse_model(self.history, params, data_fingerprint(self.history, params), self.previous)
+
+        self.model.fit.assert_called_once_with(self.history)
+
+    def test_cold_start_when_warm_start_fails(self):
+        """A failed warm start is recorded and the model is fitted from scratch."""
+        history = self._changed_history()
+        self.model.fit.side_effect = [RuntimeError("Initialization failed"), self.model]
+        errors = []
+
+        model, reused = fit_or_reuse_model(history, self.params, data_fingerprint(history, self.params),
+                                           self.previous, errors)
+
+        self.assertEqual((model, reused), (self.model, False))
+        self.assertEqual(self.mock_prophet.call_count, 2)
+        self.assertIn("init", self.model.fit.call_args_list[0][1])
+        self.assertEqual(self.model.fit.call_args_list[1], ((history,), {}))
+        self.assertEqual(len(errors), 1)
+        self.assertIn("Error warm-starting forecast model", errors[0])
+        self.assertIn("Initialization failed", errors[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
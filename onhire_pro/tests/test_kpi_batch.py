@@ -0,0 +1,72 @@
+import unittest
+from datetime import date
+from unittest.mock import patch
+
+from onhire_pro.reports.kpi_batch import evaluate_kpi_batch, grouped_window_sums
+from onhire_pro.tests.fakes import mocked_db_schema_capabilities
+
+
+class TestKPIBatch(unittest.TestCase):
+    """
+    Test suite for the batch KPI evaluation.
+
+    Validates that a KPI is evaluated for many companies and periods with one
+    grouped query per KPI, and that each window sums only its company's days.
+    """
+
+    def setUp(self):
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.mock_db.exists.return_value = True
+        self.mock_db.has_column.return_value = True
+        self.capabilities_patcher = patch('onhire_pro.utils.schema_capabilities.get_schema_capabilities',
+                                          side_effect=mocked_db_schema_capabilities)
+        self.capabilities_patcher.start()
+
+        self.log_error_patcher = patch('frappe.log_error')
+        self.mock_log_error = self.log_error_patcher.start()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.capabilities_patcher.stop()
+        self.log_error_patcher.stop()
+
+    def test_grouped_window_sums(self):
+        """Windows sum their company's days; shared rows count for every company."""
+        rows = [
+            ("A", date(2025, 3, 1), 10),
+            ("A", date(2025, 3, 5), 5),
+            ("B", date(2025, 3, 2), 7),
+            ("", date(2025, 3, 3), 1),
+        ]
+        windows = [("A", date(2025, 3, 1), date(2025, 3, 1)), ("A", date(2025, 3, 1), date(2025, 3, 31)),
+                   ("B", date(2025, 3, 1), date(2025, 3, 31)), ("C", date(2025, 3, 1), date(2025, 3, 31))]
+
+        self.assertEqual(grouped_window_sums(rows, windows)[:, 0].tolist(), [10, 15, 7, 0])
+        self.assertEqual(grouped_window_sums(rows, windows, shared=True)[:, 0].tolist(), [10, 16, 8, 1])
+
+    def test_one_query_for_all_windows(self):
+        """Revenue of all companies and days comes from one grouped query."""
+        self.mock_db.sql.return_value = [
+            ("Company A", date(2025, 3, 1), 1000),
+            ("Company A", date(2025, 3, 2), 250),
+            ("Company B", date(2025, 3, 2), 400),
+        ]
+
+        values = evaluate_kpi_batch("total_rental_revenue", [
+            ("Company A", "2025-03-01", "2025-03-01"),
+            ("Company A", "2025-03-01", "2025-03-31"),
+            ("Company B", "2025-03-01", "2025-03-31"),
+        ])
+
+        self.assertEqual(values, [1000.0, 1250.0, 400.0])
+        self.assertEqual(self.mock_db.sql.call_count, 1)
+
+    def test_unknown_kpi(self):
+        """A KPI without a batch definition yields None for every window."""
+        self.assertEqual(evaluate_kpi_batch("unknown_kpi", [("Company A", "2025-03-01", "2025-03-31")]), [None])
+        self.mock_log_error.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
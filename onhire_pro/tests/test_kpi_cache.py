@@ -0,0 +1,78 @@
+import unittest
+from unittest.mock import patch, MagicMock
+
+from onhire_pro.utils import kpi_cache
+from onhire_pro.utils.kpi_cache import cached_kpi, invalidate_kpis, normalize_filters
+from onhire_pro.tests.fakes import FakeRedis
+
+
+class TestKPICache(unittest.TestCase):
+    """
+    Test suite for the KPI result cache.
+
+    Validates that results are keyed by normalized filters, that a change only
+    invalidates the KPIs depending on the changed doctype, and the hit counters.
+    """
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.cache_patcher = patch('frappe.cache', return_value=self.redis)
+        self.cache_patcher.start()
+        kpi_cache._results.clear()
+
+        self.revenue_query = MagicMock(return_value={"value": 25000.0})
+        self.assessment_query = MagicMock(return_value={"value": 7})
+        self.revenue = cached_kpi("Sales Invoice")(self._named("revenue", self.revenue_query))
+        self.assessments = cached_kpi("Condition Assessment", ttl=300)(self._named("assessments", self.assessment_query))
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+        kpi_cache._results.clear()
+
+    def _named(self, name, query):
+        def kpi(filters):
+            return query(filters)
+        kpi.__name__ = f"test_{name}"
+        return kpi
+
+    def test_normalized_filters_share_a_result(self):
+        """Key order, empty values and date formats do not split the cache."""
+        self.revenue({"company": "Test Company", "from_date": "2025-03-01", "item_group": None})
+        self.revenue('{"from_date": "2025-03-01", "company": "Test Company"}')
+
+        self.assertEqual(self.revenue_query.call_count, 1)
+        self.assertEqual(
+            normalize_filters({"to_date": "2025-03-31", "company": "Test Company", "item_group": ""}),
+            '{"company": "Test Company", "to_date": "2025-03-31"}'
+        )
+
+    def test_invalidation_is_per_doctype(self):
+        """A Sales Invoice change recomputes revenue but not assessment counts."""
+        filters = {"company": "Test Company"}
+        self.revenue(filters)
+        self.assessments(filters)
+
+        invalidate_kpis(["Sales Invoice"])
+        self.revenue(filters)
+        self.assessments(filters)
+
+        self.assertEqual(self.revenue_query.call_count, 2)
+        self.assertEqual(self.assessment_query.call_count, 1)
+
+    def test_hit_counters(self):
+        """Local and Redis hits are counted separately from misses."""
+        stats = dict(kpi_cache._stats)
+        filters = {"company": "Test Company"}
+
+        self.revenue(filters)
+        self.revenue(filters)
+        kpi_cache._results.clear()
+        self.revenue(filters)
+
+        self.assertEqual(kpi_cache._stats["misses"] - stats["misses"], 1)
+        self.assertEqual(kpi_cache._stats["local_hits"] - stats["local_hits"], 1)
+        self.assertEqual(kpi_cache._stats["redis_hits"] - stats["redis_hits"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -18,8 +18,11 @@ from onhire_pro.reports.kpi_utils import (
     get_stock_reservation_conflicts,
     get_overdue_returns_count,
     get_active_rental_jobs_count,
-    get_total_rental_revenue
+    get_total_rental_revenue,
+    get_damage_rate_by_item_group,
+    get_customer_retention_curves
 )
+from onhire_pro.tests.fakes import mocked_db_schema_capabilities
 
 class TestKPIFunctions(unittest.TestCase):
     """
@@ -97,6 +100,16 @@ class TestKPIFunctions(unittest.TestCase):
         
         # Mock frappe.db.get_single_value for single doctype field value
         self.mock_db.get_single_value = MagicMock()
+
+        # Bypass the KPI result cache so every test runs its mocked queries
+        self.cached_kpi_patcher = patch('onhire_pro.utils.kpi_cache.get_cached_kpi',
+                                        side_effect=lambda kpi, function, filters=None, ttl=None: function(filters))
+        self.cached_kpi_patcher.start()
+
+        # Check the schema against the mocked frappe.db instead of the capability map
+        self.capabilities_patcher = patch('onhire_pro.utils.schema_capabilities.get_schema_capabilities',
+                                          side_effect=mocked_db_schema_capabilities)
+        self.capabilities_patcher.start()
     
     def tearDown(self):
         """Clean up test environment after each test."""
@@ -108,6 +121,8 @@ class TestKPIFunctions(unittest.TestCase):
         self.get_cached_value_patcher.stop()
         self.get_list_patcher.stop()
         self.get_single_patcher.stop()
+        self.cached_kpi_patcher.stop()
+        self.capabilities_patcher.stop()
     
     def test_calculate_item_utilization_rate_basic(self):
         """Test basic functionality of item utilization rate calculation."""
@@ -305,34 +320,31 @@ class TestKPIFunctions(unittest.TestCase):
     
     def test_calculate_customer_churn_rate_basic(self):
         """Test basic functionality of customer churn rate calculation."""
-        # Mock data for customers at start, end, and new customers
-        self.mock_db.sql.side_effect = [
-            [(10,)],  # 10 customers at start
-            [(12,)],  # 12 customers at end
-            [(5,)]    # 5 new customers
+        # Rental days per customer from the one grouped activity query
+        self.mock_db.sql.return_value = [
+            ("CUST-A", "2025-01-10"), ("CUST-A", "2025-03-05"),  # retained
+            ("CUST-B", "2025-01-05"),                            # churned
+            ("CUST-C", "2025-02-01"),                            # still active at the end
+            ("CUST-D", "2024-06-01"), ("CUST-D", "2025-03-20"),  # reactivated
+            ("CUST-E", "2025-03-15")                             # new
         ]
-        
-        # Expected churn rate
-        # Customers lost = (Start + New) - End = (10 + 5) - 12 = 3
-        # Churn rate = (Customers lost / Start) * 100 = (3 / 10) * 100 = 30%
-        expected_rate = 30
-        
-        # Call the function
-        result = calculate_customer_churn_rate(self.default_filters)
-        
-        # Verify the result
-        self.assertIsInstance(result, dict)
-        self.assertIn("value", result)
-        self.assertEqual(result["value"], expected_rate)
+        filters = {"company": self.company, "from_date": "2025-03-01", "to_date": "2025-03-31",
+                   "churn_window_days": 60}
+        
+        # Active at the start (rented 2024-12-31 to 2025-02-28): A, B, C
+        # Active at the end (rented 2025-01-31 to 2025-03-31): A, C, D, E
+        # Churn rate = 1 / 3 * 100; D is the only lapsed customer and rented again
+        result = calculate_customer_churn_rate(filters)
+        
+        self.assertAlmostEqual(result["value"], 100 / 3)
+        self.assertAlmostEqual(result["retention_rate"], 200 / 3)
+        self.assertEqual(result["reactivation_rate"], 100)
+        self.assertEqual(self.mock_db.sql.call_count, 1)
     
     def test_calculate_customer_churn_rate_no_customers(self):
         """Test customer churn rate calculation with no customers."""
-        # Mock data for customers at start, end, and new customers (no customers)
-        self.mock_db.sql.side_effect = [
-            [(0,)],  # 0 customers at start
-            [(0,)],  # 0 customers at end
-            [(0,)]   # 0 new customers
-        ]
+        # No submitted Rental Jobs
+        self.mock_db.sql.return_value = []
         
         # Call the function
         result = calculate_customer_churn_rate(self.default_filters)
@@ -342,6 +354,24 @@ class TestKPIFunctions(unittest.TestCase):
         self.assertIn("value", result)
         self.assertEqual(result["value"], 0)
     
+    def test_get_customer_retention_curves(self):
+        """Test monthly retention curves of all cohorts from one query."""
+        self.mock_db.sql.return_value = [
+            ("CUST-A", "2025-01-10"), ("CUST-A", "2025-01-25"), ("CUST-A", "2025-02-05"),
+            ("CUST-B", "2025-01-20"), ("CUST-B", "2025-03-02"),
+            ("CUST-C", "2025-02-14"), ("CUST-C", "2025-03-30")
+        ]
+        filters = {"company": self.company, "from_date": "2025-01-01", "to_date": "2025-03-31"}
+        
+        result = get_customer_retention_curves(filters)
+        
+        self.assertEqual(result["labels"], ["Month 0", "Month 1", "Month 2"])
+        self.assertEqual(result["datasets"], [
+            {"name": "Jan 2025 (2)", "values": [100.0, 50.0, 50.0]},
+            {"name": "Feb 2025 (1)", "values": [100.0, 100.0]}
+        ])
+        self.assertEqual(self.mock_db.sql.call_count, 1)
+    
     def test_calculate_damage_rate_basic(self):
         """Test basic functionality of damage rate calculation."""
         # Mock data for total rentals and damaged rentals
@@ -402,8 +432,8 @@ class TestKPIFunctions(unittest.TestCase):
     
     def test_get_overdue_returns_count_basic(self):
         """Test basic functionality of overdue returns count calculation."""
-        # Mock data for overdue returns
-        self.mock_db.count.return_value = 5  # 5 overdue returns
+        # Mock the live counters of overdue returns
+        self.mock_db.sql.return_value = [(5,)]  # 5 overdue returns
         
         # Call the function
         result = get_overdue_returns_count(self.default_filters)
@@ -415,8 +445,8 @@ class TestKPIFunctions(unittest.TestCase):
     
     def test_get_overdue_returns_count_no_overdue(self):
         """Test overdue returns count calculation with no overdue returns."""
-        # Mock data for overdue returns (no overdue)
-        self.mock_db.count.return_value = 0  # 0 overdue returns
+        # Mock the live counters of overdue returns (no overdue)
+        self.mock_db.sql.return_value = [(None,)]  # 0 overdue returns
         
         # Call the function
         result = get_overdue_returns_count(self.default_filters)
@@ -428,8 +458,8 @@ class TestKPIFunctions(unittest.TestCase):
     
     def test_get_active_rental_jobs_count_basic(self):
         """Test basic functionality of active rental jobs count calculation."""
-        # Mock data for active rental jobs
-        self.mock_db.count.return_value = 8  # 8 active rental jobs
+        # Mock the live counters of active rental jobs
+        self.mock_db.sql.return_value = [(8,)]  # 8 active rental jobs
         
         # Call the function
         result = get_active_rental_jobs_count(self.default_filters)
@@ -441,8 +471,8 @@ class TestKPIFunctions(unittest.TestCase):
     
     def test_get_active_rental_jobs_count_no_active(self):
         """Test active rental jobs count calculation with no active jobs."""
-        # Mock data for active rental jobs (no active)
-        self.mock_db.count.return_value = 0  # 0 active rental jobs
+        # Mock the live counters of active rental jobs (no active)
+        self.mock_db.sql.return_value = [(None,)]  # 0 active rental jobs
         
         # Call the function
         result = get_active_rental_jobs_count(self.default_filters)
@@ -478,6 +508,46 @@ class TestKPIFunctions(unittest.TestCase):
         self.assertIn("value", result)
         self.assertEqual(result["value"], 0)
     
+    def rollup_rows(self, groups):
+        """Rows of the damage counts query for `groups` item groups of two items each."""
+        rows = [frappe._dict(item_group=None, item_code=None, serial_no=None, total=groups * 4, damaged=groups)]
+        for group in range(groups):
+            item_group = f"Group {group:03d}"
+            rows.append(frappe._dict(item_group=item_group, item_code=None, serial_no=None, total=4, damaged=1))
+            for item in range(2):
+                item_code = f"ITEM-{group:03d}-{item}"
+                rows.append(frappe._dict(item_group=item_group, item_code=item_code, serial_no=None,
+                                         total=2, damaged=item))
+                rows.append(frappe._dict(item_group=item_group, item_code=item_code, serial_no=f"{item_code}-SN1",
+                                         total=2, damaged=item))
+        return rows
+    
+    def test_get_damage_rate_by_item_group_basic(self):
+        """Test damage rate by item group and its drill-down to items and serial numbers."""
+        self.mock_db.sql.return_value = self.rollup_rows(2)
+        
+        result = get_damage_rate_by_item_group(self.default_filters)
+        self.assertEqual(result["labels"], ["Group 000", "Group 001"])
+        self.assertEqual(result["datasets"][0]["values"], [25.0, 25.0])
+        
+        result = get_damage_rate_by_item_group(dict(self.default_filters, item_group="Group 001"))
+        self.assertEqual(result["labels"], ["ITEM-001-0", "ITEM-001-1"])
+        self.assertEqual(result["datasets"][0]["values"], [0.0, 50.0])
+        
+        result = get_damage_rate_by_item_group(dict(self.default_filters, item_code="ITEM-001-1"))
+        self.assertEqual(result["labels"], ["ITEM-001-1-SN1"])
+    
+    def test_get_damage_rate_by_item_group_constant_queries(self):
+        """Benchmark: the query count does not grow with the number of item groups."""
+        for groups in (1, 10, 100, 1000):
+            self.mock_db.sql.reset_mock()
+            self.mock_db.sql.return_value = self.rollup_rows(groups)
+            
+            result = get_damage_rate_by_item_group(self.default_filters)
+            
+            self.assertEqual(len(result["labels"]), groups)
+            self.assertEqual(self.mock_db.sql.call_count, 1)
+    
     def test_error_handling_in_all_functions(self):
         """Test error handling in all KPI functions."""
         # Make the database queries raise exceptions
@@ -0,0 +1,131 @@
+import unittest
+import frappe
+from datetime import date
+from unittest.mock import patch
+
+from onhire_pro.reports.kpi_snapshot import get_snapshot_kpi, trend_periods, _mysql_week
+from onhire_pro.utils import kpi_cache
+from onhire_pro.reports.kpi_utils import (
+    calculate_total_rental_revenue,
+    calculate_at_risk_stock,
+    calculate_rental_revenue_trend,
+    calculate_rental_duration,
+    calculate_booking_conversion,
+    calculate_item_utilization
+)
+from onhire_pro.tests.fakes import FakeRedis
+
+
+class TestKPISnapshot(unittest.TestCase):
+    """
+    Test suite for the single-pass KPI snapshot behind the dashboard chart sources.
+
+    Validates that all chart sources of one company and period share one snapshot
+    and that each reads its own slice.
+    """
+
+    def setUp(self):
+        self.filters = {"company": "Test Company", "from_date": "2025-03-01", "to_date": "2025-03-31"}
+        self.snapshot = {
+            "total_rental_revenue": {"value": 25000.0},
+            "at_risk_stock": {"value": 12},
+            "average_rental_duration": {"value": 4.5},
+            "booking_conversion_rate": {"value": 40.0},
+            "item_utilization_rate": {"value": 62.5},
+            "rental_revenue_trend": {
+                "Monthly": {"labels": ["Mar 2025"], "datasets": [{"name": "Revenue", "values": [25000.0]}]},
+                "Weekly": {"labels": ["Week 09, 2025"], "datasets": [{"name": "Revenue", "values": [25000.0]}]},
+            },
+        }
+
+        self.redis = FakeRedis()
+        self.cache_patcher = patch('frappe.cache', return_value=self.redis)
+        self.cache_patcher.start()
+
+        self.compute_patcher = patch('onhire_pro.reports.kpi_snapshot.compute_kpi_snapshot',
+                                     return_value=self.snapshot)
+        self.mock_compute = self.compute_patcher.start()
+
+        kpi_cache._results.clear()
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+        self.compute_patcher.stop()
+        kpi_cache._results.clear()
+
+    def test_chart_sources_share_one_snapshot(self):
+        """Several chart sources with the same filters compute the snapshot once."""
+        self.assertEqual(calculate_total_rental_revenue(self.filters), {"value": 25000.0})
+        self.assertEqual(calculate_at_risk_stock(self.filters), {"value": 12})
+        self.assertEqual(self.mock_compute.call_count, 1)
+
+    def test_number_cards_read_snapshot(self):
+        """Number cards with a calculation function of their own also read the snapshot."""
+        self.assertEqual(calculate_rental_duration(self.filters), {"value": 4.5})
+        self.assertEqual(calculate_booking_conversion(self.filters), {"value": 40.0})
+        self.assertEqual(calculate_item_utilization(self.filters), {"value": 62.5})
+        self.assertEqual(self.mock_compute.call_count, 1)
+
+    def test_snapshot_shared_through_redis(self):
+        """Another worker (empty local cache) reads the snapshot from Redis."""
+        calculate_total_rental_revenue(self.filters)
+        kpi_cache._results.clear()
+
+        calculate_at_risk_stock(self.filters)
+        self.assertEqual(self.mock_compute.call_count, 1)
+
+    def test_change_recomputes_snapshot(self):
+        """A submitted Sales Invoice invalidates the cached snapshot."""
+        calculate_total_rental_revenue(self.filters)
+        with patch('frappe.db'):
+            kpi_cache.invalidate_kpi_cache(frappe._dict(doctype="Sales Invoice"))
+
+        calculate_total_rental_revenue(self.filters)
+        self.assertEqual(self.mock_compute.call_count, 2)
+
+    def test_trend_reads_group_by(self):
+        """Trend chart sources pick the series of the requested grouping."""
+        result = calculate_rental_revenue_trend(dict(self.filters, group_by="Weekly"))
+        self.assertEqual(result["labels"], ["Week 09, 2025"])
+
+    def test_json_filters(self):
+        """Filters arrive from the dashboard as a JSON string."""
+        result = get_snapshot_kpi("total_rental_revenue", '{"company": "Test Company", "from_date": "2025-03-01"}')
+        self.assertEqual(result, {"value": 25000.0})
+
+    def test_missing_kpi_returns_empty_result(self):
+        """A KPI the snapshot lacks returns the empty result in the chart's shape."""
+        result = get_snapshot_kpi("damage_rate_by_item_group", self.filters)
+        self.assertEqual(result, {"labels": [], "datasets": [{"name": "Damage Rate (%)", "values": []}]})
+
+    def test_top_list_pages_leaderboard(self):
+        """Top lists are read from their leaderboard with the paging filters, outside the snapshot."""
+        leaderboard = {"entries": [frappe._dict(member="CUST-0007", score=35000.0),
+                                   frappe._dict(member="CUST-0099", score=12000.0)], "total": 87}
+        with patch('onhire_pro.reports.kpi_snapshot.get_leaderboard', return_value=leaderboard) as mock_leaderboard, \
+                patch('frappe.get_all', return_value=[("CUST-0007", "City Works")]):
+            result = get_snapshot_kpi("top_5_customers_by_rental_value", dict(self.filters, start=5, page_length=2))
+
+        self.assertEqual(result, {"labels": ["City Works", "CUST-0099"],
+                                  "datasets": [{"name": "Rental Value", "values": [35000.0, 12000.0]}]})
+        self.assertEqual(mock_leaderboard.call_args[1], {"start": 5, "page_length": 2})
+        self.mock_compute.assert_not_called()
+
+    def test_trend_periods(self):
+        """Monthly periods are calendar months, weekly periods start on Monday."""
+        monthly = trend_periods("2025-01-15", "2025-03-02", "Monthly")
+        self.assertEqual([period.label for period in monthly], ["Jan 2025", "Feb 2025", "Mar 2025"])
+        self.assertEqual(monthly[1].end_date, date(2025, 2, 28))
+
+        weekly = trend_periods("2025-03-05", "2025-03-12", "Weekly")
+        self.assertEqual([period.start_date for period in weekly], [date(2025, 3, 3), date(2025, 3, 10)])
+
+    def test_mysql_week(self):
+        """Week numbers match MySQL DATE_FORMAT('%u') around the turn of the year."""
+        self.assertEqual(_mysql_week(date(2021, 1, 1)), (2021, 0))
+        self.assertEqual(_mysql_week(date(2024, 12, 31)), (2024, 53))
+        self.assertEqual(_mysql_week(date(2025, 3, 5)), (2025, 10))
+
+
+if __name__ == '__main__':
+    unittest.main()
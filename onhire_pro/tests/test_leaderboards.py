@@ -0,0 +1,58 @@
+import unittest
+import frappe
+from datetime import date
+from unittest.mock import patch
+
+from onhire_pro.utils.leaderboards import split_period, get_leaderboard, TOP_CUSTOMERS
+from onhire_pro.tests.fakes import mocked_db_schema_capabilities
+
+
+class TestLeaderboards(unittest.TestCase):
+    """
+    Test suite for the rental leaderboards.
+
+    Validates that periods are read from month and day entries and that
+    leaderboards are paged in the database.
+    """
+
+    def setUp(self):
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.mock_db.exists.return_value = True
+        self.capabilities_patcher = patch('onhire_pro.utils.schema_capabilities.get_schema_capabilities',
+                                          side_effect=mocked_db_schema_capabilities)
+        self.capabilities_patcher.start()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.capabilities_patcher.stop()
+
+    def test_split_period(self):
+        """Whole months are read from month entries and the edges from day entries."""
+        self.assertEqual(split_period("2025-01-15", "2025-04-10"), (
+            [date(2025, 2, 1), date(2025, 3, 1)],
+            [(date(2025, 1, 15), date(2025, 1, 31)), (date(2025, 4, 1), date(2025, 4, 10))]
+        ))
+        self.assertEqual(split_period("2025-01-01", "2025-12-31"),
+                         ([date(2025, month, 1) for month in range(1, 13)], []))
+        self.assertEqual(split_period("2025-03-05", "2025-03-20"), ([], [(date(2025, 3, 5), date(2025, 3, 20))]))
+        self.assertEqual(split_period("2025-03-20", "2025-03-05"), ([], []))
+
+    def test_get_leaderboard_page(self):
+        """A page of a leaderboard is limited in SQL and reports the number of members."""
+        self.mock_db.sql.side_effect = [
+            [frappe._dict(member="CUST-0007", score=35000)],
+            [(87,)]
+        ]
+
+        result = get_leaderboard(TOP_CUSTOMERS, "Test Company", "2025-01-01", "2025-06-30", start=1, page_length=1)
+
+        self.assertEqual(result["total"], 87)
+        self.assertEqual(result["entries"], [{"member": "CUST-0007", "score": 35000.0}])
+        values = self.mock_db.sql.call_args_list[0][0][1]
+        self.assertEqual((values["start"], values["page_length"]), (1, 1))
+        self.assertEqual(len(values["months"]), 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import frappe
+from unittest.mock import patch, MagicMock
+
+from onhire_pro.utils.live_counters import update_live_counters, get_live_count
+from onhire_pro.tests.fakes import mocked_db_schema_capabilities
+
+
+class TestLiveCounters(unittest.TestCase):
+    """
+    Test suite for the live counters behind the dashboard number cards.
+
+    Validates that a change of state moves a document between counters and that
+    the counts are read from the counters with the requested filters.
+    """
+
+    def setUp(self):
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.mock_db.exists.return_value = True
+        self.mock_db.has_column.return_value = True
+        self.capabilities_patcher = patch('onhire_pro.utils.schema_capabilities.get_schema_capabilities',
+                                          side_effect=mocked_db_schema_capabilities)
+        self.capabilities_patcher.start()
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.capabilities_patcher.stop()
+
+    def _job(self, status, docstatus=1, in_insert=False):
+        job = frappe._dict(doctype="Rental Job", name="RJ-0001", company="Test Company", job_status=status,
+                           docstatus=docstatus, start_date="2025-03-01", end_date="2025-03-10",
+                           flags=frappe._dict(in_insert=in_insert))
+        job.get_doc_before_save = MagicMock(return_value=None)
+        return job
+
+    def _counter_changes(self):
+        return [(call[0][1]["status"], call[0][1]["count"]) for call in self.mock_db.sql.call_args_list]
+
+    def test_status_transition(self):
+        """Dispatching a job moves it from the Confirmed to the In Progress counter."""
+        job = self._job("In Progress")
+        job.get_doc_before_save.return_value = self._job("Confirmed")
+
+        update_live_counters(job, "on_update_after_submit")
+
+        self.assertEqual(self._counter_changes(), [("Confirmed", -1), ("In Progress", 1)])
+        self.mock_db.after_commit.add.assert_called_once()
+
+    def test_submit_and_close(self):
+        """Submitting counts a job; completing it leaves the counters."""
+        job = self._job("Confirmed")
+        job.get_doc_before_save.return_value = self._job("Confirmed", docstatus=0)
+        update_live_counters(job, "on_submit")
+        self.assertEqual(self._counter_changes(), [("Confirmed", 1)])
+
+        self.mock_db.sql.reset_mock()
+        job = self._job("Completed")
+        job.get_doc_before_save.return_value = self._job("In Progress")
+        update_live_counters(job, "on_update_after_submit")
+        self.assertEqual(self._counter_changes(), [("In Progress", -1)])
+
+    def test_insert_submitted(self):
+        """A job inserted as submitted has no state before it and is counted."""
+        update_live_counters(self._job("Confirmed", in_insert=True), "on_change")
+        self.assertEqual(self._counter_changes(), [("Confirmed", 1)])
+
+    def test_db_set_left_to_reconcile(self):
+        """db_set runs on_change without the state before it, so it is not counted twice."""
+        update_live_counters(self._job("In Progress"), "on_change")
+        self.mock_db.sql.assert_not_called()
+
+    def test_unchanged_state(self):
+        """Saving without a change of state leaves the counters alone."""
+        job = self._job("Confirmed")
+        job.get_doc_before_save.return_value = self._job("Confirmed")
+
+        update_live_counters(job, "on_update_after_submit")
+
+        self.mock_db.sql.assert_not_called()
+
+    def test_get_live_count(self):
+        """Counts are summed over the counters matching the status and date filters."""
+        self.mock_db.sql.return_value = [(4,)]
+
+        count = get_live_count("Rental Job", "Test Company", ["Confirmed"],
+                               start_date=("between", ["2025-03-01", "2025-03-07"]))
+
+        self.assertEqual(count, 4)
+        query, values = self.mock_db.sql.call_args[0]
+        self.assertIn("lc.start_date BETWEEN", query)
+        self.assertEqual(values["statuses"], ("Confirmed",))
+
+
+if __name__ == '__main__':
+    unittest.main()
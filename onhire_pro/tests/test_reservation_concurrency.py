@@ -0,0 +1,119 @@
+import threading
+import unittest
+import frappe
+from frappe.utils import add_days, now_datetime
+
+TEST_ITEM = "_Test Rental Concurrency Item"
+CAPACITY = 3
+ATTEMPTS = 12
+
+
+class TestReservationConcurrency(unittest.TestCase):
+    """
+    Stress test for concurrent Stock Reservations of one item.
+
+    Many bookings for the last units of an item are submitted at the same instant
+    from separate connections. The item lock taken while checking availability
+    must let exactly CAPACITY of them through, never more.
+
+    Needs a site with ERPNext installed (run with `bench run-tests`); it is skipped
+    otherwise.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.site = getattr(frappe.local, "site", None)
+        if not cls.site or not getattr(frappe.local, "db", None):
+            raise unittest.SkipTest("Concurrency test needs a site: run with bench run-tests")
+
+        cls.from_date = add_days(now_datetime(), 30)
+        cls.to_date = add_days(cls.from_date, 3)
+        cls.cleanup()
+
+        frappe.get_doc({
+            "doctype": "Item",
+            "item_code": TEST_ITEM,
+            "item_name": TEST_ITEM,
+            "item_group": frappe.db.get_value("Item Group", {"is_group": 0}, "name"),
+            "stock_uom": "Nos",
+            "is_stock_item": 1,
+            "has_serial_no": 0
+        }).insert(ignore_permissions=True)
+
+        warehouse = frappe.db.get_value("Warehouse", {"is_group": 0}, "name")
+        frappe.get_doc({
+            "doctype": "Bin",
+            "item_code": TEST_ITEM,
+            "warehouse": warehouse,
+            "actual_qty": CAPACITY
+        }).db_insert()
+
+        frappe.db.commit()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.cleanup()
+
+    @staticmethod
+    def cleanup():
+        frappe.db.sql("DELETE FROM `tabStock Reservation` WHERE item_code = %s", TEST_ITEM)
+        frappe.db.sql("DELETE FROM `tabBin` WHERE item_code = %s", TEST_ITEM)
+        frappe.db.sql("DELETE FROM `tabItem` WHERE name = %s", TEST_ITEM)
+        frappe.db.commit()
+
+    def reserve(self, barrier, results):
+        """Book one unit from a separate connection, like a parallel portal checkout."""
+        frappe.init(site=self.site)
+        frappe.connect()
+        frappe.set_user("Administrator")
+
+        try:
+            barrier.wait()
+            reservation = frappe.get_doc({
+                "doctype": "Stock Reservation",
+                "item_code": TEST_ITEM,
+                "qty": 1,
+                "reservation_date": now_datetime(),
+                "from_date": self.from_date,
+                "to_date": self.to_date,
+                "status": "Reserved"
+            })
+            reservation.insert(ignore_permissions=True)
+            reservation.submit()
+            frappe.db.commit()
+            results.append("reserved")
+        except frappe.ValidationError:
+            frappe.db.rollback()
+            results.append("rejected")
+        except Exception:
+            # Lock wait timeouts and deadlocks roll back; they must never over-book
+            frappe.db.rollback()
+            results.append("failed")
+        finally:
+            frappe.destroy()
+
+    def test_capacity_never_exceeded(self):
+        """Concurrent bookings for one item never reserve more than its stock."""
+        barrier = threading.Barrier(ATTEMPTS)
+        results = []
+        threads = [threading.Thread(target=self.reserve, args=(barrier, results)) for _ in range(ATTEMPTS)]
+
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        reserved_qty = frappe.db.sql("""
+            SELECT IFNULL(SUM(qty), 0)
+            FROM `tabStock Reservation`
+            WHERE item_code = %s AND docstatus = 1 AND status IN ('Reserved', 'In Use')
+        """, TEST_ITEM)[0][0]
+
+        self.assertEqual(len(results), ATTEMPTS)
+        self.assertLessEqual(reserved_qty, CAPACITY)
+        self.assertEqual(results.count("reserved"), reserved_qty)
+        self.assertEqual(results.count("reserved"), CAPACITY)
+
+
+if __name__ == '__main__':
+    unittest.main()
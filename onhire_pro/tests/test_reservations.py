@@ -0,0 +1,64 @@
+import unittest
+import frappe
+from unittest.mock import patch
+
+from onhire_pro.utils.reservations import reserve_reservation_names
+
+
+class TestReservationNames(unittest.TestCase):
+    """
+    Test suite for naming bulk Stock Reservations.
+
+    Validates that a batch is named from one block of the naming series and that
+    other autonames fall back to naming each reservation.
+    """
+
+    def setUp(self):
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.meta_patcher = patch('frappe.get_meta')
+        self.mock_meta = self.meta_patcher.start()
+        self.mock_meta.return_value = frappe._dict(autoname="format:SR-{####}")
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.meta_patcher.stop()
+
+    def test_block_of_series(self):
+        """A batch advances the series once and numbers its names locally."""
+        self.mock_db.sql.side_effect = [None, [(152,)], []]
+
+        names = reserve_reservation_names(150)
+
+        self.assertEqual(names[0], "SR-0003")
+        self.assertEqual(names[-1], "SR-0152")
+        self.assertEqual(len(names), 150)
+        self.assertEqual(self.mock_db.sql.call_count, 3)
+        update, values = self.mock_db.sql.call_args_list[0][0]
+        self.assertIn("current = current + %(count)s", update)
+        self.assertEqual(values, {"count": 150, "key": ""})
+
+    def test_naming_series_key(self):
+        """A naming series is numbered under its prefix and started if new."""
+        self.mock_meta.return_value = frappe._dict(autoname="SR-.#####")
+        self.mock_db.sql.side_effect = [None, [], None, []]
+
+        self.assertEqual(reserve_reservation_names(2), ["SR-00001", "SR-00002"])
+        self.assertEqual(self.mock_db.sql.call_args_list[2][0][1], {"key": "SR-", "count": 2})
+
+    @patch('onhire_pro.utils.reservations.set_new_name')
+    @patch('frappe.new_doc')
+    def test_other_autoname_names_each(self, mock_new_doc, mock_set_new_name):
+        """Autonames that are not a plain series are named one reservation at a time."""
+        self.mock_meta.return_value = frappe._dict(autoname="hash")
+        mock_new_doc.side_effect = lambda doctype: frappe._dict(doctype=doctype)
+        mock_set_new_name.side_effect = lambda doc: doc.update(name=frappe.generate_hash(length=10))
+
+        names = reserve_reservation_names(3)
+
+        self.assertEqual(len(set(names)), 3)
+        self.mock_db.sql.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+import re
+import hashlib
+import sqlite3
+import unittest
+import frappe
+from unittest.mock import patch
+
+from onhire_pro.utils.revenue_rollup import update_revenue_rollup, rebuild_revenue_rollup, DAYS_PER_CHUNK
+from onhire_pro.tests.fakes import mocked_db_schema_capabilities
+
+
+class RollupDatabase:
+    """
+    In-memory stand-in for `frappe.db.sql` running the rollup SQL on SQLite.
+
+    Only the MariaDB constructs the rollup uses are translated, so the tests
+    exercise the real upsert, prorating and deletion arithmetic.
+    """
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.create_function("MD5", 1, lambda value: hashlib.md5(str(value).encode()).hexdigest())
+        self.conn.create_function("CONCAT_WS", -1, lambda sep, *values: sep.join(
+            str(value) for value in values if value is not None))
+        self.conn.executescript("""
+            CREATE TABLE `tabSales Invoice` (name TEXT PRIMARY KEY, company TEXT, posting_date TEXT,
+                customer TEXT, rental_job TEXT, sales_person TEXT, owner TEXT, docstatus INT,
+                net_total REAL, grand_total REAL);
+            CREATE TABLE `tabSales Invoice Item` (parent TEXT, item_code TEXT, qty REAL,
+                net_amount REAL, base_net_amount REAL);
+            CREATE TABLE `tabItem` (name TEXT PRIMARY KEY, item_group TEXT, is_rental_item INT);
+            CREATE TABLE `tabRental Revenue Daily` (name TEXT PRIMARY KEY, owner TEXT, creation TEXT,
+                modified TEXT, modified_by TEXT, docstatus INT, company TEXT, date TEXT, item_group TEXT,
+                item_code TEXT, customer TEXT, rental_job TEXT, sales_person TEXT,
+                net_amount REAL, grand_total REAL, qty REAL);
+            INSERT INTO `tabItem` VALUES ('GEN-10', 'Generators', 1), ('CABLE', 'Consumables', 0);
+        """)
+        self.statements = []
+
+    def add_invoice(self, name, posting_date, items, grand_total, rental_job="RJ-0001"):
+        net_total = sum(amount for item_code, qty, amount in items)
+        self.conn.execute("INSERT INTO `tabSales Invoice` VALUES (?, 'Test Company', ?, 'CUST-0001', ?, NULL, "
+                          "'Administrator', 1, ?, ?)", (name, posting_date, rental_job, net_total, grand_total))
+        self.conn.executemany("INSERT INTO `tabSales Invoice Item` VALUES (?, ?, ?, ?, ?)",
+                              [(name, item_code, qty, amount, amount) for item_code, qty, amount in items])
+
+    def sql(self, query, values=None, as_dict=False):
+        self.statements.append(query)
+        query = re.sub(r"%\((\w+)\)s", r":\1", query)
+        query = re.sub(r"\) rollup\s+ON DUPLICATE KEY UPDATE", ") rollup WHERE 1 ON CONFLICT(name) DO UPDATE SET",
+                       query)
+        query = re.sub(r"VALUES\((\w+)\)", r"excluded.\1", query)
+        values = {key: str(value) if hasattr(value, "isoformat") else value for key, value in (values or {}).items()}
+        return self.conn.execute(query, values).fetchall()
+
+    def rows(self):
+        return self.conn.execute("SELECT item_code, net_amount, grand_total, qty FROM `tabRental Revenue Daily` "
+                                 "ORDER BY item_code").fetchall()
+
+
+class TestRevenueRollup(unittest.TestCase):
+    """
+    Test suite for the Rental Revenue Daily rollup.
+
+    Validates that submitting and cancelling an invoice adds and removes its
+    revenue, that the grand total is shared among the items by net amount and
+    that rebuilds work in chunks of DAYS_PER_CHUNK days.
+    """
+
+    def setUp(self):
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.mock_db.has_column.side_effect = lambda doctype, fieldname: (doctype, fieldname) in {
+            ("Sales Invoice", "rental_job"), ("Sales Invoice", "sales_person"), ("Item", "is_rental_item")
+        }
+        self.capabilities_patcher = patch('onhire_pro.utils.schema_capabilities.get_schema_capabilities',
+                                          side_effect=mocked_db_schema_capabilities)
+        self.capabilities_patcher.start()
+        self.log_patcher = patch('frappe.log_error')
+        self.mock_log_error = self.log_patcher.start()
+
+        self.database = RollupDatabase()
+        self.mock_db.sql.side_effect = self.database.sql
+
+    def tearDown(self):
+        self.db_patcher.stop()
+        self.capabilities_patcher.stop()
+        self.log_patcher.stop()
+
+    def _invoice(self, name="SINV-0001", posting_date="2025-03-03"):
+        return frappe._dict(doctype="Sales Invoice", name=name, company="Test Company", posting_date=posting_date)
+
+    def test_grand_total_prorated_by_net_amount(self):
+        """The invoice grand total is shared among its items by net amount."""
+        self.database.add_invoice("SINV-0001", "2025-03-03", [("GEN-10", 2, 300.0), ("CABLE", 5, 100.0)], 480.0)
+
+        update_revenue_rollup(self._invoice(), "on_submit")
+
+        self.mock_log_error.assert_not_called()
+        self.assertEqual(self.database.rows(), [("CABLE", 100.0, 120.0, 5.0), ("GEN-10", 300.0, 360.0, 2.0)])
+
+    def test_submit_adds_to_existing_rows(self):
+        """A second invoice on the same key adds to the row instead of inserting another."""
+        self.database.add_invoice("SINV-0001", "2025-03-03", [("GEN-10", 2, 300.0)], 360.0)
+        self.database.add_invoice("SINV-0002", "2025-03-03", [("GEN-10", 1, 150.0)], 180.0)
+
+        update_revenue_rollup(self._invoice("SINV-0001"), "on_submit")
+        update_revenue_rollup(self._invoice("SINV-0002"), "on_submit")
+
+        self.assertEqual(self.database.rows(), [("GEN-10", 450.0, 540.0, 3.0)])
+
+    def test_submit_then_cancel_returns_to_zero(self):
+        """Cancelling an invoice subtracts its revenue and drops the rows it alone made up."""
+        self.database.add_invoice("SINV-0001", "2025-03-03", [("GEN-10", 2, 300.0), ("CABLE", 5, 100.0)], 480.0)
+        self.database.add_invoice("SINV-0002", "2025-03-03", [("GEN-10", 1, 150.0)], 180.0)
+
+        update_revenue_rollup(self._invoice("SINV-0001"), "on_submit")
+        update_revenue_rollup(self._invoice("SINV-0002"), "on_submit")
+        update_revenue_rollup(self._invoice("SINV-0001"), "on_cancel")
+
+        self.mock_log_error.assert_not_called()
+        self.assertEqual(self.database.rows(), [("GEN-10", 150.0, 180.0, 1.0)])
+
+        update_revenue_rollup(self._invoice("SINV-0002"), "on_cancel")
+        self.assertEqual(self.database.rows(), [])
+
+    def test_rebuild_in_chunks(self):
+        """A rebuild deletes and re-inserts each chunk of DAYS_PER_CHUNK days."""
+        self.database.add_invoice("SINV-0001", "2025-01-10", [("GEN-10", 2, 300.0)], 360.0)
+        self.database.add_invoice("SINV-0002", "2025-02-20", [("GEN-10", 1, 150.0)], 180.0)
+        self.database.add_invoice("SINV-0003", "2025-03-05", [("CABLE", 5, 100.0)], 120.0, rental_job=None)
+        self.mock_db.count.return_value = 2
+
+        rebuild_revenue_rollup("2025-01-01", "2025-03-31", commit=False)
+
+        chunks = -(-90 // DAYS_PER_CHUNK)
+        deletes = [query for query in self.database.statements if query.strip().startswith("DELETE")]
+        inserts = [query for query in self.database.statements if query.strip().startswith("INSERT")]
+        self.assertEqual((len(deletes), len(inserts)), (chunks, chunks))
+        self.mock_db.commit.assert_not_called()
+        # The consumable without a Rental Job is not rental revenue
+        self.assertEqual(self.database.conn.execute(
+            "SELECT date, net_amount, grand_total FROM `tabRental Revenue Daily` ORDER BY date").fetchall(),
+            [("2025-01-10", 300.0, 360.0), ("2025-02-20", 150.0, 180.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from unittest.mock import patch
+
+from onhire_pro.utils import schema_capabilities
+from onhire_pro.utils.schema_capabilities import doctype_exists, has_column, sql_fragment
+from onhire_pro.utils.schema_verifier import verify_schema_for_kpi, get_safe_value_for_kpi
+from onhire_pro.tests.fakes import FakeRedis
+
+
+class TestSchemaCapabilities(unittest.TestCase):
+    """
+    Test suite for the schema capability map.
+
+    Validates that the schema is read once and shared through Redis, that the
+    checks and SQL fragments follow the columns found, and the KPI schema checks.
+    """
+
+    def setUp(self):
+        self.columns = {
+            "Rental Job": ["name", "docstatus", "job_status", "customer", "scheduled_dispatch_date",
+                           "scheduled_return_date"],
+            "Rental Job Item": ["name", "parent", "item_code", "qty", "rental_item_start_date", "rental_item_end_date"],
+            "Sales Invoice": ["name", "company", "posting_date", "grand_total", "is_rental_invoice"],
+        }
+
+        self.redis = FakeRedis()
+        self.cache_patcher = patch('frappe.cache', return_value=self.redis)
+        self.cache_patcher.start()
+        self.get_all_patcher = patch('frappe.get_all', return_value=list(self.columns))
+        self.mock_get_all = self.get_all_patcher.start()
+        self.db_patcher = patch('frappe.db')
+        self.mock_db = self.db_patcher.start()
+        self.mock_db.get_table_columns.side_effect = lambda doctype: self.columns[doctype]
+
+        schema_capabilities._capabilities.clear()
+
+    def tearDown(self):
+        self.cache_patcher.stop()
+        self.get_all_patcher.stop()
+        self.db_patcher.stop()
+        schema_capabilities._capabilities.clear()
+
+    def test_schema_read_once(self):
+        """Checks in this and another worker read the schema from the database once."""
+        self.assertTrue(doctype_exists("Rental Job"))
+        self.assertFalse(doctype_exists("Maintenance Task"))
+        self.assertTrue(has_column("Rental Job", "job_status"))
+        self.assertFalse(has_column("Rental Job", "company"))
+
+        schema_capabilities._capabilities.clear()
+        self.assertTrue(has_column("Sales Invoice", "is_rental_invoice"))
+
+        self.assertEqual(self.mock_get_all.call_count, 1)
+        self.mock_db.exists.assert_not_called()
+        self.mock_db.has_column.assert_not_called()
+
+    def test_sql_fragments(self):
+        """Fragments are compiled for the columns found."""
+        self.assertEqual(sql_fragment("maintenance_task_date"), "creation")
+        self.assertEqual(sql_fragment("rental_job_status"), "rj.job_status")
+        self.assertEqual(sql_fragment("rental_job_company"), "''")
+        self.assertEqual(sql_fragment("job_item_start_date"),
+                         "COALESCE(rji.rental_item_start_date, rj.scheduled_dispatch_date)")
+        self.assertEqual(sql_fragment("job_item_damaged"), "0")
+
+        self.columns["Rental Job"].append("has_damaged_items")
+        self.assertEqual(schema_capabilities.build_schema_capabilities()["fragments"]["job_item_damaged"],
+                         "rj.has_damaged_items = 1")
+        self.columns["Rental Job Item"].append("damaged_qty")
+        self.assertEqual(schema_capabilities.build_schema_capabilities()["fragments"]["job_item_damaged"],
+                         "rji.damaged_qty > 0")
+
+    def test_kpi_schema_checks(self):
+        """KPI checks name what is missing and the safe value matches the KPI's shape."""
+        self.assertEqual(verify_schema_for_kpi("total_rental_revenue")["status"], "valid")
+
+        result = verify_schema_for_kpi("maintenance_turnaround_time")
+        self.assertEqual(result, {"status": "invalid", "message": "Missing doctypes: Maintenance Task"})
+        self.assertIn("Rental Job.rental_end_date", verify_schema_for_kpi("overdue_returns_count")["message"])
+
+        self.assertEqual(get_safe_value_for_kpi("overdue_returns_count"), {"value": 0})
+        self.assertEqual(get_safe_value_for_kpi("revenue_per_item_category")["labels"], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,226 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module provides batch availability checks for catalog pages, carts and
+quote estimates.
+
+A batch of N items (or cart lines with their own dates) is answered with a fixed
+number of grouped queries: one for the items, one for active serial numbers and
+one for the Stock Reservations of every item whose availability index is not
+already current. Stock comes from the capacity cache and everything else is
+computed in memory.
+
+Dates without a time cover the whole day, so a catalog or cart period from
+2025-03-01 to 2025-03-07 is checked up to the end of 2025-03-07, the last day
+billed (see `availability_index.rental_period`).
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import flt, cint, get_datetime, today
+from typing import Dict, List, Optional, Iterable, Any, Union
+from onhire_pro.utils.availability_index import get_item_indexes, get_item_index, rental_period
+from onhire_pro.utils.capacity_cache import get_default_warehouse, get_item_capacities
+
+MAX_FREE_WINDOW_HORIZON_DAYS = 366
+
+
+def get_item_stock(item_codes: Iterable[str], warehouse: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Get stock details for several items with grouped queries.
+
+    Stock quantities come from the capacity cache, so a warm batch does not
+    touch `tabBin`.
+
+    Args:
+        item_codes: Items to look up
+        warehouse: Warehouse to count stock in; all warehouses if not set
+
+    Returns:
+        dict: item_code -> {"item_name", "has_serial_no", "actual_qty", "serial_nos"} for every existing item
+    """
+    item_codes = tuple(set(item_codes))
+    if not item_codes:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT name AS item_code, item_name, has_serial_no
+        FROM `tabItem`
+        WHERE name IN %(item_codes)s
+    """, {"item_codes": item_codes}, as_dict=1)
+    capacities = get_item_capacities([row.item_code for row in rows], warehouse)
+
+    stock = {
+        row.item_code: frappe._dict(
+            item_name=row.item_name,
+            has_serial_no=cint(row.has_serial_no),
+            actual_qty=capacities[row.item_code],
+            serial_nos=[]
+        )
+        for row in rows
+    }
+
+    serialized = tuple(item_code for item_code, details in stock.items() if details.has_serial_no)
+    if serialized:
+        serial_nos = frappe.db.sql("""
+            SELECT name, item_code
+            FROM `tabSerial No`
+            WHERE item_code IN %(item_codes)s AND status = 'Active'
+            ORDER BY name
+        """, {"item_codes": serialized}, as_dict=1)
+
+        for serial_no in serial_nos:
+            stock[serial_no.item_code].serial_nos.append(serial_no.name)
+
+    return stock
+
+
+def check_availability(lines: List[Dict[str, Any]], warehouse: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Check the availability of several item lines, each with its own dates.
+
+    Args:
+        lines: Dicts with item_code, start_date, end_date and optionally qty (default 1);
+            an end_date without a time includes that whole day
+        warehouse: Warehouse to count stock in; defaults to the Stock Settings default
+
+    Returns:
+        list: One result per line, in the same order, with item_code, qty, start_date,
+            end_date, available, available_qty and reason
+
+    Example:
+        >>> check_availability([{"item_code": "GEN-5KVA", "qty": 2,
+        ...     "start_date": "2025-03-01", "end_date": "2025-03-07"}])
+        [{"item_code": "GEN-5KVA", "qty": 2.0, "available": True, "available_qty": 3.0, ...}]
+    """
+    if not lines:
+        return []
+
+    warehouse = warehouse or get_default_warehouse()
+    item_codes = {line.get("item_code") for line in lines if line.get("item_code")}
+    stock = get_item_stock(item_codes, warehouse)
+    indexes = get_item_indexes(stock)
+
+    results = []
+    for line in lines:
+        result = frappe._dict(
+            item_code=line.get("item_code"),
+            qty=flt(line.get("qty") or 1),
+            start_date=line.get("start_date"),
+            end_date=line.get("end_date"),
+            available=False,
+            available_qty=0.0,
+            reason=""
+        )
+        results.append(result)
+
+        details = stock.get(result.item_code)
+        if not details:
+            result.reason = _("Item {0} does not exist").format(result.item_code)
+            continue
+
+        if not result.start_date or not result.end_date:
+            result.reason = _("Start date and end date are required")
+            continue
+
+        if get_datetime(result.end_date) < get_datetime(result.start_date):
+            result.reason = _("End date cannot be before start date")
+            continue
+
+        index = indexes[result.item_code]
+        from_date, to_date = rental_period(result.start_date, result.end_date)
+        if details.has_serial_no:
+            free_serials = index.free_serials(details.serial_nos, from_date, to_date)
+            result.available_qty = flt(len(free_serials))
+        else:
+            booked_qty = index.peak_booked_qty(from_date, to_date)
+            result.available_qty = max(details.actual_qty - booked_qty, 0.0)
+
+        result.available = result.available_qty >= result.qty
+        if not result.available:
+            result.reason = _("Only {0} available for the selected dates").format(result.available_qty)
+
+    return results
+
+
+def get_availability_map(item_codes: Iterable[str], start_date, end_date, qty: float = 1,
+                         warehouse: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Check several items for the same period.
+
+    Returns:
+        dict: item_code -> availability result (see `check_availability`)
+    """
+    lines = [
+        {"item_code": item_code, "qty": qty, "start_date": start_date, "end_date": end_date}
+        for item_code in dict.fromkeys(item_codes)
+    ]
+    return {result.item_code: result for result in check_availability(lines, warehouse)}
+
+
+def get_free_windows(item_code: str, qty: float = 1, min_days: int = 1, from_date=None, horizon_days: int = 90,
+                     limit: int = 3, warehouse: Optional[str] = None,
+                     exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Find the next free windows of at least `min_days` days for `qty` units of an item.
+
+    Args:
+        item_code: Item to look for
+        qty: Units needed at the same time
+        min_days: Minimum rental length in days
+        from_date: First day to consider (default today)
+        horizon_days: How many days ahead to search (capped at MAX_FREE_WINDOW_HORIZON_DAYS)
+        limit: Maximum number of windows to return
+        warehouse: Warehouse to count stock in; defaults to the Stock Settings default
+        exclude: Reservation or reference document to ignore (e.g. the one being re-validated)
+
+    Returns:
+        list: Windows with start_date, end_date, latest_start_date, days and open_ended
+
+    Example:
+        >>> get_free_windows("GEN-5KVA", qty=2, min_days=3, from_date="2025-03-01")
+        [{"start_date": date(2025, 3, 4), "end_date": date(2025, 3, 9), "days": 6, ...}]
+    """
+    horizon_days = min(max(cint(horizon_days), 0), MAX_FREE_WINDOW_HORIZON_DAYS)
+    min_days = max(cint(min_days), 1)
+    qty = flt(qty) or 1
+
+    details = get_item_stock([item_code], warehouse or get_default_warehouse()).get(item_code)
+    if not details or not horizon_days:
+        return []
+
+    return get_item_index(item_code).free_windows(
+        from_date or today(),
+        horizon_days,
+        min_days,
+        qty=qty,
+        capacity=details.actual_qty,
+        serial_nos=details.serial_nos if details.has_serial_no else None,
+        exclude=exclude,
+        limit=max(cint(limit), 1)
+    )
+
+
+def parse_availability_lines(items: Union[str, List[Any]], start_date=None, end_date=None) -> List[Dict[str, Any]]:
+    """
+    Normalize an API payload into availability lines.
+
+    `items` may be a JSON string or a list of item codes (which use `start_date`
+    and `end_date`) or of line dicts (whose own dates override them).
+    """
+    if isinstance(items, str):
+        items = frappe.parse_json(items)
+
+    lines = []
+    for item in items or []:
+        if isinstance(item, str):
+            item = {"item_code": item}
+
+        lines.append({
+            "item_code": item.get("item_code"),
+            "qty": item.get("qty") or 1,
+            "start_date": item.get("start_date") or start_date,
+            "end_date": item.get("end_date") or end_date
+        })
+
+    return lines
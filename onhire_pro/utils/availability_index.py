@@ -0,0 +1,419 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module provides the shared availability index for Stock Reservations.
+
+Every availability check (reservation validation, rental event conflict
+detection, quotation checks and the rental catalog) answers "how much of this
+item is booked between these dates" and "which serials are free". Instead of
+sending an overlap query to `tabStock Reservation` each time, the submitted
+reservations of an item are loaded once into sorted boundary arrays with prefix
+sums (see `onhire_pro.utils.occupancy`). Serial checks are a couple of binary
+searches; quantity checks use the peak concurrent booking inside the window.
+Every check treats reservations as half-open intervals [from_date, to_date), so a
+reservation may start at the instant another one of the same stock ends. Periods
+given as dates without a time cover their end date in full (see `rental_period`).
+
+Indexes are kept per worker process and per site. Stock Reservation
+submit/cancel/status changes drop the local copy immediately and bump a
+per-item version in Redis once the transaction commits, so other workers
+rebuild the item on their next lookup.
+"""
+
+import frappe
+import numpy as np
+from datetime import date, datetime
+from frappe.utils import get_datetime, getdate, add_days, date_diff, flt
+from typing import Dict, List, Optional, Iterable, Any, Tuple
+from onhire_pro.utils.occupancy import IntervalSet, day_boundaries, free_window_starts, true_runs, overlaps
+
+ACTIVE_RESERVATION_STATUSES = ("Reserved", "In Use")
+INDEX_VERSION_KEY = "onhire_pro:availability_index_version"
+EPOCH = datetime(1970, 1, 1)
+
+# (site, item_code) -> ItemReservationIndex
+_indexes: Dict[tuple, "ItemReservationIndex"] = {}
+
+
+def to_timestamp(value) -> float:
+    """Convert a date/datetime/string to naive seconds since the epoch, used as index key."""
+    return (get_datetime(value) - EPOCH).total_seconds()
+
+
+def has_time(value) -> bool:
+    """Whether a date/datetime/string value carries a time of day."""
+    if isinstance(value, datetime):
+        return True
+    if isinstance(value, date):
+        return False
+    return len(str(value).strip()) > 10
+
+
+def rental_period(start_date, end_date) -> Tuple[datetime, datetime]:
+    """
+    Half-open period [start, end) of a booking; an end date without a time
+    covers that whole day, so a rental from and to the same date is one day.
+
+    Example:
+        >>> rental_period("2025-03-01", "2025-03-07")
+        (datetime(2025, 3, 1, 0, 0), datetime(2025, 3, 8, 0, 0))
+    """
+    end = end_date if has_time(end_date) else add_days(getdate(end_date), 1)
+    return get_datetime(start_date), get_datetime(end)
+
+
+class ItemReservationIndex:
+    """Availability index for the active, submitted reservations of one item."""
+
+    def __init__(self, item_code: str, reservations: List[Dict[str, Any]], version: Optional[str] = None):
+        self.item_code = item_code
+        self.version = version
+        self.reservations = []
+
+        bulk_reservations = []
+        serial_intervals: Dict[str, list] = {}
+
+        for row in reservations:
+            reservation = frappe._dict(row)
+            reservation.from_ts = to_timestamp(reservation.from_date)
+            reservation.to_ts = to_timestamp(reservation.to_date)
+            reservation.qty = flt(reservation.qty)
+            self.reservations.append(reservation)
+
+            if reservation.serial_no:
+                serial_intervals.setdefault(reservation.serial_no, []).append(reservation)
+            else:
+                bulk_reservations.append(reservation)
+
+        self.bulk_reservations = bulk_reservations
+        self.bulk = self._interval_set(bulk_reservations)
+        self.serial_reservations = serial_intervals
+        self.serials = {
+            serial_no: IntervalSet([r.from_ts for r in rows], [r.to_ts for r in rows], [1] * len(rows))
+            for serial_no, rows in serial_intervals.items()
+        }
+
+    @staticmethod
+    def _interval_set(reservations) -> IntervalSet:
+        return IntervalSet(
+            [r.from_ts for r in reservations],
+            [r.to_ts for r in reservations],
+            [r.qty for r in reservations]
+        )
+
+    @staticmethod
+    def _overlaps(reservation, from_ts: float, to_ts: float) -> bool:
+        return overlaps(reservation.from_ts, reservation.to_ts, from_ts, to_ts)
+
+    @staticmethod
+    def _is_excluded(reservation, exclude: Optional[str]) -> bool:
+        return bool(exclude) and exclude in (reservation.name, reservation.reference_name)
+
+    def _excluded(self, reservations, exclude: Optional[str]) -> Optional[IntervalSet]:
+        if not exclude:
+            return None
+        excluded = [r for r in reservations if self._is_excluded(r, exclude)]
+        return self._interval_set(excluded) if excluded else None
+
+    def _excluded_bulk(self, exclude: Optional[str]) -> Optional[IntervalSet]:
+        return self._excluded(self.bulk_reservations, exclude)
+
+    def peak_booked_qty(self, from_date, to_date, exclude: Optional[str] = None,
+                        pending: Optional[List[Dict[str, Any]]] = None) -> float:
+        """
+        Peak quantity of the non-serialized stock booked at any one time during the period.
+
+        `pending` adds reservations that are not written yet (with from_ts, to_ts and qty),
+        e.g. the lines accepted earlier in a bulk reservation.
+        """
+        from_ts, to_ts = to_timestamp(from_date), to_timestamp(to_date)
+        if not pending:
+            return self.bulk.peak(from_ts, to_ts, exclude=self._excluded_bulk(exclude))
+
+        booked = [r for r in self.bulk_reservations if not self._is_excluded(r, exclude)] + list(pending)
+        return self._interval_set(booked).peak(from_ts, to_ts)
+
+    def occupancy_profile(self, from_date, to_date, exclude: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Per-day peak booked quantity for every day from `from_date` to `to_date` inclusive.
+
+        Returns:
+            dict: {"dates": [date, ...], "booked_qty": numpy.ndarray}
+        """
+        from_date, to_date = getdate(from_date), getdate(to_date)
+        days = date_diff(to_date, from_date) + 1
+        if days <= 0:
+            return frappe._dict(dates=[], booked_qty=self.bulk.profile([]))
+
+        boundaries = day_boundaries(to_timestamp(from_date), days)
+        return frappe._dict(
+            dates=[add_days(from_date, offset) for offset in range(days)],
+            booked_qty=self.bulk.profile(boundaries, exclude=self._excluded_bulk(exclude))
+        )
+
+    def free_windows(self, from_date, days: int, min_days: int, qty: float = 1, capacity: float = 0,
+                     serial_nos: Optional[Iterable[str]] = None, exclude: Optional[str] = None,
+                     limit: int = 3) -> List[Dict[str, Any]]:
+        """
+        Find the first free windows of at least `min_days` whole days within `days`
+        days from `from_date`, from a single occupancy profile of the horizon.
+
+        Non-serialized stock is free on a day when `capacity` less the day's peak
+        booking covers `qty`. For serialized items pass `serial_nos`: at least `qty`
+        of them must each be free for the whole booking.
+
+        Days are whole days from midnight to midnight, so a window's end_date is its
+        last free day, inclusive like a date-only period of `rental_period`.
+
+        Returns:
+            list: Windows with start_date, end_date (last free day), latest_start_date
+                (last day a `min_days` booking can start) and days. A window that
+                reaches the end of the horizon is marked open_ended.
+        """
+        from_date = getdate(from_date)
+        boundaries = day_boundaries(to_timestamp(from_date), days)
+
+        if serial_nos is not None:
+            serial_nos = list(serial_nos)
+            busy = np.zeros((len(serial_nos), days), dtype=bool)
+            for row, serial_no in enumerate(serial_nos):
+                arrays = self.serials.get(serial_no)
+                if arrays:
+                    excluded = self._excluded(self.serial_reservations[serial_no], exclude)
+                    busy[row] = arrays.profile(boundaries, exclude=excluded) > 0
+            can_start = free_window_starts(busy, min_days).sum(axis=0) >= qty
+        else:
+            booked = self.bulk.profile(boundaries, exclude=self._excluded_bulk(exclude))
+            can_start = free_window_starts(capacity - booked < qty, min_days)
+
+        run_starts, run_lengths = true_runs(can_start)
+
+        windows = []
+        for start, length in zip(run_starts[:limit].tolist(), run_lengths[:limit].tolist()):
+            window_days = length + min_days - 1
+            windows.append(frappe._dict(
+                start_date=add_days(from_date, start),
+                end_date=add_days(from_date, start + window_days - 1),
+                latest_start_date=add_days(from_date, start + length - 1),
+                days=window_days,
+                open_ended=start + window_days == days
+            ))
+
+        return windows
+
+    def booked_qty(self, from_date, to_date, exclude: Optional[str] = None) -> float:
+        """Summed quantity of every reservation overlapping the period (not the concurrent peak)."""
+        from_ts, to_ts = to_timestamp(from_date), to_timestamp(to_date)
+        booked = self.bulk.overlap_weight(from_ts, to_ts, inclusive=False)
+
+        if exclude and booked:
+            for reservation in self.reservations:
+                if (not reservation.serial_no and self._is_excluded(reservation, exclude)
+                        and self._overlaps(reservation, from_ts, to_ts)):
+                    booked -= reservation.qty
+
+        return booked
+
+    def serial_conflict(self, serial_no: str, from_date, to_date,
+                        exclude: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Return the first reservation holding `serial_no` during the period, if any."""
+        arrays = self.serials.get(serial_no)
+        if not arrays:
+            return None
+
+        from_ts, to_ts = to_timestamp(from_date), to_timestamp(to_date)
+        if not arrays.overlap_weight(from_ts, to_ts, inclusive=False):
+            return None
+
+        # Only reached on an actual conflict; scans the reservations of a single serial
+        for reservation in self.serial_reservations[serial_no]:
+            if self._is_excluded(reservation, exclude):
+                continue
+            if self._overlaps(reservation, from_ts, to_ts):
+                return reservation
+
+        return None
+
+    def free_serials(self, serial_nos: Iterable[str], from_date, to_date) -> List[str]:
+        """Filter `serial_nos` down to those without a reservation during the period."""
+        from_ts, to_ts = to_timestamp(from_date), to_timestamp(to_date)
+        free = []
+        for serial_no in serial_nos:
+            arrays = self.serials.get(serial_no)
+            if not arrays or not arrays.overlap_weight(from_ts, to_ts, inclusive=False):
+                free.append(serial_no)
+        return free
+
+
+def _site_key(item_code: str) -> tuple:
+    return (getattr(frappe.local, "site", None), item_code)
+
+
+def _get_shared_version(item_code: str) -> Optional[str]:
+    return frappe.cache().hget(INDEX_VERSION_KEY, item_code)
+
+
+def _load_reservations(item_codes: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Fetch active submitted reservations for several items in one query."""
+    item_codes = tuple(set(item_codes))
+    rows_by_item = {item_code: [] for item_code in item_codes}
+    if not item_codes:
+        return rows_by_item
+
+    rows = frappe.db.sql("""
+        SELECT sr.name, sr.item_code, sr.serial_no, sr.qty, sr.from_date, sr.to_date,
+            sr.reference_doctype, sr.reference_name
+        FROM `tabStock Reservation` sr
+        WHERE
+            sr.item_code IN %(item_codes)s
+            AND sr.docstatus = 1
+            AND sr.status IN %(statuses)s
+    """, {"item_codes": item_codes, "statuses": ACTIVE_RESERVATION_STATUSES}, as_dict=1)
+
+    for row in rows:
+        rows_by_item[row.item_code].append(row)
+
+    return rows_by_item
+
+
+def get_item_index(item_code: str) -> ItemReservationIndex:
+    """
+    Get the availability index for an item, building it from the database when the
+    local copy is missing or another worker has changed the item's reservations.
+
+    Example:
+        >>> get_item_index("GEN-5KVA").booked_qty("2025-03-01", "2025-03-07")
+        4.0
+    """
+    key = _site_key(item_code)
+    version = _get_shared_version(item_code)
+    index = _indexes.get(key)
+
+    if index is None or index.version != version:
+        rows = _load_reservations([item_code])[item_code]
+        index = ItemReservationIndex(item_code, rows, version)
+        _indexes[key] = index
+
+    return index
+
+
+def get_item_indexes(item_codes: Iterable[str]) -> Dict[str, ItemReservationIndex]:
+    """
+    Get the availability indexes for several items, loading every stale or missing
+    one with a single query.
+
+    Example:
+        >>> indexes = get_item_indexes(["GEN-5KVA", "LIGHT-TOWER"])
+        >>> indexes["LIGHT-TOWER"].peak_booked_qty("2025-03-01", "2025-03-07")
+        2.0
+    """
+    indexes = {}
+    stale = {}
+
+    for item_code in set(item_codes):
+        version = _get_shared_version(item_code)
+        index = _indexes.get(_site_key(item_code))
+        if index is None or index.version != version:
+            stale[item_code] = version
+        else:
+            indexes[item_code] = index
+
+    if stale:
+        rows_by_item = _load_reservations(stale)
+        for item_code, version in stale.items():
+            index = ItemReservationIndex(item_code, rows_by_item[item_code], version)
+            _indexes[_site_key(item_code)] = index
+            indexes[item_code] = index
+
+    return indexes
+
+
+def load_item_indexes(item_codes: Iterable[str]) -> Dict[str, ItemReservationIndex]:
+    """
+    Build indexes straight from the database, bypassing the worker cache.
+
+    Used while the items are locked, so the check sees every committed reservation
+    even if the version bump of a concurrent transaction has not happened yet.
+    """
+    rows_by_item = _load_reservations(item_codes)
+    return {
+        item_code: ItemReservationIndex(item_code, rows)
+        for item_code, rows in rows_by_item.items()
+    }
+
+
+def get_booked_qty(item_code: str, from_date, to_date, exclude: Optional[str] = None) -> float:
+    """Summed quantity of every reservation of a non-serialized item overlapping the period."""
+    return get_item_index(item_code).booked_qty(from_date, to_date, exclude)
+
+
+def get_peak_booked_qty(item_code: str, from_date, to_date, exclude: Optional[str] = None) -> float:
+    """Peak quantity of a non-serialized item reserved at any one time during the period."""
+    return get_item_index(item_code).peak_booked_qty(from_date, to_date, exclude)
+
+
+def get_occupancy_profile(item_code: str, from_date, to_date, exclude: Optional[str] = None) -> Dict[str, Any]:
+    """Per-day peak reserved quantity of a non-serialized item."""
+    return get_item_index(item_code).occupancy_profile(from_date, to_date, exclude)
+
+
+def find_free_windows(item_code: str, from_date, days: int, min_days: int, qty: float = 1, capacity: float = 0,
+                      serial_nos: Optional[Iterable[str]] = None, exclude: Optional[str] = None,
+                      limit: int = 3) -> List[Dict[str, Any]]:
+    """Next free windows of an item (see `ItemReservationIndex.free_windows`)."""
+    return get_item_index(item_code).free_windows(
+        from_date, days, min_days, qty=qty, capacity=capacity, serial_nos=serial_nos, exclude=exclude, limit=limit
+    )
+
+
+def get_serial_conflict(item_code: str, serial_no: str, from_date, to_date,
+                        exclude: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Reservation that already holds `serial_no` during the period, or None."""
+    return get_item_index(item_code).serial_conflict(serial_no, from_date, to_date, exclude)
+
+
+def get_free_serials(item_code: str, serial_nos: Iterable[str], from_date, to_date) -> List[str]:
+    """Serial numbers from `serial_nos` that are not reserved during the period."""
+    return get_item_index(item_code).free_serials(serial_nos, from_date, to_date)
+
+
+def invalidate_item(item_code: str) -> None:
+    """Drop the local index of an item and tell other workers to rebuild theirs."""
+    _indexes.pop(_site_key(item_code), None)
+    frappe.cache().hset(INDEX_VERSION_KEY, item_code, frappe.generate_hash(length=10))
+
+
+def update_reservation_index(doc, method=None) -> None:
+    """
+    Keep the availability index in step with a Stock Reservation that was
+    submitted, cancelled or changed status.
+
+    The local copy is dropped right away so later checks in the same transaction
+    rebuild from the uncommitted rows; the shared version is bumped again after
+    commit so that other workers never keep an index built before the change.
+    """
+    if not doc.item_code:
+        return
+
+    mark_items_changed([doc.item_code])
+
+
+def mark_items_changed(item_codes: Iterable[str]) -> None:
+    """Drop the local indexes of items now and invalidate them everywhere after commit."""
+    item_codes = list(set(item_codes))
+    for item_code in item_codes:
+        _indexes.pop(_site_key(item_code), None)
+
+    def invalidate():
+        for item_code in item_codes:
+            invalidate_item(item_code)
+
+    frappe.db.after_commit.add(invalidate)
+
+
+def clear_availability_index() -> None:
+    """Drop every locally built index and all shared versions for the current site."""
+    site = getattr(frappe.local, "site", None)
+    for key in [key for key in _indexes if key[0] == site]:
+        _indexes.pop(key, None)
+    frappe.cache().delete_value(INDEX_VERSION_KEY)
@@ -0,0 +1,136 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module provides the capacity cache for item stock in `tabBin`.
+
+Every availability check compares bookings against the stock of an item, which
+used to be a `SUM(actual_qty)` query on `tabBin` per check (and per item on
+catalog pages). Stock only changes when a Stock Ledger Entry is posted, so the
+quantities are cached per item and warehouse:
+
+- per request in `frappe.local`, so repeated checks in one request never leave
+  the process, and
+- in a Redis hash shared by all workers, so a warm item needs no Bin query at all.
+
+Stock Ledger Entry submit/cancel drops the affected entries right away and again
+once the transaction commits (see `invalidate_stock_ledger_entry`). The default
+warehouse from Stock Settings is cached per request as well.
+"""
+
+import frappe
+from frappe.utils import flt
+from typing import Dict, Iterable, Optional
+
+CAPACITY_CACHE_KEY = "onhire_pro:item_capacity"
+ALL_WAREHOUSES = ""
+
+
+def _cache_field(item_code: str, warehouse: Optional[str] = None) -> str:
+    return f"{item_code}::{warehouse or ALL_WAREHOUSES}"
+
+
+def _local_cache() -> Dict[str, float]:
+    if getattr(frappe.local, "onhire_capacity_cache", None) is None:
+        frappe.local.onhire_capacity_cache = {}
+    return frappe.local.onhire_capacity_cache
+
+
+def get_default_warehouse() -> Optional[str]:
+    """Get default warehouse from settings, read once per request"""
+    if not hasattr(frappe.local, "onhire_default_warehouse"):
+        frappe.local.onhire_default_warehouse = frappe.db.get_single_value("Stock Settings", "default_warehouse")
+    return frappe.local.onhire_default_warehouse
+
+
+def get_item_capacities(item_codes: Iterable[str], warehouse: Optional[str] = None) -> Dict[str, float]:
+    """
+    Get the actual stock of several items, loading every uncached one with a
+    single grouped Bin query.
+
+    Args:
+        item_codes: Items to look up
+        warehouse: Warehouse to count stock in; all warehouses if not set
+
+    Returns:
+        dict: item_code -> actual_qty (0 for items without a Bin)
+
+    Example:
+        >>> get_item_capacities(["GEN-5KVA", "LIGHT-TOWER"], "Stores - EX")
+        {"GEN-5KVA": 5.0, "LIGHT-TOWER": 2.0}
+    """
+    local_cache = _local_cache()
+    capacities = {}
+    missing = []
+
+    for item_code in set(item_codes):
+        field = _cache_field(item_code, warehouse)
+        qty = local_cache.get(field)
+        if qty is None:
+            qty = frappe.cache().hget(CAPACITY_CACHE_KEY, field)
+            if qty is not None:
+                local_cache[field] = qty
+
+        if qty is None:
+            missing.append(item_code)
+        else:
+            capacities[item_code] = qty
+
+    if missing:
+        warehouse_condition = "AND warehouse = %(warehouse)s" if warehouse else ""
+        rows = frappe.db.sql(f"""
+            SELECT item_code, SUM(actual_qty)
+            FROM `tabBin`
+            WHERE item_code IN %(item_codes)s {warehouse_condition}
+            GROUP BY item_code
+        """, {"item_codes": tuple(missing), "warehouse": warehouse})
+        loaded = {item_code: flt(qty) for item_code, qty in rows}
+
+        for item_code in missing:
+            qty = loaded.get(item_code, 0.0)
+            field = _cache_field(item_code, warehouse)
+            local_cache[field] = qty
+            frappe.cache().hset(CAPACITY_CACHE_KEY, field, qty)
+            capacities[item_code] = qty
+
+    return capacities
+
+
+def get_item_capacity(item_code: str, warehouse: Optional[str] = None) -> float:
+    """Actual stock of an item in a warehouse, or in all warehouses if not set."""
+    return get_item_capacities([item_code], warehouse).get(item_code, 0.0)
+
+
+def prefetch_item_capacities(item_codes: Iterable[str], warehouse: Optional[str] = None) -> None:
+    """Warm the cache for a catalog page or cart before checking its items one by one."""
+    get_item_capacities(item_codes, warehouse)
+
+
+def invalidate_item_capacity(item_code: str, warehouse: Optional[str] = None) -> None:
+    """Drop the cached stock of an item for one warehouse and for all warehouses."""
+    fields = {_cache_field(item_code, warehouse), _cache_field(item_code)}
+    local_cache = _local_cache()
+    for field in fields:
+        local_cache.pop(field, None)
+        frappe.cache().hdel(CAPACITY_CACHE_KEY, field)
+
+
+def invalidate_stock_ledger_entry(doc, method=None) -> None:
+    """
+    Drop the cached stock of the item a Stock Ledger Entry was posted for.
+
+    The entries are dropped now, so later checks in the same transaction read the
+    new Bin, and again after commit, so a worker that read the old Bin in between
+    does not keep it.
+    """
+    if not doc.item_code:
+        return
+
+    item_code, warehouse = doc.item_code, doc.warehouse
+    invalidate_item_capacity(item_code, warehouse)
+    frappe.db.after_commit.add(lambda: invalidate_item_capacity(item_code, warehouse))
+
+
+def clear_capacity_cache() -> None:
+    """Drop every cached stock quantity for the current site."""
+    frappe.local.onhire_capacity_cache = {}
+    frappe.cache().delete_value(CAPACITY_CACHE_KEY)
@@ -0,0 +1,185 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module detects fleet-wide booking conflicts.
+
+A conflict is a period in which the Rental Jobs booked on an item in a warehouse
+need more units than the warehouse holds. Instead of self-joining
+`tabRental Job Item` to compare every pair of bookings, the job lines of each
+item/warehouse are loaded with one query, sorted once and swept linearly (see
+`onhire_pro.utils.occupancy.over_capacity_segments`).
+
+A daily job replaces the Rental Booking Conflict table with the conflicts from
+CONFLICT_LOOKBACK_DAYS ago to CONFLICT_HORIZON_DAYS ahead; the Stock Reservation
+Conflicts KPI and the Rental Booking Conflicts report read that table.
+"""
+
+import frappe
+from datetime import date
+from frappe.utils import getdate, add_days, today, now_datetime, flt
+from typing import Dict, List, Optional, Any
+from onhire_pro.utils.capacity_cache import get_item_capacities
+from onhire_pro.utils.kpi_cache import invalidate_kpis
+from onhire_pro.utils.occupancy import over_capacity_segments
+from onhire_pro.utils.schema_capabilities import doctype_exists, sql_fragment
+
+CONFLICT_DOCTYPE = "Rental Booking Conflict"
+
+# Jobs whose items are booked or out on hire
+CONFLICT_JOB_STATUSES = ("Pending Preparation", "Preparation in Progress", "Ready for Dispatch",
+                         "Dispatched", "Partially Returned", "Order Confirmed", "Confirmed", "In Use")
+
+CONFLICT_LOOKBACK_DAYS = 30
+CONFLICT_HORIZON_DAYS = 180
+
+
+def get_job_bookings(from_date, to_date) -> List[Dict[str, Any]]:
+    """Active Rental Job lines overlapping the period, with whole-day start and end dates."""
+    if not doctype_exists("Rental Job"):
+        return []
+
+    start = sql_fragment("job_item_start_date")
+    end = sql_fragment("job_item_end_date")
+    status = sql_fragment("rental_job_status")
+    warehouse = sql_fragment("job_item_warehouse")
+    company = sql_fragment("rental_job_company")
+
+    return frappe.db.sql(f"""
+        SELECT rji.item_code, IFNULL({warehouse}, '') AS warehouse, IFNULL({company}, '') AS company,
+            rj.name AS rental_job, DATE({start}) AS start_date, DATE({end}) AS end_date, rji.qty
+        FROM `tabRental Job Item` rji
+        JOIN `tabRental Job` rj ON rji.parent = rj.name
+        WHERE rj.docstatus = 1
+            AND {status} IN %(statuses)s
+            AND rji.qty > 0
+            AND {start} <= %(to_date)s
+            AND {end} >= %(from_date)s
+    """, {
+        "from_date": getdate(from_date), "to_date": getdate(to_date), "statuses": CONFLICT_JOB_STATUSES
+    }, as_dict=1)
+
+
+def detect_booking_conflicts(from_date, to_date) -> List[Dict[str, Any]]:
+    """
+    Find every period in which an item is booked beyond its stock.
+
+    Bookings are whole days: a job from the 3rd to the 5th holds its units for the
+    3rd, 4th and 5th.
+
+    Returns:
+        list: Conflicts with item_code, warehouse, company (blank when the jobs
+            belong to several), from_date, to_date, booked_qty, available_qty,
+            shortfall_qty and rental_jobs
+
+    Example:
+        >>> detect_booking_conflicts("2025-03-01", "2025-03-31")
+        [{"item_code": "GEN-5KVA", "from_date": date(2025, 3, 4), "to_date": date(2025, 3, 5),
+          "booked_qty": 7.0, "available_qty": 5.0, "shortfall_qty": 2.0,
+          "rental_jobs": ["RJ-0041", "RJ-0043"], ...}]
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for booking in get_job_bookings(from_date, to_date):
+        groups.setdefault((booking.item_code, booking.warehouse), []).append(booking)
+
+    capacities: Dict[str, Dict[str, float]] = {}
+    for warehouse in {warehouse for item_code, warehouse in groups}:
+        capacities[warehouse] = get_item_capacities(
+            [item_code for item_code, group_warehouse in groups if group_warehouse == warehouse],
+            warehouse or None
+        )
+
+    conflicts = []
+    for (item_code, warehouse), bookings in groups.items():
+        capacity = capacities[warehouse].get(item_code, 0.0)
+        segments = over_capacity_segments(
+            [getdate(booking.start_date).toordinal() for booking in bookings],
+            [getdate(booking.end_date).toordinal() + 1 for booking in bookings],
+            [flt(booking.qty) for booking in bookings],
+            capacity
+        )
+
+        for start, end, peak, members in segments:
+            first_day = max(date.fromordinal(int(start)), from_date)
+            last_day = min(date.fromordinal(int(end - 1)), to_date)
+            if first_day > last_day:
+                continue
+
+            companies = {bookings[member].company for member in members}
+            conflicts.append(frappe._dict(
+                item_code=item_code,
+                warehouse=warehouse,
+                company=companies.pop() if len(companies) == 1 else "",
+                from_date=first_day,
+                to_date=last_day,
+                booked_qty=peak,
+                available_qty=capacity,
+                shortfall_qty=peak - max(capacity, 0.0),
+                rental_jobs=sorted({bookings[member].rental_job for member in members})
+            ))
+
+    conflicts.sort(key=lambda conflict: (conflict.from_date, conflict.item_code, conflict.warehouse))
+    return conflicts
+
+
+def refresh_booking_conflicts(from_date=None, to_date=None) -> int:
+    """
+    Replace the Rental Booking Conflict table with the current conflicts.
+
+    Scheduled daily; by default covers CONFLICT_LOOKBACK_DAYS ago to
+    CONFLICT_HORIZON_DAYS ahead.
+
+    Returns:
+        int: Number of conflicts found
+    """
+    try:
+        from_date = getdate(from_date or add_days(today(), -CONFLICT_LOOKBACK_DAYS))
+        to_date = getdate(to_date or add_days(today(), CONFLICT_HORIZON_DAYS))
+        conflicts = detect_booking_conflicts(from_date, to_date)
+
+        frappe.db.sql(f"DELETE FROM `tab{CONFLICT_DOCTYPE}`")
+        if conflicts:
+            now = now_datetime()
+            user = frappe.session.user
+            fields = ("name", "owner", "creation", "modified", "modified_by", "docstatus",
+                      "item_code", "warehouse", "company", "from_date", "to_date",
+                      "booked_qty", "available_qty", "shortfall_qty", "detected_on", "rental_jobs")
+            frappe.db.bulk_insert(CONFLICT_DOCTYPE, fields, [
+                (frappe.generate_hash(length=12), user, now, now, user, 0,
+                 conflict.item_code, conflict.warehouse or None, conflict.company or None,
+                 conflict.from_date, conflict.to_date,
+                 conflict.booked_qty, conflict.available_qty, conflict.shortfall_qty, now,
+                 ", ".join(conflict.rental_jobs))
+                for conflict in conflicts
+            ])
+
+        frappe.db.commit()
+        invalidate_kpis([CONFLICT_DOCTYPE])
+        return len(conflicts)
+    except Exception:
+        frappe.db.rollback()
+        frappe.log_error(f"Error detecting booking conflicts: {frappe.get_traceback()}", "Booking Conflict Error")
+        return 0
+
+
+def get_booking_conflicts(from_date, to_date, company: Optional[str] = None,
+                          item_code: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Stored conflicts overlapping the period; conflicts without a company match any company."""
+    conditions = ""
+    if company:
+        conditions += " AND IFNULL(company, '') IN (%(company)s, '')"
+    if item_code:
+        conditions += " AND item_code = %(item_code)s"
+
+    return frappe.db.sql(f"""
+        SELECT item_code, warehouse, company, from_date, to_date,
+            booked_qty, available_qty, shortfall_qty, rental_jobs, detected_on
+        FROM `tab{CONFLICT_DOCTYPE}`
+        WHERE from_date <= %(to_date)s AND to_date >= %(from_date)s
+            {conditions}
+        ORDER BY from_date, item_code
+    """, {
+        "from_date": getdate(from_date), "to_date": getdate(to_date),
+        "company": company, "item_code": item_code
+    }, as_dict=1)
@@ -0,0 +1,464 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module maintains the Rental Item Daily Occupancy table.
+
+The table holds one row per item, warehouse, company and day with the quantity
+reserved (booked, not yet dispatched), dispatched (out on hire) and in maintenance.
+Reports and KPIs read it instead of expanding `tabRental Job Item`,
+`tabStock Reservation` and `tabMaintenance Task` rows into days every time.
+
+Sources:
+    - Rental Job items: reserved while the job is being prepared, dispatched from
+      dispatch onwards (including returned and completed jobs, for history)
+    - Stock Reservations not made for a Rental Job: Reserved -> reserved,
+      In Use / Completed -> dispatched
+    - Maintenance Tasks: one unit from start date to completion date (open
+      tasks run up to today)
+
+Document hooks refresh the affected items over the affected dates; a nightly job
+and `bench rebuild-rental-occupancy` repair any drift. Rows whose source has no
+company apply to every company when filtering.
+"""
+
+import frappe
+import numpy as np
+from frappe.utils import getdate, add_days, date_diff, flt, today, now_datetime
+from typing import Dict, List, Optional, Iterable, Any, Tuple
+from onhire_pro.utils.schema_capabilities import doctype_exists, has_column, sql_fragment
+
+OCCUPANCY_DOCTYPE = "Rental Item Daily Occupancy"
+BUCKETS = ("reserved_qty", "dispatched_qty", "maintenance_qty")
+RESERVED, DISPATCHED, MAINTENANCE = range(len(BUCKETS))
+
+RESERVED_JOB_STATUSES = ("Pending Preparation", "Preparation in Progress", "Ready for Dispatch",
+                         "Order Confirmed", "Confirmed")
+EXCLUDED_JOB_STATUSES = ("Cancelled", "Draft")
+RESERVED_RESERVATION_STATUSES = ("Reserved",)
+DISPATCHED_RESERVATION_STATUSES = ("In Use", "Completed")
+
+DEFAULT_REBUILD_DAYS = 365
+ITEMS_PER_CHUNK = 100
+
+Interval = Tuple[str, str, str, Any, Any, float, int]
+
+
+def column_if_exists(doctype: str, fieldname: str, expression: str, fallback: str = "''") -> str:
+    """SQL `expression` if the doctype has `fieldname`, else `fallback` (for optional schema fields)."""
+    return expression if has_column(doctype, fieldname) else fallback
+
+
+def _item_condition(item_codes: Optional[Tuple[str, ...]], field: str) -> str:
+    return f"AND {field} IN %(item_codes)s" if item_codes else ""
+
+
+def get_rental_job_intervals(from_date, to_date, item_codes: Optional[Iterable[str]] = None) -> List[Interval]:
+    """Rental Job item lines overlapping the period as (item, warehouse, company, start, end, qty, bucket)."""
+    if not doctype_exists("Rental Job"):
+        return []
+
+    item_codes = tuple(set(item_codes)) if item_codes else None
+    start = sql_fragment("job_item_start_date")
+    end = sql_fragment("job_item_end_date")
+    status = sql_fragment("rental_job_status")
+    warehouse = sql_fragment("job_item_warehouse")
+    company = sql_fragment("rental_job_company")
+
+    rows = frappe.db.sql(f"""
+        SELECT rji.item_code, IFNULL({warehouse}, '') AS warehouse, IFNULL({company}, '') AS company,
+            DATE({start}) AS start_date, DATE({end}) AS end_date, rji.qty, {status} AS status
+        FROM `tabRental Job Item` rji
+        JOIN `tabRental Job` rj ON rji.parent = rj.name
+        WHERE rj.docstatus = 1
+            AND {start} <= %(to_date)s
+            AND {end} >= %(from_date)s
+            {_item_condition(item_codes, "rji.item_code")}
+    """, {"from_date": from_date, "to_date": to_date, "item_codes": item_codes}, as_dict=1)
+
+    intervals = []
+    for row in rows:
+        if row.status in EXCLUDED_JOB_STATUSES:
+            continue
+        bucket = RESERVED if row.status in RESERVED_JOB_STATUSES else DISPATCHED
+        intervals.append((row.item_code, row.warehouse, row.company, row.start_date, row.end_date, flt(row.qty), bucket))
+
+    return intervals
+
+
+def get_reservation_intervals(from_date, to_date, item_codes: Optional[Iterable[str]] = None) -> List[Interval]:
+    """Submitted Stock Reservations (other than for Rental Jobs) overlapping the period."""
+    item_codes = tuple(set(item_codes)) if item_codes else None
+    statuses = RESERVED_RESERVATION_STATUSES + DISPATCHED_RESERVATION_STATUSES
+
+    rows = frappe.db.sql(f"""
+        SELECT sr.item_code, DATE(sr.from_date) AS start_date, DATE(sr.to_date) AS end_date, sr.qty, sr.status
+        FROM `tabStock Reservation` sr
+        WHERE sr.docstatus = 1
+            AND sr.status IN %(statuses)s
+            AND IFNULL(sr.reference_doctype, '') != 'Rental Job'
+            AND sr.from_date <= %(to_datetime)s
+            AND sr.to_date >= %(from_date)s
+            {_item_condition(item_codes, "sr.item_code")}
+    """, {
+        "from_date": from_date, "to_datetime": f"{to_date} 23:59:59",
+        "statuses": statuses, "item_codes": item_codes
+    }, as_dict=1)
+
+    return [
+        (row.item_code, "", "", row.start_date, row.end_date, flt(row.qty),
+         RESERVED if row.status in RESERVED_RESERVATION_STATUSES else DISPATCHED)
+        for row in rows
+    ]
+
+
+def get_maintenance_intervals(from_date, to_date, item_codes: Optional[Iterable[str]] = None) -> List[Interval]:
+    """Maintenance Tasks overlapping the period; open tasks run up to today."""
+    if not doctype_exists("Maintenance Task") or not has_column("Maintenance Task", "item_code"):
+        return []
+
+    item_codes = tuple(set(item_codes)) if item_codes else None
+    company = column_if_exists("Maintenance Task", "company", "mt.company")
+    end = "DATE(COALESCE(mt.completion_date, GREATEST(mt.start_date, CURDATE())))"
+
+    rows = frappe.db.sql(f"""
+        SELECT mt.item_code, IFNULL({company}, '') AS company,
+            DATE(mt.start_date) AS start_date, {end} AS end_date
+        FROM `tabMaintenance Task` mt
+        WHERE mt.docstatus = 1
+            AND mt.status != 'Cancelled'
+            AND mt.item_code IS NOT NULL
+            AND mt.start_date <= %(to_date)s
+            AND {end} >= %(from_date)s
+            {_item_condition(item_codes, "mt.item_code")}
+    """, {"from_date": from_date, "to_date": to_date, "item_codes": item_codes}, as_dict=1)
+
+    return [(row.item_code, "", row.company, row.start_date, row.end_date, 1.0, MAINTENANCE) for row in rows]
+
+
+def expand_to_days(intervals: List[Interval], from_date, to_date) -> List[Dict[str, Any]]:
+    """
+    Turn intervals into daily rows with difference arrays and one cumulative sum.
+
+    Returns:
+        list: Rows with item_code, warehouse, company, date and the three quantities,
+            only for days with some occupancy
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    days = date_diff(to_date, from_date) + 1
+    if days <= 0 or not intervals:
+        return []
+
+    keys = {}
+    key_index, buckets, starts, ends, qtys = [], [], [], [], []
+    for item_code, warehouse, company, start_date, end_date, qty, bucket in intervals:
+        if not start_date or not end_date:
+            continue
+        start = max(date_diff(start_date, from_date), 0)
+        end = min(date_diff(end_date, from_date), days - 1)
+        if start > end:
+            continue
+        key_index.append(keys.setdefault((item_code, warehouse or "", company or ""), len(keys)))
+        buckets.append(bucket)
+        starts.append(start)
+        ends.append(end + 1)
+        qtys.append(qty)
+
+    if not keys:
+        return []
+
+    deltas = np.zeros((len(keys), len(BUCKETS), days + 1))
+    np.add.at(deltas, (key_index, buckets, starts), qtys)
+    np.add.at(deltas, (key_index, buckets, ends), np.negative(qtys))
+    occupancy = np.cumsum(deltas, axis=-1)[..., :days]
+
+    rows = []
+    key_list = list(keys)
+    for k, offset in zip(*np.nonzero(np.abs(occupancy).sum(axis=1) > 1e-9)):
+        item_code, warehouse, company = key_list[k]
+        row = frappe._dict(item_code=item_code, warehouse=warehouse, company=company,
+                           date=add_days(from_date, int(offset)))
+        for bucket, fieldname in enumerate(BUCKETS):
+            row[fieldname] = float(occupancy[k, bucket, offset])
+        rows.append(row)
+
+    return rows
+
+
+def refresh_item_occupancy(item_codes: Iterable[str], from_date, to_date) -> int:
+    """
+    Recompute the occupancy rows of some items over a period.
+
+    Existing rows in the period are replaced with one delete and one multi-row insert.
+
+    Returns:
+        int: Number of rows written
+    """
+    item_codes = tuple(set(filter(None, item_codes)))
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    if not item_codes or to_date < from_date:
+        return 0
+
+    intervals = (
+        get_rental_job_intervals(from_date, to_date, item_codes)
+        + get_reservation_intervals(from_date, to_date, item_codes)
+        + get_maintenance_intervals(from_date, to_date, item_codes)
+    )
+    rows = expand_to_days(intervals, from_date, to_date)
+
+    frappe.db.sql(f"""
+        DELETE FROM `tab{OCCUPANCY_DOCTYPE}`
+        WHERE item_code IN %(item_codes)s AND date BETWEEN %(from_date)s AND %(to_date)s
+    """, {"item_codes": item_codes, "from_date": from_date, "to_date": to_date})
+
+    if rows:
+        now = now_datetime()
+        user = frappe.session.user
+        fields = ("name", "owner", "creation", "modified", "modified_by", "docstatus",
+                  "item_code", "warehouse", "company", "date") + BUCKETS
+        frappe.db.bulk_insert(OCCUPANCY_DOCTYPE, fields, [
+            (frappe.generate_hash(length=12), user, now, now, user, 0,
+             row.item_code, row.warehouse or None, row.company or None, row.date)
+            + tuple(row[fieldname] for fieldname in BUCKETS)
+            for row in rows
+        ])
+
+    return len(rows)
+
+
+def _document_ranges(doc) -> List[Tuple[str, Any, Any]]:
+    """(item_code, from_date, to_date) touched by a source document."""
+    if not doc:
+        return []
+
+    if doc.doctype == "Rental Job":
+        return [
+            (item.item_code,
+             item.get("rental_item_start_date") or doc.get("scheduled_dispatch_date"),
+             item.get("rental_item_end_date") or doc.get("scheduled_return_date"))
+            for item in doc.get("items") or []
+        ]
+    if doc.doctype == "Stock Reservation":
+        return [(doc.item_code, doc.from_date, doc.to_date)]
+    if doc.doctype == "Maintenance Task":
+        if not doc.get("start_date"):
+            return []
+        end_date = doc.get("completion_date") or max(getdate(doc.start_date), getdate(today()))
+        return [(doc.get("item_code"), doc.start_date, end_date)]
+
+    return []
+
+
+def update_daily_occupancy(doc, method=None) -> None:
+    """
+    Refresh the occupancy of the items of a Rental Job, Stock Reservation or
+    Maintenance Task that was submitted, cancelled or changed after submit.
+
+    Both the old and the new dates are refreshed, so moving a booking clears the
+    days it no longer covers.
+    """
+    try:
+        ranges = _document_ranges(doc)
+        if method == "on_update_after_submit":
+            ranges += _document_ranges(doc.get_doc_before_save())
+
+        ranges = [(item_code, start, end) for item_code, start, end in ranges if item_code and start and end]
+        if not ranges:
+            return
+
+        refresh_item_occupancy(
+            [item_code for item_code, start, end in ranges],
+            min(getdate(start) for item_code, start, end in ranges),
+            max(getdate(end) for item_code, start, end in ranges)
+        )
+    except Exception:
+        frappe.log_error(
+            f"Error updating daily occupancy for {doc.doctype} {doc.name}: {frappe.get_traceback()}",
+            "Daily Occupancy Error"
+        )
+
+
+def get_occupancy_item_codes() -> List[str]:
+    """Every item that appears in an occupancy source."""
+    item_codes = set(frappe.db.sql_list("SELECT DISTINCT item_code FROM `tabStock Reservation` WHERE docstatus = 1"))
+    if doctype_exists("Rental Job"):
+        item_codes.update(frappe.db.sql_list("""
+            SELECT DISTINCT rji.item_code
+            FROM `tabRental Job Item` rji
+            JOIN `tabRental Job` rj ON rji.parent = rj.name
+            WHERE rj.docstatus = 1
+        """))
+    if doctype_exists("Maintenance Task") and has_column("Maintenance Task", "item_code"):
+        item_codes.update(frappe.db.sql_list(
+            "SELECT DISTINCT item_code FROM `tabMaintenance Task` WHERE docstatus = 1 AND item_code IS NOT NULL"
+        ))
+    item_codes.update(frappe.db.sql_list(f"SELECT DISTINCT item_code FROM `tab{OCCUPANCY_DOCTYPE}`"))
+    return sorted(filter(None, item_codes))
+
+
+def rebuild_daily_occupancy(from_date=None, to_date=None, item_codes: Optional[Iterable[str]] = None,
+                            commit: bool = True) -> int:
+    """
+    Rebuild the occupancy table from the source documents.
+
+    Args:
+        from_date: First day to rebuild (default DEFAULT_REBUILD_DAYS before today)
+        to_date: Last day to rebuild (default DEFAULT_REBUILD_DAYS after today)
+        item_codes: Items to rebuild (default every item in any source)
+        commit: Commit after each chunk of ITEMS_PER_CHUNK items
+
+    Returns:
+        int: Number of rows written
+
+    Example:
+        $ bench --site mysite rebuild-rental-occupancy --from-date 2024-01-01
+    """
+    from_date = getdate(from_date or add_days(today(), -DEFAULT_REBUILD_DAYS))
+    to_date = getdate(to_date or add_days(today(), DEFAULT_REBUILD_DAYS))
+    item_codes = sorted(set(item_codes)) if item_codes else get_occupancy_item_codes()
+
+    written = 0
+    for start in range(0, len(item_codes), ITEMS_PER_CHUNK):
+        written += refresh_item_occupancy(item_codes[start:start + ITEMS_PER_CHUNK], from_date, to_date)
+        if commit:
+            frappe.db.commit()
+
+    return written
+
+
+def refresh_recent_occupancy() -> None:
+    """Nightly: carry open maintenance tasks into the new day and repair recent drift."""
+    try:
+        rebuild_daily_occupancy(add_days(today(), -7), add_days(today(), 1))
+    except Exception:
+        frappe.log_error(f"Error refreshing daily occupancy: {frappe.get_traceback()}", "Daily Occupancy Error")
+
+
+def _occupancy_conditions(company=None, warehouse=None, item_codes=None, alias: str = "occ") -> str:
+    conditions = ""
+    if company:
+        conditions += f" AND IFNULL({alias}.company, '') IN (%(company)s, '')"
+    if warehouse:
+        conditions += f" AND {alias}.warehouse = %(warehouse)s"
+    if item_codes:
+        conditions += f" AND {alias}.item_code IN %(item_codes)s"
+    return conditions
+
+
+def get_daily_occupancy(from_date, to_date, company=None, warehouse=None,
+                        item_codes: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Occupancy per item and day, summed over warehouses (unless filtered).
+
+    Example:
+        >>> get_daily_occupancy("2025-03-01", "2025-03-31", company="Example Inc.", item_codes=["GEN-5KVA"])
+        [{"item_code": "GEN-5KVA", "date": date(2025, 3, 2), "reserved_qty": 0.0, "dispatched_qty": 3.0, ...}]
+    """
+    item_codes = tuple(set(item_codes)) if item_codes else None
+    return frappe.db.sql(f"""
+        SELECT occ.item_code, occ.date,
+            SUM(occ.reserved_qty) AS reserved_qty,
+            SUM(occ.dispatched_qty) AS dispatched_qty,
+            SUM(occ.maintenance_qty) AS maintenance_qty
+        FROM `tab{OCCUPANCY_DOCTYPE}` occ
+        WHERE occ.date BETWEEN %(from_date)s AND %(to_date)s
+            {_occupancy_conditions(company, warehouse, item_codes)}
+        GROUP BY occ.item_code, occ.date
+        ORDER BY occ.item_code, occ.date
+    """, {
+        "from_date": getdate(from_date), "to_date": getdate(to_date),
+        "company": company, "warehouse": warehouse, "item_codes": item_codes
+    }, as_dict=1)
+
+
+def get_peak_occupancy(from_date, to_date, company=None, warehouse=None,
+                       item_codes: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Highest daily reserved + dispatched quantity of each item in the period.
+
+    Returns:
+        dict: item_code -> {"booked_qty", "maintenance_qty"}
+    """
+    item_codes = tuple(set(item_codes)) if item_codes else None
+    rows = frappe.db.sql(f"""
+        SELECT daily.item_code, MAX(daily.booked_qty) AS booked_qty, MAX(daily.maintenance_qty) AS maintenance_qty
+        FROM (
+            SELECT occ.item_code, occ.date,
+                SUM(occ.reserved_qty + occ.dispatched_qty) AS booked_qty,
+                SUM(occ.maintenance_qty) AS maintenance_qty
+            FROM `tab{OCCUPANCY_DOCTYPE}` occ
+            WHERE occ.date BETWEEN %(from_date)s AND %(to_date)s
+                {_occupancy_conditions(company, warehouse, item_codes)}
+            GROUP BY occ.item_code, occ.date
+        ) daily
+        GROUP BY daily.item_code
+    """, {
+        "from_date": getdate(from_date), "to_date": getdate(to_date),
+        "company": company, "warehouse": warehouse, "item_codes": item_codes
+    }, as_dict=1)
+
+    return {
+        row.item_code: frappe._dict(booked_qty=flt(row.booked_qty), maintenance_qty=flt(row.maintenance_qty))
+        for row in rows
+    }
+
+
+def get_occupied_item_days(from_date, to_date, company=None) -> int:
+    """Number of (item, day) pairs in the period on which an item was reserved or on hire."""
+    result = frappe.db.sql(f"""
+        SELECT COUNT(*) FROM (
+            SELECT occ.item_code, occ.date
+            FROM `tab{OCCUPANCY_DOCTYPE}` occ
+            WHERE occ.date BETWEEN %(from_date)s AND %(to_date)s
+                {_occupancy_conditions(company)}
+            GROUP BY occ.item_code, occ.date
+            HAVING SUM(occ.reserved_qty + occ.dispatched_qty) > 0
+        ) occupied
+    """, {"from_date": getdate(from_date), "to_date": getdate(to_date), "company": company})
+
+    return int(result[0][0]) if result and result[0][0] else 0
+
+
+def get_occupied_items_per_day(from_date, to_date, company=None) -> List[Tuple[Any, int]]:
+    """(date, number of items reserved or on hire that day) for every occupied day in the period."""
+    return frappe.db.sql(f"""
+        SELECT occupied.date, COUNT(*) FROM (
+            SELECT occ.item_code, occ.date
+            FROM `tab{OCCUPANCY_DOCTYPE}` occ
+            WHERE occ.date BETWEEN %(from_date)s AND %(to_date)s
+                {_occupancy_conditions(company)}
+            GROUP BY occ.item_code, occ.date
+            HAVING SUM(occ.reserved_qty + occ.dispatched_qty) > 0
+        ) occupied
+        GROUP BY occupied.date
+    """, {"from_date": getdate(from_date), "to_date": getdate(to_date), "company": company})
+
+
+def get_occupied_items_per_company_day(from_date, to_date, companies: Iterable[str]) -> List[Tuple[str, Any, int]]:
+    """
+    (company, date, number of items reserved or on hire that day) for every company
+    and occupied day in the period, from one grouped query. Rows without a company
+    count for every company, as in `get_occupied_items_per_day`.
+    """
+    companies = tuple(set(companies))
+    if not companies:
+        return []
+
+    rows = frappe.db.sql(f"""
+        SELECT IFNULL(occ.company, '') AS company, occ.date, occ.item_code
+        FROM `tab{OCCUPANCY_DOCTYPE}` occ
+        WHERE occ.date BETWEEN %(from_date)s AND %(to_date)s
+            AND IFNULL(occ.company, '') IN %(companies)s
+        GROUP BY occ.date, IFNULL(occ.company, ''), occ.item_code
+        HAVING SUM(occ.reserved_qty + occ.dispatched_qty) > 0
+    """, {"from_date": getdate(from_date), "to_date": getdate(to_date), "companies": companies + ("",)})
+
+    items: Dict[tuple, set] = {}
+    for company, day, item_code in rows:
+        items.setdefault((company, day), set()).add(item_code)
+
+    shared = {day: day_items for (company, day), day_items in items.items() if company == ""}
+    occupied = []
+    for company in companies:
+        for day in {day for item_company, day in items if item_company in (company, "")}:
+            occupied.append((company, day, len(items.get((company, day), set()) | shared.get(day, set()))))
+    return occupied
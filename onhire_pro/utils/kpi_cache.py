@@ -0,0 +1,178 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module provides the result cache for KPI functions.
+
+KPI functions are called by the dashboard chart sources, the KPI data collector
+and the forecasting job, often with the same filters within minutes. Decorating
+a KPI with `cached_kpi` caches its result per normalized filters:
+
+- in a small least-recently-used cache per worker process, and
+- in Redis, shared by all workers, for `ttl` seconds.
+
+Each KPI declares the doctypes its result depends on. Saving, submitting,
+cancelling or deleting a document of such a doctype bumps that doctype's version
+in Redis (see `invalidate_kpi_cache`); cached results carry the versions they
+were computed under, so only the KPIs that depend on the changed doctype are
+recomputed. Hit and miss counters are kept per worker (see `get_kpi_cache_stats`).
+
+Tests that mock the queries of a KPI clear the cache (`clear_kpi_cache`) or
+patch `get_cached_kpi`; the undecorated function is available as `uncached`.
+"""
+
+import frappe
+import copy
+import json
+import time
+import hashlib
+from collections import OrderedDict
+from functools import wraps
+from frappe.utils import getdate
+from typing import Dict, Iterable, Any, Callable
+
+KPI_RESULT_KEY = "onhire_pro:kpi_result"
+KPI_VERSION_KEY = "onhire_pro:kpi_doctype_version"
+ALL_DOCTYPES = "*"
+DEFAULT_TTL = 3600
+LOCAL_CACHE_SIZE = 256
+
+# KPI -> doctypes its result depends on
+KPI_DEPENDENCIES: Dict[str, tuple] = {}
+
+# (site, kpi, filters key) -> (versions, expires_at, result), least recently used first
+_results: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+_stats = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+
+def normalize_filters(filters=None) -> str:
+    """
+    Canonical cache key of a filters dict or JSON string: empty values dropped,
+    dates in ISO format, keys sorted.
+
+    Example:
+        >>> normalize_filters({"to_date": "2025-03-31", "company": "Example Inc.", "item_group": None})
+        '{"company": "Example Inc.", "to_date": "2025-03-31"}'
+    """
+    if isinstance(filters, str):
+        filters = json.loads(filters or "{}")
+
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if value in (None, "", []):
+            continue
+        if key.endswith("_date") or key == "date":
+            value = str(getdate(value))
+        normalized[key] = value
+
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def _doctype_versions(doctypes: Iterable[str]) -> str:
+    versions = frappe.cache().hgetall(KPI_VERSION_KEY) or {}
+    return "|".join(versions.get(doctype) or "" for doctype in (ALL_DOCTYPES,) + tuple(doctypes))
+
+
+def _store_local(key: tuple, versions: str, ttl: int, result: Any) -> None:
+    _results[key] = (versions, time.time() + ttl, result)
+    _results.move_to_end(key)
+    while len(_results) > LOCAL_CACHE_SIZE:
+        _results.popitem(last=False)
+
+
+def get_cached_kpi(kpi: str, function: Callable, filters=None, ttl: int = DEFAULT_TTL) -> Any:
+    """Result of a KPI for the filters from the worker cache, Redis, or by computing it."""
+    filters_key = normalize_filters(filters)
+    versions = _doctype_versions(KPI_DEPENDENCIES.get(kpi, ()))
+    local_key = (getattr(frappe.local, "site", None), kpi, filters_key)
+
+    entry = _results.get(local_key)
+    if entry and entry[0] == versions and entry[1] > time.time():
+        _results.move_to_end(local_key)
+        _stats["local_hits"] += 1
+        return copy.deepcopy(entry[2])
+
+    digest = hashlib.md5(f"{versions}:{filters_key}".encode()).hexdigest()
+    redis_key = f"{KPI_RESULT_KEY}:{kpi}:{digest}"
+
+    result = frappe.cache().get_value(redis_key)
+    if result is not None:
+        _stats["redis_hits"] += 1
+    else:
+        _stats["misses"] += 1
+        result = function(filters)
+        frappe.cache().set_value(redis_key, result, expires_in_sec=ttl)
+
+    _store_local(local_key, versions, ttl, result)
+    return copy.deepcopy(result)
+
+
+def cached_kpi(*doctypes: str, ttl: int = DEFAULT_TTL):
+    """
+    Cache the results of a KPI function taking a single `filters` argument.
+
+    Args:
+        doctypes: DocTypes the KPI reads; a change to any of them invalidates it
+        ttl: Seconds a result may be served without any change
+
+    Example:
+        >>> @cached_kpi("Sales Invoice", ttl=3600)
+        ... def get_total_rental_revenue(filters):
+        ...     ...
+    """
+    def decorator(function: Callable) -> Callable:
+        kpi = f"{function.__module__}.{function.__name__}"
+        KPI_DEPENDENCIES[kpi] = tuple(doctypes)
+
+        @wraps(function)
+        def wrapper(filters=None):
+            return get_cached_kpi(kpi, function, filters, ttl)
+
+        wrapper.kpi = kpi
+        wrapper.uncached = function
+        return wrapper
+
+    return decorator
+
+
+def invalidate_kpis(doctypes: Iterable[str]) -> None:
+    """Invalidate the cached results of every KPI that depends on one of the doctypes."""
+    doctypes = set(doctypes)
+    for doctype in doctypes:
+        frappe.cache().hset(KPI_VERSION_KEY, doctype, frappe.generate_hash(length=10))
+
+    kpis = {kpi for kpi, dependencies in KPI_DEPENDENCIES.items() if doctypes.intersection(dependencies)}
+    site = getattr(frappe.local, "site", None)
+    for key in [key for key in _results if key[0] == site and key[1] in kpis]:
+        _results.pop(key, None)
+
+
+def invalidate_kpi_cache(doc, method=None) -> None:
+    """
+    Invalidate the KPIs that depend on the doctype of a changed document.
+
+    Invalidated now, so later reads in the same request see the change, and again
+    after commit, so a worker that recomputed from the old rows in between does
+    not keep that result.
+    """
+    doctype = doc.doctype
+    invalidate_kpis([doctype])
+    frappe.db.after_commit.add(lambda: invalidate_kpis([doctype]))
+
+
+def clear_kpi_cache() -> None:
+    """Invalidate every cached KPI result for the current site."""
+    site = getattr(frappe.local, "site", None)
+    for key in [key for key in _results if key[0] == site]:
+        _results.pop(key, None)
+    frappe.cache().hset(KPI_VERSION_KEY, ALL_DOCTYPES, frappe.generate_hash(length=10))
+
+
+@frappe.whitelist()
+def get_kpi_cache_stats() -> Dict[str, Any]:
+    """Hit and miss counters of this worker's KPI cache, with the hit ratio."""
+    frappe.only_for("System Manager")
+
+    lookups = sum(_stats.values())
+    hits = _stats["local_hits"] + _stats["redis_hits"]
+    return dict(_stats, lookups=lookups, hit_ratio=hits / lookups if lookups else 0, local_entries=len(_results))
@@ -0,0 +1,254 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module maintains the Rental Leaderboard Entry table.
+
+The table holds the score of every member of a leaderboard per company, per day
+and per month (see LEADERBOARDS):
+
+    - Most Rented Items: Rental Job item lines, counted on the job's start date
+    - Top Customers: grand total of Sales Invoices of a Rental Job, on the posting date
+
+Top-N lists of any date range are summed from the month rows of the months it
+covers in full and the day rows of the days before and after them, so a year
+reads about 12 rows per member instead of re-aggregating every job or invoice.
+Lists are paginated with `start` and `page_length`.
+
+Rows are named after their key, so submitting a Rental Job or Sales Invoice adds
+its scores with one INSERT ... ON DUPLICATE KEY UPDATE and cancelling it
+subtracts them again. A nightly job rebuilds the current and previous month, to
+pick up Rental Jobs changed after submit; `bench rebuild-rental-leaderboards`
+rebuilds any period. Rows without a company count for every company.
+"""
+
+import frappe
+from frappe.utils import getdate, add_days, add_months, get_first_day, get_last_day, flt, cint, today, now_datetime
+from typing import Dict, List, Any, Tuple
+from onhire_pro.utils.daily_occupancy import column_if_exists
+from onhire_pro.utils.schema_capabilities import doctype_exists, sql_fragment
+
+LEADERBOARD_DOCTYPE = "Rental Leaderboard Entry"
+MOST_RENTED_ITEMS = "Most Rented Items"
+TOP_CUSTOMERS = "Top Customers"
+
+DEFAULT_PAGE_LENGTH = 5
+MAX_PAGE_LENGTH = 500
+DEFAULT_REBUILD_DAYS = 365 * 3
+
+
+def _rental_job_start() -> str:
+    return column_if_exists("Rental Job", "start_date", "rj.start_date", "rj.scheduled_dispatch_date")
+
+
+def _most_rented_items_query(condition: str) -> str:
+    """(company, date, member, score) of Rental Job item lines of the jobs matching `condition`."""
+    company = sql_fragment("rental_job_company")
+    start = _rental_job_start()
+    return f"""
+        SELECT IFNULL({company}, '') AS company, DATE({start}) AS date, rji.item_code AS member,
+            COUNT(rji.name) AS score
+        FROM `tabRental Job Item` rji
+        JOIN `tabRental Job` rj ON rji.parent = rj.name
+        WHERE {condition}
+            AND {start} IS NOT NULL
+            AND IFNULL(rji.item_code, '') != ''
+        GROUP BY IFNULL({company}, ''), DATE({start}), rji.item_code
+    """
+
+
+def _top_customers_query(condition: str) -> str:
+    """(company, date, member, score) of rental Sales Invoices matching `condition`."""
+    rental_job = sql_fragment("sales_invoice_rental_job")
+    return f"""
+        SELECT si.company, si.posting_date AS date, si.customer AS member, SUM(si.grand_total) AS score
+        FROM `tabSales Invoice` si
+        WHERE {condition}
+            AND IFNULL({rental_job}, '') != ''
+            AND IFNULL(si.customer, '') != ''
+        GROUP BY si.company, si.posting_date, si.customer
+    """
+
+
+# Leaderboard -> (source doctype, source query, alias of the source in the query, date column)
+LEADERBOARDS = {
+    MOST_RENTED_ITEMS: ("Rental Job", _most_rented_items_query, "rj", _rental_job_start),
+    TOP_CUSTOMERS: ("Sales Invoice", _top_customers_query, "si", lambda: "si.posting_date"),
+}
+
+
+def _document_date(doc):
+    """Day a Rental Job or Sales Invoice scores on."""
+    if doc.doctype == "Rental Job":
+        return doc.get("start_date") or doc.get("scheduled_dispatch_date")
+    return doc.get("posting_date")
+
+
+def _add_to_leaderboard(board: str, condition: str, values: Dict[str, Any], sign: int = 1) -> None:
+    """Add (or with sign -1, subtract) the scores of the source documents matching `condition`."""
+    query = LEADERBOARDS[board][1](condition)
+    for period_type, period_start in (("Day", "source.date"),
+                                      ("Month", "DATE_FORMAT(source.date, '%%Y-%%m-01')")):
+        frappe.db.sql(f"""
+            INSERT INTO `tab{LEADERBOARD_DOCTYPE}`
+                (name, owner, creation, modified, modified_by, docstatus,
+                 board, company, period_type, period_start, member, score)
+            SELECT MD5(CONCAT_WS('|', %(board)s, source.company, %(period_type)s, {period_start}, source.member)),
+                %(user)s, %(now)s, %(now)s, %(user)s, 0,
+                %(board)s, NULLIF(source.company, ''), %(period_type)s, {period_start}, source.member,
+                %(sign)s * SUM(source.score)
+            FROM ({query}) source
+            GROUP BY source.company, {period_start}, source.member
+            ON DUPLICATE KEY UPDATE
+                score = `tab{LEADERBOARD_DOCTYPE}`.score + VALUES(score),
+                modified = VALUES(modified)
+        """, dict(values, board=board, period_type=period_type, sign=sign,
+                  user=frappe.session.user, now=now_datetime()))
+
+
+def update_leaderboards(doc, method=None) -> None:
+    """Add the scores of a submitted Rental Job or Sales Invoice, or remove them on cancel."""
+    try:
+        sign = -1 if method == "on_cancel" else 1
+        for board, (doctype, query, alias, date_column) in LEADERBOARDS.items():
+            if doc.doctype != doctype:
+                continue
+            _add_to_leaderboard(board, f"{alias}.name = %(name)s", {"name": doc.name}, sign)
+
+            day = _document_date(doc)
+            if sign < 0 and day:
+                # Drop the entries the document alone made up
+                frappe.db.sql(f"""
+                    DELETE FROM `tab{LEADERBOARD_DOCTYPE}`
+                    WHERE board = %(board)s AND period_start IN %(period_starts)s AND ABS(score) < 0.005
+                """, {"board": board, "period_starts": (getdate(day), get_first_day(getdate(day)))})
+    except Exception:
+        frappe.log_error(
+            f"Error updating leaderboards for {doc.doctype} {doc.name}: {frappe.get_traceback()}",
+            "Leaderboard Error"
+        )
+
+
+def rebuild_leaderboards(from_date=None, to_date=None, commit: bool = True) -> int:
+    """
+    Rebuild the leaderboards from the submitted Rental Jobs and Sales Invoices.
+
+    The period is widened to whole months, as month rows cover every day of their month.
+
+    Args:
+        from_date: First day to rebuild (default DEFAULT_REBUILD_DAYS before today)
+        to_date: Last day to rebuild (default today)
+        commit: Commit after each leaderboard
+
+    Returns:
+        int: Number of entries in the rebuilt period
+
+    Example:
+        $ bench --site mysite rebuild-rental-leaderboards --from-date 2023-01-01
+    """
+    from_date = get_first_day(getdate(from_date or add_days(today(), -DEFAULT_REBUILD_DAYS)))
+    to_date = get_last_day(getdate(to_date or today()))
+    values = {"from_date": from_date, "to_date": to_date}
+
+    for board, (doctype, query, alias, date_column) in LEADERBOARDS.items():
+        frappe.db.sql(f"""
+            DELETE FROM `tab{LEADERBOARD_DOCTYPE}`
+            WHERE board = %(board)s AND period_start BETWEEN %(from_date)s AND %(to_date)s
+        """, dict(values, board=board))
+        if doctype_exists(doctype):
+            _add_to_leaderboard(
+                board, f"{alias}.docstatus = 1 AND DATE({date_column()}) BETWEEN %(from_date)s AND %(to_date)s",
+                values
+            )
+        if commit:
+            frappe.db.commit()
+
+    return frappe.db.count(LEADERBOARD_DOCTYPE, {"period_start": ["between", [from_date, to_date]]})
+
+
+def refresh_recent_leaderboards() -> None:
+    """Nightly: rebuild the current and previous month."""
+    try:
+        rebuild_leaderboards(add_months(today(), -1), today())
+    except Exception:
+        frappe.log_error(f"Error refreshing leaderboards: {frappe.get_traceback()}", "Leaderboard Error")
+
+
+def split_period(from_date, to_date) -> Tuple[List[Any], List[Tuple[Any, Any]]]:
+    """
+    Split a period into the months it covers in full and the remaining day ranges.
+
+    Example:
+        >>> split_period("2025-01-15", "2025-04-10")
+        ([date(2025, 2, 1), date(2025, 3, 1)], [(date(2025, 1, 15), date(2025, 1, 31)), (date(2025, 4, 1), date(2025, 4, 10))])
+    """
+    from_date, to_date = getdate(from_date), getdate(to_date)
+    first_month = from_date if from_date.day == 1 else get_first_day(add_months(from_date, 1))
+    months = []
+    month = first_month
+    while get_last_day(month) <= to_date:
+        months.append(month)
+        month = add_months(month, 1)
+
+    if not months:
+        return [], [(from_date, to_date)] if from_date <= to_date else []
+
+    days = []
+    if from_date < months[0]:
+        days.append((from_date, add_days(months[0], -1)))
+    if get_last_day(months[-1]) < to_date:
+        days.append((add_days(get_last_day(months[-1]), 1), to_date))
+    return months, days
+
+
+def get_leaderboard(board: str, company: str, from_date, to_date, start: int = 0,
+                    page_length: int = DEFAULT_PAGE_LENGTH) -> Dict[str, Any]:
+    """
+    One page of a leaderboard for a period, highest score first.
+
+    Returns:
+        dict: {"entries": [{"member", "score"}], "total": number of members with a score}
+
+    Example:
+        >>> get_leaderboard("Top Customers", "Example Inc.", "2025-01-01", "2025-06-30", page_length=2)
+        {"entries": [{"member": "CUST-0042", "score": 50000.0}, {"member": "CUST-0007", "score": 35000.0}], "total": 87}
+    """
+    if board not in LEADERBOARDS:
+        frappe.throw(f"Unknown leaderboard {board}")
+    if not doctype_exists(LEADERBOARD_DOCTYPE):
+        return {"entries": [], "total": 0}
+
+    months, days = split_period(from_date, to_date)
+    if not months and not days:
+        return {"entries": [], "total": 0}
+
+    periods = []
+    values = {
+        "board": board, "company": company, "months": tuple(months) or ("",),
+        "start": max(cint(start), 0), "page_length": min(max(cint(page_length), 1), MAX_PAGE_LENGTH)
+    }
+    if months:
+        periods.append("(lb.period_type = 'Month' AND lb.period_start IN %(months)s)")
+    for index, (day_from, day_to) in enumerate(days):
+        periods.append(f"(lb.period_type = 'Day' AND lb.period_start BETWEEN %(from_{index})s AND %(to_{index})s)")
+        values.update({f"from_{index}": day_from, f"to_{index}": day_to})
+
+    scores = f"""
+        SELECT lb.member, SUM(lb.score) AS score
+        FROM `tab{LEADERBOARD_DOCTYPE}` lb
+        WHERE lb.board = %(board)s
+            AND IFNULL(lb.company, '') IN (%(company)s, '')
+            AND ({" OR ".join(periods)})
+        GROUP BY lb.member
+        HAVING ABS(SUM(lb.score)) >= 0.005
+    """
+    entries = frappe.db.sql(f"""
+        {scores}
+        ORDER BY score DESC, lb.member
+        LIMIT %(page_length)s OFFSET %(start)s
+    """, values, as_dict=1)
+    total = frappe.db.sql(f"SELECT COUNT(*) FROM ({scores}) board_scores", values)
+
+    return {
+        "entries": [frappe._dict(member=entry.member, score=flt(entry.score)) for entry in entries],
+        "total": cint(total[0][0]) if total else 0
+    }
@@ -0,0 +1,315 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module keeps the live counters behind the dashboard number cards.
+
+The Rental Live Counter table holds how many submitted documents of each
+company are in each open state (see COUNTERS): Rental Jobs booked or on hire,
+Condition Assessments pending post-rental and Maintenance Tasks not completed,
+keyed by the dates the cards filter on. The counters only hold open work, so
+the active jobs, due for dispatch/return, overdue returns, awaiting assessment
+and in maintenance cards sum the counter rows of the open documents instead of
+counting the documents on every dashboard load.
+
+Counters keep the exact start and end dates, as the cards filter on any period
+and as-of date; documents only share a row when they share their dates, so
+there can be up to one row per open document. Closed work leaves the table, so
+its size follows the open workload rather than the history.
+
+When one of those documents changes state, the counter it left is decremented
+and the one it entered incremented in the same transaction as the change.
+`db_set` runs the on_change hook without the state before the change, so such
+changes of a submitted document are left to `reconcile_live_counters`, which
+runs hourly, rebuilds the counters from the documents and drops empty ones. After a change the company's card values are published over realtime
+(LIVE_COUNTER_EVENT) for open dashboards.
+"""
+
+import frappe
+from frappe.utils import getdate, nowdate, cint, now_datetime
+from typing import Dict, List, Optional, Any, Tuple
+from onhire_pro.reports.kpi_snapshot import (
+    ACTIVE_STATUSES, PRE_DISPATCH_STATUSES, ON_HIRE_STATUSES, parse_kpi_filters, empty_kpi_result
+)
+from onhire_pro.utils.daily_occupancy import column_if_exists
+from onhire_pro.utils.schema_capabilities import doctype_exists, sql_fragment
+
+COUNTER_DOCTYPE = "Rental Live Counter"
+LIVE_COUNTER_EVENT = "onhire_pro_live_counters"
+DATE_OPERATORS = ("<", "<=", ">", ">=", "=", "between")
+
+
+def _rental_job_counter() -> Dict[str, str]:
+    return {
+        "alias": "rj",
+        "company": sql_fragment("rental_job_company"),
+        "status": sql_fragment("rental_job_status"),
+        "start_date": column_if_exists("Rental Job", "start_date", "rj.start_date", "rj.scheduled_dispatch_date"),
+        "end_date": column_if_exists("Rental Job", "end_date", "rj.end_date", "rj.scheduled_return_date"),
+        "open": "{status} IN %(active_statuses)s",
+    }
+
+
+def _condition_assessment_counter() -> Dict[str, str]:
+    return {
+        "alias": "ca",
+        "company": column_if_exists("Condition Assessment", "company", "ca.company"),
+        "status": "ca.status",
+        "start_date": "ca.creation",
+        "end_date": "NULL",
+        "open": "{status} = 'Pending Post-Rental'",
+    }
+
+
+def _maintenance_task_counter() -> Dict[str, str]:
+    return {
+        "alias": "mt",
+        "company": column_if_exists("Maintenance Task", "company", "mt.company"),
+        "status": "mt.status",
+        "start_date": "mt.start_date",
+        "end_date": "NULL",
+        "open": "{status} != 'Completed'",
+    }
+
+
+# Doctype -> SQL of its counter key and of the states it counts as open
+COUNTERS = {
+    "Rental Job": _rental_job_counter,
+    "Condition Assessment": _condition_assessment_counter,
+    "Maintenance Task": _maintenance_task_counter,
+}
+
+
+def _counter_key(doc) -> Optional[Tuple[str, str, str, Any, Any]]:
+    """(doctype, company, status, start_date, end_date) a document counts under, if open."""
+    if not doc or cint(doc.get("docstatus")) != 1:
+        return None
+
+    if doc.doctype == "Rental Job":
+        status = doc.get("job_status") or doc.get("status")
+        if status not in ACTIVE_STATUSES:
+            return None
+        start_date = doc.get("start_date") or doc.get("scheduled_dispatch_date")
+        end_date = doc.get("end_date") or doc.get("scheduled_return_date")
+    elif doc.doctype == "Condition Assessment":
+        status = doc.get("status")
+        if status != "Pending Post-Rental":
+            return None
+        start_date, end_date = doc.get("creation"), None
+    elif doc.doctype == "Maintenance Task":
+        status = doc.get("status")
+        if status == "Completed":
+            return None
+        start_date, end_date = doc.get("start_date"), None
+    else:
+        return None
+
+    return (doc.doctype, doc.get("company") or "", status or "",
+            getdate(start_date) if start_date else None, getdate(end_date) if end_date else None)
+
+
+def _add_to_counter(key: Tuple[str, str, str, Any, Any], count: int) -> None:
+    doctype, company, status, start_date, end_date = key
+    frappe.db.sql(f"""
+        INSERT INTO `tab{COUNTER_DOCTYPE}`
+            (name, owner, creation, modified, modified_by, docstatus,
+             source_doctype, company, status, start_date, end_date, open_count)
+        VALUES (MD5(CONCAT_WS('|', %(doctype)s, %(company)s, %(status)s,
+                IFNULL(%(start_date)s, ''), IFNULL(%(end_date)s, ''))),
+            %(user)s, %(now)s, %(now)s, %(user)s, 0,
+            %(doctype)s, %(company)s, %(status)s, %(start_date)s, %(end_date)s, %(count)s)
+        ON DUPLICATE KEY UPDATE
+            open_count = `tab{COUNTER_DOCTYPE}`.open_count + VALUES(open_count),
+            modified = VALUES(modified)
+    """, {
+        "doctype": doctype, "company": company, "status": status, "start_date": start_date,
+        "end_date": end_date, "count": count, "user": frappe.session.user, "now": now_datetime()
+    })
+
+
+def update_live_counters(doc, method=None) -> None:
+    """Move a Rental Job, Condition Assessment or Maintenance Task between counters on a change of state."""
+    try:
+        doc_before_save = doc.get_doc_before_save()
+        if doc_before_save is None and not doc.flags.in_insert:
+            # db_set: the state left is unknown, the hourly reconcile picks the change up
+            return
+
+        before = _counter_key(doc_before_save)
+        after = _counter_key(doc)
+        if before == after:
+            return
+
+        if before:
+            _add_to_counter(before, -1)
+        if after:
+            _add_to_counter(after, 1)
+
+        company = (after or before)[1]
+        frappe.db.after_commit.add(lambda: publish_live_counters(company))
+    except Exception:
+        frappe.log_error(
+            f"Error updating live counters for {doc.doctype} {doc.name}: {frappe.get_traceback()}",
+            "Live Counter Error"
+        )
+
+
+def count_open_documents() -> Dict[Tuple[str, str, str, Any, Any], int]:
+    """Counters as computed from the documents: counter key -> number of open documents."""
+    counts = {}
+    for doctype, counter in COUNTERS.items():
+        if not doctype_exists(doctype):
+            continue
+        counter = counter()
+        alias = counter["alias"]
+        key = (f"IFNULL({counter['company']}, '')", counter["status"],
+               f"DATE({counter['start_date']})", f"DATE({counter['end_date']})")
+
+        rows = frappe.db.sql(f"""
+            SELECT {', '.join(key)}, COUNT(*)
+            FROM `tab{doctype}` {alias}
+            WHERE {alias}.docstatus = 1
+                AND {counter["open"].format(status=counter["status"])}
+            GROUP BY {', '.join(key)}
+        """, {"active_statuses": ACTIVE_STATUSES})
+        for company, status, start_date, end_date, count in rows:
+            counts[(doctype, company or "", status or "", start_date, end_date)] = cint(count)
+
+    return counts
+
+
+def reconcile_live_counters() -> int:
+    """
+    Hourly: compare the counters with the documents and correct any drift.
+
+    Returns:
+        int: Number of counters corrected
+    """
+    try:
+        expected = count_open_documents()
+        current = {
+            (row.source_doctype, row.company or "", row.status or "",
+             getdate(row.start_date) if row.start_date else None,
+             getdate(row.end_date) if row.end_date else None): cint(row.open_count)
+            for row in frappe.get_all(
+                COUNTER_DOCTYPE, fields=["source_doctype", "company", "status", "start_date", "end_date", "open_count"]
+            )
+        }
+
+        drift = {
+            key: expected.get(key, 0) - current.get(key, 0)
+            for key in set(expected) | set(current)
+            if expected.get(key, 0) != current.get(key, 0)
+        }
+        for key, count in drift.items():
+            _add_to_counter(key, count)
+
+        # Drop the counters of closed work
+        frappe.db.sql(f"DELETE FROM `tab{COUNTER_DOCTYPE}` WHERE open_count = 0")
+        frappe.db.commit()
+        for company in {key[1] for key in drift}:
+            publish_live_counters(company)
+
+        return len(drift)
+    except Exception:
+        frappe.log_error(f"Error reconciling live counters: {frappe.get_traceback()}", "Live Counter Error")
+        return 0
+
+
+def get_live_count(doctype: str, company: str, statuses: Optional[List[str]] = None,
+                   start_date: Optional[tuple] = None, end_date: Optional[tuple] = None) -> int:
+    """
+    Number of open documents of a company from the counters.
+
+    Counters without a company count for every company.
+
+    Args:
+        doctype: Rental Job, Condition Assessment or Maintenance Task
+        company: Company name
+        statuses: Statuses to count (default every open status)
+        start_date: (operator, value) on the start date, e.g. ("<=", "2025-03-01")
+        end_date: (operator, value) on the end date, e.g. ("between", ["2025-03-01", "2025-03-07"])
+
+    Example:
+        >>> get_live_count("Rental Job", "Example Inc.", ["Confirmed"], start_date=("between", ["2025-03-01", "2025-03-07"]))
+        4
+    """
+    conditions = ""
+    values = {"doctype": doctype, "company": company, "statuses": tuple(statuses or ())}
+    if statuses:
+        conditions += " AND lc.status IN %(statuses)s"
+
+    for field, condition in (("start_date", start_date), ("end_date", end_date)):
+        if not condition:
+            continue
+        operator, value = condition
+        if operator not in DATE_OPERATORS:
+            frappe.throw(f"Unsupported date operator {operator} for live counters")
+        if operator == "between":
+            conditions += f" AND lc.{field} BETWEEN %({field}_from)s AND %({field}_to)s"
+            values.update({f"{field}_from": getdate(value[0]), f"{field}_to": getdate(value[1])})
+        else:
+            conditions += f" AND lc.{field} {operator} %({field})s"
+            values[field] = getdate(value)
+
+    result = frappe.db.sql(f"""
+        SELECT SUM(lc.open_count)
+        FROM `tab{COUNTER_DOCTYPE}` lc
+        WHERE lc.source_doctype = %(doctype)s
+            AND IFNULL(lc.company, '') IN (%(company)s, '')
+            {conditions}
+    """, values)
+
+    return cint(result[0][0]) if result and result[0][0] else 0
+
+
+# Number card -> function of (company, from_date, to_date, as_of_date) returning its value
+LIVE_COUNTER_KPIS = {
+    "active_rental_jobs": lambda company, from_date, to_date, as_of_date: get_live_count(
+        "Rental Job", company, ACTIVE_STATUSES, start_date=("<=", as_of_date), end_date=(">=", as_of_date)),
+    "overdue_returns": lambda company, from_date, to_date, as_of_date: get_live_count(
+        "Rental Job", company, ACTIVE_STATUSES, end_date=("<", as_of_date)),
+    "jobs_due_for_dispatch": lambda company, from_date, to_date, as_of_date: get_live_count(
+        "Rental Job", company, PRE_DISPATCH_STATUSES, start_date=("between", [from_date, to_date])),
+    "jobs_due_for_return": lambda company, from_date, to_date, as_of_date: get_live_count(
+        "Rental Job", company, ON_HIRE_STATUSES, end_date=("between", [from_date, to_date])),
+    "items_awaiting_assessment": lambda company, from_date, to_date, as_of_date: get_live_count(
+        "Condition Assessment", company, start_date=("<=", as_of_date)),
+    "items_in_maintenance": lambda company, from_date, to_date, as_of_date: get_live_count(
+        "Maintenance Task", company, start_date=("<=", as_of_date)),
+}
+
+
+def get_live_counter_kpi(kpi: str, filters=None) -> Dict[str, Any]:
+    """
+    Read a number card from the live counters, with the filters of `get_snapshot_kpi`.
+
+    Example:
+        >>> get_live_counter_kpi("overdue_returns", {"company": "Example Inc."})
+        {'value': 3}
+    """
+    try:
+        filters = parse_kpi_filters(filters)
+        if not filters.company:
+            frappe.log_error(f"Missing required filters for {kpi} calculation: {filters}", "KPI Calculation Error")
+            return empty_kpi_result(kpi)
+
+        return {"value": LIVE_COUNTER_KPIS[kpi](
+            filters.company, getdate(filters.from_date), getdate(filters.to_date),
+            getdate(filters.get("as_of_date") or nowdate())
+        )}
+    except Exception as e:
+        frappe.log_error(
+            f"Error calculating {kpi} from live counters: {str(e)}\n{frappe.get_traceback()}",
+            "KPI Calculation Error"
+        )
+        return empty_kpi_result(kpi)
+
+
+def publish_live_counters(company: str) -> None:
+    """Publish a company's number card values for the dashboard's default filters."""
+    filters = parse_kpi_filters({"company": company})
+    from_date, to_date = getdate(filters.from_date), getdate(filters.to_date)
+    frappe.publish_realtime(LIVE_COUNTER_EVENT, {
+        "company": company,
+        "values": {kpi: value(company, from_date, to_date, to_date) for kpi, value in LIVE_COUNTER_KPIS.items()}
+    })
@@ -0,0 +1,320 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module provides the vectorized sweep-line engine behind availability checks.
+
+A set of bookings is held as sorted start and end boundaries with prefix sums of
+their quantities. Summing the quantity of every booking that overlaps a window
+over-counts bookings that follow each other inside it, so availability is based
+on the peak concurrent quantity instead: the occupancy at the window start plus
+a cumulative sum over the start (+qty) and end (-qty) events inside the window.
+
+Bookings are half-open intervals [start, end), so a return and a dispatch at the
+same instant do not collide. The module only depends on NumPy so the maths can be
+exercised without a site.
+"""
+
+import numpy as np
+from typing import Iterable, List, Optional, Tuple
+
+SECONDS_PER_DAY = 86400.0
+
+
+class IntervalSet:
+    """
+    Weighted half-open intervals stored as sorted boundary arrays.
+
+    Example:
+        >>> bookings = IntervalSet([0, 86400], [86400, 172800], [1, 1])
+        >>> bookings.peak(0, 172800)
+        1.0
+    """
+
+    def __init__(self, starts: Iterable[float], ends: Iterable[float], weights: Iterable[float]):
+        starts = np.asarray(list(starts), dtype=float)
+        ends = np.asarray(list(ends), dtype=float)
+        weights = np.asarray(list(weights), dtype=float)
+
+        start_order = np.argsort(starts, kind="stable")
+        end_order = np.argsort(ends, kind="stable")
+
+        self.starts = starts[start_order]
+        self.start_weights = weights[start_order]
+        self.ends = ends[end_order]
+        self.end_weights = weights[end_order]
+
+        self.start_prefix = np.concatenate(([0.0], np.cumsum(self.start_weights)))
+        self.end_prefix = np.concatenate(([0.0], np.cumsum(self.end_weights)))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def overlap_weight(self, from_ts: float, to_ts: float, inclusive: bool = True) -> float:
+        """
+        Summed weight of intervals touching [from_ts, to_ts] (or (from_ts, to_ts) if not inclusive).
+
+        An interval that ends before `from_ts` necessarily starts before `to_ts`,
+        so the result is W(start <= to) - W(end < from): two binary searches.
+        """
+        if not len(self):
+            return 0.0
+
+        if inclusive:
+            started = np.searchsorted(self.starts, to_ts, side="right")
+            ended = np.searchsorted(self.ends, from_ts, side="left")
+        else:
+            started = np.searchsorted(self.starts, to_ts, side="left")
+            ended = np.searchsorted(self.ends, from_ts, side="right")
+
+        return float(self.start_prefix[started] - self.end_prefix[ended])
+
+    def active_at(self, points) -> np.ndarray:
+        """Weight of intervals active at each point (start <= point < end)."""
+        points = np.asarray(points, dtype=float)
+        started = np.searchsorted(self.starts, points, side="right")
+        ended = np.searchsorted(self.ends, points, side="right")
+        return self.start_prefix[started] - self.end_prefix[ended]
+
+    def events_between(self, lo: float, hi: float) -> Tuple[np.ndarray, np.ndarray]:
+        """Times and signed weights of the start/end events strictly inside (lo, hi)."""
+        s_lo = np.searchsorted(self.starts, lo, side="right")
+        s_hi = np.searchsorted(self.starts, hi, side="left")
+        e_lo = np.searchsorted(self.ends, lo, side="right")
+        e_hi = np.searchsorted(self.ends, hi, side="left")
+
+        times = np.concatenate((self.starts[s_lo:s_hi], self.ends[e_lo:e_hi]))
+        deltas = np.concatenate((self.start_weights[s_lo:s_hi], -self.end_weights[e_lo:e_hi]))
+        return times, deltas
+
+    def profile(self, boundaries, exclude: Optional["IntervalSet"] = None) -> np.ndarray:
+        """
+        Peak concurrent weight within each slot [boundaries[i], boundaries[i + 1]).
+
+        Args:
+            boundaries: Ascending slot boundaries (n + 1 values for n slots)
+            exclude: Intervals to leave out (e.g. the bookings being re-validated);
+                they are subtracted as negative events, so the sweep stays vectorized.
+
+        Returns:
+            numpy.ndarray: n peak values
+        """
+        boundaries = np.asarray(boundaries, dtype=float)
+        if len(boundaries) < 2:
+            return np.zeros(0)
+
+        lo, hi = boundaries[0], boundaries[-1]
+        slot_start_occupancy = self.active_at(boundaries[:-1])
+        base = slot_start_occupancy[0]
+        times, deltas = self.events_between(lo, hi)
+
+        if exclude is not None and len(exclude):
+            slot_start_occupancy = slot_start_occupancy - exclude.active_at(boundaries[:-1])
+            base = slot_start_occupancy[0]
+            ex_times, ex_deltas = exclude.events_between(lo, hi)
+            times = np.concatenate((times, ex_times))
+            deltas = np.concatenate((deltas, -ex_deltas))
+
+        peaks = slot_start_occupancy.copy()
+        if not len(times):
+            return peaks
+
+        order = np.argsort(times, kind="stable")
+        times = times[order]
+        running = base + np.cumsum(deltas[order])
+
+        # Only the total after the last event at an instant is a real occupancy, so a
+        # returned unit and its next booking at the same instant are never counted together
+        settled = np.append(times[1:] != times[:-1], True)
+        times, running = times[settled], running[settled]
+
+        slots = np.searchsorted(boundaries, times, side="right") - 1
+        np.maximum.at(peaks, slots, running)
+        return peaks
+
+    def idle_gaps(self, from_ts: float, to_ts: float) -> Tuple[float, float]:
+        """
+        Idle time between [from_ts, to_ts) and the nearest interval ending before it
+        and starting after it (inf when there is none). Meant for a window that is
+        free in this set.
+        """
+        ended = np.searchsorted(self.ends, from_ts, side="right")
+        following = np.searchsorted(self.starts, to_ts, side="left")
+        before = from_ts - self.ends[ended - 1] if ended else np.inf
+        after = self.starts[following] - to_ts if following < len(self.starts) else np.inf
+        return float(before), float(after)
+
+    def peak(self, from_ts: float, to_ts: float, exclude: Optional["IntervalSet"] = None) -> float:
+        """Peak concurrent weight within [from_ts, to_ts)."""
+        if not len(self):
+            return 0.0
+        return float(self.profile([from_ts, to_ts], exclude=exclude)[0])
+
+
+def overlaps(from_ts: float, to_ts: float, other_from_ts: float, other_to_ts: float) -> bool:
+    """Whether the half-open intervals [from_ts, to_ts) and [other_from_ts, other_to_ts) overlap."""
+    return from_ts < other_to_ts and other_from_ts < to_ts
+
+
+def day_boundaries(first_day_ts: float, days: int) -> np.ndarray:
+    """Midnight boundaries for `days` consecutive days starting at `first_day_ts`."""
+    return first_day_ts + SECONDS_PER_DAY * np.arange(days + 1, dtype=float)
+
+
+def free_window_starts(busy, min_slots: int) -> np.ndarray:
+    """
+    Which slots can start a run of `min_slots` slots with no busy slot in it.
+
+    Args:
+        busy: Boolean array (..., n); leading axes (e.g. one row per serial) are kept
+        min_slots: Required run length
+
+    Returns:
+        numpy.ndarray: Boolean array (..., n - min_slots + 1)
+    """
+    busy = np.asarray(busy, dtype=bool)
+    if min_slots < 1 or busy.shape[-1] < min_slots:
+        return np.zeros(busy.shape[:-1] + (0,), dtype=bool)
+
+    zeros = np.zeros(busy.shape[:-1] + (1,), dtype=int)
+    busy_prefix = np.concatenate((zeros, np.cumsum(busy, axis=-1)), axis=-1)
+    return (busy_prefix[..., min_slots:] - busy_prefix[..., :-min_slots]) == 0
+
+
+def true_runs(mask) -> Tuple[np.ndarray, np.ndarray]:
+    """Start indices and lengths of the runs of True in a 1-D boolean array."""
+    mask = np.asarray(mask, dtype=bool)
+    edges = np.diff(np.concatenate(([0], mask.astype(int), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    return starts, ends - starts
+
+
+def best_fit_order(gaps_before, gaps_after) -> np.ndarray:
+    """
+    Order candidate units so the tightest fit for a booking comes first.
+
+    Units with bookings on both sides come first, then units open on one side, then
+    idle units; within each group the smallest total idle gap wins. Short gaps get
+    filled and long free stretches stay in one piece for long bookings.
+
+    Args:
+        gaps_before: Idle time before the booking per unit (inf if none)
+        gaps_after: Idle time after the booking per unit (inf if none)
+
+    Returns:
+        numpy.ndarray: Candidate indices, best first
+    """
+    before = np.asarray(gaps_before, dtype=float)
+    after = np.asarray(gaps_after, dtype=float)
+
+    open_sides = np.isinf(before).astype(int) + np.isinf(after).astype(int)
+    finite_gap = np.where(np.isinf(before), 0.0, before) + np.where(np.isinf(after), 0.0, after)
+    return np.lexsort((finite_gap, open_sides))
+
+
+def over_capacity_segments(starts, ends, weights, capacity: float) -> List[Tuple[float, float, float, List[int]]]:
+    """
+    Time segments in which the summed weight of the active intervals exceeds `capacity`.
+
+    The boundaries are sorted once and swept linearly, so the cost grows with
+    n log n rather than with the number of overlapping pairs.
+
+    Returns:
+        list: (start, end, peak, member indices) per maximal over-capacity segment,
+            where the members are every interval active at some point in it
+    """
+    starts = np.asarray(list(starts), dtype=float)
+    ends = np.asarray(list(ends), dtype=float)
+    weights = np.asarray(list(weights), dtype=float)
+    count = len(starts)
+    if not count:
+        return []
+
+    times = np.concatenate((starts, ends))
+    deltas = np.concatenate((weights, -weights))
+    ids = np.concatenate((np.arange(count), np.arange(count)))
+
+    # Ends sort before starts at the same instant: the intervals are half-open
+    order = np.lexsort((deltas > 0, times))
+    times, deltas, ids = times[order], deltas[order], ids[order]
+    running = np.cumsum(deltas)
+    settled = np.append(times[1:] != times[:-1], True)
+    over = running > max(capacity, 0.0)
+
+    segments = []
+    active = set()
+    segment = None
+
+    for position in range(len(times)):
+        interval = int(ids[position])
+        if deltas[position] > 0:
+            active.add(interval)
+            if segment is not None:
+                segment[3].add(interval)
+        else:
+            active.discard(interval)
+
+        if not settled[position]:
+            continue
+
+        if over[position]:
+            if segment is None:
+                segment = [times[position], None, running[position], set(active)]
+            else:
+                segment[2] = max(segment[2], running[position])
+        elif segment is not None:
+            segment[1] = times[position]
+            segments.append((float(segment[0]), float(segment[1]), float(segment[2]), sorted(segment[3])))
+            segment = None
+
+    return segments
+
+
+def daily_interval_weight(starts, ends, weights, first_day: int, days: int) -> np.ndarray:
+    """
+    Summed weight of the half-open day intervals [start, end) active on each of
+    `days` days from `first_day` (all as day ordinals). Intervals are clipped to the
+    range and accumulated as +weight/-weight events with `np.add.at`.
+    """
+    starts = np.clip(np.asarray(starts, dtype=np.int64) - first_day, 0, days)
+    ends = np.clip(np.asarray(ends, dtype=np.int64) - first_day, 0, days)
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), starts.shape)
+
+    events = np.zeros(days + 1)
+    np.add.at(events, starts, weights)
+    np.add.at(events, ends, -weights)
+    return np.cumsum(events)[:days]
+
+
+def bucket_days(days, weights, first_day: int, length: int) -> np.ndarray:
+    """Per-day totals of (day ordinal, weight) pairs over `length` days; days outside are dropped."""
+    offsets = np.asarray(days, dtype=np.int64) - first_day
+    weights = np.broadcast_to(np.asarray(weights, dtype=float), offsets.shape)
+    inside = (offsets >= 0) & (offsets < length)
+
+    totals = np.zeros(length)
+    np.add.at(totals, offsets[inside], weights[inside])
+    return totals
+
+
+def period_sums(daily, period_offsets) -> np.ndarray:
+    """Sum a daily array over consecutive periods starting at `period_offsets` (sorted, first 0)."""
+    daily = np.asarray(daily, dtype=float)
+    if not len(period_offsets):
+        return np.zeros(0)
+    return np.add.reduceat(daily, np.asarray(period_offsets, dtype=np.int64))
+
+
+def window_sums(days, values, starts, ends) -> np.ndarray:
+    """
+    Sum `values` (one row per day in sorted `days`, one or more columns) over each
+    [start, end] window of days, inclusive, with one cumulative sum.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    totals = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+    first = np.searchsorted(days, np.asarray(starts, dtype=np.int64), side="left")
+    last = np.searchsorted(days, np.asarray(ends, dtype=np.int64), side="right")
+    return totals[last] - totals[first]
@@ -0,0 +1,339 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module provides bulk creation of Stock Reservations.
+
+Rental Events and approved Quotations reserve every line of a job at once. Inserting
+one Stock Reservation document per line re-runs the availability check for each
+insert and leaves half a job reserved when a later line fails. Instead, the items
+are locked in a fixed order, every line is checked against one snapshot of the
+reservations (including the lines accepted earlier in the same batch), and the
+accepted reservations are written in a single multi-row insert, named from one
+block of the naming series (see `reserve_reservation_names`).
+"""
+
+import re
+import frappe
+from frappe import _
+from frappe.model.naming import set_new_name
+from frappe.utils import flt, cint, now_datetime, get_datetime
+from typing import Dict, List, Optional, Iterable, Any
+from onhire_pro.utils.availability import get_item_stock
+from onhire_pro.utils.availability_index import load_item_indexes, mark_items_changed, to_timestamp
+from onhire_pro.utils.daily_occupancy import refresh_item_occupancy
+from onhire_pro.utils.kpi_cache import invalidate_kpi_cache
+from onhire_pro.utils.occupancy import overlaps
+from onhire_pro.utils.serial_allocator import SerialPool, LEAST_USED, get_allocation_policy, get_serial_usage
+
+RESERVATION_FIELDS = (
+    "name", "owner", "creation", "modified", "modified_by", "docstatus", "idx",
+    "item_code", "item_name", "serial_no", "qty", "reservation_date", "from_date", "to_date",
+    "status", "reference_doctype", "reference_name"
+)
+
+# Autonames whose names can be reserved as a block: "format:SR-{####}" and "SR-.####"
+FORMAT_SERIES_PATTERN = re.compile(r"^format:([^{}]*)\{(#+)\}$")
+NAMING_SERIES_PATTERN = re.compile(r"^([^.{}]*)\.(#+)$")
+
+
+def lock_items(item_codes: Iterable[str]) -> None:
+    """
+    Lock the Item rows of `item_codes` until the transaction ends.
+
+    Rows are always locked in name order, so two transactions reserving overlapping
+    sets of items wait for each other instead of deadlocking. Transactions for
+    different items never block each other.
+    """
+    item_codes = sorted(set(item_codes))
+    if item_codes:
+        frappe.db.sql("""
+            SELECT name FROM `tabItem`
+            WHERE name IN %(item_codes)s
+            ORDER BY name
+            FOR UPDATE
+        """, {"item_codes": tuple(item_codes)})
+
+
+def get_locked_item_index(item_code: str):
+    """
+    Lock an item and build its availability index from the database.
+
+    The worker cache cannot be used under the lock: a concurrent transaction that
+    just committed a reservation for the item bumps the cache version only after
+    its commit, so a cached index may still miss that reservation.
+    """
+    lock_items([item_code])
+    return load_item_indexes([item_code])[item_code]
+
+
+def check_reservation_lines(lines: List[Dict[str, Any]], warehouse: Optional[str] = None,
+                            exclude: Optional[str] = None, policy: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Check reservation lines together against the current reservations.
+
+    Lines are checked in order, and each accepted line counts against the lines after
+    it, so a batch can never over-book an item by itself. Callers that go on to write
+    the reservations must hold the item locks (see `lock_items`).
+
+    Lines of serialized items without a serial_no get their serials assigned by the
+    serial allocator; such a line of qty N is returned as N results (same idx), one
+    per serial.
+
+    Args:
+        lines: Dicts with item_code, qty, from_date, to_date and optionally serial_no
+        warehouse: Warehouse to count stock in; all warehouses if not set
+        exclude: Reservation or reference document whose reservations are ignored
+        policy: Serial allocation policy; Rental Settings if not set
+
+    Returns:
+        list: One result per reservation with the line's fields plus item_name,
+            available and reason
+    """
+    item_codes = {line.get("item_code") for line in lines if line.get("item_code")}
+    stock = get_item_stock(item_codes, warehouse)
+    indexes = load_item_indexes(stock)
+
+    accepted_bulk: Dict[str, List[Dict[str, Any]]] = {}
+    accepted_serials: Dict[str, List[Dict[str, Any]]] = {}
+    named_serials = {line.get("serial_no") for line in lines if line.get("serial_no")}
+    pools: Dict[str, SerialPool] = {}
+    results = []
+
+    for idx, line in enumerate(lines, start=1):
+        result = frappe._dict(
+            idx=line.get("idx") or idx,
+            item_code=line.get("item_code"),
+            serial_no=line.get("serial_no") or None,
+            qty=1 if line.get("serial_no") else flt(line.get("qty")),
+            from_date=line.get("from_date"),
+            to_date=line.get("to_date"),
+            available=False,
+            reason=""
+        )
+        results.append(result)
+
+        details = stock.get(result.item_code)
+        if not details:
+            result.reason = _("Item {0} does not exist").format(result.item_code)
+            continue
+
+        result.item_name = details.item_name
+
+        if not result.from_date or not result.to_date or get_datetime(result.to_date) <= get_datetime(result.from_date):
+            result.reason = _("To Date must be after From Date")
+            continue
+
+        if result.qty <= 0:
+            result.reason = _("Quantity must be greater than zero")
+            continue
+
+        result.from_ts = to_timestamp(result.from_date)
+        result.to_ts = to_timestamp(result.to_date)
+        index = indexes[result.item_code]
+
+        if result.serial_no:
+            conflict = index.serial_conflict(result.serial_no, result.from_date, result.to_date, exclude=exclude)
+            if not conflict:
+                conflict = next(
+                    (other for other in accepted_serials.get(result.serial_no, [])
+                     if overlaps(other.from_ts, other.to_ts, result.from_ts, result.to_ts)),
+                    None
+                )
+                if conflict:
+                    conflict = frappe._dict(reference_doctype=_("line"), reference_name=conflict.idx,
+                                            from_date=conflict.from_date, to_date=conflict.to_date)
+
+            if conflict:
+                result.reason = _("Serial No {0} is already reserved in {1} {2} from {3} to {4}").format(
+                    result.serial_no, conflict.reference_doctype, conflict.reference_name,
+                    conflict.from_date, conflict.to_date
+                )
+                continue
+
+            accepted_serials.setdefault(result.serial_no, []).append(result)
+        elif details.has_serial_no:
+            if result.qty != cint(result.qty):
+                result.reason = _("Quantity of serialized item {0} must be a whole number").format(result.item_code)
+                continue
+
+            if result.item_code not in pools:
+                policy = policy or get_allocation_policy()
+                pools[result.item_code] = SerialPool(
+                    result.item_code, details.serial_nos, index,
+                    usage=get_serial_usage([result.item_code]) if policy == LEAST_USED else None,
+                    pending=accepted_serials,
+                    avoid=named_serials
+                )
+
+            serial_nos = pools[result.item_code].allocate(
+                cint(result.qty), result.from_date, result.to_date, policy, exclude=exclude, hold=False
+            )
+            if len(serial_nos) < result.qty:
+                result.reason = _("Not enough serial numbers available for {0}. Requested: {1}, Available: {2}").format(
+                    result.item_code, cint(result.qty), len(serial_nos)
+                )
+                continue
+
+            result.qty = 1
+            for position, serial_no in enumerate(serial_nos):
+                allocated = result if position == 0 else frappe._dict(result, available=True)
+                allocated.serial_no = serial_no
+                if position:
+                    results.append(allocated)
+                accepted_serials.setdefault(serial_no, []).append(allocated)
+        else:
+            booked = index.peak_booked_qty(
+                result.from_date, result.to_date, exclude=exclude, pending=accepted_bulk.get(result.item_code)
+            )
+            available_qty = details.actual_qty - booked
+            if result.qty > available_qty:
+                result.reason = _("Not enough quantity available for {0}. Requested: {1}, Available: {2}").format(
+                    result.item_code, result.qty, available_qty
+                )
+                continue
+
+            accepted_bulk.setdefault(result.item_code, []).append(result)
+
+        result.available = True
+
+    return results
+
+
+def create_bulk_reservations(lines: List[Dict[str, Any]], reference_doctype: str, reference_name: str,
+                             warehouse: Optional[str] = None, allow_partial: bool = False,
+                             policy: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Reserve several lines for one document in a single transaction.
+
+    The items are locked in a fixed order, all lines are checked together (see
+    `check_reservation_lines`), serials are assigned where a serialized line does
+    not name them, and the accepted lines are written as submitted
+    Stock Reservations with one multi-row insert. Nothing is committed here; the
+    reservations commit or roll back with the caller's transaction.
+
+    Args:
+        lines: Dicts with item_code, qty, from_date, to_date and optionally serial_no and idx
+        reference_doctype: DocType the reservations are for
+        reference_name: Document the reservations are for
+        warehouse: Warehouse to count stock in; all warehouses if not set
+        allow_partial: Reserve the available lines even if others conflict
+        policy: Serial allocation policy for lines without a serial_no; Rental Settings if not set
+
+    Returns:
+        dict: {"success", "reservations", "conflicts", "lines"}, where lines is a
+            per-line report with available, reason and the reservation name
+
+    Example:
+        >>> report = create_bulk_reservations(lines, "Rental Event", "RE-0042")
+        >>> report["success"], len(report["reservations"]), report["conflicts"]
+        (True, 150, [])
+    """
+    if not lines:
+        return {"success": True, "reservations": [], "conflicts": [], "lines": []}
+
+    lock_items(line.get("item_code") for line in lines if line.get("item_code"))
+    results = check_reservation_lines(lines, warehouse=warehouse, policy=policy)
+
+    conflicts = [result for result in results if not result.available]
+    accepted = [result for result in results if result.available]
+
+    if conflicts and not allow_partial:
+        return {"success": False, "reservations": [], "conflicts": conflicts, "lines": results}
+
+    insert_reservations(accepted, reference_doctype, reference_name)
+
+    return {
+        "success": not conflicts,
+        "reservations": [result.reservation for result in accepted],
+        "conflicts": conflicts,
+        "lines": results
+    }
+
+
+def reserve_reservation_names(count: int) -> List[str]:
+    """
+    Names for `count` new Stock Reservations, with one block of the naming series.
+
+    The series is advanced by `count` with one UPDATE, so naming a job costs two
+    queries instead of a SELECT ... FOR UPDATE and an UPDATE per line. Like
+    `frappe.model.naming`, a "format:" autoname numbers its series under the
+    empty key and a naming series under its prefix. Autonames that are not a plain
+    series, and blocks that would clash with existing names, are named one by one.
+    """
+    autoname = frappe.get_meta("Stock Reservation").autoname or ""
+    format_series = FORMAT_SERIES_PATTERN.match(autoname)
+    naming_series = NAMING_SERIES_PATTERN.match(autoname)
+
+    if format_series or naming_series:
+        prefix, digits = (format_series or naming_series).groups()
+        key = "" if format_series else prefix
+
+        frappe.db.sql("UPDATE `tabSeries` SET current = current + %(count)s WHERE name = %(key)s",
+                      {"count": count, "key": key})
+        current = frappe.db.sql("SELECT current FROM `tabSeries` WHERE name = %(key)s", {"key": key})
+        if current:
+            last = cint(current[0][0])
+        else:
+            frappe.db.sql("INSERT INTO `tabSeries` (name, current) VALUES (%(key)s, %(count)s)",
+                          {"key": key, "count": count})
+            last = count
+
+        names = [f"{prefix}{number:0{len(digits)}d}" for number in range(last - count + 1, last + 1)]
+        if not frappe.db.sql("SELECT name FROM `tabStock Reservation` WHERE name IN %(names)s LIMIT 1",
+                             {"names": tuple(names)}):
+            return names
+
+    names = []
+    for position in range(count):
+        reservation = frappe.new_doc("Stock Reservation")
+        set_new_name(reservation)
+        names.append(reservation.name)
+    return names
+
+
+def insert_reservations(lines: List[Dict[str, Any]], reference_doctype: str, reference_name: str) -> None:
+    """Write checked lines as submitted Stock Reservations in one multi-row insert."""
+    if not lines:
+        return
+
+    now = now_datetime()
+    user = frappe.session.user
+    values = []
+
+    names = reserve_reservation_names(len(lines))
+
+    for idx, (line, name) in enumerate(zip(lines, names), start=1):
+        line.reservation = name
+
+        values.append((
+            name, user, now, now, user, 1, idx,
+            line.item_code, line.item_name, line.serial_no, line.qty, now, line.from_date, line.to_date,
+            "Reserved", reference_doctype, reference_name
+        ))
+
+    frappe.db.bulk_insert("Stock Reservation", RESERVATION_FIELDS, values)
+
+    serial_nos = tuple(line.serial_no for line in lines if line.serial_no)
+    if serial_nos:
+        frappe.db.sql("""
+            UPDATE `tabSerial No`
+            SET reservation_status = 'Reserved', reserved_for = %(reserved_for)s
+            WHERE name IN %(serial_nos)s
+        """, {"serial_nos": serial_nos, "reserved_for": f"{reference_doctype}: {reference_name}"})
+
+    mark_items_changed(line.item_code for line in lines)
+
+    # Bulk inserts skip the document hooks that keep the cached KPIs and the daily occupancy table current
+    invalidate_kpi_cache(frappe._dict(doctype="Stock Reservation"))
+    refresh_item_occupancy(
+        [line.item_code for line in lines],
+        min(get_datetime(line.from_date) for line in lines).date(),
+        max(get_datetime(line.to_date) for line in lines).date()
+    )
+
+
+def format_conflicts(conflicts: List[Dict[str, Any]]) -> str:
+    """Render a conflict report as an HTML list for frappe.throw / msgprint."""
+    return "<br>".join(
+        _("Row {0}: {1}").format(conflict.idx, conflict.reason) for conflict in conflicts
+    )
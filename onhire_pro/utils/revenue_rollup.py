@@ -0,0 +1,227 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module maintains the Rental Revenue Daily table.
+
+The table holds the rental revenue of submitted Sales Invoices summed per
+company, posting date, item group, item, customer, rental job and sales person:
+
+    - net_amount: the invoice items' net amount in company currency
+    - grand_total: the invoice grand total, shared among its items by net amount,
+      so the rows of an invoice add up to its grand total
+    - qty: the invoiced quantity
+
+An invoice item counts as rental revenue if the invoice is linked to a Rental Job
+or the item is a rental item. Revenue KPIs and reports read the table with range
+scans on (company, date) instead of summing `tabSales Invoice` and
+`tabSales Invoice Item` on every call.
+
+Rows are named after their key, so submitting an invoice adds its amounts to the
+existing rows with one INSERT ... ON DUPLICATE KEY UPDATE and cancelling it
+subtracts them again. A nightly job rebuilds the current and previous month, to
+repair rows an invoice failed to update; `bench rebuild-rental-revenue` rebuilds
+any period from the invoices.
+"""
+
+import frappe
+from frappe.utils import getdate, add_days, add_months, get_first_day, flt, today, now_datetime
+from typing import Dict, List, Optional, Iterable, Any
+from onhire_pro.utils.daily_occupancy import column_if_exists
+from onhire_pro.utils.schema_capabilities import doctype_exists, sql_fragment
+
+REVENUE_DOCTYPE = "Rental Revenue Daily"
+KEY_FIELDS = ("company", "date", "item_group", "item_code", "customer", "rental_job", "sales_person")
+AMOUNT_FIELDS = ("net_amount", "grand_total", "qty")
+
+DEFAULT_REBUILD_DAYS = 365 * 3
+DAYS_PER_CHUNK = 31
+
+
+def _rollup_query(condition: str) -> str:
+    """SELECT of the rollup rows of the invoices matching `condition`, signed by %(sign)s."""
+    rental_job = f"IFNULL({sql_fragment('sales_invoice_rental_job')}, '')"
+    sales_person = f"IFNULL({sql_fragment('sales_invoice_sales_person')}, '')"
+    is_rental_item = column_if_exists("Item", "is_rental_item", "item.is_rental_item = 1", "0 = 1")
+    key = ("si.company", "si.posting_date", "IFNULL(item.item_group, '')", "sii.item_code",
+           "IFNULL(si.customer, '')", rental_job, sales_person)
+
+    return f"""
+        SELECT MD5(CONCAT_WS('|', {', '.join(key)})) AS name,
+            si.company, si.posting_date AS date, IFNULL(item.item_group, '') AS item_group, sii.item_code,
+            IFNULL(si.customer, '') AS customer, {rental_job} AS rental_job, {sales_person} AS sales_person,
+            %(sign)s * SUM(sii.base_net_amount) AS net_amount,
+            %(sign)s * SUM(CASE WHEN si.net_total != 0 THEN si.grand_total * sii.net_amount / si.net_total ELSE 0 END)
+                AS grand_total,
+            %(sign)s * SUM(sii.qty) AS qty
+        FROM `tabSales Invoice Item` sii
+        JOIN `tabSales Invoice` si ON sii.parent = si.name
+        LEFT JOIN `tabItem` item ON sii.item_code = item.name
+        WHERE {condition}
+            AND ({rental_job} != '' OR {is_rental_item})
+        GROUP BY {', '.join(key)}
+    """
+
+
+def _add_to_rollup(condition: str, values: Dict[str, Any], sign: int = 1) -> None:
+    """Add (or with sign -1, subtract) the revenue of the invoices matching `condition`."""
+    fields = KEY_FIELDS + AMOUNT_FIELDS
+    frappe.db.sql(f"""
+        INSERT INTO `tab{REVENUE_DOCTYPE}`
+            (name, owner, creation, modified, modified_by, docstatus, {', '.join(fields)})
+        SELECT rollup.name, %(user)s, %(now)s, %(now)s, %(user)s, 0,
+            rollup.company, rollup.date, NULLIF(rollup.item_group, ''), rollup.item_code,
+            NULLIF(rollup.customer, ''), NULLIF(rollup.rental_job, ''), NULLIF(rollup.sales_person, ''),
+            rollup.net_amount, rollup.grand_total, rollup.qty
+        FROM ({_rollup_query(condition)}) rollup
+        ON DUPLICATE KEY UPDATE
+            {', '.join(f"{field} = `tab{REVENUE_DOCTYPE}`.{field} + VALUES({field})" for field in AMOUNT_FIELDS)},
+            modified = VALUES(modified)
+    """, dict(values, sign=sign, user=frappe.session.user, now=now_datetime()))
+
+
+def update_revenue_rollup(doc, method=None) -> None:
+    """Add the revenue of a submitted Sales Invoice to the rollup, or remove it on cancel."""
+    try:
+        sign = -1 if method == "on_cancel" else 1
+        _add_to_rollup("si.name = %(invoice)s", {"invoice": doc.name}, sign)
+
+        if sign < 0:
+            # Drop the rows the invoice alone made up
+            frappe.db.sql(f"""
+                DELETE FROM `tab{REVENUE_DOCTYPE}`
+                WHERE company = %(company)s AND date = %(date)s
+                    AND ABS(net_amount) < 0.005 AND ABS(grand_total) < 0.005 AND ABS(qty) < 0.000001
+            """, {"company": doc.company, "date": doc.posting_date})
+    except Exception:
+        frappe.log_error(
+            f"Error updating revenue rollup for {doc.doctype} {doc.name}: {frappe.get_traceback()}",
+            "Revenue Rollup Error"
+        )
+
+
+def rebuild_revenue_rollup(from_date=None, to_date=None, company: Optional[str] = None,
+                           commit: bool = True) -> int:
+    """
+    Rebuild the revenue rollup from the submitted Sales Invoices.
+
+    Args:
+        from_date: First posting date to rebuild (default DEFAULT_REBUILD_DAYS before today)
+        to_date: Last posting date to rebuild (default today)
+        company: Company to rebuild (default every company)
+        commit: Commit after each chunk of DAYS_PER_CHUNK days
+
+    Returns:
+        int: Number of rows in the rebuilt period
+
+    Example:
+        $ bench --site mysite rebuild-rental-revenue --from-date 2023-01-01
+    """
+    from_date = getdate(from_date or add_days(today(), -DEFAULT_REBUILD_DAYS))
+    to_date = getdate(to_date or today())
+    company_condition = "AND {}company = %(company)s" if company else ""
+
+    start = from_date
+    while start <= to_date:
+        end = min(add_days(start, DAYS_PER_CHUNK - 1), to_date)
+        values = {"from_date": start, "to_date": end, "company": company}
+
+        frappe.db.sql(f"""
+            DELETE FROM `tab{REVENUE_DOCTYPE}`
+            WHERE date BETWEEN %(from_date)s AND %(to_date)s {company_condition.format("")}
+        """, values)
+        _add_to_rollup(
+            f"si.docstatus = 1 AND si.posting_date BETWEEN %(from_date)s AND %(to_date)s "
+            f"{company_condition.format('si.')}",
+            values
+        )
+        if commit:
+            frappe.db.commit()
+        start = add_days(end, 1)
+
+    return frappe.db.count(REVENUE_DOCTYPE, dict(
+        {"date": ["between", [from_date, to_date]]}, **({"company": company} if company else {})
+    ))
+
+
+def refresh_recent_revenue() -> None:
+    """Nightly: rebuild the current and previous month."""
+    try:
+        rebuild_revenue_rollup(get_first_day(add_months(today(), -1)), today())
+    except Exception:
+        frappe.log_error(f"Error refreshing revenue rollup: {frappe.get_traceback()}", "Revenue Rollup Error")
+
+
+def _revenue_conditions(filters: Dict[str, Any]) -> str:
+    conditions = ""
+    for field in ("item_group", "item_code", "customer", "rental_job", "sales_person"):
+        if filters.get(field):
+            conditions += f" AND rev.{field} = %({field})s"
+    if filters.get("rental_jobs_only"):
+        conditions += " AND rev.rental_job IS NOT NULL"
+    return conditions
+
+
+def get_revenue(company: str, from_date, to_date, group_by: Iterable[str] = (), measure: str = "grand_total",
+                filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Rental revenue of a company in a period, summed over the rollup.
+
+    Args:
+        company: Company name
+        from_date: First posting date
+        to_date: Last posting date
+        group_by: Key fields to group by (see KEY_FIELDS)
+        measure: Amount field to sum as `revenue` (see AMOUNT_FIELDS)
+        filters: Key field values to match, and `rental_jobs_only` to count only
+            invoices linked to a Rental Job
+
+    Returns:
+        list: Rows with the group_by fields and revenue, highest revenue first
+
+    Example:
+        >>> get_revenue("Example Inc.", "2025-01-01", "2025-03-31", group_by=["item_group"], measure="net_amount")
+        [{"item_group": "Generators", "revenue": 18250.0}, {"item_group": "Lifts", "revenue": 9400.0}]
+    """
+    group_by = list(group_by)
+    if measure not in AMOUNT_FIELDS or not set(group_by) <= set(KEY_FIELDS):
+        frappe.throw(f"Cannot sum {measure} of the revenue rollup by {group_by}")
+    if not doctype_exists(REVENUE_DOCTYPE):
+        return []
+
+    filters = filters or {}
+    fields = "".join(f"rev.{field}, " for field in group_by)
+    group_by_sql = f"GROUP BY {', '.join(f'rev.{field}' for field in group_by)}" if group_by else ""
+
+    rows = frappe.db.sql(f"""
+        SELECT {fields}SUM(rev.{measure}) AS revenue
+        FROM `tab{REVENUE_DOCTYPE}` rev
+        WHERE rev.company = %(company)s
+            AND rev.date BETWEEN %(from_date)s AND %(to_date)s
+            {_revenue_conditions(filters)}
+        {group_by_sql}
+        ORDER BY revenue DESC
+    """, dict(filters, company=company, from_date=getdate(from_date), to_date=getdate(to_date)), as_dict=1)
+
+    for row in rows:
+        row.revenue = flt(row.revenue)
+    return rows
+
+
+def get_total_revenue(company: str, from_date, to_date, measure: str = "grand_total",
+                      filters: Optional[Dict[str, Any]] = None) -> float:
+    """Rental revenue of a company in a period (see `get_revenue`)."""
+    if measure not in AMOUNT_FIELDS:
+        frappe.throw(f"Cannot sum {measure} of the revenue rollup")
+    if not doctype_exists(REVENUE_DOCTYPE):
+        return 0.0
+
+    filters = filters or {}
+    result = frappe.db.sql(f"""
+        SELECT SUM(rev.{measure})
+        FROM `tab{REVENUE_DOCTYPE}` rev
+        WHERE rev.company = %(company)s
+            AND rev.date BETWEEN %(from_date)s AND %(to_date)s
+            {_revenue_conditions(filters)}
+    """, dict(filters, company=company, from_date=getdate(from_date), to_date=getdate(to_date)))
+
+    return flt(result[0][0]) if result and result[0][0] else 0.0
@@ -0,0 +1,193 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module keeps the schema capability map of the site.
+
+KPIs and reports adapt to the schema they find: optional doctypes such as
+Maintenance Task, and fields that differ between installations such as
+`job_status` / `status` on Rental Job. Instead of asking the database with
+`frappe.db.exists("DocType", ...)` and `frappe.db.has_column` on every call, the
+existence of the tracked doctypes (those of
+`schema_verifier.get_rental_schema_requirements` plus TRACKED_DOCTYPES) and
+their table columns are read once and kept in Redis, shared by all workers, and
+in each worker for LOCAL_CACHE_SECONDS.
+
+The SQL fragments that depend on the schema (SQL_FRAGMENTS, e.g. the date field
+of a Maintenance Task) are compiled into the map as well, so queries pick them up
+with a dictionary lookup.
+
+The map is built on first use, rebuilt after `bench migrate` and after a Custom
+Field of a tracked doctype changes. Tests that mock the schema patch
+`get_schema_capabilities`, or clear the worker cache (`_capabilities`) after
+changing the mocked tables.
+"""
+
+import frappe
+import time
+from typing import Dict, List, Any, Callable
+from onhire_pro.utils.kpi_cache import clear_kpi_cache
+from onhire_pro.utils.schema_verifier import get_rental_schema_requirements, log_schema_verification_results
+
+SCHEMA_CAPABILITIES_KEY = "onhire_pro:schema_capabilities"
+LOCAL_CACHE_SECONDS = 300
+
+# Doctypes read by KPIs and reports besides those of the rental schema requirements
+TRACKED_DOCTYPES = ("Stock Reservation", "Rental Booking Conflict", "Rental Item Daily Occupancy",
+                    "Rental Revenue Daily", "Rental Leaderboard Entry", "Rental Live Counter",
+                    "Forecasted KPI Value", "Historical KPI Value", "Serial No",
+                    "Sales Invoice Item")
+
+# Fragment name -> function of `has_column(doctype, fieldname)` returning the SQL
+SQL_FRAGMENTS: Dict[str, Callable[[Callable[[str, str], bool]], str]] = {
+    # Maintenance Task date a task is filtered on
+    "maintenance_task_date": lambda has_column:
+        "start_date" if has_column("Maintenance Task", "start_date") else "creation",
+    # Rental Job (rj) and Rental Job Item (rji) columns that differ between installations
+    "rental_job_status": lambda has_column:
+        "rj.job_status" if has_column("Rental Job", "job_status") else "rj.status",
+    "rental_job_company": lambda has_column:
+        "rj.company" if has_column("Rental Job", "company") else "''",
+    "job_item_start_date": lambda has_column:
+        "COALESCE(rji.rental_item_start_date, rj.scheduled_dispatch_date)"
+        if has_column("Rental Job Item", "rental_item_start_date") else "rj.scheduled_dispatch_date",
+    "job_item_end_date": lambda has_column:
+        "COALESCE(rji.rental_item_end_date, rj.scheduled_return_date)"
+        if has_column("Rental Job Item", "rental_item_end_date") else "rj.scheduled_return_date",
+    "job_item_warehouse": lambda has_column:
+        "rji.warehouse" if has_column("Rental Job Item", "warehouse")
+        else "rj.set_warehouse" if has_column("Rental Job", "set_warehouse") else "''",
+    # Whether a job line came back damaged: its damaged quantity, else the job's damage flag
+    "job_item_damaged": lambda has_column:
+        "rji.damaged_qty > 0" if has_column("Rental Job Item", "damaged_qty")
+        else "rj.has_damaged_items = 1" if has_column("Rental Job", "has_damaged_items") else "0",
+    # Sales Invoice (si) link to its Rental Job and the person credited with the sale
+    "sales_invoice_rental_job": lambda has_column:
+        "COALESCE(si.rental_job, si.custom_linked_rental_job)"
+        if has_column("Sales Invoice", "rental_job") and has_column("Sales Invoice", "custom_linked_rental_job")
+        else "si.rental_job" if has_column("Sales Invoice", "rental_job")
+        else "si.custom_linked_rental_job" if has_column("Sales Invoice", "custom_linked_rental_job") else "''",
+    "sales_invoice_sales_person": lambda has_column:
+        "si.sales_person" if has_column("Sales Invoice", "sales_person") else "si.owner",
+}
+
+# site -> (expires_at, capabilities)
+_capabilities: Dict[str, tuple] = {}
+
+
+def tracked_doctypes() -> List[str]:
+    """Doctypes whose existence and columns the capability map holds."""
+    doctypes = [doctype["name"] for doctype in get_rental_schema_requirements()["doctypes"]]
+    return doctypes + [doctype for doctype in TRACKED_DOCTYPES if doctype not in doctypes]
+
+
+def _table_columns(doctype: str) -> List[str]:
+    try:
+        return sorted(frappe.db.get_table_columns(doctype))
+    except Exception:
+        # Single and virtual doctypes have no table
+        return []
+
+
+def build_schema_capabilities() -> Dict[str, Any]:
+    """
+    Read the existence and columns of the tracked doctypes and compile the SQL fragments.
+
+    Returns:
+        dict: {"doctypes": {doctype: exists}, "columns": {doctype: [column]},
+            "fragments": {name: sql}, "verification": schema requirement results}
+    """
+    doctypes = tracked_doctypes()
+    existing = set(frappe.get_all("DocType", filters={"name": ["in", doctypes]}, pluck="name"))
+    capabilities = {
+        "doctypes": {doctype: doctype in existing for doctype in doctypes},
+        "columns": {doctype: _table_columns(doctype) for doctype in doctypes if doctype in existing},
+    }
+
+    columns = {doctype: set(fields) for doctype, fields in capabilities["columns"].items()}
+    in_table = lambda doctype, fieldname: fieldname in columns.get(doctype, ())
+    capabilities["fragments"] = {name: build(in_table) for name, build in SQL_FRAGMENTS.items()}
+    capabilities["verification"] = verify_requirements(capabilities)
+    return capabilities
+
+
+def verify_requirements(capabilities: Dict[str, Any]) -> Dict[str, Any]:
+    """Rental schema requirements checked against the map, in the shape of `verify_schema_requirements`."""
+    requirements = get_rental_schema_requirements()
+    result = {"success": True, "missing_doctypes": [], "missing_fields": [], "wrong_type_fields": []}
+
+    for doctype in requirements["doctypes"]:
+        if not capabilities["doctypes"].get(doctype["name"]):
+            result["missing_doctypes"].append(doctype["name"])
+            result["success"] = result["success"] and not doctype.get("required", True)
+
+    for field in requirements["fields"]:
+        if field["doctype"] in result["missing_doctypes"]:
+            continue
+        if field["name"] not in capabilities["columns"].get(field["doctype"], ()):
+            result["missing_fields"].append({"doctype": field["doctype"], "field": field["name"]})
+            result["success"] = result["success"] and not field.get("required", True)
+
+    return result
+
+
+def get_schema_capabilities() -> Dict[str, Any]:
+    """The capability map from the worker cache or Redis, building it on first use."""
+    site = getattr(frappe.local, "site", None)
+    entry = _capabilities.get(site)
+    if entry and entry[0] > time.time():
+        return entry[1]
+
+    capabilities = frappe.cache().get_value(SCHEMA_CAPABILITIES_KEY)
+    if not capabilities:
+        capabilities = build_schema_capabilities()
+        frappe.cache().set_value(SCHEMA_CAPABILITIES_KEY, capabilities)
+
+    _capabilities[site] = (time.time() + LOCAL_CACHE_SECONDS, capabilities)
+    return capabilities
+
+
+def doctype_exists(doctype: str) -> bool:
+    """Whether the doctype exists; untracked doctypes are checked in the database."""
+    exists = get_schema_capabilities()["doctypes"].get(doctype)
+    return bool(frappe.db.exists("DocType", doctype)) if exists is None else exists
+
+
+def has_column(doctype: str, fieldname: str) -> bool:
+    """Whether the doctype's table has the column; untracked doctypes are checked in the database."""
+    capabilities = get_schema_capabilities()
+    if doctype not in capabilities["doctypes"]:
+        return bool(frappe.db.has_column(doctype, fieldname))
+    return fieldname in capabilities["columns"].get(doctype, ())
+
+
+def sql_fragment(name: str) -> str:
+    """
+    Precompiled SQL fragment of SQL_FRAGMENTS for this site's schema.
+
+    Example:
+        >>> sql_fragment("maintenance_task_date")
+        'start_date'
+    """
+    return get_schema_capabilities()["fragments"][name]
+
+
+def refresh_schema_capabilities() -> Dict[str, Any]:
+    """
+    Rebuild the capability map and share it with all workers.
+
+    Runs after `bench migrate`. Cached KPI results are invalidated, as they may
+    have been computed with other SQL fragments.
+    """
+    capabilities = build_schema_capabilities()
+    frappe.cache().set_value(SCHEMA_CAPABILITIES_KEY, capabilities)
+    _capabilities[getattr(frappe.local, "site", None)] = (time.time() + LOCAL_CACHE_SECONDS, capabilities)
+    clear_kpi_cache()
+
+    log_schema_verification_results(capabilities["verification"])
+    return capabilities
+
+
+def invalidate_schema_capabilities(doc, method=None) -> None:
+    """Rebuild the capability map after commit when a Custom Field of a tracked doctype changes."""
+    if doc.get("dt") in tracked_doctypes():
+        frappe.db.after_commit.add(refresh_schema_capabilities)
@@ -349,3 +349,96 @@ def log_schema_verification_results(results: Dict[str, Any]) -> None:
                 for f in results["wrong_type_fields"]
             ]
             logger.warning(f"Fields with wrong type: {', '.join(wrong_types)}")
+
+# KPI -> (doctype, field) pairs its query reads; a field of None only needs the doctype
+KPI_SCHEMA_REQUIREMENTS = {
+    "item_utilization_rate": [
+        ("Item", "is_rental_item"), ("Item", "company"), ("Bin", "actual_qty"),
+        ("Rental Job", "company"), ("Rental Job", "rental_start_date"), ("Rental Job", "rental_end_date"),
+        ("Rental Job", "actual_return_date"), ("Rental Job Item", "qty")
+    ],
+    "average_rental_duration": [
+        ("Rental Job", "company"), ("Rental Job", "status"), ("Rental Job", "rental_start_date"),
+        ("Rental Job", "rental_end_date"), ("Rental Job", "actual_return_date")
+    ],
+    "revenue_per_item_category": [
+        ("Rental Job", "company"), ("Rental Job", "rental_start_date"), ("Rental Job", "rental_end_date"),
+        ("Rental Job", "actual_return_date"), ("Rental Job Item", "amount"), ("Item", "item_group")
+    ],
+    "maintenance_turnaround_time": [
+        ("Maintenance Task", "company"), ("Maintenance Task", "status"),
+        ("Maintenance Task", "start_date"), ("Maintenance Task", "completion_date")
+    ],
+    "booking_conversion_rate": [
+        ("Quotation", "company"), ("Quotation", "transaction_date"), ("Quotation", "is_rental_quotation"),
+        ("Rental Job", "quotation")
+    ],
+    "stock_reservation_conflicts": [
+        ("Rental Job", "company"), ("Rental Job", "status"), ("Rental Job", "rental_start_date"),
+        ("Rental Job", "rental_end_date"), ("Rental Job Item", "qty"), ("Bin", "actual_qty")
+    ],
+    "overdue_returns_count": [
+        ("Rental Job", "company"), ("Rental Job", "status"), ("Rental Job", "rental_end_date"),
+        ("Rental Job", "actual_return_date")
+    ],
+    "active_rental_jobs_count": [
+        ("Rental Job", "company"), ("Rental Job", "status"), ("Rental Job", "rental_start_date"),
+        ("Rental Job", "rental_end_date"), ("Rental Job", "actual_return_date")
+    ],
+    "total_rental_revenue": [
+        ("Sales Invoice", "company"), ("Sales Invoice", "posting_date"), ("Sales Invoice", "grand_total"),
+        ("Sales Invoice", "is_rental_invoice")
+    ]
+}
+
+# Result returned when a KPI cannot be calculated on this schema
+KPI_SAFE_VALUES = {
+    "revenue_per_item_category": {"labels": [], "datasets": [{"name": "Revenue", "values": []}]},
+    "total_rental_revenue": {"value": 0, "previous_value": 0, "change_percentage": 0}
+}
+
+def verify_schema_for_kpi(kpi_name: str) -> Dict[str, str]:
+    """
+    Verify that the doctypes and fields a KPI reads exist.
+
+    Checked against the schema capability map, so no database query is made.
+
+    Args:
+        kpi_name (str): Name of the KPI in KPI_SCHEMA_REQUIREMENTS
+
+    Returns:
+        dict: {"status": "valid" | "invalid", "message": str}
+
+    Example:
+        >>> verify_schema_for_kpi("overdue_returns_count")
+        {'status': 'invalid', 'message': 'Missing fields: Rental Job.rental_end_date'}
+    """
+    from onhire_pro.utils.schema_capabilities import doctype_exists, has_column
+
+    if kpi_name not in KPI_SCHEMA_REQUIREMENTS:
+        return {"status": "invalid", "message": f"Unknown KPI: {kpi_name}"}
+
+    missing_doctypes, missing_fields = [], []
+    for doctype, field in KPI_SCHEMA_REQUIREMENTS[kpi_name]:
+        if doctype in missing_doctypes:
+            continue
+        if not doctype_exists(doctype):
+            missing_doctypes.append(doctype)
+        elif field and not has_column(doctype, field):
+            missing_fields.append(f"{doctype}.{field}")
+
+    if missing_doctypes:
+        return {"status": "invalid", "message": f"Missing doctypes: {', '.join(missing_doctypes)}"}
+    if missing_fields:
+        return {"status": "invalid", "message": f"Missing fields: {', '.join(missing_fields)}"}
+    return {"status": "valid", "message": ""}
+
+def get_safe_value_for_kpi(kpi_name: str) -> Dict[str, Any]:
+    """
+    Get the result a KPI returns when its schema requirements are not met.
+
+    Example:
+        >>> get_safe_value_for_kpi("overdue_returns_count")
+        {'value': 0}
+    """
+    return json.loads(json.dumps(KPI_SAFE_VALUES.get(kpi_name, {"value": 0})))
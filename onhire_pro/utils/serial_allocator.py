@@ -0,0 +1,175 @@
+"""
+OnHire Pro - Rental Management Application for ERPNext
+
+This module provides automatic serial number allocation for serialized items.
+
+A booking line for a serialized item does not have to name its serials: the
+allocator keeps a pool per item with the active serials and their booked
+intervals (from the availability index) and picks the N serials for a window in
+one call. Two packing policies are available (Rental Settings > Serial
+Allocation Policy):
+
+- Best Fit: prefer serials whose bookings tightly surround the window, so short
+  gaps get used and long free stretches stay available for long hires.
+- Least Used: prefer serials with the fewest booked hours overall, to spread wear
+  across the fleet.
+
+Serials allocated or named earlier in the same batch are held in the pool, so a
+bulk reservation never hands out one serial twice.
+"""
+
+import frappe
+from frappe.utils import flt
+from typing import Dict, List, Optional, Iterable, Any
+from onhire_pro.utils.availability import get_item_stock
+from onhire_pro.utils.availability_index import get_item_index, to_timestamp
+from onhire_pro.utils.occupancy import best_fit_order, overlaps
+
+BEST_FIT = "Best Fit"
+LEAST_USED = "Least Used"
+ALLOCATION_POLICIES = (BEST_FIT, LEAST_USED)
+
+
+def get_allocation_policy() -> str:
+    """Serial allocation policy from Rental Settings (Best Fit if not set)"""
+    policy = frappe.db.get_single_value("Rental Settings", "serial_allocation_policy")
+    return policy if policy in ALLOCATION_POLICIES else BEST_FIT
+
+
+def get_serial_usage(item_codes: Iterable[str]) -> Dict[str, float]:
+    """Hours each serial of the items has been booked for, over all submitted reservations."""
+    item_codes = tuple(set(item_codes))
+    if not item_codes:
+        return {}
+
+    rows = frappe.db.sql("""
+        SELECT serial_no, SUM(TIMESTAMPDIFF(SECOND, from_date, to_date)) / 3600
+        FROM `tabStock Reservation`
+        WHERE item_code IN %(item_codes)s
+            AND docstatus = 1
+            AND IFNULL(serial_no, '') != ''
+        GROUP BY serial_no
+    """, {"item_codes": item_codes})
+
+    return {serial_no: flt(hours) for serial_no, hours in rows}
+
+
+class SerialPool:
+    """
+    Active serials of one item with their booked intervals.
+
+    Args:
+        item_code: Item the serials belong to
+        serial_nos: Active serials of the item
+        index: Availability index of the item
+        usage: Booked hours per serial, needed for Least Used
+        pending: serial_no -> bookings (with from_ts and to_ts) not written yet;
+            shared with the caller so explicitly named serials are held too
+        avoid: Serials named elsewhere in the batch; only picked as a last resort
+    """
+
+    def __init__(self, item_code: str, serial_nos: Iterable[str], index, usage: Optional[Dict[str, float]] = None,
+                 pending: Optional[Dict[str, List[Dict[str, Any]]]] = None, avoid: Iterable[str] = ()):
+        self.item_code = item_code
+        self.serial_nos = list(serial_nos)
+        self.index = index
+        self.usage = usage or {}
+        self.pending = pending if pending is not None else {}
+        self.avoid = set(avoid)
+
+    def _pending_overlaps(self, serial_no: str, from_ts: float, to_ts: float) -> bool:
+        return any(
+            overlaps(booking.from_ts, booking.to_ts, from_ts, to_ts)
+            for booking in self.pending.get(serial_no, ())
+        )
+
+    def free_serials(self, from_date, to_date, exclude: Optional[str] = None) -> List[str]:
+        """Serials of the pool that are neither booked nor held during the period."""
+        from_ts, to_ts = to_timestamp(from_date), to_timestamp(to_date)
+        free = []
+        for serial_no in self.serial_nos:
+            if self._pending_overlaps(serial_no, from_ts, to_ts):
+                continue
+            arrays = self.index.serials.get(serial_no)
+            if arrays and arrays.overlap_weight(from_ts, to_ts, inclusive=False) and \
+                    self.index.serial_conflict(serial_no, from_date, to_date, exclude=exclude):
+                continue
+            free.append(serial_no)
+        return free
+
+    def _gaps(self, serial_no: str, from_ts: float, to_ts: float):
+        before, after = float("inf"), float("inf")
+        arrays = self.index.serials.get(serial_no)
+        if arrays:
+            before, after = arrays.idle_gaps(from_ts, to_ts)
+
+        for booking in self.pending.get(serial_no, ()):
+            if booking.to_ts <= from_ts:
+                before = min(before, from_ts - booking.to_ts)
+            elif booking.from_ts >= to_ts:
+                after = min(after, booking.from_ts - to_ts)
+
+        return before, after
+
+    def rank(self, serial_nos: List[str], from_date, to_date, policy: str = BEST_FIT) -> List[str]:
+        """Order free serials by the packing policy, serials to avoid last."""
+        if policy == LEAST_USED:
+            ranked = sorted(serial_nos, key=lambda serial_no: (self.usage.get(serial_no, 0.0), serial_no))
+        else:
+            from_ts, to_ts = to_timestamp(from_date), to_timestamp(to_date)
+            gaps = [self._gaps(serial_no, from_ts, to_ts) for serial_no in serial_nos]
+            order = best_fit_order([gap[0] for gap in gaps], [gap[1] for gap in gaps])
+            ranked = [serial_nos[i] for i in order.tolist()]
+
+        return [s for s in ranked if s not in self.avoid] + [s for s in ranked if s in self.avoid]
+
+    def allocate(self, qty: int, from_date, to_date, policy: str = BEST_FIT,
+                 exclude: Optional[str] = None, hold: bool = True) -> List[str]:
+        """
+        Pick `qty` free serials for the period and hold them in the pool (unless
+        `hold` is off and the caller adds them to `pending` itself).
+
+        Returns:
+            list: The chosen serials, or every free serial (fewer than `qty`, none held)
+                if there are not enough
+        """
+        free = self.free_serials(from_date, to_date, exclude=exclude)
+        if len(free) < qty:
+            return free
+
+        chosen = self.rank(free, from_date, to_date, policy)[:qty]
+        if hold:
+            self.hold(chosen, from_date, to_date)
+        return chosen
+
+    def hold(self, serial_nos: Iterable[str], from_date, to_date) -> None:
+        """Keep serials busy for the period in this pool, e.g. for lines not written yet."""
+        from_ts, to_ts = to_timestamp(from_date), to_timestamp(to_date)
+        for serial_no in serial_nos:
+            self.pending.setdefault(serial_no, []).append(frappe._dict(from_ts=from_ts, to_ts=to_ts))
+
+
+def allocate_serials(item_code: str, qty: int, from_date, to_date, policy: Optional[str] = None,
+                     exclude: Optional[str] = None) -> List[str]:
+    """
+    Suggest `qty` free serials of an item for a period.
+
+    Nothing is locked or written; use `create_bulk_reservations` to reserve them.
+
+    Example:
+        >>> allocate_serials("CAM-FX6", 3, "2025-03-01", "2025-03-04")
+        ["CAM-FX6-0007", "CAM-FX6-0002", "CAM-FX6-0011"]
+    """
+    policy = policy or get_allocation_policy()
+    details = get_item_stock([item_code]).get(item_code)
+    if not details or not details.has_serial_no:
+        return []
+
+    pool = SerialPool(
+        item_code,
+        details.serial_nos,
+        get_item_index(item_code),
+        usage=get_serial_usage([item_code]) if policy == LEAST_USED else None
+    )
+    serial_nos = pool.allocate(qty, from_date, to_date, policy, exclude=exclude)
+    return serial_nos if len(serial_nos) == qty else []
@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
 from frappe.utils import getdate, add_days, cint
+from onhire_pro.utils.availability import check_availability
 from onhire_pro.doctype.rental_portal_settings.rental_portal_settings import get_rental_portal_settings, get_portal_navigation_items
 
 def get_context(context):
@@ -45,4 +46,11 @@ def get_cart_items():
             "total": 0
         }
     
+    # Check every rental line against its own dates in one batch
+    rental_items = [item for item in cart.get("items", []) if item.get("is_rental_item")]
+    for item, availability in zip(rental_items, check_availability(rental_items)):
+        item["available"] = availability.available
+        item["available_qty"] = availability.available_qty
+        item["availability_reason"] = availability.reason
+    
     return cart
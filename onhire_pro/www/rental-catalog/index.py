@@ -1,6 +1,7 @@
 import frappe
 from frappe import _
-from frappe.utils import getdate, add_days, cint
+from frappe.utils import add_days, cint
+from onhire_pro.utils.availability import get_availability_map
 from onhire_pro.doctype.rental_portal_settings.rental_portal_settings import get_rental_portal_settings, get_portal_navigation_items
 
 def get_context(context):
@@ -71,14 +72,16 @@ def get_context(context):
         items.sort(key=lambda x: x.rate or 0, reverse=True)
     # Most Popular would require additional data, default to name sort
     
-    # Check availability for each item
+    # Apply search filter if provided
+    if search:
+        items = [item for item in items if search.lower() in (item.item_name.lower() + " " +
+                                                              (item.description or "").lower())]
+    
+    # Check availability for all items at once
+    availability_map = get_availability_map([item.name for item in items], start_date, end_date)
+    
     for item in items:
-        item.available = check_item_availability(item.name, start_date, end_date)
-        
-        # Apply search filter if provided
-        if search and search.lower() not in (item.item_name.lower() + " " + 
-                                           (item.description or "").lower()):
-            items.remove(item)
+        item.available = availability_map[item.name].available
         
         # Calculate rates based on admin settings if not explicitly set
         if not item.daily_rate:
@@ -133,63 +136,3 @@ def get_context(context):
     }
     
     return context
-
-def check_item_availability(item_code, start_date, end_date):
-    """Check if item is available for the given date range"""
-    
-    # Convert to datetime objects
-    start_date = getdate(start_date)
-    end_date = getdate(end_date)
-    
-    # Get total quantity of this item
-    total_qty = frappe.db.get_value("Bin", 
-                                   {"item_code": item_code, "warehouse": frappe.db.get_single_value("Stock Settings", "default_warehouse")},
-                                   "actual_qty") or 0
-    
-    # If serialized item, check each serial number
-    is_serialized = frappe.db.get_value("Item", item_code, "has_serial_no")
-    
-    if is_serialized:
-        # Get all serial numbers for this item
-        serial_nos = frappe.get_all("Serial No", 
-                                   filters={"item_code": item_code, "status": "Active"},
-                                   fields=["name"])
-        
-        # Check each serial number for reservations
-        available_serial_nos = []
-        for sn in serial_nos:
-            # Check if serial number is reserved during the requested period
-            reserved = frappe.db.sql("""
-                SELECT name FROM `tabStock Reservation`
-                WHERE serial_no = %s
-                AND docstatus = 1
-                AND status IN ('Reserved', 'In Use')
-                AND (
-                    (from_date <= %s AND to_date >= %s)
-                    OR (from_date <= %s AND to_date >= %s)
-                    OR (from_date >= %s AND to_date <= %s)
-                )
-            """, (sn.name, end_date, start_date, start_date, start_date, start_date, end_date))
-            
-            if not reserved:
-                available_serial_nos.append(sn.name)
-        
-        # Item is available if at least one serial number is available
-        return len(available_serial_nos) > 0
-    else:
-        # For non-serialized items, check total reserved quantity
-        reserved_qty = frappe.db.sql("""
-            SELECT SUM(qty) FROM `tabStock Reservation`
-            WHERE item_code = %s
-            AND serial_no IS NULL
-            AND docstatus = 1
-            AND status IN ('Reserved', 'In Use')
-            AND (
-                (from_date <= %s AND to_date >= %s)
-                OR (from_date <= %s AND to_date >= %s)
-                OR (from_date >= %s AND to_date <= %s)
-            )
-        """, (item_code, end_date, start_date, start_date, start_date, start_date, end_date))[0][0] or 0
-        
-        # Item is available if there's at least one unit available
-        return (total_qty - reserved_qty) > 0
@@ -1,6 +1,6 @@
 import frappe
 from frappe import _
-from frappe.utils import getdate
+from onhire_pro.utils.availability import get_availability_map
 
 def get_context(context):
     """Prepare context for rental item detail page"""
@@ -86,60 +86,4 @@ def get_context(context):
 
 def check_item_availability(item_code, start_date, end_date):
     """Check if item is available for the given date range"""
-    
-    # Convert to datetime objects
-    start_date = getdate(start_date)
-    end_date = getdate(end_date)
-    
-    # Get total quantity of this item
-    total_qty = frappe.db.get_value("Bin", 
-                                   {"item_code": item_code, "warehouse": frappe.db.get_single_value("Stock Settings", "default_warehouse")},
-                                   "actual_qty") or 0
-    
-    # If serialized item, check each serial number
-    is_serialized = frappe.db.get_value("Item", item_code, "has_serial_no")
-    
-    if is_serialized:
-        # Get all serial numbers for this item
-        serial_nos = frappe.get_all("Serial No", 
-                                   filters={"item_code": item_code, "status": "Active"},
-                                   fields=["name"])
-        
-        # Check each serial number for reservations
-        available_serial_nos = []
-        for sn in serial_nos:
-            # Check if serial number is reserved during the requested period
-            reserved = frappe.db.sql("""
-                SELECT name FROM `tabStock Reservation`
-                WHERE serial_no = %s
-                AND docstatus = 1
-                AND status IN ('Reserved', 'In Use')
-                AND (
-                    (from_date <= %s AND to_date >= %s)
-                    OR (from_date <= %s AND to_date >= %s)
-                    OR (from_date >= %s AND to_date <= %s)
-                )
-            """, (sn.name, end_date, start_date, start_date, start_date, start_date, end_date))
-            
-            if not reserved:
-                available_serial_nos.append(sn.name)
-        
-        # Item is available if at least one serial number is available
-        return len(available_serial_nos) > 0
-    else:
-        # For non-serialized items, check total reserved quantity
-        reserved_qty = frappe.db.sql("""
-            SELECT SUM(qty) FROM `tabStock Reservation`
-            WHERE item_code = %s
-            AND serial_no IS NULL
-            AND docstatus = 1
-            AND status IN ('Reserved', 'In Use')
-            AND (
-                (from_date <= %s AND to_date >= %s)
-                OR (from_date <= %s AND to_date >= %s)
-                OR (from_date >= %s AND to_date <= %s)
-            )
-        """, (item_code, end_date, start_date, start_date, start_date, start_date, end_date))[0][0] or 0
-        
-        # Item is available if there's at least one unit available
-        return (total_qty - reserved_qty) > 0
+    return get_availability_map([item_code], start_date, end_date)[item_code].available